@@ -0,0 +1,86 @@
+"""Drive froog_core directly, without Discord, and report how fast it goes.
+
+Usage: python benchmark_core.py [--runs 5000] [--users 50] [--tracks 16]
+
+Everything runs against a fresh database in a temporary directory, so the bot's own
+database is never touched. Each submission is its own transaction, as with /add_time, and
+an active weekly trial covers three of the tracks so weekly entries and streaks are
+exercised too.
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+import froog_core
+from tracks_config import MK8_TRACKS
+
+GUILD_ID = 1
+
+def timed(label, count, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<16} {count:>7} calls  {elapsed:8.2f}s  {count / elapsed:10.0f}/s  {elapsed / count * 1000:8.3f} ms/call")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Discord-free froog_core service layer")
+    parser.add_argument("--runs", type=int, default=5000, help="runs to submit")
+    parser.add_argument("--users", type=int, default=50, help="distinct players submitting them")
+    parser.add_argument("--tracks", type=int, default=16, help="tracks the runs are spread over")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    tracks = MK8_TRACKS[:args.tracks]
+    
+    previous_cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="froog_bench_") as workdir:
+        os.chdir(workdir)
+        froog_core.init_database()
+        conn = sqlite3.connect('mario_kart_times.db')
+        cursor = conn.cursor()
+        config = froog_core.get_trial_config(cursor, GUILD_ID)
+        week_number = froog_core.get_trial_week(config, datetime.datetime.now(datetime.timezone.utc))
+        cursor.execute('''
+            INSERT INTO weekly_trials (guild_id, week_number, tracks, categories, start_date, end_date, is_active)
+            VALUES (?, ?, ?, ?, date('now'), date('now', '+6 days'), 1)
+        ''', (GUILD_ID, week_number, json.dumps(tracks[:3]), froog_core.format_trial_categories(config["categories"])))
+        conn.commit()
+        
+        # Times between the world record and 15% slower, so every standard tier gets hit
+        runs = []
+        for _ in range(args.runs):
+            track = rng.choice(tracks)
+            wr = froog_core.get_world_record(track, "150cc", "shrooms")
+            wr_ms = froog_core.time_to_total_ms(*wr) if wr else 120000
+            runs.append((rng.randrange(args.users), track, int(wr_ms * rng.uniform(1.0, 1.15))))
+        
+        def submit_all():
+            for user_id, track, total_ms in runs:
+                froog_core.submit_run(cursor, user_id, GUILD_ID, track, "150cc", "shrooms", *froog_core.total_ms_to_time(total_ms))
+                conn.commit()
+        
+        def leaderboard_all():
+            for _ in range(100):
+                froog_core.get_leaderboard(cursor, "150cc", "shrooms")
+        
+        def stats_all():
+            for user_id in range(args.users):
+                froog_core.compute_stats(cursor, user_id, "150cc", "shrooms", compare_id=(user_id + 1) % args.users)
+        
+        timed("submit_run", len(runs), submit_all)
+        timed("get_leaderboard", 100, leaderboard_all)
+        timed("compute_stats", args.users, stats_all)
+        conn.close()
+        os.chdir(previous_cwd)
+    
+    # The core must stay importable and usable without the Discord library
+    assert "discord" not in sys.modules, "froog_core imported discord"
+
+if __name__ == "__main__":
+    main()
@@ -2,113 +2,40 @@ import discord
 import sqlite3
 import os
 import random
+import re
 import datetime
 import asyncio
+import heapq
+import concurrent.futures
+import sys
+import csv
+import gzip
+import hashlib
+import io
+import json
+import socket
+import tempfile
+import zipfile
 from dotenv import load_dotenv
 load_dotenv()
-from tracks_config import MK8_TRACKS, GAME_MODES
+from tracks_config import MK8_TRACKS, MK8_CUPS, GAME_MODES
 from karts_config import MK8_VEHICLES
-from world_records_itemless import WORLD_RECORDS_ITEMLESS
-from world_records_shrooms import WORLD_RECORDS_SHROOMS
-from discord.ext import commands, tasks
-
-# Helper functions
-def get_tour_tracks():
-    """Get list of all Tour tracks from MK8_TRACKS"""
-    return [track for track in MK8_TRACKS if track.startswith("Tour ")]
-
-def get_non_tour_tracks():
-    """Get list of all non-Tour tracks from MK8_TRACKS"""
-    return [track for track in MK8_TRACKS if not track.startswith("Tour ")]
-
-def select_weekly_tracks(week_number):
-    """Select 3 tracks for the week. Every other week includes 1 tour track."""
-    # Handle week 0 (before trials start)
-    if week_number <= 0:
-        return []
-    
-    # Use week number as seed to ensure consistent selection across all servers
-    random.seed(week_number)
-    
-    tour_tracks = get_tour_tracks()
-    non_tour_tracks = get_non_tour_tracks()
-    
-    # Get previous week's tracks to avoid duplicates
-    previous_tracks = []
-    if week_number > 1:
-        try:
-            conn = sqlite3.connect('mario_kart_times.db')
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT track1, track2, track3 
-                FROM weekly_trials 
-                WHERE week_number = ?
-            ''', (week_number - 1,))
-            prev_result = cursor.fetchone()
-            if prev_result:
-                previous_tracks = [track for track in prev_result if track]
-            conn.close()
-        except Exception as e:
-            print(f"Warning: Could not fetch previous week's tracks: {e}")
-    
-    max_attempts = 50  # Prevent infinite loops
-    attempts = 0
-    
-    while attempts < max_attempts:
-        selected_tracks = []
-        
-        # Every other week (odd week numbers) should include a tour track
-        if week_number % 2 == 1:
-            # Include 1 tour track and 2 regular tracks
-            available_tour = [t for t in tour_tracks if t not in previous_tracks]
-            available_non_tour = [t for t in non_tour_tracks if t not in previous_tracks]
-            
-            # If we filtered out too many tracks, fall back to full lists
-            if len(available_tour) == 0:
-                available_tour = tour_tracks
-            if len(available_non_tour) < 2:
-                available_non_tour = non_tour_tracks
-            
-            selected_tracks.append(random.choice(available_tour))
-            selected_tracks.extend(random.sample(available_non_tour, min(2, len(available_non_tour))))
-        else:
-            # All regular tracks
-            available_non_tour = [t for t in non_tour_tracks if t not in previous_tracks]
-            
-            # If we filtered out too many tracks, fall back to full list
-            if len(available_non_tour) < 3:
-                available_non_tour = non_tour_tracks
-            
-            selected_tracks = random.sample(available_non_tour, min(3, len(available_non_tour)))
-        
-        # Check if we have any duplicates with previous week
-        if not any(track in previous_tracks for track in selected_tracks):
-            break
-        
-        attempts += 1
-        # Re-seed with a slight variation to get different random results
-        random.seed(week_number + attempts)
-    
-    # Reset random seed to avoid affecting other random operations
-    random.seed()
-    
-    return selected_tracks
+from discord.ext import commands
+from db_writer import WriterClient, WriterError
+from froog_core import (
+    fetch_weekly_standings, format_time, format_total_time, format_trial_categories,
+    get_active_weekly_trial, get_category_neighbors, get_leaderboard, get_track_neighbors,
+    get_trial_config, get_world_record, init_database, next_trial_event, open_weekly_trial,
+    parse_time, parse_trial_categories, previous_trial_event, RATING_PROVISIONAL_MATCHUPS,
+    SHARED_WEEK_GUILD_ID, standard_tier_name, standard_tier_points, STREAK_ROLES,
+    time_to_total_ms, total_ms_to_time, TRIAL_DEFAULT_CATEGORIES, TRIAL_EVENTS, validate_run,
+    warm_caches, WEEKDAY_NAMES, WRITE_OPERATIONS
+)
 
-def get_current_week():
-    """Get current week number since November 4, 2025 (Week 1 starts Monday Nov 4)"""
-    today = datetime.date.today()
-    # Get Monday of current week
-    monday = today - datetime.timedelta(days=today.weekday())
-    # Calculate week number since November 4, 2025 (Monday)
-    start_date = datetime.date(2025, 11, 4)  # Week 1 starts Monday November 4, 2025
-    # start_date is already a Monday, so no adjustment needed
-    
-    # If we're before the start date, return 0 (no active trials yet)
-    if monday < start_date:
-        return 0
-    
-    week_number = (monday - start_date).days // 7 + 1
-    return week_number
+# When run as a script this module is __main__; register it as "bot" too so the cogs'
+# "from bot import ..." reuse it instead of importing a second copy of the bot
+if __name__ == "__main__":
+    sys.modules.setdefault("bot", sys.modules[__name__])
 
 async def track_autocomplete(interaction, current: str):
     return [discord.app_commands.Choice(name=track, value=track) for track in MK8_TRACKS if current.lower() in track.lower()][:25]
@@ -125,125 +52,48 @@ async def test_autocomplete(interaction, current: str):
 async def cc_autocomplete(interaction, current: str):
     return [discord.app_commands.Choice(name=cc, value=cc) for cc in ["150cc", "200cc"] if current.lower() in cc.lower()][:25]
 
+async def cup_autocomplete(interaction, current: str):
+    return [discord.app_commands.Choice(name=cup_name, value=cup_name) for cup_name, _ in MK8_CUPS if current.lower() in cup_name.lower()][:25]
+
+async def ranking_autocomplete(interaction, current: str):
+    return [discord.app_commands.Choice(name=ranking, value=ranking) for ranking in RANKING_TYPES if current.lower() in ranking.lower()][:25]
+
+async def search_scope_autocomplete(interaction, current: str):
+    return [discord.app_commands.Choice(name=scope, value=scope) for scope in SEARCH_SCOPES if current.lower() in scope.lower()][:25]
+
+async def output_autocomplete(interaction, current: str):
+    return [discord.app_commands.Choice(name=output_format, value=output_format) for output_format in OUTPUT_FORMATS if current.lower() in output_format.lower()][:25]
+
+async def export_format_autocomplete(interaction, current: str):
+    return [discord.app_commands.Choice(name=fmt, value=fmt) for fmt in EXPORT_FORMATS if current.lower() in fmt.lower()][:25]
+
 def truncate_text(text, max_length):
     if not text:
         return ""
     return text if len(text) <= max_length else text[:max_length-3] + "..."
 
-def parse_time(time_str):
-    # Accepts MM:SS.mmm or M:SS.mmm
-    try:
-        mins_secs, ms = time_str.split('.')
-        mins, secs = mins_secs.split(':')
-        return int(mins), int(secs), int(ms)
-    except Exception:
-        return None
-
-def format_time(mins, secs, ms):
-    return f"{mins}:{secs:02d}.{ms:03d}"
-
-def time_to_total_ms(mins, secs, ms):
-    return mins * 60000 + secs * 1000 + ms
+def join_field_lines(lines, max_length=1000):
+    """Join lines for an embed field value, stopping before max_length with an '... and N more' note"""
+    field_value = ""
+    shown = 0
+    for line in lines:
+        if len(field_value) + len(line) + 1 > max_length - 20:
+            break
+        field_value += line + "\n"
+        shown += 1
+    field_value = field_value.rstrip("\n")
+    if shown < len(lines):
+        field_value += f"\n... and {len(lines) - shown} more"
+    return field_value
 
-# Streak management functions
-async def update_user_streak(user_id, guild_id, week_number):
-    """Update user's weekly trial streak based on participation"""
-    conn = sqlite3.connect('mario_kart_times.db')
-    cursor = conn.cursor()
-    
-    # Get current streak data
-    cursor.execute('''
-        SELECT current_streak, best_streak, last_participation_week, total_weeks_participated
-        FROM weekly_streaks 
-        WHERE user_id = ? AND guild_id = ?
-    ''', (user_id, guild_id))
-    
-    streak_data = cursor.fetchone()
-    
-    if streak_data:
-        current_streak, best_streak, last_week, total_weeks = streak_data
-        
-        # Check if they participated last week (streak continues) or this is a new streak
-        if last_week == week_number - 1:
-            # Streak continues
-            current_streak += 1
-        elif last_week < week_number - 1:
-            # Streak broken, reset to 1
-            current_streak = 1
-        # If last_week == week_number, they already participated this week
-        
-        # Update best streak if needed
-        if current_streak > best_streak:
-            best_streak = current_streak
-        
-        total_weeks += 1
-        
-        # Update record
-        cursor.execute('''
-            UPDATE weekly_streaks 
-            SET current_streak = ?, best_streak = ?, last_participation_week = ?, 
-                total_weeks_participated = ?, date_updated = CURRENT_TIMESTAMP
-            WHERE user_id = ? AND guild_id = ?
-        ''', (current_streak, best_streak, week_number, total_weeks, user_id, guild_id))
-    else:
-        # First time participating, create new record
-        current_streak = 1
-        best_streak = 1
-        total_weeks = 1
-        
-        cursor.execute('''
-            INSERT INTO weekly_streaks 
-            (user_id, guild_id, current_streak, best_streak, last_participation_week, total_weeks_participated)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (user_id, guild_id, current_streak, best_streak, week_number, total_weeks))
-    
-    conn.commit()
-    conn.close()
-    
-    return current_streak, best_streak
+# Time standard tier badges
+STANDARD_TIER_EMOJIS = {"Elite": "💎", "Gold": "🥇", "Silver": "🥈", "Bronze": "🥉"}
 
-async def check_weekly_completion(user_id, week_number):
-    """Check if user completed all 3 tracks for the week"""
-    conn = sqlite3.connect('mario_kart_times.db')
-    cursor = conn.cursor()
-    
-    # Get the 3 tracks for this week
-    cursor.execute('''
-        SELECT track1, track2, track3 
-        FROM weekly_trials 
-        WHERE week_number = ?
-    ''', (week_number,))
-    
-    trial_data = cursor.fetchone()
-    if not trial_data:
-        conn.close()
-        return False, []
-    
-    required_tracks = [trial_data[0], trial_data[1], trial_data[2]]
-    
-    # Check which tracks the user has submitted for
-    cursor.execute('''
-        SELECT DISTINCT track_name 
-        FROM weekly_submissions 
-        WHERE user_id = ? AND week_number = ?
-    ''', (user_id, week_number))
-    
-    submitted_tracks = [row[0] for row in cursor.fetchall()]
-    conn.close()
-    
-    completed_all = all(track in submitted_tracks for track in required_tracks)
-    return completed_all, submitted_tracks
+def format_tier(tier_points):
+    name = standard_tier_name(tier_points)
+    return f"{STANDARD_TIER_EMOJIS[name]} {name}" if name else "No tier"
 
 # Streak role management
-STREAK_ROLES = {
-    2: "Trial Cadet",
-    4: "Trial Veteran", 
-    8: "Trial Master",
-    16: "Trial Legend",
-    32: "Trial Champion",
-    52: "Trial Grandmaster"
-}
-
 async def award_streak_role(member, guild, current_streak):
     """Award appropriate role based on current streak"""
     # Find the highest role they've earned
@@ -288,254 +138,306 @@ async def award_streak_role(member, guild, current_streak):
     
     return None  # Already has the role
 
-async def track_record_change(user_id, guild_id, track, mode, items, mins, secs, ms, vehicle=None, notes=None):
-    """Track when someone gets or loses a record"""
-    conn = sqlite3.connect('mario_kart_times.db')
-    cursor = conn.cursor()
-    
-    # Check current record holder
-    cursor.execute('''
-        SELECT user_id FROM record_holders 
-        WHERE track_name = ? AND game_mode = ? AND items_setting = ? AND guild_id = ? AND is_current = 1
-    ''', (track, mode, items, guild_id))
-    
-    current_holder = cursor.fetchone()
-    current_time = datetime.datetime.now().isoformat()
-    
-    if current_holder and current_holder[0] != user_id:
-        # Someone else held the record, mark it as lost
-        cursor.execute('''
-            UPDATE record_holders 
-            SET is_current = 0, date_lost = ?, days_held = CAST((julianday(?) - julianday(date_achieved)) AS INTEGER)
-            WHERE track_name = ? AND game_mode = ? AND items_setting = ? AND guild_id = ? AND is_current = 1
-        ''', (current_time, current_time, track, mode, items, guild_id))
-    
-    # Add new record
-    cursor.execute('''
-        INSERT INTO record_holders 
-        (user_id, guild_id, track_name, game_mode, items_setting, time_minutes, time_seconds, time_milliseconds, 
-         date_achieved, vehicle_setup, notes, is_current)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
-    ''', (user_id, guild_id, track, mode, items, mins, secs, ms, current_time, vehicle or "", notes or ""))
-    
-    conn.commit()
-    conn.close()
+async def award_streak_progress(interaction, current_streak):
+    """Award the streak role for a streak the core just advanced (see advance_weekly_streak).
+    
+    Returns a line for the weekly trials summary, or None if there is nothing to report.
+    """
+    # Try to award streak role
+    member = interaction.guild.get_member(interaction.user.id)
+    if member:
+        awarded_role = await award_streak_role(member, interaction.guild, current_streak)
+        if awarded_role:
+            return f"🏆 **{awarded_role.name}** role awarded for {current_streak} week streak!"
+    if current_streak > 1:
+        return f"🔥 Trial streak: {current_streak} weeks!"
+    return None
+
+def format_standing(distribution, best_ms):
+    """Describe where a PB sits in its track's distribution, e.g. 'Faster than 75.0% of 41 players (top 25%)'"""
+    if distribution.total <= 1:
+        return "Only time on this track so far"
+    faster, slower = distribution.standing(best_ms)
+    beaten_pct = 100 * slower / (distribution.total - 1)
+    top_pct = max(1, round(100 * (faster + 1) / distribution.total))
+    return f"Faster than {beaten_pct:.1f}% of {distribution.total - 1} other players (top {top_pct}%)"
+
+def tier_change_line(result):
+    """'🥇 Gold on <track> (...)' if a batch result moved the player into a better tier, else None"""
+    old_points = standard_tier_points(result["track"], result["mode"], result["items"], result["old_best_ms"])
+    new_points = standard_tier_points(result["track"], result["mode"], result["items"], result["new_best_ms"])
+    if new_points <= old_points:
+        return None
+    return f"{format_tier(new_points)} on {result['track']} ({result['mode']}, {result['items']})"
 
-async def check_milestones(user_id, guild_id):
-    """Check and award milestones for user achievements"""
-    conn = sqlite3.connect('mario_kart_times.db')
-    cursor = conn.cursor()
-    
-    # Count total submissions
-    cursor.execute('SELECT COUNT(*) FROM time_trials WHERE user_id = ?', (user_id,))
-    total_submissions = cursor.fetchone()[0]
-    
-    # Count unique tracks
-    cursor.execute('SELECT COUNT(DISTINCT track_name) FROM time_trials WHERE user_id = ?', (user_id,))
-    unique_tracks = cursor.fetchone()[0]
-    
-    # Check for milestones
-    milestones_to_check = [
-        (10, "10_submissions", f"First 10 Time Trials"),
-        (50, "50_submissions", f"50 Time Trials Milestone"),
-        (100, "100_submissions", f"Century Club - 100 Submissions"),
-        (500, "500_submissions", f"Speed Demon - 500 Submissions"),
-        (10, "10_tracks", f"Track Explorer - 10 Different Tracks"),
-        (25, "25_tracks", f"Track Veteran - 25 Different Tracks"),
-        (50, "50_tracks", f"Track Master - 50 Different Tracks"),
-        (96, "all_tracks", f"Track Completionist - All 96 Tracks!")
-    ]
-    
-    new_milestones = []
-    for threshold, milestone_type, milestone_name in milestones_to_check:
-        # Check if milestone already achieved
-        cursor.execute('''
-            SELECT id FROM user_milestones 
-            WHERE user_id = ? AND guild_id = ? AND milestone_type = ?
-        ''', (user_id, guild_id, milestone_type))
-        
-        if not cursor.fetchone():
-            # Check if threshold is met
-            if ("submissions" in milestone_type and total_submissions >= threshold) or \
-               ("tracks" in milestone_type and unique_tracks >= threshold):
-                
-                # Award milestone
-                cursor.execute('''
-                    INSERT INTO user_milestones (user_id, guild_id, milestone_type, milestone_name, milestone_data)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (user_id, guild_id, milestone_type, milestone_name, f"Achieved with {total_submissions} submissions on {unique_tracks} tracks"))
-                
-                new_milestones.append(milestone_name)
-    
-    conn.commit()
-    conn.close()
-    return new_milestones
+# Data export
+EXPORT_FORMATS = ["csv", "ndjson"]
+EXPORT_TABLES = ["time_trials", "weekly_submissions", "record_holders"]
+EXPORT_CHUNK_SIZE = 1000
 
-def time_to_total_ms(mins, secs, ms):
-    return mins * 60000 + secs * 1000 + ms
+def write_time_export(fileobj, scope_column, scope_id, export_format):
+    """Stream every row of EXPORT_TABLES matching scope_column = scope_id into fileobj.
 
-def init_database():
+    CSV exports are a zip holding one CSV per table; NDJSON exports are a single gzipped
+    file with one JSON object per line, tagged with its table. Rows are pulled from the
+    cursor in EXPORT_CHUNK_SIZE chunks so memory stays flat however many runs there are.
+    Returns a dict of table -> rows written.
+    """
     conn = sqlite3.connect('mario_kart_times.db')
     cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS time_trials (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            track_name TEXT,
-            time_minutes INTEGER,
-            time_seconds INTEGER,
-            time_milliseconds INTEGER,
-            game_mode TEXT,
-            items_setting TEXT,
-            vehicle_setup TEXT,
-            notes TEXT,
-            date_recorded TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
+    counts = {}
+    
+    def stream_table(table):
+        cursor.execute(f'SELECT * FROM {table} WHERE {scope_column} = ?', (scope_id,))
+        columns = [col[0] for col in cursor.description]
+        yield columns
+        while True:
+            rows = cursor.fetchmany(EXPORT_CHUNK_SIZE)
+            if not rows:
+                break
+            counts[table] = counts.get(table, 0) + len(rows)
+            yield rows
     
-    # Weekly trials table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS weekly_trials (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            week_number INTEGER UNIQUE,
-            track1 TEXT,
-            track2 TEXT,
-            track3 TEXT,
-            start_date TEXT,
-            end_date TEXT,
-            is_active BOOLEAN DEFAULT 1
-        )
-    ''')
+    try:
+        if export_format == "csv":
+            with zipfile.ZipFile(fileobj, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+                for table in EXPORT_TABLES:
+                    counts[table] = 0
+                    chunks = stream_table(table)
+                    with io.TextIOWrapper(archive.open(f"{table}.csv", 'w'), encoding='utf-8', newline='') as text:
+                        writer = csv.writer(text)
+                        writer.writerow(next(chunks))
+                        for rows in chunks:
+                            writer.writerows(rows)
+        else:
+            with io.TextIOWrapper(gzip.GzipFile(fileobj=fileobj, mode='wb'), encoding='utf-8') as text:
+                for table in EXPORT_TABLES:
+                    counts[table] = 0
+                    chunks = stream_table(table)
+                    columns = next(chunks)
+                    for rows in chunks:
+                        for row in rows:
+                            text.write(json.dumps({"table": table, **dict(zip(columns, row))}) + "\n")
+    finally:
+        conn.close()
     
-    # Weekly submissions table (separate from regular time_trials)
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS weekly_submissions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            week_number INTEGER,
-            user_id INTEGER,
-            track_name TEXT,
-            time_minutes INTEGER,
-            time_seconds INTEGER,
-            time_milliseconds INTEGER,
-            game_mode TEXT,
-            items_setting TEXT,
-            vehicle_setup TEXT,
-            notes TEXT,
-            date_recorded TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (week_number) REFERENCES weekly_trials(week_number)
-        )
-    ''')
+    return counts
+
+async def send_time_export(interaction, scope_column, scope_id, export_format, filename_prefix):
+    """Build an export off the event loop and send it as an ephemeral attachment"""
+    await interaction.response.defer(ephemeral=True)
     
-    # Weekly trial streaks table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS weekly_streaks (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            guild_id INTEGER,
-            current_streak INTEGER DEFAULT 0,
-            best_streak INTEGER DEFAULT 0,
-            last_participation_week INTEGER DEFAULT 0,
-            total_weeks_participated INTEGER DEFAULT 0,
-            date_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE(user_id, guild_id)
+    with tempfile.TemporaryFile() as export_file:
+        try:
+            counts = await asyncio.to_thread(write_time_export, export_file, scope_column, scope_id, export_format)
+        except Exception as e:
+            print(f"❌ Export error for {scope_column}={scope_id}: {e}")
+            await interaction.followup.send(f"❌ Error building export: {str(e)[:200]}", ephemeral=True)
+            return
+        
+        size = export_file.tell()
+        size_limit = interaction.guild.filesize_limit if interaction.guild else 25 * 1024 * 1024
+        if size > size_limit:
+            await interaction.followup.send(
+                f"❌ Export is {size / (1024 * 1024):.1f} MB, which is over this server's upload limit. "
+                "Please contact the bot administrators for a copy.",
+                ephemeral=True
+            )
+            return
+        
+        export_file.seek(0)
+        extension = "zip" if export_format == "csv" else "ndjson.gz"
+        filename = f"{filename_prefix}_{datetime.date.today().isoformat()}.{extension}"
+        summary = "\n".join(f"• `{table}`: {count} rows" for table, count in counts.items())
+        await interaction.followup.send(
+            f"📦 **Your export is ready** ({export_format.upper()})\n{summary}",
+            file=discord.File(export_file, filename=filename),
+            ephemeral=True
         )
-    ''')
+
+# Bulk submissions
+IMPORT_MAX_BYTES = 1024 * 1024
+IMPORT_MAX_ROWS = 5000
+
+def parse_import_csv(text, default_mode, default_items):
+    """Parse and validate an import CSV.
+
+    The header row needs `track` and `time` columns; `mode`, `items`, `vehicle`, `notes`
+    and `date` are optional (mode/items fall back to the given defaults). Returns
+    (runs, errors) where runs are insert_run_batch tuples and errors are per-line messages.
+    """
+    reader = csv.DictReader(io.StringIO(text))
+    headers = {header.strip().lower(): header for header in reader.fieldnames or [] if header}
+    if "track" not in headers or "time" not in headers:
+        return [], ["The CSV needs a header row with at least `track` and `time` columns."]
+    
+    runs = []
+    errors = []
+    for line_number, row in enumerate(reader, 2):
+        def field(name):
+            column = headers.get(name)
+            return (row.get(column) or "").strip() if column else ""
+        
+        run, error = validate_run(field("track"), field("time"), field("mode") or default_mode, field("items") or default_items)
+        date_recorded = None
+        if not error and field("date"):
+            try:
+                date_recorded = datetime.datetime.fromisoformat(field("date")).strftime("%Y-%m-%d %H:%M:%S")
+            except ValueError:
+                error = f"invalid date `{field('date')}` (use YYYY-MM-DD)"
+        
+        if error:
+            errors.append(f"Line {line_number}: {error}")
+            continue
+        runs.append((*run, field("vehicle") or None, field("notes") or None, date_recorded))
     
-    # Hall of Fame tables for legacy records and achievements
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS record_holders (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            guild_id INTEGER,
-            track_name TEXT,
-            game_mode TEXT,
-            items_setting TEXT,
-            time_minutes INTEGER,
-            time_seconds INTEGER,
-            time_milliseconds INTEGER,
-            date_achieved TIMESTAMP,
-            date_lost TIMESTAMP,
-            days_held INTEGER,
-            is_current BOOLEAN DEFAULT 1,
-            vehicle_setup TEXT,
-            notes TEXT
-        )
-    ''')
+    return runs, errors
+
+SESSION_MAX_RUNS = 50
+
+def parse_session_runs(text, mode, items, vehicle=None, notes=None):
+    """Parse session lines of the form `Track, M:SS.mmm` (the comma is optional).
+
+    Returns (runs, errors) where runs are insert_run_batch tuples sharing the session's
+    mode, items, vehicle and notes.
+    """
+    runs = []
+    errors = []
+    for line_number, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line:
+            continue
+        parts = line.rsplit(",", 1) if "," in line else line.rsplit(None, 1)
+        if len(parts) != 2:
+            errors.append(f"Line {line_number}: expected `Track, M:SS.mmm`")
+            continue
+        run, error = validate_run(parts[0], parts[1], mode, items)
+        if error:
+            errors.append(f"Line {line_number}: {error}")
+            continue
+        runs.append((*run, vehicle, notes, None))
+    return runs, errors
+
+def weekly_batch_lines(weekly_bests):
+    """One weekly trials line per track and category from insert_weekly_batch's (track, mode, items, batch_best_ms, previous_best_ms)"""
+    lines = []
+    for track, mode, items, session_best_ms, previous_best_ms in weekly_bests:
+        formatted_best = format_time(*total_ms_to_time(session_best_ms))
+        label = f"{track} ({mode}, {items})"
+        if previous_best_ms is None:
+            lines.append(f"🎉 {label}: first weekly submission ({formatted_best})")
+        elif session_best_ms < previous_best_ms:
+            improvement_seconds = (previous_best_ms - session_best_ms) / 1000
+            lines.append(f"🎉 {label}: new weekly best {formatted_best} (-{improvement_seconds:.3f}s)")
+        else:
+            difference_seconds = (session_best_ms - previous_best_ms) / 1000
+            lines.append(f"{label}: weekly best {format_time(*total_ms_to_time(previous_best_ms))} (+{difference_seconds:.3f}s)")
+    return lines
+
+def build_batch_summary_embed(title, run_count, results, new_milestones, weekly_lines=None):
+    """Summarize an insert_run_batch result as a single embed"""
+    embed = discord.Embed(title=title, color=0x00ff00)
+    embed.description = (
+        f"Recorded **{run_count}** run{'s' if run_count != 1 else ''} across "
+        f"**{len(results)}** track/mode/items setting{'s' if len(results) != 1 else ''}."
+    )
     
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS user_milestones (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            guild_id INTEGER,
-            milestone_type TEXT,
-            milestone_name TEXT,
-            date_achieved TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            milestone_data TEXT
-        )
-    ''')
+    pb_lines = []
+    record_lines = []
+    tier_lines = []
+    for result in results:
+        label = f"{result['track']} ({result['mode']}, {result['items']})"
+        new_time = format_time(*total_ms_to_time(result["new_best_ms"]))
+        if result["old_best_ms"] is None:
+            pb_lines.append(f"🆕 {label}: {new_time}")
+        elif result["new_best_ms"] < result["old_best_ms"]:
+            improvement_seconds = (result["old_best_ms"] - result["new_best_ms"]) / 1000
+            pb_lines.append(f"🎉 {label}: {new_time} (-{improvement_seconds:.3f}s)")
+        if result["took_record"]:
+            record_lines.append(f"👑 {label}: {new_time}")
+        tier_line = tier_change_line(result)
+        if tier_line:
+            tier_lines.append(tier_line)
+    
+    if pb_lines:
+        embed.add_field(name=f"🏆 New Personal Bests ({len(pb_lines)})", value=join_field_lines(pb_lines), inline=False)
+    if record_lines:
+        embed.add_field(name=f"👑 Top Times ({len(record_lines)})", value=join_field_lines(record_lines), inline=False)
+    if tier_lines:
+        embed.add_field(name=f"⭐ New Standards Reached ({len(tier_lines)})", value=join_field_lines(tier_lines), inline=False)
+    if weekly_lines:
+        embed.add_field(name="📅 Weekly Trials", value=join_field_lines(weekly_lines), inline=False)
+    if new_milestones:
+        milestone_text = "\n".join([f"🎖️ {milestone}" for milestone in new_milestones])
+        embed.add_field(name="🏆 New Achievements Unlocked!", value=milestone_text, inline=False)
     
-    conn.commit()
-    conn.close()
+    if pb_lines or record_lines or new_milestones:
+        embed.color = 0xffd700
+    return embed
+
+async def send_record_pings(interaction, results):
+    """Ping everyone whose top time was beaten by a batch, in as few messages as possible"""
+    ping_lines = [
+        f"🏁 <@{result['beaten_user_id']}> Your top time for {result['track']} ({result['mode']}, {result['items']}) was just beaten!"
+        for result in results if result["beaten_user_id"]
+    ]
+    message = ""
+    for line in ping_lines:
+        if len(message) + len(line) + 1 > 2000:
+            await interaction.channel.send(message)
+            message = ""
+        message += line + "\n"
+    if message:
+        try:
+            await interaction.channel.send(message)
+        except Exception:
+            await interaction.followup.send(message, ephemeral=False)
 
-async def generate_weekly_leaderboard(week_number, tracks):
-    """Generate leaderboard embed for weekly trials"""
+async def generate_weekly_leaderboard(trial):
+    """Generate leaderboard embed for a server's week (a get_weekly_trial dict)"""
     conn = sqlite3.connect('mario_kart_times.db')
     cursor = conn.cursor()
     
     embed = discord.Embed(
-        title=f"🏆 Weekly Trials Results - Week {week_number}",
+        title=f"🏆 Weekly Trials Results - Week {trial['week_number']}",
         description="Final leaderboard for this week's trials",
         color=0xffd700
     )
     
-    for i, track in enumerate(tracks, 1):
-        # Get top 5 USERS with their best times for this track (no duplicate users)
-        cursor.execute('''
-            SELECT ws.user_id, ws.time_minutes, ws.time_seconds, ws.time_milliseconds, ws.vehicle_setup
-            FROM weekly_submissions ws
-            INNER JOIN (
-                SELECT user_id, MIN(time_minutes * 60000 + time_seconds * 1000 + time_milliseconds) as best_time_ms
-                FROM weekly_submissions
-                WHERE week_number = ? AND track_name = ?
-                GROUP BY user_id
-            ) best ON ws.user_id = best.user_id 
-                AND (ws.time_minutes * 60000 + ws.time_seconds * 1000 + ws.time_milliseconds) = best.best_time_ms
-            WHERE ws.week_number = ? AND ws.track_name = ?
-            ORDER BY (ws.time_minutes * 60000 + ws.time_seconds * 1000 + ws.time_milliseconds) ASC
-            LIMIT 5
-        ''', (week_number, track, week_number, track))
-        
-        results = cursor.fetchall()
+    sections = [(track, category) for track in trial["tracks"] for category in trial["categories"]]
+    field_limit = min(900, 5000 // len(sections))  # Stay under the 6000 character embed limit
+    for track, (mode, items) in sections:
+        # Top 5 users by their best time on this track and category
+        results = fetch_weekly_standings(cursor, trial["guild_id"], trial["week_number"], track, mode, items)[:5]
+        field_name = f"{trial['tracks'].index(track) + 1}. {truncate_text(track, 30)}"  # Limit track name in title
+        if len(trial["categories"]) > 1:
+            field_name += f" ({mode}, {items})"
         
         if results:
             leaderboard_text = ""
-            for j, (user_id, mins, secs, ms, vehicle) in enumerate(results, 1):
-                formatted_time = format_time(mins, secs, ms)
-                try:
-                    user = await bot.fetch_user(user_id)
-                    username = truncate_text(user.display_name, 20)  # Limit username length
-                except:
-                    username = f"User {user_id}"
+            for j, (user_id, best_ms, vehicle) in enumerate(results, 1):
+                formatted_time = format_time(*total_ms_to_time(best_ms))
+                username = await get_user_name(user_id)
                 
                 medal = ["🥇", "🥈", "🥉", "4️⃣", "5️⃣"][j-1]
                 vehicle_str = f" ({truncate_text(vehicle, 15)})" if vehicle else ""  # Limit vehicle length
                 line = f"{medal} {username}: {formatted_time}{vehicle_str}\n"
                 
                 # Check if adding this line would exceed limit
-                if len(leaderboard_text + line) > 900:  # Leave buffer
+                if len(leaderboard_text + line) > field_limit:  # Leave buffer
                     leaderboard_text += "... (truncated)"
                     break
                 
                 leaderboard_text += line
             
             embed.add_field(
-                name=f"{i}. {truncate_text(track, 30)}",  # Limit track name in title
+                name=field_name,
                 value=leaderboard_text.rstrip("\n") or "No submissions",
                 inline=False
             )
         else:
             embed.add_field(
-                name=f"{i}. {truncate_text(track, 30)}",
+                name=field_name,
                 value="No submissions",
                 inline=False
             )
@@ -543,1868 +445,1570 @@ async def generate_weekly_leaderboard(week_number, tracks):
     conn.close()
     return embed
 
-# Bot setup
-intents = discord.Intents.default()
-# Remove privileged intents that require approval
-# intents.members = True  # Commented out - requires privileged intent
-# intents.guilds = True   # This is included in default intents
-bot = commands.Bot(command_prefix="!", intents=intents)
-
-@tasks.loop(time=datetime.time(hour=12, minute=0))  # Sunday 12:00 PM
-async def start_weekly_trials():
-    """Start new weekly trials every Sunday at 12:00 PM"""
-    today = datetime.date.today()
-    if today.weekday() == 6:  # Sunday = 6
-        await setup_new_weekly_trials()
-
-@tasks.loop(time=datetime.time(hour=12, minute=0))  # Saturday 12:00 PM  
-async def end_weekly_trials():
-    """End weekly trials every Saturday at 12:00 PM and show results"""
-    today = datetime.date.today()
-    if today.weekday() == 5:  # Saturday = 5
-        await finish_weekly_trials()
-
-async def setup_new_weekly_trials(target_guild=None):
-    """Set up new weekly trials"""
-    week_number = get_current_week()
-    
-    # If week is 0, trials haven't started yet
-    if week_number == 0:
-        print("📅 Weekly trials haven't started yet (starts Monday November 4, 2025)")
-        return
-    
-    tracks = select_weekly_tracks(week_number)
+# Command sync
+# Comma-separated guild IDs; when set, commands are synced to these guilds only (instant
+# updates while developing) instead of globally
+DEV_GUILD_IDS = [int(guild_id) for guild_id in os.getenv('DEV_GUILD_IDS', '').replace(' ', '').split(',') if guild_id]
+FORCE_COMMAND_SYNC = os.getenv('FORCE_COMMAND_SYNC', '') == '1'
+
+def command_tree_hash(tree, guild=None):
+    """Stable hash of the commands registered for a scope, as they'd be sent to Discord.
     
+    Covers names, descriptions, options, choices and autocomplete flags; command order and
+    dict ordering don't affect it.
+    """
+    payload = sorted((command.to_dict(tree) for command in tree.get_commands(guild=guild)), key=lambda command: (command.get('type', 1), command['name']))
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, separators=(',', ':')).encode('utf-8')).hexdigest()
+
+def get_synced_hash(scope):
+    conn = sqlite3.connect('mario_kart_times.db')
+    cursor = conn.cursor()
+    cursor.execute('SELECT tree_hash FROM command_sync_state WHERE scope = ?', (scope,))
+    row = cursor.fetchone()
+    conn.close()
+    return row[0] if row else None
+
+def save_synced_hash(scope, tree_hash):
     conn = sqlite3.connect('mario_kart_times.db')
     cursor = conn.cursor()
-    
-    # Deactivate previous trials
-    cursor.execute('UPDATE weekly_trials SET is_active = 0 WHERE is_active = 1')
-    
-    # Insert new weekly trials
-    start_date = datetime.date.today().isoformat()
-    end_date = (datetime.date.today() + datetime.timedelta(days=6)).isoformat()
-    
     cursor.execute('''
-        INSERT OR REPLACE INTO weekly_trials 
-        (week_number, track1, track2, track3, start_date, end_date, is_active)
-        VALUES (?, ?, ?, ?, ?, ?, 1)
-    ''', (week_number, tracks[0], tracks[1], tracks[2], start_date, end_date))
-    
+        INSERT INTO command_sync_state (scope, tree_hash) VALUES (?, ?)
+        ON CONFLICT (scope) DO UPDATE SET tree_hash = excluded.tree_hash, date_synced = CURRENT_TIMESTAMP
+    ''', (scope, tree_hash))
     conn.commit()
     conn.close()
+
+async def sync_command_tree(tree, force=False):
+    """Sync commands to Discord only for scopes whose command tree hash changed since the last sync"""
+    if DEV_GUILD_IDS:
+        targets = []
+        for guild_id in DEV_GUILD_IDS:
+            guild = discord.Object(id=guild_id)
+            tree.copy_global_to(guild=guild)
+            targets.append((str(guild_id), guild))
+    else:
+        targets = [("global", None)]
     
-    # Announce new trials - if target_guild specified, only post there
-    guilds_to_announce = [target_guild] if target_guild else bot.guilds
-    
-    for guild in guilds_to_announce:
-        if guild is None:
+    for scope, guild in targets:
+        tree_hash = command_tree_hash(tree, guild)
+        if not force and get_synced_hash(scope) == tree_hash:
+            print(f"Commands unchanged for {scope}, skipping sync")
             continue
-        
-        # Find the specific time-trials-of-the-week channel (exact name match)
-        target_channels = [ch for ch in guild.text_channels if ch.name.lower().strip() == 'time-trials-of-the-week']
-        
-        if target_channels:
-            channel = target_channels[0]  # Use the first (should be only) match
-            embed = discord.Embed(
-                title="🏁 New Weekly Time Trials!",
-                description=f"Week {week_number} trials are now active!",
-                color=0x00ff00
-            )
-            embed.add_field(name="Featured Tracks", value=f"1. {tracks[0]}\n2. {tracks[1]}\n3. {tracks[2]}", inline=False)
-            embed.add_field(name="Duration", value=f"{start_date} to {end_date}", inline=False)
-            embed.add_field(name="How to Participate", value="Use `/add_time` with 150cc and shrooms for these tracks!", inline=False)
-            
-            try:
-                await channel.send(embed=embed)
-                print(f"✅ Posted new weekly trials to {guild.name}#{channel.name}")
-            except discord.Forbidden:
-                print(f"❌ Missing permissions to send messages in {guild.name}#{channel.name}")
-            except discord.HTTPException as e:
-                print(f"❌ Failed to send message in {guild.name}#{channel.name}: {e}")
-            except Exception as e:
-                print(f"❌ Unexpected error sending message in {guild.name}#{channel.name}: {e}")
-        else:
-            print(f"ℹ️ No 'time-trials-of-the-week' channel found in {guild.name}")
+        try:
+            synced = await tree.sync(guild=guild)
+            save_synced_hash(scope, tree_hash)
+            print(f"Synced {len(synced)} command(s) to {scope}")
+        except Exception as e:
+            print(f"Failed to sync commands to {scope}: {e}")
+
+# Sharding
+# SHARD_COUNT is the total number of shards across every bot process and SHARD_IDS the
+# comma-separated shards this process runs. Leave both unset to run every shard here.
+SHARD_COUNT = int(os.getenv('SHARD_COUNT')) if os.getenv('SHARD_COUNT') else None
+SHARD_IDS = [int(shard_id) for shard_id in os.getenv('SHARD_IDS', '').replace(' ', '').split(',') if shard_id]
+# Names this process in cluster_leases and bot_guilds
+CLUSTER_NAME = os.getenv('CLUSTER_NAME') or f"{socket.gethostname()}:{os.getpid()}"
+
+# Cluster coordination: processes share state through the database only
+LEASE_TTL_SECONDS = 90
+LEASE_RENEW_SECONDS = 30
+SCHEDULER_LEASE = "trial_scheduler"
+
+def local_shard_condition(column):
+    """SQL condition (and its params) matching rows whose guild is on one of this process's shards"""
+    shard_ids = sorted(bot.shards)
+    return f"(({column} >> 22) % ?) IN ({', '.join('?' * len(shard_ids))})", (bot.shard_count, *shard_ids)
+
+def acquire_lease(name):
+    """Take or renew a lease for this process.
+    
+    Returns the lease's revision if this process holds it, or None while another process
+    holds an unexpired one.
+    """
+    now = datetime.datetime.now(datetime.timezone.utc).timestamp()
+    conn = sqlite3.connect('mario_kart_times.db')
+    cursor = conn.cursor()
+    cursor.execute('''
+        INSERT INTO cluster_leases (name, owner, expires_at) VALUES (?, ?, ?)
+        ON CONFLICT (name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+        WHERE cluster_leases.owner = excluded.owner OR cluster_leases.expires_at <= ?
+    ''', (name, CLUSTER_NAME, now + LEASE_TTL_SECONDS, now))
+    held = cursor.rowcount == 1
+    cursor.execute('SELECT revision FROM cluster_leases WHERE name = ?', (name,))
+    revision = cursor.fetchone()[0]
+    conn.commit()
+    conn.close()
+    return revision if held else None
 
-async def finish_weekly_trials(target_guild=None):
-    """Finish current weekly trials and show leaderboard"""
+def release_lease(name):
     conn = sqlite3.connect('mario_kart_times.db')
     cursor = conn.cursor()
-    
-    # Get current active trials
-    cursor.execute('SELECT * FROM weekly_trials WHERE is_active = 1')
-    current_trial = cursor.fetchone()
-    
-    if current_trial:
-        week_number, track1, track2, track3 = current_trial[1], current_trial[2], current_trial[3], current_trial[4]
-        
-        # Generate leaderboard - if target_guild specified, only post there
-        guilds_to_announce = [target_guild] if target_guild else bot.guilds
-        
-        for guild in guilds_to_announce:
-            if guild is None:
-                continue
-            
-            # Find the specific time-trials-of-the-week channel (exact name match)
-            target_channels = [ch for ch in guild.text_channels if ch.name.lower().strip() == 'time-trials-of-the-week']
-            
-            if target_channels:
-                channel = target_channels[0]  # Use the first (should be only) match
-                embed = await generate_weekly_leaderboard(week_number, [track1, track2, track3])
-                
-                try:
-                    await channel.send(embed=embed)
-                    print(f"✅ Posted weekly leaderboard to {guild.name}#{channel.name}")
-                except discord.Forbidden:
-                    print(f"❌ Missing permissions to send messages in {guild.name}#{channel.name}")
-                except discord.HTTPException as e:
-                    print(f"❌ Failed to send leaderboard in {guild.name}#{channel.name}: {e}")
-                except Exception as e:
-                    print(f"❌ Unexpected error sending leaderboard in {guild.name}#{channel.name}: {e}")
-            else:
-                print(f"ℹ️ No 'time-trials-of-the-week' channel found in {guild.name}")
-    
+    cursor.execute('DELETE FROM cluster_leases WHERE name = ? AND owner = ?', (name, CLUSTER_NAME))
+    conn.commit()
     conn.close()
 
-@bot.event
-async def on_ready():
-    print(f'{bot.user} has connected to Discord!')
-    init_database()
-    
-    # Start scheduled tasks only if they're not already running
-    if not start_weekly_trials.is_running():
-        start_weekly_trials.start()
-        print("✅ Started weekly trials task")
-    else:
-        print("ℹ️ Weekly trials task already running")
-        
-    if not end_weekly_trials.is_running():
-        end_weekly_trials.start()
-        print("✅ Started end weekly trials task")
-    else:
-        print("ℹ️ End weekly trials task already running")
-    
-    # Check if we need to setup trials for current week (in case bot was offline)
-    await check_and_setup_current_week()
-    
-    try:
-        synced = await bot.tree.sync()
-        print(f"Synced {len(synced)} command(s)")
-    except Exception as e:
-        print(f"Failed to sync commands: {e}")
+def bump_lease_revision(cursor, name):
+    """Tell whichever process holds a lease that the job's inputs changed"""
+    cursor.execute('UPDATE cluster_leases SET revision = revision + 1 WHERE name = ?', (name,))
 
-async def check_and_setup_current_week():
-    """Check if current week has active trials, if not, set them up"""
+def register_shard_guilds(shard_id):
+    """Replace bot_guilds' rows for a shard with the servers it sees now that it's ready"""
     conn = sqlite3.connect('mario_kart_times.db')
     cursor = conn.cursor()
-    
-    current_week = get_current_week()
-    cursor.execute('SELECT * FROM weekly_trials WHERE week_number = ? AND is_active = 1', (current_week,))
-    
-    if not cursor.fetchone():
-        # No active trials for current week, set them up
-        await setup_new_weekly_trials()
-    
+    cursor.execute('DELETE FROM bot_guilds WHERE (guild_id >> 22) % ? = ?', (bot.shard_count, shard_id))
+    cursor.executemany('''
+        INSERT OR REPLACE INTO bot_guilds (guild_id, cluster_name) VALUES (?, ?)
+    ''', [(guild.id, CLUSTER_NAME) for guild in bot.guilds if guild.shard_id == shard_id])
+    conn.commit()
     conn.close()
+    trial_scheduler.reschedule()
 
-@bot.tree.command(name="compare_wr_itemless", description="Compare your shroomless times to world records and group by proximity")
-async def compare_wr_itemless(interaction: discord.Interaction):
-    items = "no_items"  # Shroomless/Itemless only
-    mode = "150cc"      # Default mode for WRs (adjust if needed)
-
+def register_guild(guild):
     conn = sqlite3.connect('mario_kart_times.db')
     cursor = conn.cursor()
+    cursor.execute('INSERT OR REPLACE INTO bot_guilds (guild_id, cluster_name) VALUES (?, ?)', (guild.id, CLUSTER_NAME))
+    conn.commit()
+    conn.close()
+    trial_scheduler.reschedule()
 
-    # Get user's personal best times for shroomless 150cc (only best time per track)
-    cursor.execute('''
-        SELECT track_name, time_minutes, time_seconds, time_milliseconds
-        FROM time_trials
-        WHERE user_id = ? AND game_mode = ? AND items_setting = ?
-        AND (time_minutes * 60000 + time_seconds * 1000 + time_milliseconds) IN (
-            SELECT MIN(time_minutes * 60000 + time_seconds * 1000 + time_milliseconds)
-            FROM time_trials t2
-            WHERE t2.user_id = time_trials.user_id 
-            AND t2.track_name = time_trials.track_name 
-            AND t2.game_mode = time_trials.game_mode 
-            AND t2.items_setting = time_trials.items_setting
-        )
-    ''', (interaction.user.id, mode, items))
-    user_times = cursor.fetchall()
+def unregister_guild(guild_id):
+    conn = sqlite3.connect('mario_kart_times.db')
+    cursor = conn.cursor()
+    cursor.execute('DELETE FROM bot_guilds WHERE guild_id = ?', (guild_id,))
+    conn.commit()
+    conn.close()
+    trial_scheduler.reschedule()
+
+def get_registered_guild_ids(cursor):
+    """Every server the bot is in, whichever process serves it"""
+    cursor.execute('SELECT guild_id FROM bot_guilds ORDER BY guild_id')
+    return [row[0] for row in cursor.fetchall()]
+
+# Writer service
+# Set DB_WRITER_SOCKET (run_clusters.py does) to send submissions to db_writer.py, which
+# group-commits them for every bot process, instead of writing them from this process
+DB_WRITER_SOCKET = os.getenv('DB_WRITER_SOCKET')
+db_writer_client = WriterClient(DB_WRITER_SOCKET) if DB_WRITER_SOCKET else None
+
+async def write_submission(op, *args):
+    """Run one of froog_core's WRITE_OPERATIONS (e.g. submit_run) as its own transaction.
+    
+    Goes through the writer service when one is configured, else writes here in a worker
+    thread. A ValueError or a local error means nothing was saved, but a WriterError can
+    come after the request reached the service, so the write may or may not have been
+    committed.
+    """
+    if db_writer_client is not None:
+        return await db_writer_client.call(op, *args)
+    return await asyncio.to_thread(apply_write_operation, op, args)
+
+def apply_write_operation(op, args):
+    conn = sqlite3.connect('mario_kart_times.db')
+    cursor = conn.cursor()
+    try:
+        result = WRITE_OPERATIONS[op](cursor, *args)
+    except Exception:
+        conn.rollback()
+        conn.close()
+        raise
+    conn.commit()
     conn.close()
+    return result
 
-    # Prepare grouping buckets
-    buckets = {
-        "Within 1s": [],
-        "Within 2s": [],
-        "Within 3s": [],
-        "Within 5s": [],
-        "Within 7s": [],
-        "7s+": []
-    }
+# Bot setup
+# Commands live in these cogs. /reload swaps one out at runtime; the caches, workers and
+# helpers they use stay in this module, so reloading a cog keeps them.
+EXTENSIONS = ["cogs.records", "cogs.weekly", "cogs.streaks", "cogs.hall_of_fame", "cogs.admin", "cogs.analytics"]
 
-    for track_name, mins, secs, ms in user_times:
-        wr_time_str = WORLD_RECORDS_ITEMLESS.get(track_name)
-        if not wr_time_str:
-            continue
-        wr_parsed = parse_time(wr_time_str)
-        if not wr_parsed:
-            continue
-        user_ms = time_to_total_ms(mins, secs, ms)
-        wr_ms = time_to_total_ms(*wr_parsed)
-        diff = user_ms - wr_ms
-        diff_s = diff / 1000.0
-        formatted_user = format_time(mins, secs, ms)
-        formatted_wr = format_time(*wr_parsed)
-        entry = f"{track_name}: {formatted_user} (WR: {formatted_wr}, +{diff_s:.3f}s)"
-        if diff_s <= 1:
-            buckets["Within 1s"].append(entry)
-        elif diff_s <= 2:
-            buckets["Within 2s"].append(entry)
-        elif diff_s <= 3:
-            buckets["Within 3s"].append(entry)
-        elif diff_s <= 5:
-            buckets["Within 5s"].append(entry)
-        elif diff_s <= 7:
-            buckets["Within 7s"].append(entry)
-        else:
-            buckets["7s+"].append(entry)
-
-    embed = discord.Embed(title="⏱️ Your Shroomless Times vs World Records", color=0x1abc9c)
-    for group, entries in buckets.items():
-        if entries:
-            # Limit entries and ensure field value doesn't exceed 1024 characters
-            field_value = ""
-            shown_entries = 0
-            max_entries_per_field = 15  # Reasonable limit to prevent overflow
-            
-            for entry in entries[:max_entries_per_field]:
-                new_line = entry + "\n"
-                if len(field_value + new_line) > 1000:  # Leave buffer for potential "..." 
-                    break
-                field_value += new_line
-                shown_entries += 1
-            
-            # Remove trailing newline
-            field_value = field_value.rstrip("\n")
-            
-            # Add truncation indicator if needed
-            if shown_entries < len(entries):
-                remaining = len(entries) - shown_entries
-                field_value += f"\n... and {remaining} more"
-            
-            embed.add_field(name=f"{group} ({len(entries)})", value=field_value or "None", inline=False)
-        else:
-            embed.add_field(name=f"{group} (0)", value="None", inline=False)
-
-    embed.set_footer(text="World records: Shroomless/Itemless only. Times shown are your PBs for each track.")
-    await interaction.response.send_message(embed=embed)
-@bot.tree.command(name="add_time", description="Add a new time trial record")
-@discord.app_commands.autocomplete(
-    track=track_autocomplete,
-    mode=mode_autocomplete,
-    items=items_autocomplete,
-    vehicle=test_autocomplete
-)
-async def add_time(
-    interaction: discord.Interaction,
-    track: str,
-    time: str,
-    mode: str,
-    items: str,
-    vehicle: str | None = None,
-    notes: str | None = None
-):
-    # Validate track
-    if track not in MK8_TRACKS:
-        await interaction.response.send_message(f"❌ Invalid track name. Use `/list_tracks` to see all available tracks.", ephemeral=True)
-        return
+class FroogBot(commands.AutoShardedBot):
+    """Bot whose one-time startup work runs in setup_hook.
     
-    # Validate mode
-    if mode not in GAME_MODES:
-        await interaction.response.send_message(f"❌ Invalid game mode. Choose from: {', '.join(GAME_MODES)}", ephemeral=True)
-        return
+    on_ready fires again after every gateway reconnect, so it only logs. Database
+    migrations, cache warmup, background workers, loading the command cogs and the
+    command sync run once per process in setup_hook, before the gateway connects.
     
-    # Validate items setting
-    if items not in ["shrooms", "no_items"]:
-        await interaction.response.send_message("❌ Invalid items setting. Choose `shrooms` or `no_items`.", ephemeral=True)
-        return
+    Several processes can each run some of the shards (see SHARD_IDS). Each one posts
+    announcements for its own servers; the weekly trials scheduler runs in whichever
+    process holds the scheduler lease.
+    """
     
-    # Parse time
-    parsed_time = parse_time(time)
-    if not parsed_time:
-        await interaction.response.send_message("❌ Invalid time format. Use MM:SS.mmm (e.g., 1:23.456)", ephemeral=True)
-        return
+    async def setup_hook(self):
+        await asyncio.to_thread(init_database)
+        await asyncio.to_thread(warm_caches)
+    
+        # Background workers wait for the guild cache themselves
+        announcement_outbox.start()
+        scheduler_lease.start()
+    
+        for extension in EXTENSIONS:
+            await self.load_extension(extension)
+        await sync_command_tree(self.tree, force=FORCE_COMMAND_SYNC)
+    
+    async def close(self):
+        # Hand the scheduler over now rather than when the lease expires
+        scheduler_lease.release()
+        await super().close()
+
+intents = discord.Intents.default()
+# Remove privileged intents that require approval
+# intents.members = True  # Commented out - requires privileged intent
+# intents.guilds = True   # This is included in default intents
+bot = FroogBot(command_prefix="!", intents=intents, shard_count=SHARD_COUNT, shard_ids=(SHARD_IDS or None) if SHARD_COUNT else None)
+
+# Cache of user display names so paging through leaderboards doesn't re-fetch the same users
+user_name_cache = {}
+
+async def get_user_name(user_id, max_length=20):
+    """Resolve a user's display name (cached), falling back to 'User <id>'"""
+    if user_id not in user_name_cache:
+        user = bot.get_user(user_id)
+        try:
+            if user is None:
+                user = await bot.fetch_user(user_id)
+        except Exception:
+            return f"User {user_id}"
+        user_name_cache[user_id] = user.display_name
+    return truncate_text(user_name_cache[user_id], max_length)
+
+# Progress charts
+def load_progress_series(user_id, track, mode, items):
+    """Read a user's runs on a track in date order.
     
-    minutes, seconds, milliseconds = parsed_time
+    Returns (runs, pb_steps), each a list of (unix_seconds, total_ms); pb_steps holds only
+    the runs that set a new PB.
+    """
     conn = sqlite3.connect('mario_kart_times.db')
     cursor = conn.cursor()
-    # Check personal best for this user/track/mode/items
     cursor.execute('''
-        SELECT time_minutes, time_seconds, time_milliseconds 
-        FROM time_trials 
+        SELECT date_recorded, (time_minutes * 60000 + time_seconds * 1000 + time_milliseconds)
+        FROM time_trials
         WHERE user_id = ? AND track_name = ? AND game_mode = ? AND items_setting = ?
-        ORDER BY (time_minutes * 60000 + time_seconds * 1000 + time_milliseconds) ASC
-        LIMIT 1
-    ''', (interaction.user.id, track, mode, items))
-    current_best = cursor.fetchone()
-    # Insert new record
-    cursor.execute('''
-        INSERT INTO time_trials (user_id, track_name, time_minutes, time_seconds, time_milliseconds, game_mode, items_setting, vehicle_setup, notes)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (interaction.user.id, track, minutes, seconds, milliseconds, mode, items, vehicle or "", notes or ""))
-    conn.commit()
-    
-    # Check if this qualifies for weekly trials (150cc and shrooms only)
-    weekly_submission_made = False
-    weekly_best_info = None
-    if mode == "150cc" and items == "shrooms":
-        # Check if there are active weekly trials and if this track is part of them
-        cursor.execute('SELECT * FROM weekly_trials WHERE is_active = 1')
-        current_trial = cursor.fetchone()
-        
-        if current_trial:
-            week_number = current_trial[1]
-            active_tracks = [current_trial[2], current_trial[3], current_trial[4]]
-            
-            if track in active_tracks:
-                # Check current weekly best for this user/track (only best time during trial period)
-                cursor.execute('''
-                    SELECT time_minutes, time_seconds, time_milliseconds 
-                    FROM weekly_submissions 
-                    WHERE week_number = ? AND user_id = ? AND track_name = ? AND game_mode = ? AND items_setting = ?
-                    ORDER BY (time_minutes * 60000 + time_seconds * 1000 + time_milliseconds) ASC
-                    LIMIT 1
-                ''', (week_number, interaction.user.id, track, mode, items))
-                
-                current_weekly_best = cursor.fetchone()
-                
-                # Insert into weekly submissions
-                cursor.execute('''
-                    INSERT INTO weekly_submissions 
-                    (week_number, user_id, track_name, time_minutes, time_seconds, time_milliseconds, game_mode, items_setting, vehicle_setup, notes)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (week_number, interaction.user.id, track, minutes, seconds, milliseconds, mode, items, vehicle or "", notes or ""))
-                conn.commit()
-                
-                weekly_submission_made = True
-                
-                # Check for streak progression and role rewards
-                try:
-                    completed_all, submitted_tracks = await check_weekly_completion(interaction.user.id, week_number)
-                    if completed_all:
-                        # User completed all 3 tracks - update streak!
-                        current_streak, best_streak = await update_user_streak(interaction.user.id, interaction.guild.id, week_number)
-                        
-                        # Try to award streak role
-                        member = interaction.guild.get_member(interaction.user.id)
-                        if member:
-                            awarded_role = await award_streak_role(member, interaction.guild, current_streak)
-                            if awarded_role:
-                                weekly_best_info += f"\n🏆 **{awarded_role.name}** role awarded for {current_streak} week streak!"
-                            elif current_streak > 1:
-                                weekly_best_info += f"\n🔥 Trial streak: {current_streak} weeks!"
-                        else:
-                            if current_streak > 1:
-                                weekly_best_info += f"\n🔥 Trial streak: {current_streak} weeks!"
-                except Exception as e:
-                    print(f"❌ Error updating streak for {interaction.user}: {e}")
-                
-                # Check if this is a weekly personal best
-                if current_weekly_best:
-                    current_weekly_ms = time_to_total_ms(current_weekly_best[0], current_weekly_best[1], current_weekly_best[2])
-                    new_total_ms = time_to_total_ms(minutes, seconds, milliseconds)
-                    
-                    if new_total_ms < current_weekly_ms:
-                        improvement_ms = current_weekly_ms - new_total_ms
-                        improvement_seconds = improvement_ms / 1000
-                        weekly_best_info = f"🎉 New Weekly Best! Improved by {improvement_seconds:.3f}s"
-                    else:
-                        difference_ms = new_total_ms - current_weekly_ms
-                        difference_seconds = difference_ms / 1000
-                        weekly_best_info = f"Weekly Best: {format_time(current_weekly_best[0], current_weekly_best[1], current_weekly_best[2])} (+{difference_seconds:.3f}s)"
-                else:
-                    weekly_best_info = "🎉 First Weekly Submission for this track!"
-    
-    conn.close()
-    
-    formatted_time = format_time(minutes, seconds, milliseconds)
-    embed = discord.Embed(title="🏁 Time Trial Added!", color=0x00ff00)
-    embed.add_field(name="Track", value=track, inline=False)
-    embed.add_field(name="Time", value=formatted_time, inline=True)
-    embed.add_field(name="Mode", value=mode, inline=True)
-    embed.add_field(name="Items", value=items, inline=True)
-    if vehicle:
-        embed.add_field(name="Vehicle Setup", value=truncate_text(vehicle, 1000), inline=True)
-    if notes:
-        embed.add_field(name="Notes", value=truncate_text(notes, 1000), inline=False)
-    
-    # Check for ping AFTER inserting the new record
-    conn = sqlite3.connect('mario_kart_times.db')
-    cursor = conn.cursor()
-    
-    # Check if this new time is now the top time
-    cursor.execute('''
-        SELECT user_id, time_minutes, time_seconds, time_milliseconds 
-        FROM time_trials 
-        WHERE track_name = ? AND game_mode = ? AND items_setting = ?
-        ORDER BY (time_minutes * 60000 + time_seconds * 1000 + time_milliseconds) ASC
-        LIMIT 1
-    ''', (track, mode, items))
-    top_time = cursor.fetchone()
-    
-    ping_message = None
-    
-    # If current user is now the top time holder, check if they just took over from someone else
-    if top_time and top_time[0] == interaction.user.id:
-        # Check if the user was already the previous top holder by getting the second-best time from current user
-        cursor.execute('''
-            SELECT user_id, time_minutes, time_seconds, time_milliseconds 
-            FROM time_trials 
-            WHERE track_name = ? AND game_mode = ? AND items_setting = ?
-            AND user_id = ?
-            ORDER BY (time_minutes * 60000 + time_seconds * 1000 + time_milliseconds) ASC
-            LIMIT 1, 1
-        ''', (track, mode, items, interaction.user.id))
-        user_second_best = cursor.fetchone()
-        
-        # Get the best time from other users
-        cursor.execute('''
-            SELECT user_id, time_minutes, time_seconds, time_milliseconds 
-            FROM time_trials 
-            WHERE track_name = ? AND game_mode = ? AND items_setting = ?
-            AND user_id != ?
-            ORDER BY (time_minutes * 60000 + time_seconds * 1000 + time_milliseconds) ASC
-            LIMIT 1
-        ''', (track, mode, items, interaction.user.id))
-        other_users_best = cursor.fetchone()
-        
-        # Only ping if:
-        # 1. There is a best time from other users, AND
-        # 2. Either the user had no previous time, OR their previous best was slower than the other user's best
-        if other_users_best:
-            should_ping = False
-            
-            if user_second_best is None:
-                # User had no previous time, so they're taking over from someone else
-                should_ping = True
-            else:
-                # Compare user's previous best with other user's best
-                user_prev_ms = time_to_total_ms(user_second_best[1], user_second_best[2], user_second_best[3])
-                other_best_ms = time_to_total_ms(other_users_best[1], other_users_best[2], other_users_best[3])
-                
-                # Only ping if user's previous time was slower than the other user's best
-                # (meaning the other user was previously holding the record)
-                if user_prev_ms > other_best_ms:
-                    should_ping = True
-            
-            if should_ping:
-                prev_user_id = other_users_best[0]
-                ping_message = f"🏁 <@{prev_user_id}> Your top time for {track} ({mode}, {items}) was just beaten!"
-    
-    conn.close()
-    
-    # Personal best check
-    if current_best:
-        current_total_ms = time_to_total_ms(current_best[0], current_best[1], current_best[2])
-        new_total_ms = time_to_total_ms(minutes, seconds, milliseconds)
-        
-        if new_total_ms < current_total_ms:
-            improvement_ms = current_total_ms - new_total_ms
-            improvement_seconds = improvement_ms / 1000
-            embed.add_field(name="🎉 New Personal Best!", value=f"Improved by {improvement_seconds:.3f} seconds!", inline=False)
-            embed.color = 0xffd700
-        else:
-            difference_ms = new_total_ms - current_total_ms
-            difference_seconds = difference_ms / 1000
-            embed.add_field(name="Current PB", value=f"{format_time(current_best[0], current_best[1], current_best[2])} (+{difference_seconds:.3f}s)", inline=False)
-    else:
-        embed.add_field(name="🎉 First Time on This Track!", value=f"This is your first recorded time for this track/mode/items setting.", inline=False)
-        embed.color = 0xffd700
-    
-    # Add weekly trials information if applicable
-    if weekly_submission_made:
-        embed.add_field(name="📅 Weekly Trials", value=weekly_best_info, inline=False)
-        if weekly_best_info.startswith("🎉 New Weekly Best!"):
-            embed.color = 0xffd700
-    
-    # Check for server record and track it
-    if top_time and top_time[0] == interaction.user.id:
-        # User has the best time, track this record
-        await track_record_change(interaction.user.id, interaction.guild.id, track, mode, items, 
-                                 minutes, seconds, milliseconds, vehicle, notes)
-    
-    # Check for milestones
-    new_milestones = await check_milestones(interaction.user.id, interaction.guild.id)
-    if new_milestones:
-        milestone_text = "\n".join([f"🎖️ {milestone}" for milestone in new_milestones])
-        embed.add_field(name="🏆 New Achievements Unlocked!", value=milestone_text, inline=False)
-        embed.color = 0xffd700
-    
-    if ping_message:
-        try:
-            await interaction.channel.send(ping_message)
-        except Exception:
-            await interaction.followup.send(ping_message, ephemeral=False)
-    await interaction.response.send_message(embed=embed)
-
-@bot.tree.command(name="view_times", description="View your times for a specific track and mode/items")
-@discord.app_commands.autocomplete(
-    track=track_autocomplete,
-    mode=mode_autocomplete,
-    items=items_autocomplete
-)
-async def view_times(interaction: discord.Interaction, track: str, mode: str = None, items: str = None):
-    # Validate track
-    if track not in MK8_TRACKS:
-        await interaction.response.send_message(f"❌ Invalid track name. Use `/list_tracks` to see all available tracks.")
-        return
-    conn = sqlite3.connect('mario_kart_times.db')
-    cursor = conn.cursor()
-    # Build query
-    query = '''SELECT time_minutes, time_seconds, time_milliseconds, vehicle_setup, date_recorded, notes, game_mode, items_setting FROM time_trials WHERE user_id = ? AND track_name = ?'''
-    params = [interaction.user.id, track]
-    if mode:
-        query += ' AND game_mode = ?'
-        params.append(mode)
-    if items:
-        query += ' AND items_setting = ?'
-        params.append(items)
-    query += ' ORDER BY (time_minutes * 60000 + time_seconds * 1000 + time_milliseconds) ASC'
-    cursor.execute(query, tuple(params))
-    results = cursor.fetchall()
-    conn.close()
-    if not results:
-        await interaction.response.send_message(f"❌ No times found for {track}" + (f" in {mode} mode ({items})" if mode and items else "."), ephemeral=True)
-        return
-    embed = discord.Embed(
-        title=f"📜 Times for {track}" + (f" ({mode}, {items})" if mode and items else " (All Categories)"),
-        color=0x3498db
-    )
-    
-    # Limit the number of entries to prevent overflow
-    max_entries = 20  # Reasonable limit
-    total_results = len(results)
-    
-    for idx, (mins, secs, ms, vehicle, date_recorded, notes, rec_mode, rec_items) in enumerate(results[:max_entries], 1):
-        formatted_time = format_time(mins, secs, ms)
-        field_value = f"⏱ {formatted_time} | 🗓 {date_recorded.split()[0]} | 🏷 {rec_mode}, {rec_items}"
-        if vehicle:
-            field_value += f" | 🚗 {truncate_text(vehicle, 50)}"
-        if notes:
-            field_value += f" | 📝 {truncate_text(notes, 50)}"
-        embed.add_field(name=f"{idx}.", value=field_value, inline=False)
-    
-    # Add footer if results were truncated
-    if total_results > max_entries:
-        embed.set_footer(text=f"Showing {max_entries} of {total_results} times. Use filters to see specific times.")
-    
-    await interaction.response.send_message(embed=embed)
-
-
-@bot.tree.command(name="personal_best", description="View your personal best for a specific track and mode/items")
-@discord.app_commands.autocomplete(
-    track=track_autocomplete,
-    mode=mode_autocomplete,
-    items=items_autocomplete
-)
-async def personal_best(interaction: discord.Interaction, track: str, mode: str = "150cc", items: str = "shrooms"):
-    # Validate track
-    if track not in MK8_TRACKS:
-        await interaction.response.send_message(f"❌ Invalid track name. Use `/list_tracks` to see all available tracks.")
-        return
-    
-    # Validate mode
-    if mode not in GAME_MODES:
-        await interaction.response.send_message(f"❌ Invalid game mode. Choose from: {', '.join(GAME_MODES)}")
-        return
-    
-    # Validate items
-    if items not in ["shrooms", "no_items"]:
-        await interaction.response.send_message("❌ Invalid items setting. Choose `shrooms` or `no_items`.")
-        return
-    
-    conn = sqlite3.connect('mario_kart_times.db')
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        SELECT time_minutes, time_seconds, time_milliseconds, vehicle_setup, date_recorded, notes
-        FROM time_trials 
-        WHERE user_id = ? AND track_name = ? AND game_mode = ? AND items_setting = ?
-        ORDER BY (time_minutes * 60000 + time_seconds * 1000 + time_milliseconds) ASC
-        LIMIT 1
-    ''', (interaction.user.id, track, mode, items))
-    
-    result = cursor.fetchone()
-    conn.close()
-    
-    if not result:
-        await interaction.response.send_message(f"❌ No records found for {track} in {mode} mode ({items}).", ephemeral=True)
-        return
-    
-    mins, secs, ms, vehicle, date_recorded, notes = result
-    formatted_time = format_time(mins, secs, ms)
-    
-    embed = discord.Embed(title="🏆 Personal Best", color=0xffd700)
-    embed.add_field(name="Track", value=track, inline=False)
-    embed.add_field(name="Mode", value=mode, inline=True)
-    embed.add_field(name="Items", value=items, inline=True)  # NEW FIELD
-    embed.add_field(name="Time", value=formatted_time, inline=True)
-    
-    if vehicle:
-        embed.add_field(name="Vehicle Setup", value=truncate_text(vehicle, 1000), inline=True)
-    
-    embed.add_field(name="Date Recorded", value=date_recorded.split()[0], inline=True)
-    
-    if notes:
-        embed.add_field(name="Notes", value=truncate_text(notes, 1000), inline=False)
-    
-    await interaction.response.send_message(embed=embed)
-
-@bot.tree.command(name="delete_time", description="Delete one of your recorded times for a track/mode/items")
-@discord.app_commands.autocomplete(
-    track=track_autocomplete,
-    mode=mode_autocomplete,
-    items=items_autocomplete
-)
-async def delete_time(
-    interaction: discord.Interaction,
-    track: str,
-    mode: str = "150cc",
-    items: str = "shrooms"
-):
-    # Validate track
-    if track not in MK8_TRACKS:
-        await interaction.response.send_message(
-            f"❌ Invalid track name. Use `/list_tracks` to see all available tracks.",
-            ephemeral=True
-        )
-        return
-
-    # Validate mode
-    if mode not in GAME_MODES:
-        await interaction.response.send_message(
-            f"❌ Invalid game mode. Choose from: {', '.join(GAME_MODES)}",
-            ephemeral=True
-        )
-        return
-
-    # Validate items
-    if items not in ["shrooms", "no_items"]:
-        await interaction.response.send_message(
-            "❌ Invalid items setting. Choose `shrooms` or `no_items`.",
-            ephemeral=True
-        )
-        return
-
-    conn = sqlite3.connect('mario_kart_times.db')
-    cursor = conn.cursor()
-
-    # Find the most recent record for this user/track/mode/items
-    cursor.execute('''
-        SELECT id, time_minutes, time_seconds, time_milliseconds, date_recorded
-        FROM time_trials
-        WHERE user_id = ? AND track_name = ? AND game_mode = ? AND items_setting = ?
-        ORDER BY date_recorded DESC
-        LIMIT 1
-    ''', (interaction.user.id, track, mode, items))
-
-    result = cursor.fetchone()
-
-    if not result:
-        conn.close()
-        await interaction.response.send_message(
-            f"❌ No records found for {track} in {mode} mode ({items}).",
-            ephemeral=True
-        )
-        return
-
-    record_id, mins, secs, ms, date_recorded = result
-
-    # Delete that record
-    cursor.execute('DELETE FROM time_trials WHERE id = ?', (record_id,))
-    conn.commit()
+        ORDER BY date_recorded ASC, id ASC
+    ''', (user_id, track, mode, items))
+    runs = []
+    pb_steps = []
+    while True:
+        rows = cursor.fetchmany(EXPORT_CHUNK_SIZE)
+        if not rows:
+            break
+        for date_recorded, total_ms in rows:
+            try:
+                timestamp = datetime.datetime.fromisoformat(str(date_recorded)).timestamp()
+            except ValueError:
+                continue
+            runs.append((timestamp, total_ms))
+            if not pb_steps or total_ms < pb_steps[-1][1]:
+                pb_steps.append((timestamp, total_ms))
     conn.close()
+    return runs, pb_steps
 
-    formatted_time = format_time(mins, secs, ms)
-
-    embed = discord.Embed(title="🗑️ Time Deleted", color=0xe74c3c)
-    embed.add_field(name="Track", value=track, inline=False)
-    embed.add_field(name="Mode", value=mode, inline=True)
-    embed.add_field(name="Items", value=items, inline=True)
-    embed.add_field(name="Time", value=formatted_time, inline=True)
-    embed.add_field(name="Date Recorded", value=date_recorded.split()[0], inline=True)
+# Run search
+SEARCH_SCOPES = ["mine", "server"]
 
-    await interaction.response.send_message(embed=embed)
-
-
-@bot.tree.command(name="clear_track", description="Clear all your times for a specific track")
-@discord.app_commands.autocomplete(track=track_autocomplete)
-async def clear_track(interaction: discord.Interaction, track: str):
-    if track not in MK8_TRACKS:
-        await interaction.response.send_message(f"❌ Invalid track name. Use `/list_tracks` to see all available tracks.", ephemeral=True)
-        return
+def build_search_query(text):
+    """Turn free text into an FTS5 query matching runs that contain every word.
     
-    conn = sqlite3.connect('mario_kart_times.db')
-    cursor = conn.cursor()
-    
-    # Count existing records
-    cursor.execute('SELECT COUNT(*) FROM time_trials WHERE user_id = ? AND track_name = ?', (interaction.user.id, track))
-    count = cursor.fetchone()[0]
-    
-    if count == 0:
-        await interaction.response.send_message(f"❌ No records found for {track}.", ephemeral=True)
-        conn.close()
-        return
-    
-    # Delete all records for this track
-    cursor.execute('DELETE FROM time_trials WHERE user_id = ? AND track_name = ?', (interaction.user.id, track))
-    conn.commit()
-    conn.close()
-    
-    embed = discord.Embed(title="🗑️ Track Records Cleared", color=0xff0000)
-    embed.add_field(name="Track", value=track, inline=False)
-    embed.add_field(name="Records Deleted", value=str(count), inline=True)
-    embed.add_field(name="⚠️ Warning", value="This action cannot be undone!", inline=False)
-    
-    await interaction.response.send_message(embed=embed)
-
-@bot.tree.command(name="list_tracks", description="List all 96 Mario Kart 8 Deluxe tracks")
-async def list_tracks(interaction: discord.Interaction):
-    # Group tracks by category (all 96 tracks organized by cups)
-    cups = [
-        # Base Game Nitro Cups
-        ("Mushroom Cup", MK8_TRACKS[0:4]),
-        ("Flower Cup", MK8_TRACKS[4:8]),
-        ("Star Cup", MK8_TRACKS[8:12]),
-        ("Special Cup", MK8_TRACKS[12:16]),
-        # Base Game Retro Cups
-        ("Shell Cup", MK8_TRACKS[16:20]),
-        ("Banana Cup", MK8_TRACKS[20:24]),
-        ("Leaf Cup", MK8_TRACKS[24:28]),
-        ("Lightning Cup", MK8_TRACKS[28:32]),
-        ("Bell Cup", MK8_TRACKS[32:36]),
-        ("Egg Cup", MK8_TRACKS[36:40]),
-        ("Triforce Cup", MK8_TRACKS[40:44]),
-        ("Crossing Cup", MK8_TRACKS[44:48]),
-        # DLC Booster Course Pass
-        ("Golden Dash Cup", MK8_TRACKS[48:52]),
-        ("Lucky Cat Cup", MK8_TRACKS[52:56]),
-        ("Turnip Cup", MK8_TRACKS[56:60]),
-        ("Propeller Cup", MK8_TRACKS[60:64]),
-        ("Rock Cup", MK8_TRACKS[64:68]),
-        ("Moon Cup", MK8_TRACKS[68:72]),
-        ("Fruit Cup", MK8_TRACKS[72:76]),
-        ("Boomerang Cup", MK8_TRACKS[76:80]),
-        ("Feather Cup", MK8_TRACKS[80:84]),
-        ("Cherry Cup", MK8_TRACKS[84:88]),
-        ("Acorn Cup", MK8_TRACKS[88:92]),
-        ("Spiny Cup", MK8_TRACKS[92:96])
-    ]
-    
-    # Create embed with all 24 cups (within Discord's 25 field limit)
-    embed = discord.Embed(title="🏁 All 96 Mario Kart 8 Deluxe Tracks", color=0x0099ff)
-    embed.description = "**Base Game (48) + Booster Course Pass DLC (48)**"
-    
-    for cup_name, tracks in cups:
-        track_list = "\n".join([f"• {track}" for track in tracks])
-        embed.add_field(name=cup_name, value=track_list, inline=True)
-    
-    embed.set_footer(text="Total: 96 tracks across 24 cups (12 Base Game + 12 DLC)")
-    
-    await interaction.response.send_message(embed=embed)
-
-@bot.tree.command(name="stats", description="View your time trial stats and comparisons.")
-@discord.app_commands.autocomplete(
-    mode=mode_autocomplete,
-    items=items_autocomplete
-)
-async def stats(
-    interaction: discord.Interaction,
-    mode: str = "150cc",
-    items: str = "shrooms",
-    compare_user: str = None
-):
-    # Validate mode
-    if mode not in GAME_MODES:
-        await interaction.response.send_message(f"❌ Invalid game mode. Choose from: {', '.join(GAME_MODES)}", ephemeral=True)
-        return
-    # Validate items
-    if items not in ["shrooms", "no_items"]:
-        await interaction.response.send_message("❌ Invalid items setting. Choose `shrooms` or `no_items`.", ephemeral=True)
-        return
-    conn = sqlite3.connect('mario_kart_times.db')
-    cursor = conn.cursor()
-    # Total run submissions
-    cursor.execute('''
-        SELECT COUNT(*) FROM time_trials WHERE user_id = ? AND game_mode = ? AND items_setting = ?
-    ''', (interaction.user.id, mode, items))
-    total_submissions = cursor.fetchone()[0]
-    # Most played track
-    cursor.execute('''
-        SELECT track_name, COUNT(*) as cnt FROM time_trials
-        WHERE user_id = ? AND game_mode = ? AND items_setting = ?
-        GROUP BY track_name ORDER BY cnt DESC LIMIT 1
-    ''', (interaction.user.id, mode, items))
-    most_played = cursor.fetchone()
-    # Recent activity (last 5 runs)
-    cursor.execute('''
-        SELECT track_name, time_minutes, time_seconds, time_milliseconds, date_recorded FROM time_trials
-        WHERE user_id = ? AND game_mode = ? AND items_setting = ?
-        ORDER BY date_recorded DESC LIMIT 5
-    ''', (interaction.user.id, mode, items))
-    recent_runs = cursor.fetchall()
-    # Track completion rate
-    cursor.execute('''
-        SELECT COUNT(DISTINCT track_name) FROM time_trials WHERE user_id = ? AND game_mode = ? AND items_setting = ?
-    ''', (interaction.user.id, mode, items))
-    tracks_recorded = cursor.fetchone()[0]
-    completion_rate = f"{tracks_recorded}/{len(MK8_TRACKS)} ({(tracks_recorded/len(MK8_TRACKS))*100:.1f}%)"
-    # Average rank per map & WR gap
-    ranks = []
-    wr_gaps = []
-    for track in MK8_TRACKS:
-        cursor.execute('''
-            SELECT user_id, time_minutes, time_seconds, time_milliseconds FROM time_trials
-            WHERE track_name = ? AND game_mode = ? AND items_setting = ?
-            ORDER BY (time_minutes * 60000 + time_seconds * 1000 + time_milliseconds) ASC
-        ''', (track, mode, items))
-        all_times = cursor.fetchall()
-        user_best = None
-        for idx, (uid, mins, secs, ms) in enumerate(all_times, 1):
-            if uid == interaction.user.id:
-                user_best = (mins, secs, ms, idx)
-                break
-        if user_best:
-            ranks.append(user_best[3])
-            if items == "shrooms":
-                wr_dict = WORLD_RECORDS_SHROOMS.get(mode, {})
-                wr_time_str = wr_dict.get(track) if wr_dict else None
-            else:
-                wr_time_str = WORLD_RECORDS_ITEMLESS.get(track)
-            wr_parsed = parse_time(wr_time_str) if wr_time_str else None
-            if wr_parsed:
-                user_ms = time_to_total_ms(user_best[0], user_best[1], user_best[2])
-                wr_ms = time_to_total_ms(*wr_parsed)
-                wr_gaps.append(user_ms - wr_ms)
-    avg_rank = sum(ranks) / len(ranks) if ranks else None
-    avg_gap = (sum(wr_gaps) / len(wr_gaps)) / 1000 if wr_gaps else None
-    # Head-to-head comparison
-    head_to_head = None
-    if compare_user:
-        try:
-            compare_id = int(compare_user)
-            wins = 0
-            losses = 0
-            for track in MK8_TRACKS:
-                cursor.execute('''
-                    SELECT user_id, time_minutes, time_seconds, time_milliseconds FROM time_trials
-                    WHERE track_name = ? AND game_mode = ? AND items_setting = ?
-                    ORDER BY (time_minutes * 60000 + time_seconds * 1000 + time_milliseconds) ASC
-                    LIMIT 2
-                ''', (track, mode, items))
-                top_two = cursor.fetchall()
-                if len(top_two) == 2:
-                    if top_two[0][0] == interaction.user.id and top_two[1][0] == compare_id:
-                        wins += 1
-                    elif top_two[0][0] == compare_id and top_two[1][0] == interaction.user.id:
-                        losses += 1
-            head_to_head = f"Wins: {wins}, Losses: {losses}"
-        except Exception:
-            head_to_head = "Invalid user ID for comparison."
-    conn.close()
-    embed = discord.Embed(title=f"📊 Time Trial Stats ({mode}, {items})", color=0x9b59b6)
-    embed.add_field(name="Total Run Submissions", value=str(total_submissions), inline=True)
-    if avg_rank:
-        embed.add_field(name="Average Rank (per map)", value=f"{avg_rank:.2f}", inline=True)
-    else:
-        embed.add_field(name="Average Rank (per map)", value="No times recorded", inline=True)
-    if avg_gap is not None:
-        embed.add_field(name="Average Distance from WR", value=f"{avg_gap:.3f} seconds", inline=True)
-    else:
-        embed.add_field(name="Average Distance from WR", value="N/A", inline=True)
-    embed.add_field(name="Track Completion Rate", value=completion_rate, inline=True)
-    if most_played:
-        embed.add_field(name="Most Played Track", value=f"{most_played[0]} ({most_played[1]} runs)", inline=True)
-    else:
-        embed.add_field(name="Most Played Track", value="N/A", inline=True)
-    if recent_runs:
-        # Ensure recent runs field doesn't exceed limit
-        recent_lines = []
-        for r in recent_runs:
-            line = f"{r[0]}: {format_time(r[1], r[2], r[3])} ({r[4].split()[0]})"
-            # Truncate track name if too long
-            if len(line) > 100:
-                track_name = truncate_text(r[0], 30)
-                line = f"{track_name}: {format_time(r[1], r[2], r[3])} ({r[4].split()[0]})"
-            recent_lines.append(line)
-        
-        recent_str = "\n".join(recent_lines)
-        # Ensure total field value is under 1024 characters
-        if len(recent_str) > 1000:
-            recent_str = recent_str[:997] + "..."
-        
-        embed.add_field(name="Recent Runs", value=recent_str, inline=False)
-    else:
-        embed.add_field(name="Recent Runs", value="N/A", inline=False)
-    if head_to_head:
-        embed.add_field(name="Head-to-Head vs User", value=head_to_head, inline=False)
-    await interaction.response.send_message(embed=embed)
-
+    Each word is quoted so FTS5 operators and punctuation in the input can't cause syntax
+    errors; the last word also matches as a prefix. Returns None if there are no words.
+    """
+    words = re.findall(r"\w+", text.lower())
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
 
-@bot.tree.command(name="compare_wr_shrooms", description="Compare your shrooms times to world records and group by proximity (150cc/200cc)")
-@discord.app_commands.autocomplete(cc=cc_autocomplete)
-async def compare_wr_shrooms(interaction: discord.Interaction, cc: str = "150cc"):
-    if cc not in WORLD_RECORDS_SHROOMS:
-        await interaction.response.send_message(f"❌ Invalid CC. Choose '150cc' or '200cc'", ephemeral=True)
+def load_rendering():
+    """Import the Pillow renderers on first use; None if Pillow isn't installed"""
+    try:
+        import rendering
+    except ImportError:
+        return None
+    return rendering
+
+# Table images: full boards rendered with Pillow in worker processes, cached by content
+OUTPUT_FORMATS = ["embed", "image"]
+RENDER_WORKERS = 2
+RENDER_CACHE_SIZE = 64
+
+# Created on first use so the bot doesn't start worker processes it never needs
+render_pool = None
+# sha256 of a table's content -> PNG bytes, oldest first
+render_cache = {}
+
+async def render_table(title, headers, rows, footer=None):
+    """Render a table image off the event loop, reusing the cached PNG if the content is unchanged"""
+    global render_pool
+    cache_key = hashlib.sha256(json.dumps([title, headers, rows, footer]).encode()).hexdigest()
+    if cache_key in render_cache:
+        # Move to the end so the least recently used entry is evicted first
+        render_cache[cache_key] = render_cache.pop(cache_key)
+        return render_cache[cache_key]
+    
+    if render_pool is None:
+        render_pool = concurrent.futures.ProcessPoolExecutor(max_workers=RENDER_WORKERS)
+    rendering = load_rendering()
+    png = await asyncio.get_running_loop().run_in_executor(render_pool, rendering.render_table_image, title, headers, rows, footer)
+    render_cache[cache_key] = png
+    if len(render_cache) > RENDER_CACHE_SIZE:
+        del render_cache[next(iter(render_cache))]
+    return png
+
+async def send_table_image(interaction, title, headers, rows, footer=None):
+    """Render a table and send it as a followup to a deferred interaction"""
+    if load_rendering() is None:
+        await interaction.followup.send("❌ Image output isn't available on this bot (Pillow is not installed).", ephemeral=True)
         return
-    items = "shrooms"
-    mode = cc
-
-    conn = sqlite3.connect('mario_kart_times.db')
-    cursor = conn.cursor()
+    png = await render_table(title, headers, rows, footer)
+    await interaction.followup.send(file=discord.File(io.BytesIO(png), filename="table.png"))
 
-    # Get user's personal best times for shrooms and selected cc (only best time per track)
-    cursor.execute('''
-        SELECT track_name, time_minutes, time_seconds, time_milliseconds
-        FROM time_trials
-        WHERE user_id = ? AND game_mode = ? AND items_setting = ?
-        AND (time_minutes * 60000 + time_seconds * 1000 + time_milliseconds) IN (
-            SELECT MIN(time_minutes * 60000 + time_seconds * 1000 + time_milliseconds)
-            FROM time_trials t2
-            WHERE t2.user_id = time_trials.user_id 
-            AND t2.track_name = time_trials.track_name 
-            AND t2.game_mode = time_trials.game_mode 
-            AND t2.items_setting = time_trials.items_setting
-        )
-    ''', (interaction.user.id, mode, items))
-    user_times = cursor.fetchall()
-    conn.close()
-
-    buckets = {
-        "Within 1s": [],
-        "Within 2s": [],
-        "Within 3s": [],
-        "Within 5s": [],
-        "Within 7s": [],
-        "7s+": []
-    }
-
-    wr_dict = WORLD_RECORDS_SHROOMS[cc]
+def wr_comparison_table_rows(user_times, wr_lookup):
+    """Table rows for a WR comparison: one section per gap group, PBs closest to the WR first"""
+    groups = [("Within 1s", 1), ("Within 2s", 2), ("Within 3s", 3), ("Within 5s", 5), ("Within 7s", 7), ("7s+", None)]
+    grouped = {group: [] for group, _ in groups}
     for track_name, mins, secs, ms in user_times:
-        wr_time_str = wr_dict.get(track_name)
-        if not wr_time_str:
-            continue
-        wr_parsed = parse_time(wr_time_str)
+        wr_time_str = wr_lookup.get(track_name)
+        wr_parsed = parse_time(wr_time_str) if wr_time_str else None
         if not wr_parsed:
             continue
-        user_ms = time_to_total_ms(mins, secs, ms)
-        wr_ms = time_to_total_ms(*wr_parsed)
-        diff = user_ms - wr_ms
-        diff_s = diff / 1000.0
-        formatted_user = format_time(mins, secs, ms)
-        formatted_wr = format_time(*wr_parsed)
-        entry = f"{track_name}: {formatted_user} (WR: {formatted_wr}, +{diff_s:.3f}s)"
-        if diff_s <= 1:
-            buckets["Within 1s"].append(entry)
-        elif diff_s <= 2:
-            buckets["Within 2s"].append(entry)
-        elif diff_s <= 3:
-            buckets["Within 3s"].append(entry)
-        elif diff_s <= 5:
-            buckets["Within 5s"].append(entry)
-        elif diff_s <= 7:
-            buckets["Within 7s"].append(entry)
-        else:
-            buckets["7s+"].append(entry)
-
-    embed = discord.Embed(title=f"⏱️ Your Shrooms Times vs World Records ({cc})", color=0x3498db)
-    for group, entries in buckets.items():
-        if entries:
-            # Limit entries and ensure field value doesn't exceed 1024 characters
-            field_value = ""
-            shown_entries = 0
-            max_entries_per_field = 15  # Reasonable limit to prevent overflow
-            
-            for entry in entries[:max_entries_per_field]:
-                new_line = entry + "\n"
-                if len(field_value + new_line) > 1000:  # Leave buffer for potential "..." 
-                    break
-                field_value += new_line
-                shown_entries += 1
-            
-            # Remove trailing newline
-            field_value = field_value.rstrip("\n")
-            
-            # Add truncation indicator if needed
-            if shown_entries < len(entries):
-                remaining = len(entries) - shown_entries
-                field_value += f"\n... and {remaining} more"
-            
-            embed.add_field(name=f"{group} ({len(entries)})", value=field_value or "None", inline=False)
-        else:
-            embed.add_field(name=f"{group} (0)", value="None", inline=False)
-
-    embed.set_footer(text="World records: Shrooms only. Times shown are your PBs for each track.")
-    await interaction.response.send_message(embed=embed)
-
-@bot.tree.command(name="leaderboard", description="Show the top time for every track, mode, and items setting.")
-@discord.app_commands.autocomplete(
-    mode=mode_autocomplete,
-    items=items_autocomplete
-)
-async def leaderboard(interaction: discord.Interaction, mode: str, items: str):
-    # Validate mode
-    if mode not in GAME_MODES:
-        await interaction.response.send_message(f"❌ Invalid game mode. Choose from: {', '.join(GAME_MODES)}", ephemeral=True)
-        return
-    
-    # Validate items
-    if items not in ["shrooms", "no_items"]:
-        await interaction.response.send_message("❌ Invalid items setting. Choose `shrooms` or `no_items`.", ephemeral=True)
-        return
-    
-    # Defer response since this might take a while
-    await interaction.response.defer()
-    
-    try:
+        diff_s = (time_to_total_ms(mins, secs, ms) - time_to_total_ms(*wr_parsed)) / 1000.0
+        group = next(group for group, limit in groups if limit is None or diff_s <= limit)
+        grouped[group].append((diff_s, [track_name, format_time(mins, secs, ms), format_time(*wr_parsed), f"+{diff_s:.3f}s"]))
+    
+    rows = []
+    for group, _ in groups:
+        rows.append(f"{group} ({len(grouped[group])})")
+        rows.extend(row for _, row in sorted(grouped[group]))
+    return rows
+
+# Paginated views
+class KeysetPaginator(discord.ui.View):
+    """Base view for browsing results one page at a time with Prev/Next buttons.
+
+    Pages are fetched lazily using a keyset cursor (the sort key of the last row on the
+    previous page), so the database seeks straight to the page instead of scanning with
+    OFFSET. Cursors of pages already visited are kept so Prev can step back.
+    """
+    
+    def __init__(self, owner_id, page_size=10, timeout=180):
+        super().__init__(timeout=timeout)
+        self.owner_id = owner_id
+        self.page_size = page_size
+        self.page_cursors = [None]  # page_cursors[n] is the cursor the n-th page starts after
+        self.page_number = 0
+        self.rows = []
+        self.message = None
+    
+    def fetch_rows(self, cursor, after, limit):
+        """Return up to `limit` rows ordered after the keyset cursor `after` (None for the first page)"""
+        raise NotImplementedError
+    
+    def row_key(self, row):
+        """Return the keyset cursor (full sort key) of a row"""
+        raise NotImplementedError
+    
+    async def build_embed(self):
+        raise NotImplementedError
+    
+    def load_page(self):
         conn = sqlite3.connect('mario_kart_times.db')
         cursor = conn.cursor()
-        embed = discord.Embed(title=f"🏆 Leaderboard ({mode}, {items})", color=0x00bfff)
-        
-        # Define cups and their track indices (same as list_tracks)
-        cups = [
-            ("Mushroom Cup", MK8_TRACKS[0:4]),
-            ("Flower Cup", MK8_TRACKS[4:8]),
-            ("Star Cup", MK8_TRACKS[8:12]),
-            ("Special Cup", MK8_TRACKS[12:16]),
-            ("Shell Cup", MK8_TRACKS[16:20]),
-            ("Banana Cup", MK8_TRACKS[20:24]),
-            ("Leaf Cup", MK8_TRACKS[24:28]),
-            ("Lightning Cup", MK8_TRACKS[28:32]),
-            ("Bell Cup", MK8_TRACKS[32:36]),
-            ("Egg Cup", MK8_TRACKS[36:40]),
-            ("Triforce Cup", MK8_TRACKS[40:44]),
-            ("Crossing Cup", MK8_TRACKS[44:48]),
-            ("Golden Dash Cup", MK8_TRACKS[48:52]),
-            ("Lucky Cat Cup", MK8_TRACKS[52:56]),
-            ("Turnip Cup", MK8_TRACKS[56:60]),
-            ("Propeller Cup", MK8_TRACKS[60:64]),
-            ("Rock Cup", MK8_TRACKS[64:68]),
-            ("Moon Cup", MK8_TRACKS[68:72]),
-            ("Fruit Cup", MK8_TRACKS[72:76]),
-            ("Boomerang Cup", MK8_TRACKS[76:80]),
-            ("Feather Cup", MK8_TRACKS[80:84]),
-            ("Cherry Cup", MK8_TRACKS[84:88]),
-            ("Acorn Cup", MK8_TRACKS[88:92]),
-            ("Spiny Cup", MK8_TRACKS[92:96])
-        ]
-        
-        # Single bulk query to get all best times at once - MUCH faster!
-        cursor.execute('''
-            SELECT track_name, user_id, time_minutes, time_seconds, time_milliseconds, vehicle_setup,
-                   ROW_NUMBER() OVER (PARTITION BY track_name ORDER BY (time_minutes * 60000 + time_seconds * 1000 + time_milliseconds) ASC) as rank
-            FROM time_trials
-            WHERE game_mode = ? AND items_setting = ?
-        ''', (mode, items))
-        
-        all_results = cursor.fetchall()
-        
-        # Create a dictionary of track -> best time record for O(1) lookup
-        track_records = {}
-        for track_name, user_id, mins, secs, ms, vehicle, rank in all_results:
-            if rank == 1:  # Only keep the best time per track
-                track_records[track_name] = (user_id, mins, secs, ms, vehicle)
-        
-        # Cache user names to avoid repeated API calls
-        user_cache = {}
-        async def get_user_name(user_id):
-            if user_id not in user_cache:
-                try:
-                    user = await bot.fetch_user(user_id)
-                    user_cache[user_id] = truncate_text(user.display_name, 20)
-                except Exception:
-                    user_cache[user_id] = f"User {user_id}"
-            return user_cache[user_id]
+        # Fetch one extra row to find out whether there is a next page
+        rows = self.fetch_rows(cursor, self.page_cursors[self.page_number], self.page_size + 1)
+        conn.close()
         
-        # Process cups using the cached data
-        for cup_name, tracks in cups:
-            field_lines = []
-            for track in tracks:
-                if track in track_records:
-                    user_id, mins, secs, ms, vehicle = track_records[track]
-                    user_name = await get_user_name(user_id)
-                    formatted_time = format_time(mins, secs, ms)
-                    vehicle_str = f" ({truncate_text(vehicle, 15)})" if vehicle else ""
-                    
-                    # Truncate track name if needed
-                    track_display = truncate_text(track, 25)
-                    line = f"{track_display}: {user_name} {formatted_time}{vehicle_str}"
-                    
-                    # Ensure individual line isn't too long
-                    if len(line) > 80:
-                        line = f"{truncate_text(track, 20)}: {truncate_text(user_name, 15)} {formatted_time}"
-                    
-                    field_lines.append(line)
-                else:
-                    field_lines.append(f"{truncate_text(track, 25)}: No record")
-            
-            # Ensure field value doesn't exceed 1024 characters
-            field_value = "\n".join(field_lines)
-            if len(field_value) > 1000:
-                # If still too long, truncate the field
-                field_value = field_value[:997] + "..."
-            
-            embed.add_field(name=cup_name, value=field_value, inline=False)
+        has_next = len(rows) > self.page_size
+        self.rows = rows[:self.page_size]
+        if has_next and len(self.page_cursors) == self.page_number + 1:
+            self.page_cursors.append(self.row_key(self.rows[-1]))
         
-        conn.close()
-        embed.set_footer(text="Each field is a cup. Only 25 cups/fields allowed per embed.")
-        await interaction.followup.send(embed=embed)
+        self.previous_page.disabled = self.page_number == 0
+        self.next_page.disabled = not has_next
     
-    except Exception as e:
-        print(f"❌ Error in leaderboard command: {e}")
-        try:
-            conn.close()
-        except:
-            pass
-        await interaction.followup.send(
-            f"❌ An error occurred while generating the leaderboard: {str(e)[:100]}", 
-            ephemeral=True
-        )
-
-
-
-@bot.tree.command(name="current_trials", description="View current weekly time trials")
-async def current_trials(interaction: discord.Interaction):
-    # Check if command is used in the correct channel
-    if interaction.channel.name != 'time-trials-of-the-week':
-        await interaction.response.send_message(
-            "❌ This command can only be used in the #time-trials-of-the-week channel.",
-            ephemeral=True
-        )
-        return
-    
-    # Check if trials have started yet
-    current_week = get_current_week()
-    if current_week == 0:
-        await interaction.response.send_message(
-            "🏁 **Weekly Time Trials**\n\n"
-            "Trials haven't started yet!\n"
-            "**Week 1 begins:** Monday, November 4, 2025\n\n"
-            "Get ready to race! 🏎️",
-            ephemeral=False
+    async def send(self, interaction, ephemeral=False):
+        """Load the first page and send it as the response (or as a followup if already deferred)"""
+        self.load_page()
+        embed = await self.build_embed()
+        if interaction.response.is_done():
+            self.message = await interaction.followup.send(embed=embed, view=self, ephemeral=ephemeral, wait=True)
+        else:
+            await interaction.response.send_message(embed=embed, view=self, ephemeral=ephemeral)
+            self.message = await interaction.original_response()
+    
+    async def show_page(self, interaction):
+        self.load_page()
+        await interaction.response.edit_message(embed=await self.build_embed(), view=self)
+    
+    async def interaction_check(self, interaction):
+        if interaction.user.id != self.owner_id:
+            await interaction.response.send_message("❌ Only the person who ran this command can change pages.", ephemeral=True)
+            return False
+        return True
+    
+    async def on_timeout(self):
+        for item in self.children:
+            item.disabled = True
+        if self.message:
+            try:
+                await self.message.edit(view=self)
+            except discord.HTTPException:
+                pass
+    
+    @discord.ui.button(label="◀ Prev", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page_number = max(0, self.page_number - 1)
+        await self.show_page(interaction)
+    
+    @discord.ui.button(label="Next ▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if self.page_number + 1 < len(self.page_cursors):
+            self.page_number += 1
+        await self.show_page(interaction)
+
+class ViewTimesPaginator(KeysetPaginator):
+    """A user's runs on one track, fastest first"""
+    
+    def __init__(self, owner_id, track, mode=None, items=None):
+        super().__init__(owner_id, page_size=10)
+        self.track = track
+        self.mode = mode
+        self.items = items
+    
+    def fetch_rows(self, cursor, after, limit):
+        query = '''
+            SELECT id, (time_minutes * 60000 + time_seconds * 1000 + time_milliseconds) as total_ms,
+                   vehicle_setup, date_recorded, notes, game_mode, items_setting
+            FROM time_trials
+            WHERE user_id = ? AND track_name = ?
+        '''
+        params = [self.owner_id, self.track]
+        if self.mode:
+            query += ' AND game_mode = ?'
+            params.append(self.mode)
+        if self.items:
+            query += ' AND items_setting = ?'
+            params.append(self.items)
+        if after:
+            # The plain >= bound lets SQLite seek the expression index; the row value breaks ties
+            query += ' AND (time_minutes * 60000 + time_seconds * 1000 + time_milliseconds) >= ?'
+            query += ' AND ((time_minutes * 60000 + time_seconds * 1000 + time_milliseconds), id) > (?, ?)'
+            params.append(after[0])
+            params.extend(after)
+        query += ' ORDER BY (time_minutes * 60000 + time_seconds * 1000 + time_milliseconds) ASC, id ASC LIMIT ?'
+        params.append(limit)
+        cursor.execute(query, tuple(params))
+        return cursor.fetchall()
+    
+    def row_key(self, row):
+        return (row[1], row[0])
+    
+    async def build_embed(self):
+        embed = discord.Embed(
+            title=f"📜 Times for {self.track}" + (f" ({self.mode}, {self.items})" if self.mode and self.items else " (All Categories)"),
+            color=0x3498db
         )
-        return
-    
-    conn = sqlite3.connect('mario_kart_times.db')
-    cursor = conn.cursor()
-    
-    cursor.execute('SELECT * FROM weekly_trials WHERE is_active = 1')
-    current_trial = cursor.fetchone()
-    
-    if not current_trial:
-        await interaction.response.send_message("❌ No active weekly trials at the moment.", ephemeral=True)
-        conn.close()
-        return
-    
-    week_number, track1, track2, track3, start_date, end_date = current_trial[1], current_trial[2], current_trial[3], current_trial[4], current_trial[5], current_trial[6]
-    
-    embed = discord.Embed(
-        title=f"🏁 Weekly Time Trials - Week {week_number}",
-        description="Current active weekly trials",
-        color=0x3498db
-    )
+        first_idx = self.page_number * self.page_size + 1
+        for idx, (run_id, total_ms, vehicle, date_recorded, notes, rec_mode, rec_items) in enumerate(self.rows, first_idx):
+            formatted_time = format_time(*total_ms_to_time(total_ms))
+            field_value = f"⏱ {formatted_time} | 🗓 {date_recorded.split()[0]} | 🏷 {rec_mode}, {rec_items}"
+            if vehicle:
+                field_value += f" | 🚗 {truncate_text(vehicle, 50)}"
+            if notes:
+                field_value += f" | 📝 {truncate_text(notes, 50)}"
+            embed.add_field(name=f"{idx}.", value=field_value, inline=False)
+        embed.set_footer(text=f"Page {self.page_number + 1} • Fastest first")
+        return embed
+
+class SearchRunsPaginator(KeysetPaginator):
+    """Runs whose notes or vehicle setup match a full-text search, best match first"""
+    
+    def __init__(self, owner_id, query_text, fts_query, scope_column, scope_id, scope_label):
+        super().__init__(owner_id, page_size=8)
+        self.query_text = query_text
+        self.fts_query = fts_query
+        self.scope_column = scope_column
+        self.scope_id = scope_id
+        self.scope_label = scope_label
+    
+    def fetch_rows(self, cursor, after, limit):
+        # scope_column is always "user_id" or "guild_id", never user input
+        query = f'''
+            SELECT t.id, f.rank, t.user_id, t.track_name, t.game_mode, t.items_setting,
+                   (t.time_minutes * 60000 + t.time_seconds * 1000 + t.time_milliseconds),
+                   snippet(time_trials_fts, -1, '**', '**', '…', 16)
+            FROM time_trials_fts f
+            JOIN time_trials t ON t.id = f.rowid
+            WHERE time_trials_fts MATCH ? AND t.{self.scope_column} = ?
+        '''
+        params = [self.fts_query, self.scope_id]
+        if after:
+            query += ' AND (f.rank, t.id) > (?, ?)'
+            params.extend(after)
+        query += ' ORDER BY f.rank, t.id LIMIT ?'
+        params.append(limit)
+        cursor.execute(query, tuple(params))
+        return cursor.fetchall()
+    
+    def row_key(self, row):
+        return (row[1], row[0])
+    
+    async def build_embed(self):
+        embed = discord.Embed(title=f"🔎 Runs matching \"{truncate_text(self.query_text, 50)}\" ({self.scope_label})", color=0x3498db)
+        if not self.rows:
+            embed.description = "No matching runs."
+        for run_id, _, user_id, track, mode, items, total_ms, snippet_text in self.rows:
+            user_name = await get_user_name(user_id)
+            embed.add_field(
+                name=f"{truncate_text(track, 60)} ({mode}, {items}) — {format_time(*total_ms_to_time(total_ms))}",
+                value=f"{user_name}: {truncate_text(snippet_text, 200)}",
+                inline=False
+            )
+        embed.set_footer(text=f"Page {self.page_number + 1} • Best match first")
+        return embed
+
+class RivalsPaginator(KeysetPaginator):
+    """The players just ahead of and behind the invoker on each track they have a PB on"""
+    
+    def __init__(self, owner_id, mode, items):
+        super().__init__(owner_id, page_size=8)
+        self.mode = mode
+        self.items = items
+        self.overall = None
+    
+    def fetch_rows(self, cursor, after, limit):
+        query = '''
+            SELECT track_name, best_ms FROM personal_bests
+            WHERE user_id = ? AND game_mode = ? AND items_setting = ?
+        '''
+        params = [self.owner_id, self.mode, self.items]
+        if after:
+            query += ' AND track_name > ?'
+            params.append(after)
+        query += ' ORDER BY track_name ASC LIMIT ?'
+        params.append(limit)
+        cursor.execute(query, tuple(params))
+        rows = cursor.fetchall()
+        # Neighbours only for the rows shown; the extra lookahead row just signals a next page
+        return [
+            (track, best_ms) + get_track_neighbors(cursor, self.owner_id, best_ms, track, self.mode, self.items)
+            if index < self.page_size else (track, best_ms, None, None, None)
+            for index, (track, best_ms) in enumerate(rows)
+        ]
     
-    embed.add_field(name="Featured Tracks", value=f"1. {track1}\n2. {track2}\n3. {track3}", inline=False)
-    embed.add_field(name="Duration", value=f"{start_date} to {end_date}", inline=False)
-    embed.add_field(name="How to Participate", value="Use `/add_time` with 150cc and shrooms for these tracks!", inline=False)
+    def row_key(self, row):
+        return row[0]
     
-    # Show current participant count
-    cursor.execute('SELECT COUNT(DISTINCT user_id) FROM weekly_submissions WHERE week_number = ?', (week_number,))
-    participant_count = cursor.fetchone()[0]
-    embed.add_field(name="Participants", value=str(participant_count), inline=True)
+    def load_page(self):
+        if self.overall is None:
+            conn = sqlite3.connect('mario_kart_times.db')
+            cursor = conn.cursor()
+            self.overall = get_category_neighbors(cursor, self.owner_id, self.mode, self.items) or ()
+            conn.close()
+        super().load_page()
+    
+    async def build_embed(self):
+        embed = discord.Embed(title=f"⚔️ Rivals ({self.mode}, {self.items})", color=0xe67e22)
+        if self.overall:
+            position, (_, total_ms, tracks_completed), ahead, behind = self.overall
+            lines = [f"**#{position}** - {format_total_time(total_ms)} ({tracks_completed}/{len(MK8_TRACKS)})"]
+            if ahead:
+                gap = f"{(total_ms - ahead[1]) / 1000:.3f}s" if ahead[2] == tracks_completed else f"{ahead[2] - tracks_completed} more track{'s' if ahead[2] - tracks_completed != 1 else ''}"
+                lines.append(f"⬆️ {await get_user_name(ahead[0])}: {format_total_time(ahead[1])} ({ahead[2]}/{len(MK8_TRACKS)}) · {gap} ahead")
+            if behind:
+                gap = f"{(behind[1] - total_ms) / 1000:.3f}s" if behind[2] == tracks_completed else f"{tracks_completed - behind[2]} fewer track{'s' if tracks_completed - behind[2] != 1 else ''}"
+                lines.append(f"⬇️ {await get_user_name(behind[0])}: {format_total_time(behind[1])} ({behind[2]}/{len(MK8_TRACKS)}) · {gap} behind")
+            embed.description = "**Overall (sum of PBs)**\n" + "\n".join(lines)
+        else:
+            embed.description = "No personal bests in this category yet."
     
-    conn.close()
-    await interaction.response.send_message(embed=embed)
-
-@bot.tree.command(name="weekly_leaderboard", description="View current weekly trials leaderboard")
-async def weekly_leaderboard(interaction: discord.Interaction):
-    # Check if command is used in the correct channel
-    if interaction.channel.name != 'time-trials-of-the-week':
-        await interaction.response.send_message(
-            "❌ This command can only be used in the #time-trials-of-the-week channel.",
-            ephemeral=True
+        for track, best_ms, position, ahead, behind in self.rows:
+            lines = []
+            if ahead:
+                lines.append(f"⬆️ {await get_user_name(ahead[0])}: {format_time(*total_ms_to_time(ahead[1]))} (+{(best_ms - ahead[1]) / 1000:.3f}s)")
+            else:
+                lines.append("👑 You hold the top time")
+            if behind:
+                lines.append(f"⬇️ {await get_user_name(behind[0])}: {format_time(*total_ms_to_time(behind[1]))} (-{(behind[1] - best_ms) / 1000:.3f}s)")
+            embed.add_field(
+                name=f"#{position} {truncate_text(track, 60)} — {format_time(*total_ms_to_time(best_ms))}",
+                value="\n".join(lines),
+                inline=False
+            )
+        embed.set_footer(text=f"Page {self.page_number + 1} • Tracks A-Z")
+        return embed
+
+class WeeklyHistoryPaginator(KeysetPaginator):
+    """A server's archived weekly results, one week per page from newest to oldest.
+    
+    Weeks from before each server ran its own are shown to every server.
+    """
+    
+    def __init__(self, owner_id, guild_id, start_week=None):
+        super().__init__(owner_id, page_size=1)
+        self.guild_id = guild_id
+        if start_week is not None:
+            # Start the first page on start_week by placing the cursor just above it
+            self.page_cursors = [(start_week + 1, SHARED_WEEK_GUILD_ID)]
+    
+    def fetch_rows(self, cursor, after, limit):
+        query = '''
+            SELECT week_number, guild_id, tracks, categories, start_date, end_date, participant_count
+            FROM weekly_result_weeks
+            WHERE guild_id IN (?, ?)
+        '''
+        params = [self.guild_id, SHARED_WEEK_GUILD_ID]
+        if after is not None:
+            query += ' AND (week_number < ? OR (week_number = ? AND guild_id < ?))'
+            params.extend([after[0], after[0], after[1]])
+        query += ' ORDER BY week_number DESC, guild_id DESC LIMIT ?'
+        params.append(limit)
+        cursor.execute(query, tuple(params))
+        rows = cursor.fetchall()
+        if not rows:
+            return rows
+        # The podium of each track and category on the week being shown, read straight off the primary key
+        week_number, guild_id, tracks, categories = rows[0][:4]
+        podiums = []
+        for track in json.loads(tracks):
+            for mode, items in parse_trial_categories(categories) or TRIAL_DEFAULT_CATEGORIES:
+                cursor.execute('''
+                    SELECT placement, user_id, best_ms, vehicle_setup, track_participants FROM weekly_results
+                    WHERE guild_id = ? AND week_number = ? AND track_name = ? AND game_mode = ? AND items_setting = ?
+                    AND placement <= 5
+                    ORDER BY placement
+                ''', (guild_id, week_number, track, mode, items))
+                podiums.append((track, mode, items, cursor.fetchall()))
+        return [rows[0] + (podiums,)] + rows[1:]
+    
+    def row_key(self, row):
+        return (row[0], row[1])
+    
+    async def build_embed(self):
+        if not self.rows:
+            return discord.Embed(title="📚 Weekly Trials History", description="No archived weeks found.", color=0xffd700)
+        week_number, guild_id, tracks, categories, start_date, end_date, participant_count, podiums = self.rows[0]
+        shared_label = " (all servers)" if guild_id == SHARED_WEEK_GUILD_ID else ""
+        embed = discord.Embed(
+            title=f"📚 Weekly Trials Results - Week {week_number}{shared_label}",
+            description=f"{start_date} to {end_date} • {participant_count} participant{'s' if participant_count != 1 else ''}",
+            color=0xffd700
         )
-        return
-    
-    conn = sqlite3.connect('mario_kart_times.db')
-    cursor = conn.cursor()
-    
-    cursor.execute('SELECT * FROM weekly_trials WHERE is_active = 1')
-    current_trial = cursor.fetchone()
-    
-    if not current_trial:
-        await interaction.response.send_message("❌ No active weekly trials at the moment.", ephemeral=True)
-        conn.close()
-        return
-    
-    week_number = current_trial[1]
-    tracks = [current_trial[2], current_trial[3], current_trial[4]]
-    
-    embed = await generate_weekly_leaderboard(week_number, tracks)
-    embed.title = f"🏆 Weekly Trials Leaderboard - Week {week_number}"
-    embed.description = "Current standings (live leaderboard)"
-    embed.color = 0x3498db
-    
-    conn.close()
-    await interaction.response.send_message(embed=embed)
-
-async def admin_action_autocomplete(interaction, current: str):
-    actions = ["start_now", "end_now", "schedule_start", "schedule_end"]
-    return [discord.app_commands.Choice(name=action, value=action) for action in actions if current.lower() in action.lower()][:25]
-
-@bot.tree.command(name="weekly_admin", description="Admin commands for weekly trials")
-@discord.app_commands.autocomplete(action=admin_action_autocomplete)
-@discord.app_commands.describe(
-    action="Action to perform: start_now, end_now, schedule_start, schedule_end",
-    time_hour="Hour for scheduling (0-23)",
-    time_minute="Minute for scheduling (0-59)"
-)
-async def weekly_admin(
-    interaction: discord.Interaction, 
-    action: str,
-    time_hour: int = 12,
-    time_minute: int = 0
-):
-    # Check if user has captain or coach role (alternative method without Members Intent)
-    try:
-        # Try to get the member object from the guild
-        member = interaction.guild.get_member(interaction.user.id)
-        if member is None:
-            # Fallback: fetch member if not in cache
-            member = await interaction.guild.fetch_member(interaction.user.id)
+        track_names = json.loads(tracks)
+        show_category = len({(mode, items) for _, mode, items, _ in podiums}) > 1
+        for track, mode, items, placements in podiums:
+            lines = []
+            for placement, user_id, best_ms, vehicle, _ in placements:
+                medal = ["🥇", "🥈", "🥉", "4️⃣", "5️⃣"][placement - 1]
+                vehicle_str = f" ({truncate_text(vehicle, 15)})" if vehicle else ""
+                lines.append(f"{medal} {await get_user_name(user_id)}: {format_time(*total_ms_to_time(best_ms))}{vehicle_str}")
+            track_participants = placements[0][4] if placements else 0
+            category_str = f" ({mode}, {items})" if show_category else ""
+            embed.add_field(
+                name=f"{track_names.index(track) + 1}. {truncate_text(track, 30)}{category_str} ({track_participants} entered)",
+                value="\n".join(lines) or "No submissions",
+                inline=False
+            )
+        embed.set_footer(text="◀ Newer weeks • Older weeks ▶")
+        return embed
+
+class WeeklyPlacementsPaginator(KeysetPaginator):
+    """One user's archived weekly placements in a server (and in shared weeks), newest week first"""
+    
+    def __init__(self, owner_id, guild_id, user_id, user_label):
+        super().__init__(owner_id, page_size=10)
+        self.guild_id = guild_id
+        self.user_id = user_id
+        self.user_label = user_label
+        self.summary = None
+    
+    def fetch_rows(self, cursor, after, limit):
+        query = '''
+            SELECT week_number, guild_id, track_name, game_mode, items_setting, placement, best_ms, track_participants
+            FROM weekly_results
+            WHERE user_id = ? AND guild_id IN (?, ?)
+        '''
+        params = [self.user_id, self.guild_id, SHARED_WEEK_GUILD_ID]
+        if after:
+            query += ''' AND (
+                week_number < ?
+                OR (week_number = ? AND guild_id < ?)
+                OR (week_number = ? AND guild_id = ? AND (track_name, game_mode, items_setting) > (?, ?, ?))
+            )'''
+            params.extend([after[0], after[0], after[1], after[0], after[1], after[2], after[3], after[4]])
+        query += ' ORDER BY week_number DESC, guild_id DESC, track_name ASC, game_mode ASC, items_setting ASC LIMIT ?'
+        params.append(limit)
+        cursor.execute(query, tuple(params))
+        return cursor.fetchall()
+    
+    def row_key(self, row):
+        return row[:5]
+    
+    def load_page(self):
+        if self.summary is None:
+            conn = sqlite3.connect('mario_kart_times.db')
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT COUNT(DISTINCT guild_id || ':' || week_number), COUNT(*), MIN(placement), SUM(placement = 1), SUM(placement <= 3)
+                FROM weekly_results WHERE user_id = ? AND guild_id IN (?, ?)
+            ''', (self.user_id, self.guild_id, SHARED_WEEK_GUILD_ID))
+            self.summary = cursor.fetchone()
+            conn.close()
+        super().load_page()
+    
+    async def build_embed(self):
+        embed = discord.Embed(title=f"📚 Weekly Placements: {self.user_label}", color=0xffd700)
+        weeks, entries, best_placement, wins, podiums = self.summary
+        if not entries:
+            embed.description = "No archived weekly results yet."
+            return embed
+        embed.description = f"{weeks} weeks • {entries} tracks • Best: #{best_placement} • 🥇 {wins} • Podiums: {podiums}"
+        lines = []
+        for week_number, _, track, mode, items, placement, best_ms, track_participants in self.rows:
+            medal = {1: "🥇", 2: "🥈", 3: "🥉"}.get(placement, f"#{placement}")
+            lines.append(
+                f"Week {week_number} • {truncate_text(track, 30)} ({mode}, {items}): "
+                f"{medal}/{track_participants} ({format_time(*total_ms_to_time(best_ms))})"
+            )
+        embed.add_field(name="Results", value="\n".join(lines), inline=False)
+        embed.set_footer(text=f"Page {self.page_number + 1} • Newest week first")
+        return embed
+
+class TrackLeaderboardPaginator(KeysetPaginator):
+    """Every player's personal best on one track/mode/items, fastest first"""
+    
+    def __init__(self, owner_id, track, mode, items):
+        super().__init__(owner_id, page_size=10)
+        self.track = track
+        self.mode = mode
+        self.items = items
+    
+    def fetch_rows(self, cursor, after, limit):
+        query = '''
+            SELECT pb.user_id, pb.best_ms, t.vehicle_setup
+            FROM personal_bests pb
+            LEFT JOIN time_trials t ON t.id = pb.run_id
+            WHERE pb.game_mode = ? AND pb.items_setting = ? AND pb.track_name = ?
+        '''
+        params = [self.mode, self.items, self.track]
+        if after:
+            query += ' AND (pb.best_ms, pb.user_id) > (?, ?)'
+            params.extend(after)
+        query += ' ORDER BY pb.best_ms ASC, pb.user_id ASC LIMIT ?'
+        params.append(limit)
+        cursor.execute(query, tuple(params))
+        return cursor.fetchall()
+    
+    def row_key(self, row):
+        return (row[1], row[0])
+    
+    async def build_embed(self):
+        embed = discord.Embed(title=f"🏆 {self.track} ({self.mode}, {self.items})", color=0x00bfff)
+        wr = get_world_record(self.track, self.mode, self.items)
+        if wr:
+            embed.description = f"🌍 World Record: {format_time(*wr)}"
+        
+        if not self.rows:
+            embed.add_field(name="Standings", value="No times recorded yet", inline=False)
+            return embed
+        
+        lines = []
+        first_rank = self.page_number * self.page_size + 1
+        for rank, (user_id, best_ms, vehicle) in enumerate(self.rows, first_rank):
+            medal = {1: "🥇", 2: "🥈", 3: "🥉"}.get(rank, f"{rank}.")
+            user_name = await get_user_name(user_id)
+            vehicle_str = f" ({truncate_text(vehicle, 25)})" if vehicle else ""
+            lines.append(f"{medal} {user_name}: {format_time(*total_ms_to_time(best_ms))}{vehicle_str}")
+        
+        embed.add_field(name="Standings", value="\n".join(lines), inline=False)
+        embed.set_footer(text=f"Page {self.page_number + 1} • One entry per player (their PB)")
+        return embed
+
+RANKING_TYPES = ["total_time", "average_rank"]
+AVERAGE_RANK_MIN_TRACKS = 10
+
+class TotalTimePaginator(KeysetPaginator):
+    """Sum-of-PBs (overall or per cup) or average-rank ladder, read from the ranking indexes"""
+    
+    def __init__(self, owner_id, mode, items, ranking="total_time", cup=None):
+        super().__init__(owner_id, page_size=10)
+        self.mode = mode
+        self.items = items
+        self.ranking = ranking
+        self.cup = cup
+        self.track_count = 4 if cup else len(MK8_TRACKS)
+        self.own_standing = None
+    
+    def scope(self):
+        """Table, extra WHERE clause and params for the ladder being shown"""
+        if self.cup:
+            return "cup_totals", " AND cup_name = ?", [self.mode, self.items, self.cup]
+        return "category_totals", "", [self.mode, self.items]
+    
+    def fetch_rows(self, cursor, after, limit):
+        table, scope_sql, params = self.scope()
+        if self.ranking == "average_rank":
+            query = f'''
+                SELECT user_id, total_ms, tracks_completed, (CAST(rank_sum AS REAL) / tracks_completed) as avg_rank
+                FROM category_totals
+                WHERE game_mode = ? AND items_setting = ? AND +tracks_completed >= ?
+            '''
+            # The unary + keeps SQLite walking idx_category_totals_avg_rank in order
+            params = params + [AVERAGE_RANK_MIN_TRACKS]
+            if after:
+                query += ' AND (CAST(rank_sum AS REAL) / tracks_completed) >= ?'
+                query += ' AND ((CAST(rank_sum AS REAL) / tracks_completed), user_id) > (?, ?)'
+                params.append(after[0])
+                params.extend(after)
+            query += ' ORDER BY (CAST(rank_sum AS REAL) / tracks_completed) ASC, user_id ASC LIMIT ?'
+        else:
+            query = f'''
+                SELECT user_id, total_ms, tracks_completed, NULL
+                FROM {table}
+                WHERE game_mode = ? AND items_setting = ?{scope_sql}
+            '''
+            if after:
+                # More tracks completed ranks first, then lower total time
+                query += ' AND (tracks_completed < ? OR (tracks_completed = ? AND (total_ms, user_id) > (?, ?)))'
+                params = params + [after[0], after[0], after[1], after[2]]
+            query += ' ORDER BY tracks_completed DESC, total_ms ASC, user_id ASC LIMIT ?'
+        params.append(limit)
+        cursor.execute(query, tuple(params))
+        return cursor.fetchall()
+    
+    def row_key(self, row):
+        user_id, total_ms, tracks_completed, avg_rank = row
+        if self.ranking == "average_rank":
+            return (avg_rank, user_id)
+        return (tracks_completed, total_ms, user_id)
+    
+    def load_own_standing(self):
+        """Find the invoker's position by counting the rows ahead of them on the index"""
+        table, scope_sql, params = self.scope()
+        conn = sqlite3.connect('mario_kart_times.db')
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT total_ms, tracks_completed, {"NULL" if self.cup else "rank_sum"} FROM {table}
+            WHERE user_id = ? AND game_mode = ? AND items_setting = ?{scope_sql}
+        ''', [self.owner_id] + params)
+        own_row = cursor.fetchone()
+        if not own_row:
+            conn.close()
+            return None
         
-        user_roles = [role.name.lower() for role in member.roles]
-        print(f"🔍 DEBUG: User {interaction.user} in {interaction.guild.name} has roles: {user_roles}")
-        print(f"🔍 DEBUG: User ID: {interaction.user.id}, Guild ID: {interaction.guild.id}")
+        total_ms, tracks_completed, rank_sum = own_row
+        if self.ranking == "average_rank":
+            if tracks_completed < AVERAGE_RANK_MIN_TRACKS:
+                conn.close()
+                return None
+            avg_rank = rank_sum / tracks_completed
+            cursor.execute('''
+                SELECT COUNT(*) FROM category_totals
+                WHERE game_mode = ? AND items_setting = ? AND tracks_completed >= ?
+                AND (CAST(rank_sum AS REAL) / tracks_completed) < ?
+            ''', (self.mode, self.items, AVERAGE_RANK_MIN_TRACKS, avg_rank))
+            value = f"avg rank {avg_rank:.2f} over {tracks_completed} tracks"
+        else:
+            cursor.execute(f'''
+                SELECT COUNT(*) FROM {table}
+                WHERE game_mode = ? AND items_setting = ?{scope_sql}
+                AND (tracks_completed > ? OR (tracks_completed = ? AND total_ms < ?))
+            ''', params + [tracks_completed, tracks_completed, total_ms])
+            value = f"{format_total_time(total_ms)} ({tracks_completed}/{self.track_count})"
+        position = cursor.fetchone()[0] + 1
+        conn.close()
+        return f"**#{position}** - {value}"
+    
+    async def build_embed(self):
+        category = f"{self.mode}, {self.items}"
+        if self.ranking == "average_rank":
+            embed = discord.Embed(title=f"🏅 Average Rank Ladder ({category})", color=0x9b59b6)
+        elif self.cup:
+            embed = discord.Embed(title=f"⏱️ {self.cup} Total Time ({category})", color=0x00bfff)
+        else:
+            embed = discord.Embed(title=f"⏱️ Total Time Ladder ({category})", color=0x00bfff)
+        
+        if self.own_standing is None:
+            self.own_standing = self.load_own_standing() or "Not ranked yet"
+        embed.description = f"Your standing: {self.own_standing}"
+        
+        lines = []
+        first_rank = self.page_number * self.page_size + 1
+        for rank, (user_id, total_ms, tracks_completed, avg_rank) in enumerate(self.rows, first_rank):
+            medal = {1: "🥇", 2: "🥈", 3: "🥉"}.get(rank, f"{rank}.")
+            user_name = await get_user_name(user_id)
+            if self.ranking == "average_rank":
+                lines.append(f"{medal} {user_name}: {avg_rank:.2f} ({tracks_completed} tracks)")
+            else:
+                lines.append(f"{medal} {user_name}: {format_total_time(total_ms)} ({tracks_completed}/{self.track_count})")
+        embed.add_field(name="Standings", value="\n".join(lines) or "No times recorded yet", inline=False)
         
-        if not any(role in user_roles for role in ['captain', 'coach']):
-            await interaction.response.send_message(f"❌ You need either the 'captain' or 'coach' role to use this command.\n**Your current roles:** {', '.join([role.name for role in member.roles if role.name != '@everyone'])}", ephemeral=True)
-            return
-    except discord.Forbidden:
-        # Bot doesn't have permission to fetch member info
-        await interaction.response.send_message("❌ Bot doesn't have permission to check your roles. Please contact an administrator.", ephemeral=True)
-        return
-    except Exception as e:
-        print(f"❌ Error checking roles: {e}")
-        await interaction.response.send_message("❌ Unable to verify your roles. Please try again or contact an administrator.", ephemeral=True)
-        return
-    
-    # Defer the response to avoid timeout
-    await interaction.response.defer(ephemeral=True)
+        if self.ranking == "average_rank":
+            embed.set_footer(text=f"Page {self.page_number + 1} • Average of per-track ranks, min. {AVERAGE_RANK_MIN_TRACKS} tracks")
+        else:
+            embed.set_footer(text=f"Page {self.page_number + 1} • Sum of PBs; more tracks completed ranks first")
+        return embed
+
+class RatingPaginator(KeysetPaginator):
+    """Skill rating ladder for a category, read in order from idx_player_ratings_ranking"""
     
-    if action.lower() == "start_now":
-        try:
-            await setup_new_weekly_trials(target_guild=interaction.guild)
-            await interaction.followup.send(
-                "✅ Started new weekly trials immediately.\n"
-                "ℹ️ Check the console for details about posting to channels."
-            )
-        except Exception as e:
-            print(f"❌ Error in setup_new_weekly_trials: {e}")
-            await interaction.followup.send(
-                f"⚠️ Trials were set up, but there may have been issues posting announcements.\n"
-                f"**Error:** {str(e)[:100]}...\n"
-                f"Please check bot permissions in the 'time-trials-of-the-week' channel."
-            )
+    def __init__(self, owner_id, mode, items):
+        super().__init__(owner_id, page_size=10)
+        self.mode = mode
+        self.items = items
     
-    elif action.lower() == "end_now":
-        try:
-            await finish_weekly_trials(target_guild=interaction.guild)
-            await interaction.followup.send(
-                "✅ Ended current weekly trials and showed results.\n"
-                "ℹ️ Check the console for details about posting leaderboards."
-            )
-        except Exception as e:
-            print(f"❌ Error in finish_weekly_trials: {e}")
-            await interaction.followup.send(
-                f"⚠️ Trials were ended, but there may have been issues posting results.\n"
-                f"**Error:** {str(e)[:100]}...\n"
-                f"Please check bot permissions in the 'time-trials-of-the-week' channel."
-            )
+    def fetch_rows(self, cursor, after, limit):
+        query = '''
+            SELECT user_id, rating, matchups FROM player_ratings
+            WHERE game_mode = ? AND items_setting = ?
+        '''
+        params = [self.mode, self.items]
+        if after:
+            query += ' AND (rating < ? OR (rating = ? AND user_id > ?))'
+            params.extend([after[0], after[0], after[1]])
+        query += ' ORDER BY rating DESC, user_id ASC LIMIT ?'
+        params.append(limit)
+        cursor.execute(query, tuple(params))
+        return cursor.fetchall()
+    
+    def row_key(self, row):
+        return (row[1], row[0])
+    
+    async def build_embed(self):
+        embed = discord.Embed(title=f"📈 Rating Leaderboard ({self.mode}, {self.items})", color=0x9b59b6)
+        lines = []
+        first_rank = self.page_number * self.page_size + 1
+        for rank, (user_id, rating, matchups) in enumerate(self.rows, first_rank):
+            medal = {1: "🥇", 2: "🥈", 3: "🥉"}.get(rank, f"{rank}.")
+            user_name = await get_user_name(user_id)
+            provisional = "?" if matchups < RATING_PROVISIONAL_MATCHUPS else ""
+            lines.append(f"{medal} {user_name}: **{rating:.0f}{provisional}**")
+        embed.add_field(name="Standings", value="\n".join(lines) or "No ratings yet", inline=False)
+        embed.set_footer(text=f"Page {self.page_number + 1} • ? = provisional (fewer than {RATING_PROVISIONAL_MATCHUPS} head-to-heads)")
+        return embed
+
+class SessionModal(discord.ui.Modal, title="🏁 Add Practice Session"):
+    """Collects many track/time pairs for /add_session and submits them as one batch"""
+    
+    runs = discord.ui.TextInput(
+        label="Runs (one per line: Track, M:SS.mmm)",
+        style=discord.TextStyle.paragraph,
+        placeholder="Mario Kart Stadium, 1:35.123\nWater Park, 1:40.456",
+        max_length=4000
+    )
+    vehicle = discord.ui.TextInput(label="Vehicle Setup (optional)", required=False, max_length=200)
+    notes = discord.ui.TextInput(label="Notes (optional)", style=discord.TextStyle.paragraph, required=False, max_length=500)
     
-    elif action.lower() == "schedule_start":
-        # Validate time
-        if not (0 <= time_hour <= 23) or not (0 <= time_minute <= 59):
-            await interaction.followup.send("❌ Invalid time. Hour must be 0-23, minute must be 0-59.")
-            return
-        
-        # Update start task timing
-        try:
-            start_weekly_trials.change_interval(time=datetime.time(hour=time_hour, minute=time_minute))
-            await interaction.followup.send(
-                f"✅ Weekly trials **start** time updated to {time_hour:02d}:{time_minute:02d} (Sunday).\n"
-                "New schedule is active immediately!"
-            )
-        except Exception as e:
-            await interaction.followup.send(f"❌ Error updating start schedule: {e}")
+    def __init__(self, mode, items):
+        super().__init__()
+        self.mode = mode
+        self.items = items
     
-    elif action.lower() == "schedule_end":
-        # Validate time
-        if not (0 <= time_hour <= 23) or not (0 <= time_minute <= 59):
-            await interaction.followup.send("❌ Invalid time. Hour must be 0-23, minute must be 0-59.")
+    async def on_submit(self, interaction: discord.Interaction):
+        runs, errors = parse_session_runs(self.runs.value, self.mode, self.items, self.vehicle.value or None, self.notes.value or None)
+        if errors:
+            await interaction.response.send_message(
+                f"❌ Found {len(errors)} invalid line{'s' if len(errors) != 1 else ''}. Nothing was added.\n" + join_field_lines(errors, 1800),
+                ephemeral=True
+            )
+            return
+        if not runs:
+            await interaction.response.send_message("❌ No runs entered.", ephemeral=True)
             return
+        if len(runs) > SESSION_MAX_RUNS:
+            await interaction.response.send_message(f"❌ Too many runs. A session can have up to {SESSION_MAX_RUNS} runs.", ephemeral=True)
+            return
+        
+        await interaction.response.defer()
         
-        # Update end task timing
+        # Everything goes in as one transaction; derived state is updated once per track
         try:
-            end_weekly_trials.change_interval(time=datetime.time(hour=time_hour, minute=time_minute))
-            await interaction.followup.send(
-                f"✅ Weekly trials **end** time updated to {time_hour:02d}:{time_minute:02d} (Saturday).\n"
-                "New schedule is active immediately!"
-            )
+            submission = await write_submission("submit_runs", interaction.user.id, interaction.guild_id, runs)
+        except WriterError as e:
+            print(f"❌ Session error for {interaction.user}: {e}")
+            await interaction.followup.send("⚠️ Couldn't confirm the session was saved. Check `/view_times` before adding it again.")
+            return
         except Exception as e:
-            await interaction.followup.send(f"❌ Error updating end schedule: {e}")
-    
-    else:
-        await interaction.followup.send(
-            "❌ Invalid action. Available actions:\n"
-            "• `start_now` - Start new trials immediately\n"
-            "• `end_now` - End current trials immediately\n"
-            "• `schedule_start` - Set weekly start time (Sundays)\n"
-            "• `schedule_end` - Set weekly end time (Saturdays)\n\n"
-            f"**Current Schedule:**\n"
-            f"Start: Sundays at {start_weekly_trials.time.strftime('%H:%M')}\n"
-            f"End: Saturdays at {end_weekly_trials.time.strftime('%H:%M')}"
-        )
-
-@bot.tree.command(name="check_permissions", description="Check bot permissions for weekly trials")
-async def check_permissions(interaction: discord.Interaction):
-    # Check if user has captain or coach role first
-    try:
-        member = interaction.guild.get_member(interaction.user.id)
-        if member is None:
-            member = await interaction.guild.fetch_member(interaction.user.id)
+            print(f"❌ Session error for {interaction.user}: {e}")
+            await interaction.followup.send(f"❌ Session failed, nothing was saved: {str(e)[:200]}")
+            return
         
-        user_roles = [role.name.lower() for role in member.roles]
+        weekly_lines = weekly_batch_lines(submission["weekly_bests"])
+        if submission["streak"]:
+            try:
+                streak_info = await award_streak_progress(interaction, submission["streak"])
+                if streak_info:
+                    weekly_lines.append(streak_info)
+            except Exception as e:
+                print(f"❌ Error awarding streak role to {interaction.user}: {e}")
         
-        if not any(role in user_roles for role in ['captain', 'coach']):
-            await interaction.response.send_message(
-                "❌ You need either the 'captain' or 'coach' role to use this command.", 
-                ephemeral=True
-            )
-            return
-    except Exception as e:
-        await interaction.response.send_message(
-            f"❌ Error checking your roles: {e}", 
-            ephemeral=True
-        )
-        return
-
-    # Check for time-trials-of-the-week channel
-    target_channels = [ch for ch in interaction.guild.text_channels if ch.name.lower().strip() == 'time-trials-of-the-week']
+        embed = build_batch_summary_embed(f"🏁 Session Added! ({self.mode}, {self.items})", len(runs), submission["results"], submission["milestones"], weekly_lines)
+        await interaction.followup.send(embed=embed)
+        await send_record_pings(interaction, submission["results"])
+
+class LeaderboardPaginator(KeysetPaginator):
+    """Top time on every track, a few cups per page, with a drilldown into each track"""
+    
+    def __init__(self, owner_id, mode, items):
+        super().__init__(owner_id, page_size=4)
+        self.mode = mode
+        self.items = items
+    
+    def fetch_rows(self, cursor, after, limit):
+        start = 0 if after is None else after + 1
+        rows = []
+        for cup_index in range(start, min(start + limit, len(MK8_CUPS))):
+            cup_name, tracks = MK8_CUPS[cup_index]
+            rows.append((cup_index, cup_name, tracks, get_leaderboard(cursor, self.mode, self.items, tracks)))
+        return rows
+    
+    def row_key(self, row):
+        return row[0]
+    
+    def load_page(self):
+        super().load_page()
+        # Drilldown menu lists the tracks on the current page
+        self.track_select.options = [
+            discord.SelectOption(label=truncate_text(track, 100), value=track, description=cup_name)
+            for _, cup_name, tracks, _ in self.rows
+            for track in tracks
+        ]
     
-    if not target_channels:
-        await interaction.response.send_message(
-            "❌ No 'time-trials-of-the-week' channel found in this server.\n"
-            "Please create this channel for weekly trials to work.",
-            ephemeral=True
-        )
-        return
+    async def build_embed(self):
+        embed = discord.Embed(title=f"🏆 Leaderboard ({self.mode}, {self.items})", color=0x00bfff)
+        for _, cup_name, tracks, records in self.rows:
+            field_lines = []
+            for track in tracks:
+                record = records.get(track)
+                if record:
+                    user_id, best_ms, vehicle = record
+                    user_name = await get_user_name(user_id)
+                    formatted_time = format_time(*total_ms_to_time(best_ms))
+                    vehicle_str = f" ({truncate_text(vehicle, 15)})" if vehicle else ""
+                    line = f"{truncate_text(track, 25)}: {user_name} {formatted_time}{vehicle_str}"
+                    if len(line) > 80:
+                        line = f"{truncate_text(track, 20)}: {truncate_text(user_name, 15)} {formatted_time}"
+                    field_lines.append(line)
+                else:
+                    field_lines.append(f"{truncate_text(track, 25)}: No record")
+            embed.add_field(name=cup_name, value="\n".join(field_lines), inline=False)
+        
+        total_pages = -(-len(MK8_CUPS) // self.page_size)
+        embed.set_footer(text=f"Page {self.page_number + 1}/{total_pages} • Pick a track below to see its full standings")
+        return embed
+    
+    async def interaction_check(self, interaction):
+        # Anyone may drill down into a track; only the invoker can turn pages
+        if interaction.data.get("custom_id") == self.track_select.custom_id:
+            return True
+        return await super().interaction_check(interaction)
+    
+    @discord.ui.select(placeholder="🔎 View full standings for a track...", row=1)
+    async def track_select(self, interaction: discord.Interaction, select: discord.ui.Select):
+        view = TrackLeaderboardPaginator(interaction.user.id, select.values[0], self.mode, self.items)
+        await view.send(interaction, ephemeral=True)
+
+class TrialScheduler:
+    """Fires every server's weekly trial start/end events from a single priority queue.
+    
+    The queue holds (due_at, guild_id, event) entries; the scheduler sleeps until the
+    earliest one is due or until a schedule changes, so there is no polling. An event that
+    came due while the bot was offline is queued as due immediately (once, however many
+    weeks were missed) and fires on startup.
+    """
+    
+    def __init__(self):
+        self.queue = []
+        self.changed = asyncio.Event()
+        self.task = None
+    
+    def load(self):
+        """Rebuild the queue from guild_trial_config for every server the bot is in, on any shard"""
+        now = datetime.datetime.now(datetime.timezone.utc)
+        queue = []
+        conn = sqlite3.connect('mario_kart_times.db')
+        cursor = conn.cursor()
+        for guild_id in get_registered_guild_ids(cursor):
+            config = get_trial_config(cursor, guild_id)
+            for event in TRIAL_EVENTS:
+                weekday, clock_time = config[event]
+                last_fired = config[f"last_{event}_at"]
+                if last_fired is None:
+                    # New schedule: nothing was missed, start from the next occurrence
+                    cursor.execute(f'UPDATE guild_trial_config SET last_{event}_at = ? WHERE guild_id = ?', (now.isoformat(), guild_id))
+                    due_at = next_trial_event(now, config["timezone"], weekday, clock_time)
+                else:
+                    due_at = previous_trial_event(now, config["timezone"], weekday, clock_time)
+                    if due_at <= datetime.datetime.fromisoformat(last_fired):
+                        due_at = next_trial_event(now, config["timezone"], weekday, clock_time)
+                queue.append((due_at, guild_id, event))
+        conn.commit()
+        conn.close()
+        heapq.heapify(queue)
+        self.queue = queue
     
-    channel = target_channels[0]
+    def reschedule(self):
+        """Reload schedules after one changed or the bot joined or left a server.
+        
+        Wakes the scheduler here, and bumps the lease revision so it reloads in whichever
+        process runs it.
+        """
+        conn = sqlite3.connect('mario_kart_times.db')
+        cursor = conn.cursor()
+        bump_lease_revision(cursor, SCHEDULER_LEASE)
+        conn.commit()
+        conn.close()
+        self.changed.set()
+    
+    def start(self):
+        if self.task is None or self.task.done():
+            self.changed.clear()
+            self.task = asyncio.create_task(self.run())
+    
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+    
+    async def run(self):
+        await bot.wait_until_ready()
+        print("✅ Started weekly trials scheduler")
+        loaded = False
+        while not bot.is_closed():
+            if not loaded or self.changed.is_set():
+                self.changed.clear()
+                try:
+                    self.load()
+                    loaded = True
+                except sqlite3.Error as e:
+                    print(f"⚠️ Couldn't load weekly trials schedules, retrying in {LEASE_RENEW_SECONDS}s: {e}")
+                    loaded = False
+                    await asyncio.sleep(LEASE_RENEW_SECONDS)
+                    continue
+            if not self.queue:
+                await self.changed.wait()
+                continue
     
-    # Check bot permissions in that channel
-    bot_member = interaction.guild.get_member(bot.user.id)
-    permissions = channel.permissions_for(bot_member)
+            due_at = self.queue[0][0]
+            delay = (due_at - datetime.datetime.now(datetime.timezone.utc)).total_seconds()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self.changed.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
     
-    embed = discord.Embed(
-        title="🔍 Bot Permissions Check",
-        description=f"Checking permissions for #{channel.name}",
-        color=0x3498db
-    )
+            _, guild_id, event = heapq.heappop(self.queue)
+            await self.fire(guild_id, event, due_at)
     
-    # Check required permissions
-    required_perms = {
-        "Send Messages": permissions.send_messages,
-        "Embed Links": permissions.embed_links,
-        "Read Messages": permissions.read_messages,
-        "Use Application Commands": permissions.use_application_commands,
-        "Read Message History": permissions.read_message_history
-    }
-    
-    all_good = True
-    perm_status = []
-    
-    for perm_name, has_perm in required_perms.items():
-        if has_perm:
-            perm_status.append(f"✅ {perm_name}")
-        else:
-            perm_status.append(f"❌ {perm_name}")
-            all_good = False
+    async def fire(self, guild_id, event, due_at):
+        # The server may be on another process's shards; its announcement is posted from there
+        print(f"⏰ Weekly trials {event} for guild {guild_id} (due {due_at.isoformat()})")
+        try:
+            if event == "start":
+                await setup_new_weekly_trials(guild_id, due_at)
+            else:
+                await finish_weekly_trials(guild_id)
+        except Exception as e:
+            print(f"❌ Error running weekly trials {event} for guild {guild_id}: {e}")
     
-    embed.add_field(
-        name="Required Permissions",
-        value="\n".join(perm_status),
-        inline=False
-    )
+        conn = sqlite3.connect('mario_kart_times.db')
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f'UPDATE guild_trial_config SET last_{event}_at = ? WHERE guild_id = ?', (due_at.isoformat(), guild_id))
+            config = get_trial_config(cursor, guild_id)
+            conn.commit()
+        except sqlite3.Error as e:
+            # Reload the queue from the database instead; the event may fire again, which
+            # setup_new_weekly_trials and finish_weekly_trials allow
+            print(f"⚠️ Couldn't record weekly trials {event} for guild {guild_id}, reloading schedules: {e}")
+            self.changed.set()
+            return
+        finally:
+            conn.close()
+        weekday, clock_time = config[event]
+        now = datetime.datetime.now(datetime.timezone.utc)
+        heapq.heappush(self.queue, (next_trial_event(max(now, due_at), config["timezone"], weekday, clock_time), guild_id, event))
+
+trial_scheduler = TrialScheduler()
+
+class SchedulerLease:
+    """Runs the weekly trials scheduler in exactly one bot process.
+    
+    Every process tries to take or renew SCHEDULER_LEASE every LEASE_RENEW_SECONDS. The
+    holder runs trial_scheduler; if it stops renewing (crash, hang, lost database) another
+    process takes over once the lease has expired. Any process can bump the lease's
+    revision (see TrialScheduler.reschedule) and the holder reloads its queue on its next
+    renewal.
+    """
+    
+    def __init__(self):
+        self.held = False
+        self.revision = None
+        self.task = None
+    
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+    
+    async def run(self):
+        await bot.wait_until_ready()
+        while not bot.is_closed():
+            try:
+                revision = acquire_lease(SCHEDULER_LEASE)
+            except sqlite3.Error as e:
+                print(f"⚠️ Couldn't renew the scheduler lease: {e}")
+                revision = None
+            if revision is not None and not self.held:
+                self.held = True
+                self.revision = revision
+                print(f"✅ {CLUSTER_NAME} now runs the weekly trials scheduler")
+                # Its first load catches up on any start or end missed while no process held the lease
+                trial_scheduler.start()
+            elif revision is not None:
+                if revision != self.revision:
+                    self.revision = revision
+                    trial_scheduler.changed.set()
+                if trial_scheduler.task is None or trial_scheduler.task.done():
+                    # Holding the lease with a dead scheduler would stop every process's events
+                    error = trial_scheduler.task.exception() if trial_scheduler.task and not trial_scheduler.task.cancelled() else None
+                    print(f"⚠️ Weekly trials scheduler stopped{f': {error}' if error else ''}, restarting it")
+                    trial_scheduler.start()
+            elif revision is None and self.held:
+                self.held = False
+                print(f"⚠️ {CLUSTER_NAME} lost the scheduler lease, stopping the weekly trials scheduler")
+                trial_scheduler.stop()
+            await asyncio.sleep(LEASE_RENEW_SECONDS)
+    
+    def release(self):
+        if self.held:
+            self.held = False
+            trial_scheduler.stop()
+            release_lease(SCHEDULER_LEASE)
+
+scheduler_lease = SchedulerLease()
+
+# Announcement outbox
+ANNOUNCEMENT_CONCURRENCY = 4
+ANNOUNCEMENT_BATCH_SIZE = 50
+ANNOUNCEMENT_MAX_ATTEMPTS = 8
+ANNOUNCEMENT_RETRY_BASE_SECONDS = 15
+ANNOUNCEMENT_RETRY_MAX_SECONDS = 3600
+ANNOUNCEMENT_POLL_SECONDS = 30  # With SHARD_IDS set, other processes queue rows for this one too
+
+def get_trials_channel(guild):
+    """The server's time-trials-of-the-week channel (exact name match), or None"""
+    target_channels = [ch for ch in guild.text_channels if ch.name.lower().strip() == 'time-trials-of-the-week']
+    return target_channels[0] if target_channels else None
+
+def enqueue_announcement(cursor, guild_id, kind, week_number, embed):
+    """Queue an embed for a server's trials channel.
+    
+    (guild_id, kind, week_number) is the idempotency key: queueing the same announcement
+    again is a no-op. Returns True if it was newly queued.
+    """
+    cursor.execute('''
+        INSERT OR IGNORE INTO announcement_outbox (guild_id, kind, week_number, payload)
+        VALUES (?, ?, ?, ?)
+    ''', (guild_id, kind, week_number, json.dumps(embed.to_dict())))
+    return cursor.rowcount == 1
+
+class AnnouncementOutbox:
+    """Posts queued announcements, several servers at a time, retrying failures with backoff.
+    
+    Rows are claimed ('sending') before posting and marked 'sent' right after, so a restart
+    resumes only what is left. A row that may or may not have been posted (still claimed
+    from before a restart or a failed status update, or its send failed in a way Discord may have acted on, like a 5xx or a
+    timeout) becomes 'unconfirmed', and the channel's recent history is checked before
+    posting it again. Only failures known to happen before the send go back to 'pending'.
+    Each process only handles rows for servers on its own shards.
+    """
+    
+    def __init__(self):
+        self.wakeup = asyncio.Event()
+        self.task = None
+    
+    def wake(self):
+        self.wakeup.set()
+    
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+    
+    def execute(self, query, params=()):
+        conn = sqlite3.connect('mario_kart_times.db')
+        try:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+            conn.commit()
+        finally:
+            conn.close()
+        return rows
     
-    if all_good:
-        embed.add_field(
-            name="✅ Status",
-            value="All permissions are correct! Weekly trials should work.",
-            inline=False
-        )
-        embed.color = 0x00ff00
-    else:
-        embed.add_field(
-            name="❌ Action Required",
-            value=f"Please give the bot the missing permissions in #{channel.name}\n"
-                  "Go to Server Settings → Roles → Froog → Enable missing permissions",
-            inline=False
+    def claim_due(self):
+        now = datetime.datetime.now(datetime.timezone.utc).timestamp()
+        shard_condition, shard_params = local_shard_condition('guild_id')
+        conn = sqlite3.connect('mario_kart_times.db')
+        try:
+            rows = self.claim_rows(conn.cursor(), now, shard_condition, shard_params)
+            conn.commit()
+        finally:
+            conn.close()
+        return rows
+    
+    def claim_rows(self, cursor, now, shard_condition, shard_params):
+        # Take the write lock before reading so no other process can claim the same rows
+        cursor.execute('BEGIN IMMEDIATE')
+        # Nothing is in flight between batches, so rows still claimed for this process's shards
+        # were left by a restart or a status update that failed; they may have been posted
+        cursor.execute(
+            f"UPDATE announcement_outbox SET status = 'unconfirmed' WHERE status = 'sending' AND {shard_condition}",
+            shard_params
         )
-        embed.color = 0xff0000
+        cursor.execute(f'''
+            SELECT id, guild_id, kind, week_number, payload, status, attempts, claimed_at
+            FROM announcement_outbox
+            WHERE status IN ('pending', 'unconfirmed') AND next_attempt_at <= ? AND {shard_condition}
+            ORDER BY next_attempt_at, id
+            LIMIT ?
+        ''', (now, *shard_params, ANNOUNCEMENT_BATCH_SIZE))
+        rows = cursor.fetchall()
+        if rows:
+            cursor.execute(
+                f"UPDATE announcement_outbox SET status = 'sending', claimed_at = ? WHERE id IN ({', '.join('?' * len(rows))})",
+                (now, *[row[0] for row in rows])
+            )
+        return rows
     
-    # Test sending a message
-    try:
-        test_embed = discord.Embed(
-            title="🧪 Permission Test",
-            description="If you can see this, the bot can send messages!",
-            color=0x00ff00
+    def seconds_until_next(self):
+        shard_condition, shard_params = local_shard_condition('guild_id')
+        rows = self.execute(
+            f"SELECT MIN(next_attempt_at) FROM announcement_outbox WHERE status IN ('pending', 'unconfirmed') AND {shard_condition}",
+            shard_params
         )
-        await channel.send(embed=test_embed)
-        embed.add_field(
-            name="🧪 Send Test",
-            value="✅ Successfully sent test message",
-            inline=False
-        )
-    except discord.Forbidden:
-        embed.add_field(
-            name="🧪 Send Test",
-            value="❌ Failed to send test message - permission denied",
-            inline=False
-        )
-    except Exception as e:
-        embed.add_field(
-            name="🧪 Send Test",
-            value=f"❌ Failed to send test message: {str(e)[:100]}",
-            inline=False
-        )
-    
-    await interaction.response.send_message(embed=embed, ephemeral=True)
-
-@bot.tree.command(name="my_streak", description="View your weekly trials streak information")
-async def my_streak(interaction: discord.Interaction):
-    conn = sqlite3.connect('mario_kart_times.db')
-    cursor = conn.cursor()
-    
-    # Get user's streak data
-    cursor.execute('''
-        SELECT current_streak, best_streak, total_weeks_participated, last_participation_week
-        FROM weekly_streaks 
-        WHERE user_id = ? AND guild_id = ?
-    ''', (interaction.user.id, interaction.guild.id))
+        if rows[0][0] is None:
+            delay = None
+        else:
+            delay = max(rows[0][0] - datetime.datetime.now(datetime.timezone.utc).timestamp(), 0)
+        if SHARD_IDS:
+            delay = min(delay, ANNOUNCEMENT_POLL_SECONDS) if delay is not None else ANNOUNCEMENT_POLL_SECONDS
+        return delay
+    
+    async def run(self):
+        await bot.wait_until_ready()
+        while not bot.is_closed():
+            self.wakeup.clear()
+            try:
+                rows = self.claim_due()
+                delay = None if rows else self.seconds_until_next()
+            except sqlite3.Error as e:
+                # e.g. "database is locked" while another process holds the write lock
+                print(f"⚠️ Announcement outbox couldn't read the queue, retrying in {ANNOUNCEMENT_POLL_SECONDS}s: {e}")
+                rows, delay = [], ANNOUNCEMENT_POLL_SECONDS
+            if rows:
+                semaphore = asyncio.Semaphore(ANNOUNCEMENT_CONCURRENCY)
+                results = await asyncio.gather(*(self.deliver(row, semaphore) for row in rows), return_exceptions=True)
+                for row, result in zip(rows, results):
+                    if isinstance(result, Exception):
+                        print(f"❌ Error delivering announcement {row[0]}: {result}")
+                continue
     
-    streak_data = cursor.fetchone()
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+    
+    async def find_posted(self, channel, embed, claimed_at):
+        """Find a message this bot already posted for an unconfirmed announcement"""
+        after = datetime.datetime.fromtimestamp(claimed_at - 60, datetime.timezone.utc) if claimed_at else None
+        async for message in channel.history(limit=25, after=after):
+            if message.author.id == bot.user.id and message.embeds and message.embeds[0].title == embed.title:
+                return message
+        return None
     
-    # Get current week for context
-    current_week = get_current_week()
+    async def deliver(self, row, semaphore):
+        try:
+            await self.post(row, semaphore)
+        except sqlite3.Error as e:
+            # The row stays claimed and is handed back as 'unconfirmed' by the next claim
+            print(f"⚠️ Couldn't update announcement {row[0]} in the outbox, will check it again: {e}")
+    
+    async def post(self, row, semaphore):
+        outbox_id, guild_id, kind, week_number, payload, status, attempts, claimed_at = row
+        guild = bot.get_guild(guild_id)
+        if guild is None:
+            self.give_up(outbox_id, "bot is not in this server")
+            return
+        channel = get_trials_channel(guild)
+        if channel is None:
+            print(f"ℹ️ No 'time-trials-of-the-week' channel found in {guild.name}")
+            self.give_up(outbox_id, "no time-trials-of-the-week channel")
+            return
     
-    if not streak_data:
-        embed = discord.Embed(
-            title="🔥 Your Trial Streak",
-            description="You haven't participated in weekly trials yet!",
-            color=0x95a5a6
-        )
-        embed.add_field(name="Get Started", value="Complete all 3 tracks in a weekly trial to start your streak!", inline=False)
-    else:
-        current_streak, best_streak, total_weeks, last_week = streak_data
-        
-        # Check if they've participated this week
-        completed_this_week, submitted_tracks = await check_weekly_completion(interaction.user.id, current_week)
-        
-        embed = discord.Embed(
-            title="🔥 Your Trial Streak",
-            color=0xe74c3c if current_streak >= 8 else 0xf39c12 if current_streak >= 4 else 0x2ecc71
-        )
-        
-        embed.add_field(name="Current Streak", value=f"🔥 **{current_streak}** weeks", inline=True)
-        embed.add_field(name="Best Streak", value=f"🏆 **{best_streak}** weeks", inline=True)
-        embed.add_field(name="Total Participation", value=f"📊 **{total_weeks}** weeks", inline=True)
-        
-        # Current week status
-        if completed_this_week:
-            embed.add_field(name="This Week", value="✅ **Completed all 3 tracks!**", inline=False)
-        else:
-            if submitted_tracks:
-                embed.add_field(name="This Week", value=f"🔄 **In Progress** ({len(submitted_tracks)}/3 tracks)", inline=False)
+        embed = discord.Embed.from_dict(json.loads(payload))
+        async with semaphore:
+            message = None
+            if status == 'unconfirmed':
+                try:
+                    message = await self.find_posted(channel, embed, claimed_at)
+                except discord.Forbidden:
+                    # Can't read the channel's history (no Read Message History); post it rather than drop it
+                    print(f"⚠️ Can't check {guild.name}#{channel.name} for an earlier {kind} post, posting it")
+                except discord.RateLimited as e:
+                    self.retry(outbox_id, attempts, str(e), delay=e.retry_after, count_attempt=False, status=status)
+                    return
+                except Exception as e:
+                    print(f"⚠️ Couldn't check {guild.name}#{channel.name} for an earlier {kind} post, will retry: {e}")
+                    self.retry(outbox_id, attempts, str(e), status=status)
+                    return
+            try:
+                if message is None:
+                    message = await channel.send(embed=embed)
+            except discord.RateLimited as e:
+                # Raised before the request is sent. Not counted as a failed attempt; just wait as long as Discord asks
+                self.retry(outbox_id, attempts, str(e), delay=e.retry_after, count_attempt=False, status=status)
+            except (discord.Forbidden, discord.NotFound) as e:
+                print(f"❌ Missing permissions to send messages in {guild.name}#{channel.name}")
+                self.give_up(outbox_id, str(e))
+            except discord.HTTPException as e:
+                if e.status == 429:
+                    # Rejected without being processed
+                    print(f"⚠️ Rate limited posting {kind} in {guild.name}#{channel.name}, will retry: {e}")
+                    self.retry(outbox_id, attempts, str(e), status=status)
+                elif e.status >= 500:
+                    # Discord may have created the message before failing
+                    print(f"⚠️ Failed to post {kind} in {guild.name}#{channel.name}, will check and retry: {e}")
+                    self.retry(outbox_id, attempts, str(e), status='unconfirmed')
+                else:
+                    print(f"❌ Failed to post {kind} in {guild.name}#{channel.name}: {e}")
+                    self.give_up(outbox_id, str(e))
+            except Exception as e:
+                # e.g. a timeout, which may come after the message was created
+                print(f"⚠️ Unexpected error posting {kind} in {guild.name}#{channel.name}, will check and retry: {e}")
+                self.retry(outbox_id, attempts, str(e), status='unconfirmed')
             else:
-                embed.add_field(name="This Week", value="❌ **Not started**", inline=False)
-        
-        # Show next role milestone
-        next_milestone = None
-        for min_streak, role_name in STREAK_ROLES.items():
-            if current_streak < min_streak:
-                next_milestone = (min_streak, role_name)
-                break
-        
-        if next_milestone:
-            weeks_needed = next_milestone[0] - current_streak
-            embed.add_field(
-                name="Next Milestone", 
-                value=f"🎯 **{next_milestone[1]}** role\n({weeks_needed} more weeks needed)",
-                inline=False
-            )
-        else:
-            embed.add_field(name="Achievement", value="🏆 **Trial Champion** - Maximum rank achieved!", inline=False)
-    
-    conn.close()
-    await interaction.response.send_message(embed=embed)
-
-@bot.tree.command(name="streak_leaderboard", description="View the top trial streaks in this server")
-async def streak_leaderboard(interaction: discord.Interaction):
+                self.execute('''
+                    UPDATE announcement_outbox
+                    SET status = 'sent', message_id = ?, attempts = attempts + 1, date_sent = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                ''', (message.id, outbox_id))
+                print(f"✅ Posted {kind} for week {week_number} to {guild.name}#{channel.name}")
+    
+    def retry(self, outbox_id, attempts, error, delay=None, count_attempt=True, status='pending'):
+        """Requeue a row; status is 'unconfirmed' if it may have been posted, so the next attempt checks first"""
+        attempts += 1 if count_attempt else 0
+        if attempts >= ANNOUNCEMENT_MAX_ATTEMPTS:
+            self.give_up(outbox_id, error)
+            return
+        if delay is None:
+            delay = min(ANNOUNCEMENT_RETRY_BASE_SECONDS * 2 ** attempts, ANNOUNCEMENT_RETRY_MAX_SECONDS)
+            delay *= random.uniform(0.8, 1.2)  # Jitter so servers that failed together don't retry together
+        self.execute('''
+            UPDATE announcement_outbox
+            SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?
+            WHERE id = ?
+        ''', (status, attempts, datetime.datetime.now(datetime.timezone.utc).timestamp() + delay, error[:500], outbox_id))
+    
+    def give_up(self, outbox_id, error):
+        self.execute('''
+            UPDATE announcement_outbox SET status = 'failed', attempts = attempts + 1, last_error = ? WHERE id = ?
+        ''', (error[:500], outbox_id))
+
+announcement_outbox = AnnouncementOutbox()
+
+def format_trial_schedule(config):
+    """Describe a server's schedule with the next start and end as Discord timestamps, and its weekly format"""
+    now = datetime.datetime.now(datetime.timezone.utc)
+    lines = []
+    for event, label in [("start", "🟢 Start"), ("end", "🔴 End")]:
+        weekday, clock_time = config[event]
+        next_at = next_trial_event(now, config["timezone"], weekday, clock_time)
+        lines.append(f"{label}: {WEEKDAY_NAMES[weekday]}s at {clock_time} ({config['timezone']}) · next <t:{int(next_at.timestamp())}:R>")
+    lines.append(f"🏁 Tracks: {config['track_count']} per week")
+    lines.append(f"🎮 Categories: {format_trial_categories(config['categories'])}")
+    return "\n".join(lines)
+
+async def setup_new_weekly_trials(guild_id, at=None):
+    """Start a server's week for its start event due at `at` (now by default) and announce it.
+    
+    Returns (trial, opened) as open_weekly_trial does.
+    """
     conn = sqlite3.connect('mario_kart_times.db')
     cursor = conn.cursor()
-    
-    # Get top current streaks
-    cursor.execute('''
-        SELECT user_id, current_streak, best_streak, total_weeks_participated
-        FROM weekly_streaks 
-        WHERE guild_id = ? 
-        ORDER BY current_streak DESC, best_streak DESC
-        LIMIT 10
-    ''', (interaction.guild.id,))
-    
-    streak_data = cursor.fetchall()
+    trial, opened = open_weekly_trial(cursor, guild_id, at or datetime.datetime.now(datetime.timezone.utc))
+    conn.commit()
     conn.close()
     
-    if not streak_data:
-        embed = discord.Embed(
-            title="🏆 Trial Streak Leaderboard",
-            description="No one has participated in weekly trials yet!",
-            color=0x95a5a6
-        )
-    else:
-        embed = discord.Embed(
-            title="🏆 Trial Streak Leaderboard",
-            description="Top current streaks in this server",
-            color=0xffd700
-        )
-        
-        leaderboard_text = ""
-        for i, (user_id, current_streak, best_streak, total_weeks) in enumerate(streak_data, 1):
-            try:
-                user = await bot.fetch_user(user_id)
-                username = user.display_name
-            except:
-                username = f"User {user_id}"
-            
-            medal = ["🥇", "🥈", "🥉"][i-1] if i <= 3 else f"{i}."
-            
-            # Add streak role emoji if they have one
-            role_emoji = ""
-            for min_streak, role_name in reversed(STREAK_ROLES.items()):
-                if current_streak >= min_streak:
-                    role_emoji = {
-                        "Trial Cadet": "🟢",
-                        "Trial Veteran": "🔵", 
-                        "Trial Master": "🟣",
-                        "Trial Legend": "🔴",
-                        "Trial Champion": "🏆",
-                        "Trial Grandmaster": "💎"
-                    }.get(role_name, "")
-                    break
-            
-            leaderboard_text += f"{medal} {role_emoji} **{username}**: {current_streak} weeks (Best: {best_streak})\n"
-        
-        embed.add_field(name="Current Streaks", value=leaderboard_text or "None", inline=False)
-        embed.set_footer(text="Complete all 3 weekly tracks to build your streak!")
+    # If there is no week yet, trials haven't started
+    if not trial:
+        print(f"📅 Weekly trials haven't started yet in guild {guild_id}")
+        return trial, opened
+    if opened:
+        print(f"✅ Started week {trial['week_number']} in guild {guild_id}")
     
-    await interaction.response.send_message(embed=embed)
-
-@bot.tree.command(name="schedule", description="View the current weekly trials schedule")
-async def schedule(interaction: discord.Interaction):
+    # Queued even if the week was already running: a retried start posts it at most once
     embed = discord.Embed(
-        title="📅 Weekly Trials Schedule",
-        description="Current automated schedule for weekly trials",
-        color=0x3498db
-    )
-    
-    # Get current schedule times
-    start_time = start_weekly_trials.time.strftime('%H:%M')
-    end_time = end_weekly_trials.time.strftime('%H:%M')
-    
-    embed.add_field(
-        name="🟢 Trials Start",
-        value=f"**Sundays** at {start_time}",
-        inline=True
-    )
-    
-    embed.add_field(
-        name="🔴 Trials End",
-        value=f"**Saturdays** at {end_time}",
-        inline=True
+        title="🏁 New Weekly Time Trials!",
+        description=f"Week {trial['week_number']} trials are now active!",
+        color=0x00ff00
     )
-    
+    embed.add_field(name="Featured Tracks", value="\n".join(f"{i}. {track}" for i, track in enumerate(trial["tracks"], 1)), inline=False)
+    embed.add_field(name="Duration", value=f"{trial['start_date']} to {trial['end_date']}", inline=False)
     embed.add_field(
-        name="ℹ️ Info",
-        value="Times are in the bot's server timezone.\n"
-              "Trials run for exactly one week (Sunday to Saturday).",
+        name="How to Participate",
+        value=f"Use `/add_time` with {format_trial_categories(trial['categories'], ' or ')} for these tracks!",
         inline=False
     )
+    await queue_guild_announcements(guild_id, "week_start", trial["week_number"], embed)
+    return trial, opened
+
+async def queue_guild_announcements(guild_id, kind, week_number, embed):
+    """Queue an announcement for one server (or every server) and wake the outbox worker.
     
-    # Check if there are current active trials
+    The process serving the server's shard posts it, and checks for the trials channel then.
+    """
     conn = sqlite3.connect('mario_kart_times.db')
     cursor = conn.cursor()
-    cursor.execute('SELECT week_number, start_date, end_date FROM weekly_trials WHERE is_active = 1')
-    current_trial = cursor.fetchone()
+    guild_ids = [guild_id] if guild_id else get_registered_guild_ids(cursor)
+    for target_guild_id in guild_ids:
+        if not enqueue_announcement(cursor, target_guild_id, kind, week_number, embed):
+            print(f"ℹ️ Week {week_number} {kind} is already queued or posted in guild {target_guild_id}")
+    conn.commit()
     conn.close()
-    
-    if current_trial:
-        week_num, start_date, end_date = current_trial
-        embed.add_field(
-            name="📊 Current Trials",
-            value=f"Week {week_num}: {start_date} to {end_date}",
-            inline=False
-        )
-    
-    await interaction.response.send_message(embed=embed)
+    announcement_outbox.wake()
 
-@bot.tree.command(name="streak_roles", description="View information about trial streak roles")
-async def streak_roles(interaction: discord.Interaction):
-    embed = discord.Embed(
-        title="🏆 Trial Streak Roles",
-        description="Earn special roles by maintaining weekly trial streaks!",
-        color=0x9b59b6
-    )
-    
-    embed.add_field(
-        name="How It Works",
-        value="Complete **all 3 tracks** each week to maintain your streak.\n"
-              "Missing a week resets your streak to 0.",
-        inline=False
-    )
-    
-    roles_text = ""
-    for min_streak, role_name in STREAK_ROLES.items():
-        emoji = {
-            "Trial Cadet": "🟢",
-            "Trial Veteran": "🔵", 
-            "Trial Master": "🟣",
-            "Trial Legend": "🔴",
-            "Trial Champion": "🏆",
-            "Trial Grandmaster": "💎"
-        }.get(role_name, "⭐")
-        
-        roles_text += f"{emoji} **{role_name}**: {min_streak}+ weeks\n"
+async def finish_weekly_trials(guild_id):
+    """Post the results of a server's running week there and return the week, or None.
     
-    embed.add_field(name="Available Roles", value=roles_text, inline=False)
-    embed.add_field(
-        name="Tips", 
-        value="• Use `/my_streak` to check your progress\n"
-              "• Submit times for all 3 tracks each week\n"
-              "• Roles are automatically awarded when earned",
-        inline=False
-    )
+    The week stays open (and is archived) until the server's next start replaces it.
+    """
+    conn = sqlite3.connect('mario_kart_times.db')
+    cursor = conn.cursor()
+    trial = get_active_weekly_trial(cursor, guild_id)
+    conn.close()
     
-    await interaction.response.send_message(embed=embed)
+    if trial:
+        embed = await generate_weekly_leaderboard(trial)
+        await queue_guild_announcements(guild_id, "week_results", trial["week_number"], embed)
+    return trial
 
-@bot.tree.command(name="hall_of_fame", description="View the server's Hall of Fame and record holders")
-async def hall_of_fame(interaction: discord.Interaction):
-    await interaction.response.defer()
-    
-    try:
-        conn = sqlite3.connect('mario_kart_times.db')
-        cursor = conn.cursor()
-        
-        embed = discord.Embed(
-            title="🏛️ Hall of Fame",
-            description=f"**{interaction.guild.name}** - Legends and Champions",
-            color=0xffd700
-        )
-        
-        # Current record holders (top 5 by days held)
-        cursor.execute('''
-            SELECT user_id, track_name, time_minutes, time_seconds, time_milliseconds, 
-                   CAST((julianday('now') - julianday(date_achieved)) AS INTEGER) as days_held,
-                   date_achieved
-            FROM record_holders 
-            WHERE guild_id = ? AND is_current = 1
-            ORDER BY days_held DESC
-            LIMIT 5
-        ''', (interaction.guild.id,))
-        
-        current_records = cursor.fetchall()
-        
-        if current_records:
-            record_lines = []
-            for user_id, track, mins, secs, ms, days_held, date_achieved in current_records:
-                try:
-                    user = await bot.fetch_user(user_id)
-                    formatted_time = format_time(mins, secs, ms)
-                    track_display = truncate_text(track, 20)
-                    record_lines.append(f"**{user.display_name}** - {track_display}\n{formatted_time} • {days_held} days")
-                except:
-                    record_lines.append(f"User {user_id} - {truncate_text(track, 20)}\n{format_time(mins, secs, ms)} • {days_held} days")
-            
-            embed.add_field(
-                name="👑 Current Record Holders",
-                value="\n\n".join(record_lines[:3]),  # Limit to prevent overflow
-                inline=False
-            )
-        
-        # Longest-held records (all time)
-        cursor.execute('''
-            SELECT user_id, track_name, time_minutes, time_seconds, time_milliseconds, days_held
-            FROM record_holders 
-            WHERE guild_id = ? AND days_held IS NOT NULL
-            ORDER BY days_held DESC
-            LIMIT 3
-        ''', (interaction.guild.id,))
-        
-        longest_records = cursor.fetchall()
-        
-        if longest_records:
-            legend_lines = []
-            for user_id, track, mins, secs, ms, days_held in longest_records:
-                try:
-                    user = await bot.fetch_user(user_id)
-                    formatted_time = format_time(mins, secs, ms)
-                    track_display = truncate_text(track, 20)
-                    legend_lines.append(f"**{user.display_name}** - {track_display}\n{formatted_time} • {days_held} days")
-                except:
-                    legend_lines.append(f"User {user_id} - {truncate_text(track, 20)}\n{format_time(mins, secs, ms)} • {days_held} days")
-            
-            embed.add_field(
-                name="📜 Legendary Records",
-                value="\n\n".join(legend_lines),
-                inline=False
-            )
-        
-        embed.set_footer(text="Use /my_achievements to see your personal milestones!")
-        conn.close()
-        
-        await interaction.followup.send(embed=embed)
-        
-    except Exception as e:
-        print(f"❌ Hall of Fame error: {e}")
-        await interaction.followup.send(f"❌ Error loading Hall of Fame: {str(e)[:200]}")
+@bot.event
+async def on_ready():
+    # Fires again after every reconnect; one-time startup lives in FroogBot.setup_hook
+    print(f'{bot.user} has connected to Discord! ({len(bot.guilds)} servers)')
 
-@bot.tree.command(name="my_achievements", description="View your personal achievements and milestones")
-async def my_achievements(interaction: discord.Interaction):
-    await interaction.response.defer()
-    
-    try:
-        conn = sqlite3.connect('mario_kart_times.db')
-        cursor = conn.cursor()
-        
-        embed = discord.Embed(
-            title="🏆 Your Achievements",
-            description=f"**{interaction.user.display_name}**'s Mario Kart Legacy",
-            color=0x9b59b6
-        )
-        
-        # Current records held
-        cursor.execute('''
-            SELECT track_name, time_minutes, time_seconds, time_milliseconds, 
-                   CAST((julianday('now') - julianday(date_achieved)) AS INTEGER) as days_held,
-                   date_achieved
-            FROM record_holders 
-            WHERE user_id = ? AND guild_id = ? AND is_current = 1
-            ORDER BY days_held DESC
-        ''', (interaction.user.id, interaction.guild.id))
-        
-        current_records = cursor.fetchall()
-        
-        if current_records:
-            record_lines = []
-            for track, mins, secs, ms, days_held, date_achieved in current_records[:5]:
-                formatted_time = format_time(mins, secs, ms)
-                track_display = truncate_text(track, 25)
-                record_lines.append(f"**{track_display}** - {formatted_time} ({days_held} days)")
-            
-            embed.add_field(
-                name="👑 Current Records",
-                value="\n".join(record_lines),
-                inline=False
-            )
-        
-        # Total records ever held
-        cursor.execute('''
-            SELECT COUNT(*), SUM(COALESCE(days_held, CAST((julianday('now') - julianday(date_achieved)) AS INTEGER)))
-            FROM record_holders 
-            WHERE user_id = ? AND guild_id = ?
-        ''', (interaction.user.id, interaction.guild.id))
-        
-        total_records, total_days = cursor.fetchone()
-        
-        # Personal milestones
-        cursor.execute('''
-            SELECT milestone_name, date_achieved
-            FROM user_milestones 
-            WHERE user_id = ? AND guild_id = ?
-            ORDER BY date_achieved DESC
-        ''', (interaction.user.id, interaction.guild.id))
-        
-        milestones = cursor.fetchall()
-        
-        if milestones:
-            milestone_lines = []
-            for milestone_name, date_achieved in milestones[:8]:
-                date_str = date_achieved.split()[0] if date_achieved else "Unknown"
-                milestone_lines.append(f"🎖️ {milestone_name} ({date_str})")
-            
-            embed.add_field(
-                name="🏅 Milestones Achieved",
-                value="\n".join(milestone_lines),
-                inline=False
-            )
-        
-        # Stats summary
-        stats_text = f"**Records Held:** {total_records or 0} (Total: {total_days or 0} days)\n"
-        stats_text += f"**Current Records:** {len(current_records)}\n"
-        stats_text += f"**Milestones:** {len(milestones)}"
-        
-        embed.add_field(
-            name="📊 Legacy Summary",
-            value=stats_text,
-            inline=True
-        )
-        
-        # Calculate anniversary (days since first submission)
-        cursor.execute('''
-            SELECT MIN(date_recorded) 
-            FROM time_trials 
-            WHERE user_id = ?
-        ''', (interaction.user.id,))
-        
-        first_submission = cursor.fetchone()[0]
-        if first_submission:
-            first_date = datetime.datetime.fromisoformat(first_submission)
-            days_active = (datetime.datetime.now() - first_date).days
-            
-            if days_active >= 365:
-                years = days_active // 365
-                embed.add_field(
-                    name="🎂 Anniversary",
-                    value=f"**{years} year{'s' if years > 1 else ''}** of racing!\n({days_active} days total)",
-                    inline=True
-                )
-            elif days_active >= 30:
-                months = days_active // 30
-                embed.add_field(
-                    name="📅 Active For",
-                    value=f"**{months} month{'s' if months > 1 else ''}**\n({days_active} days)",
-                    inline=True
-                )
-        
-        embed.set_thumbnail(url=interaction.user.display_avatar.url)
-        conn.close()
-        
-        await interaction.followup.send(embed=embed)
-        
-    except Exception as e:
-        print(f"❌ Achievements error: {e}")
-        await interaction.followup.send(f"❌ Error loading achievements: {str(e)[:200]}")
+@bot.event
+async def on_shard_ready(shard_id):
+    print(f'Shard {shard_id} is ready ({CLUSTER_NAME})')
+    register_shard_guilds(shard_id)
+
+@bot.event
+async def on_guild_join(guild):
+    register_guild(guild)
+
+@bot.event
+async def on_guild_remove(guild):
+    unregister_guild(guild.id)
 
 # Main block
 if __name__ == "__main__":
@@ -2413,6 +2017,9 @@ if __name__ == "__main__":
         print("❌ DISCORD_BOT_TOKEN environment variable not found!")
         print("Please set your Discord bot token as an environment variable.")
         exit(1)
+    if SHARD_IDS and (SHARD_COUNT is None or max(SHARD_IDS) >= SHARD_COUNT):
+        print("❌ SHARD_IDS needs SHARD_COUNT set to the total number of shards, greater than every listed shard ID.")
+        exit(1)
     
     print("Starting bot...")
     print("Note: Discord bot tokens should start with a bot ID followed by a dot and then the actual token")
@@ -0,0 +1,438 @@
+import discord
+import sqlite3
+import zoneinfo
+from discord.ext import commands
+from tracks_config import GAME_MODES
+from bot import (
+    export_format_autocomplete, EXPORT_FORMATS, EXTENSIONS, finish_weekly_trials,
+    format_trial_schedule, send_time_export, setup_new_weekly_trials, sync_command_tree,
+    trial_scheduler
+)
+from froog_core import (
+    format_trial_categories, get_trial_config, parse_clock_time, parse_trial_categories,
+    TRIAL_ITEMS, TRIAL_MAX_TRACKS, WEEKDAY_NAMES
+)
+
+def update_trial_config(guild_id, **changes):
+    """Save schedule changes for a server, wake the scheduler and return the new config"""
+    conn = sqlite3.connect('mario_kart_times.db')
+    cursor = conn.cursor()
+    get_trial_config(cursor, guild_id)
+    for column, value in changes.items():
+        cursor.execute(f'UPDATE guild_trial_config SET {column} = ? WHERE guild_id = ?', (value, guild_id))
+    config = get_trial_config(cursor, guild_id)
+    conn.commit()
+    conn.close()
+    trial_scheduler.reschedule()
+    return config
+
+async def weekday_autocomplete(interaction, current: str):
+    return [discord.app_commands.Choice(name=day, value=day) for day in WEEKDAY_NAMES if current.lower() in day.lower()][:25]
+
+async def timezone_autocomplete(interaction, current: str):
+    return [
+        discord.app_commands.Choice(name=zone, value=zone)
+        for zone in sorted(zoneinfo.available_timezones()) if current.lower() in zone.lower()
+    ][:25]
+
+async def admin_action_autocomplete(interaction, current: str):
+    actions = ["start_now", "end_now", "schedule_start", "schedule_end"]
+    return [discord.app_commands.Choice(name=action, value=action) for action in actions if current.lower() in action.lower()][:25]
+
+def extension_names():
+    return [extension.removeprefix("cogs.") for extension in EXTENSIONS]
+
+async def extension_autocomplete(interaction, current: str):
+    return [discord.app_commands.Choice(name=name, value=name) for name in extension_names() if current.lower() in name.lower()][:25]
+
+async def is_trial_admin(interaction):
+    """Check whether the user has the 'captain' or 'coach' role in this server"""
+    member = interaction.guild.get_member(interaction.user.id)
+    if member is None:
+        # Fallback: fetch member if not in cache
+        member = await interaction.guild.fetch_member(interaction.user.id)
+    return any(role.name.lower() in ['captain', 'coach'] for role in member.roles)
+
+class Admin(commands.Cog):
+    """Server admin commands for weekly trials and data exports"""
+    
+    def __init__(self, bot):
+        self.bot = bot
+    
+    @discord.app_commands.command(name="weekly_config", description="Admin: set this server's weekly trials days, times, timezone, tracks and categories")
+    @discord.app_commands.autocomplete(
+        timezone=timezone_autocomplete,
+        start_day=weekday_autocomplete,
+        end_day=weekday_autocomplete
+    )
+    @discord.app_commands.describe(
+        timezone="IANA timezone, e.g. Europe/London",
+        start_time="Start time as HH:MM (24-hour)",
+        end_time="End time as HH:MM (24-hour)",
+        track_count=f"Tracks per week (1-{TRIAL_MAX_TRACKS})",
+        categories="Comma-separated mode and items, e.g. 150cc shrooms, 200cc no_items"
+    )
+    async def weekly_config(
+        self,
+        interaction: discord.Interaction,
+        timezone: str | None = None,
+        start_day: str | None = None,
+        start_time: str | None = None,
+        end_day: str | None = None,
+        end_time: str | None = None,
+        track_count: int | None = None,
+        categories: str | None = None
+    ):
+        if interaction.guild is None:
+            await interaction.response.send_message("❌ This command only works inside a server.", ephemeral=True)
+            return
+        try:
+            if not await is_trial_admin(interaction):
+                await interaction.response.send_message("❌ You need either the 'captain' or 'coach' role to use this command.", ephemeral=True)
+                return
+        except Exception as e:
+            print(f"❌ Error checking roles: {e}")
+            await interaction.response.send_message("❌ Unable to verify your roles. Please try again or contact an administrator.", ephemeral=True)
+            return
+        
+        changes = {}
+        if timezone is not None:
+            try:
+                zoneinfo.ZoneInfo(timezone)
+            except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+                await interaction.response.send_message("❌ Unknown timezone. Use a name like `Europe/London` or `America/New_York`.", ephemeral=True)
+                return
+            changes["timezone"] = timezone
+        for column, day in [("start_day", start_day), ("end_day", end_day)]:
+            if day is not None:
+                if day.title() not in WEEKDAY_NAMES:
+                    await interaction.response.send_message(f"❌ Invalid day. Choose from: {', '.join(WEEKDAY_NAMES)}", ephemeral=True)
+                    return
+                changes[column] = WEEKDAY_NAMES.index(day.title())
+        for column, clock_time in [("start_time", start_time), ("end_time", end_time)]:
+            if clock_time is not None:
+                parsed = parse_clock_time(clock_time)
+                if not parsed:
+                    await interaction.response.send_message("❌ Invalid time. Use HH:MM in 24-hour time, e.g. `18:30`.", ephemeral=True)
+                    return
+                changes[column] = f"{parsed[0]:02d}:{parsed[1]:02d}"
+        if track_count is not None:
+            if not 1 <= track_count <= TRIAL_MAX_TRACKS:
+                await interaction.response.send_message(f"❌ Invalid track count. Choose 1 to {TRIAL_MAX_TRACKS}.", ephemeral=True)
+                return
+            changes["track_count"] = track_count
+        if categories is not None:
+            parsed_categories = parse_trial_categories(categories)
+            if not parsed_categories:
+                await interaction.response.send_message(
+                    f"❌ Invalid categories. Use mode and items pairs, e.g. `150cc shrooms, 200cc no_items` "
+                    f"(modes: {', '.join(GAME_MODES)}; items: {', '.join(TRIAL_ITEMS)}).",
+                    ephemeral=True
+                )
+                return
+            changes["categories"] = format_trial_categories(parsed_categories)
+    
+        config = update_trial_config(interaction.guild.id, **changes)
+        embed = discord.Embed(
+            title="📅 Weekly Trials Schedule Updated" if changes else "📅 Weekly Trials Schedule",
+            description=format_trial_schedule(config),
+            color=0x3498db
+        )
+        if "track_count" in changes or "categories" in changes:
+            embed.set_footer(text="Track count and category changes apply from the next week.")
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+    
+    @discord.app_commands.command(name="weekly_admin", description="Admin commands for weekly trials")
+    @discord.app_commands.autocomplete(action=admin_action_autocomplete)
+    @discord.app_commands.describe(
+        action="Action to perform: start_now, end_now, schedule_start, schedule_end",
+        time_hour="Hour for scheduling (0-23)",
+        time_minute="Minute for scheduling (0-59)"
+    )
+    async def weekly_admin(
+        self,
+        interaction: discord.Interaction, 
+        action: str,
+        time_hour: int = 12,
+        time_minute: int = 0
+    ):
+        # Check if user has captain or coach role (alternative method without Members Intent)
+        try:
+            # Try to get the member object from the guild
+            member = interaction.guild.get_member(interaction.user.id)
+            if member is None:
+                # Fallback: fetch member if not in cache
+                member = await interaction.guild.fetch_member(interaction.user.id)
+            
+            user_roles = [role.name.lower() for role in member.roles]
+            print(f"🔍 DEBUG: User {interaction.user} in {interaction.guild.name} has roles: {user_roles}")
+            print(f"🔍 DEBUG: User ID: {interaction.user.id}, Guild ID: {interaction.guild.id}")
+            
+            if not any(role in user_roles for role in ['captain', 'coach']):
+                await interaction.response.send_message(f"❌ You need either the 'captain' or 'coach' role to use this command.\n**Your current roles:** {', '.join([role.name for role in member.roles if role.name != '@everyone'])}", ephemeral=True)
+                return
+        except discord.Forbidden:
+            # Bot doesn't have permission to fetch member info
+            await interaction.response.send_message("❌ Bot doesn't have permission to check your roles. Please contact an administrator.", ephemeral=True)
+            return
+        except Exception as e:
+            print(f"❌ Error checking roles: {e}")
+            await interaction.response.send_message("❌ Unable to verify your roles. Please try again or contact an administrator.", ephemeral=True)
+            return
+        
+        # Defer the response to avoid timeout
+        await interaction.response.defer(ephemeral=True)
+        
+        if action.lower() == "start_now":
+            try:
+                trial, opened = await setup_new_weekly_trials(interaction.guild.id)
+                if not trial:
+                    await interaction.followup.send("📅 Weekly trials haven't started yet for this server's schedule.")
+                elif not opened:
+                    await interaction.followup.send(
+                        f"ℹ️ Week {trial['week_number']} is already running; the next one starts at this server's next scheduled start.\n"
+                        "Its announcement was queued again in case it hadn't been posted."
+                    )
+                else:
+                    await interaction.followup.send(
+                        f"✅ Started week {trial['week_number']} immediately.\n"
+                        "ℹ️ Check the console for details about posting to channels."
+                    )
+            except Exception as e:
+                print(f"❌ Error in setup_new_weekly_trials: {e}")
+                await interaction.followup.send(
+                    f"⚠️ Trials were set up, but there may have been issues posting announcements.\n"
+                    f"**Error:** {str(e)[:100]}...\n"
+                    f"Please check bot permissions in the 'time-trials-of-the-week' channel."
+                )
+        
+        elif action.lower() == "end_now":
+            try:
+                trial = await finish_weekly_trials(interaction.guild.id)
+                if not trial:
+                    await interaction.followup.send("❌ No active weekly trials at the moment.")
+                else:
+                    await interaction.followup.send(
+                        f"✅ Posted the results of week {trial['week_number']}.\n"
+                        "ℹ️ Runs still count until the next week starts; check the console for details about posting leaderboards."
+                    )
+            except Exception as e:
+                print(f"❌ Error in finish_weekly_trials: {e}")
+                await interaction.followup.send(
+                    f"⚠️ Trials were ended, but there may have been issues posting results.\n"
+                    f"**Error:** {str(e)[:100]}...\n"
+                    f"Please check bot permissions in the 'time-trials-of-the-week' channel."
+                )
+        
+        elif action.lower() == "schedule_start":
+            # Validate time
+            if not (0 <= time_hour <= 23) or not (0 <= time_minute <= 59):
+                await interaction.followup.send("❌ Invalid time. Hour must be 0-23, minute must be 0-59.")
+                return
+            
+            # Update this server's start time
+            try:
+                config = update_trial_config(interaction.guild.id, start_time=f"{time_hour:02d}:{time_minute:02d}")
+                await interaction.followup.send(
+                    f"✅ Weekly trials **start** time updated to {time_hour:02d}:{time_minute:02d} "
+                    f"({WEEKDAY_NAMES[config['start'][0]]}, {config['timezone']}).\n"
+                    "New schedule is active immediately!"
+                )
+            except Exception as e:
+                await interaction.followup.send(f"❌ Error updating start schedule: {e}")
+        
+        elif action.lower() == "schedule_end":
+            # Validate time
+            if not (0 <= time_hour <= 23) or not (0 <= time_minute <= 59):
+                await interaction.followup.send("❌ Invalid time. Hour must be 0-23, minute must be 0-59.")
+                return
+            
+            # Update this server's end time
+            try:
+                config = update_trial_config(interaction.guild.id, end_time=f"{time_hour:02d}:{time_minute:02d}")
+                await interaction.followup.send(
+                    f"✅ Weekly trials **end** time updated to {time_hour:02d}:{time_minute:02d} "
+                    f"({WEEKDAY_NAMES[config['end'][0]]}, {config['timezone']}).\n"
+                    "New schedule is active immediately!"
+                )
+            except Exception as e:
+                await interaction.followup.send(f"❌ Error updating end schedule: {e}")
+        
+        else:
+            conn = sqlite3.connect('mario_kart_times.db')
+            cursor = conn.cursor()
+            config = get_trial_config(cursor, interaction.guild.id)
+            conn.commit()
+            conn.close()
+            await interaction.followup.send(
+                "❌ Invalid action. Available actions:\n"
+                "• `start_now` - Start new trials immediately\n"
+                "• `end_now` - End current trials immediately\n"
+                "• `schedule_start` - Set weekly start time\n"
+                "• `schedule_end` - Set weekly end time\n"
+                "Use `/weekly_config` to change days and timezone.\n\n"
+                f"**Current Schedule:**\n"
+                f"{format_trial_schedule(config)}"
+            )
+    
+    @discord.app_commands.command(name="check_permissions", description="Check bot permissions for weekly trials")
+    async def check_permissions(self, interaction: discord.Interaction):
+        # Check if user has captain or coach role first
+        try:
+            member = interaction.guild.get_member(interaction.user.id)
+            if member is None:
+                member = await interaction.guild.fetch_member(interaction.user.id)
+            
+            user_roles = [role.name.lower() for role in member.roles]
+            
+            if not any(role in user_roles for role in ['captain', 'coach']):
+                await interaction.response.send_message(
+                    "❌ You need either the 'captain' or 'coach' role to use this command.", 
+                    ephemeral=True
+                )
+                return
+        except Exception as e:
+            await interaction.response.send_message(
+                f"❌ Error checking your roles: {e}", 
+                ephemeral=True
+            )
+            return
+
+        # Check for time-trials-of-the-week channel
+        target_channels = [ch for ch in interaction.guild.text_channels if ch.name.lower().strip() == 'time-trials-of-the-week']
+        
+        if not target_channels:
+            await interaction.response.send_message(
+                "❌ No 'time-trials-of-the-week' channel found in this server.\n"
+                "Please create this channel for weekly trials to work.",
+                ephemeral=True
+            )
+            return
+        
+        channel = target_channels[0]
+        
+        # Check bot permissions in that channel
+        bot_member = interaction.guild.get_member(self.bot.user.id)
+        permissions = channel.permissions_for(bot_member)
+        
+        embed = discord.Embed(
+            title="🔍 Bot Permissions Check",
+            description=f"Checking permissions for #{channel.name}",
+            color=0x3498db
+        )
+        
+        # Check required permissions
+        required_perms = {
+            "Send Messages": permissions.send_messages,
+            "Embed Links": permissions.embed_links,
+            "Read Messages": permissions.read_messages,
+            "Use Application Commands": permissions.use_application_commands,
+            "Read Message History": permissions.read_message_history
+        }
+        
+        all_good = True
+        perm_status = []
+        
+        for perm_name, has_perm in required_perms.items():
+            if has_perm:
+                perm_status.append(f"✅ {perm_name}")
+            else:
+                perm_status.append(f"❌ {perm_name}")
+                all_good = False
+        
+        embed.add_field(
+            name="Required Permissions",
+            value="\n".join(perm_status),
+            inline=False
+        )
+        
+        if all_good:
+            embed.add_field(
+                name="✅ Status",
+                value="All permissions are correct! Weekly trials should work.",
+                inline=False
+            )
+            embed.color = 0x00ff00
+        else:
+            embed.add_field(
+                name="❌ Action Required",
+                value=f"Please give the bot the missing permissions in #{channel.name}\n"
+                      "Go to Server Settings → Roles → Froog → Enable missing permissions",
+                inline=False
+            )
+            embed.color = 0xff0000
+        
+        # Test sending a message
+        try:
+            test_embed = discord.Embed(
+                title="🧪 Permission Test",
+                description="If you can see this, the bot can send messages!",
+                color=0x00ff00
+            )
+            await channel.send(embed=test_embed)
+            embed.add_field(
+                name="🧪 Send Test",
+                value="✅ Successfully sent test message",
+                inline=False
+            )
+        except discord.Forbidden:
+            embed.add_field(
+                name="🧪 Send Test",
+                value="❌ Failed to send test message - permission denied",
+                inline=False
+            )
+        except Exception as e:
+            embed.add_field(
+                name="🧪 Send Test",
+                value=f"❌ Failed to send test message: {str(e)[:100]}",
+                inline=False
+            )
+        
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+    
+    @discord.app_commands.command(name="export_guild_times", description="Admin: download this server's time trial data as a compressed CSV or NDJSON file")
+    @discord.app_commands.autocomplete(format=export_format_autocomplete)
+    @discord.app_commands.describe(format="csv (zip with one file per table) or ndjson (gzipped JSON lines)")
+    async def export_guild_times(self, interaction: discord.Interaction, format: str = "csv"):
+        if format not in EXPORT_FORMATS:
+            await interaction.response.send_message(f"❌ Invalid format. Choose from: {', '.join(EXPORT_FORMATS)}", ephemeral=True)
+            return
+        
+        try:
+            if not await is_trial_admin(interaction):
+                await interaction.response.send_message("❌ You need either the 'captain' or 'coach' role to use this command.", ephemeral=True)
+                return
+        except Exception as e:
+            print(f"❌ Error checking roles: {e}")
+            await interaction.response.send_message("❌ Unable to verify your roles. Please try again or contact an administrator.", ephemeral=True)
+            return
+        
+        await send_time_export(interaction, "guild_id", interaction.guild.id, format, f"froog_guild_export_{interaction.guild.id}")
+    
+    @discord.app_commands.command(name="reload", description="Owner: reload a command group without restarting the bot")
+    @discord.app_commands.autocomplete(extension=extension_autocomplete)
+    async def reload(self, interaction: discord.Interaction, extension: str):
+        if not await self.bot.is_owner(interaction.user):
+            await interaction.response.send_message("❌ Only the bot owner can reload commands.", ephemeral=True)
+            return
+    
+        name = f"cogs.{extension}"
+        if name not in EXTENSIONS:
+            await interaction.response.send_message(f"❌ Unknown command group. Choose from: {', '.join(extension_names())}", ephemeral=True)
+            return
+    
+        await interaction.response.defer(ephemeral=True)
+        try:
+            # On failure discord.py puts the previously loaded version back
+            await self.bot.reload_extension(name)
+        except commands.ExtensionError as e:
+            await interaction.followup.send(f"❌ Reload failed, the previous version is still running: {e}", ephemeral=True)
+            return
+    
+        # Only talks to Discord if the reload changed a command's name, options or description
+        await sync_command_tree(self.bot.tree)
+        print(f"🔄 Reloaded {name}")
+        await interaction.followup.send(f"✅ Reloaded `{extension}`. Caches and background workers were kept.", ephemeral=True)
+
+async def setup(bot):
+    await bot.add_cog(Admin(bot))
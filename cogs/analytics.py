@@ -0,0 +1,273 @@
+import discord
+import asyncio
+import datetime
+import io
+import sqlite3
+from discord.ext import commands
+from tracks_config import GAME_MODES, MK8_TRACKS
+from kart_stats_config import STAT_NAMES
+from bot import (
+    build_search_query, format_standing, items_autocomplete, load_progress_series,
+    load_rendering, mode_autocomplete, search_scope_autocomplete, SEARCH_SCOPES,
+    SearchRunsPaginator, track_autocomplete, truncate_text
+)
+from froog_core import (
+    COMBO_MAX_WEIGHT, COMBO_PART_TYPES, DISTRIBUTION_BUCKET_MS, format_time, get_combo_frontier,
+    get_time_distribution, get_track_leader, get_world_record, load_vehicle_parts,
+    META_GAP_BUCKETS_PER_PCT, search_combos, total_ms_to_time, vehicle_part_names,
+    VEHICLE_PART_TYPES
+)
+
+class Analytics(commands.Cog):
+    """Rarely used statistics, charts and search"""
+    
+    def __init__(self, bot):
+        self.bot = bot
+    
+    @discord.app_commands.command(name="track_stats", description="View how PB times are spread out on a track")
+    @discord.app_commands.autocomplete(
+        track=track_autocomplete,
+        mode=mode_autocomplete,
+        items=items_autocomplete
+    )
+    async def track_stats(self, interaction: discord.Interaction, track: str, mode: str = "150cc", items: str = "shrooms"):
+        # Validate track
+        if track not in MK8_TRACKS:
+            await interaction.response.send_message(f"❌ Invalid track name. Use `/list_tracks` to see all available tracks.", ephemeral=True)
+            return
+        
+        # Validate mode
+        if mode not in GAME_MODES:
+            await interaction.response.send_message(f"❌ Invalid game mode. Choose from: {', '.join(GAME_MODES)}", ephemeral=True)
+            return
+        
+        # Validate items
+        if items not in ["shrooms", "no_items"]:
+            await interaction.response.send_message("❌ Invalid items setting. Choose `shrooms` or `no_items`.", ephemeral=True)
+            return
+        
+        conn = sqlite3.connect('mario_kart_times.db')
+        cursor = conn.cursor()
+        distribution = get_time_distribution(cursor, track, mode, items)
+        leader = get_track_leader(cursor, track, mode, items)
+        cursor.execute('''
+            SELECT best_ms FROM personal_bests
+            WHERE user_id = ? AND track_name = ? AND game_mode = ? AND items_setting = ?
+        ''', (interaction.user.id, track, mode, items))
+        own_row = cursor.fetchone()
+        conn.close()
+        
+        if not distribution.total:
+            await interaction.response.send_message(f"❌ No times recorded for {track} in {mode} ({items}) yet.", ephemeral=True)
+            return
+        
+        def approx(total_ms):
+            return f"~{format_time(*total_ms_to_time(total_ms))}"
+        
+        embed = discord.Embed(title=f"📊 {track} ({mode}, {items})", color=0x3498db)
+        embed.add_field(name="Players", value=str(distribution.total), inline=True)
+        if leader:
+            embed.add_field(name="Best PB", value=format_time(*total_ms_to_time(leader[1])), inline=True)
+        wr = get_world_record(track, mode, items)
+        if wr:
+            embed.add_field(name="World Record", value=format_time(*wr), inline=True)
+        embed.add_field(name="Median", value=approx(distribution.quantile(0.5)), inline=True)
+        embed.add_field(name="Middle 50%", value=f"{approx(distribution.quantile(0.25))} – {approx(distribution.quantile(0.75))}", inline=True)
+        embed.add_field(name="Top 10% Cutoff", value=approx(distribution.quantile(0.1)), inline=True)
+        if own_row:
+            embed.add_field(name="Your PB", value=f"{format_time(*total_ms_to_time(own_row[0]))}\n{format_standing(distribution, own_row[0])}", inline=False)
+        embed.set_footer(text=f"Times are grouped into {DISTRIBUTION_BUCKET_MS}ms buckets, so the spread is approximate.")
+        await interaction.response.send_message(embed=embed)
+    
+    @discord.app_commands.command(name="meta", description="See which bodies, tires and gliders people use for their PBs")
+    @discord.app_commands.autocomplete(
+        track=track_autocomplete,
+        mode=mode_autocomplete,
+        items=items_autocomplete
+    )
+    async def meta(self, interaction: discord.Interaction, track: str = None, mode: str = "150cc", items: str = "shrooms"):
+        # Validate track
+        if track and track not in MK8_TRACKS:
+            await interaction.response.send_message(f"❌ Invalid track name. Use `/list_tracks` to see all available tracks.", ephemeral=True)
+            return
+        
+        # Validate mode
+        if mode not in GAME_MODES:
+            await interaction.response.send_message(f"❌ Invalid game mode. Choose from: {', '.join(GAME_MODES)}", ephemeral=True)
+            return
+        
+        # Validate items
+        if items not in ["shrooms", "no_items"]:
+            await interaction.response.send_message("❌ Invalid items setting. Choose `shrooms` or `no_items`.", ephemeral=True)
+            return
+        
+        conn = sqlite3.connect('mario_kart_times.db')
+        cursor = conn.cursor()
+        if not vehicle_part_names:
+            load_vehicle_parts(cursor)
+        # Without a track, every track's rollup is summed into one for the whole category
+        cursor.execute(f'''
+            SELECT part_id, gap_bucket, SUM(player_count) FROM setup_meta
+            WHERE game_mode = ? AND items_setting = ? {"AND track_name = ?" if track else ""} AND player_count > 0
+            GROUP BY part_id, gap_bucket
+            ORDER BY part_id, gap_bucket
+        ''', (mode, items, track) if track else (mode, items))
+        bucket_rows = cursor.fetchall()
+        conn.close()
+        
+        if not bucket_rows:
+            await interaction.response.send_message(f"❌ No PBs with a recognized vehicle setup for {track or 'any track'} in {mode} ({items}) yet.", ephemeral=True)
+            return
+        
+        # part_id -> [usage count, [(gap_bucket, count), ...]]
+        part_stats = {}
+        for part_id, gap_bucket, count in bucket_rows:
+            stats = part_stats.setdefault(part_id, [0, []])
+            stats[0] += count
+            if gap_bucket >= 0:
+                stats[1].append((gap_bucket, count))
+        
+        def median_gap(gap_buckets):
+            half = sum(count for _, count in gap_buckets) / 2
+            seen = 0
+            for gap_bucket, count in gap_buckets:
+                seen += count
+                if seen >= half:
+                    return (gap_bucket + 0.5) / META_GAP_BUCKETS_PER_PCT
+            return None
+        
+        embed = discord.Embed(title=f"🔧 Meta: {track or 'All Tracks'} ({mode}, {items})", color=0xe67e22)
+        for part_type, _ in VEHICLE_PART_TYPES:
+            type_stats = [(part_id, stats) for part_id, stats in part_stats.items() if vehicle_part_names[part_id][0] == part_type]
+            if not type_stats:
+                continue
+            type_total = sum(stats[0] for _, stats in type_stats)
+            type_stats.sort(key=lambda entry: -entry[1][0])
+            lines = []
+            for part_id, (usage, gap_buckets) in type_stats[:5]:
+                line = f"**{vehicle_part_names[part_id][1]}** — {usage * 100 / type_total:.0f}% ({usage})"
+                gap = median_gap(gap_buckets)
+                if gap is not None:
+                    line += f" · median +{gap:.1f}% vs WR"
+                lines.append(line)
+            embed.add_field(name={"body": "Bodies", "tire": "Tires", "glider": "Gliders"}[part_type], value="\n".join(lines), inline=False)
+        embed.set_footer(text="Based on the setup noted on each player's PB run" + ("" if track else ", counted once per track") + ".")
+        await interaction.response.send_message(embed=embed)
+    
+    @discord.app_commands.command(name="combo_search", description="Find the best driver/vehicle combos for the stats you care about")
+    async def combo_search(
+        self,
+        interaction: discord.Interaction,
+        speed: int = 1,
+        acceleration: int = 1,
+        weight: int = 1,
+        handling: int = 1,
+        mini_turbo: int = 1
+    ):
+        weights = [speed, acceleration, weight, handling, mini_turbo]
+        
+        # Validate weights
+        if any(value < 0 or value > COMBO_MAX_WEIGHT for value in weights):
+            await interaction.response.send_message(f"❌ Weights must be between 0 and {COMBO_MAX_WEIGHT}.", ephemeral=True)
+            return
+        if not any(weights):
+            await interaction.response.send_message("❌ Give at least one stat a weight above 0.", ephemeral=True)
+            return
+        
+        stat_labels = [stat_name.replace("_", "-").title() for stat_name in STAT_NAMES]
+        embed = discord.Embed(title="🏎️ Best Combos", color=0xe74c3c)
+        embed.description = "Weights: " + " · ".join(
+            f"{label} ×{value}" for label, value in zip(stat_labels, weights)
+        )
+        
+        for rank, (score, stats, class_indexes) in enumerate(search_combos(weights), 1):
+            part_lines = []
+            for (part_label, part_classes), class_index in zip(COMBO_PART_TYPES, class_indexes):
+                names = part_classes[class_index][0]
+                part_lines.append(f"**{part_label}:** {truncate_text(', '.join(names), 80)}")
+            part_lines.append(" · ".join(f"{label} {value}" for label, value in zip(stat_labels, stats)))
+            embed.add_field(name=f"#{rank} (score {score})", value="\n".join(part_lines), inline=False)
+        
+        embed.set_footer(text=f"Searched {get_combo_frontier()[2]} Pareto-optimal stat combos. Parts listed together share the same stats.")
+        await interaction.response.send_message(embed=embed)
+    
+    @discord.app_commands.command(name="progress", description="Chart your PB and practice over time on a track")
+    @discord.app_commands.autocomplete(
+        track=track_autocomplete,
+        mode=mode_autocomplete,
+        items=items_autocomplete
+    )
+    async def progress(self, interaction: discord.Interaction, track: str, mode: str = "150cc", items: str = "shrooms"):
+        # Validate track
+        if track not in MK8_TRACKS:
+            await interaction.response.send_message(f"❌ Invalid track name. Use `/list_tracks` to see all available tracks.", ephemeral=True)
+            return
+        
+        # Validate mode
+        if mode not in GAME_MODES:
+            await interaction.response.send_message(f"❌ Invalid game mode. Choose from: {', '.join(GAME_MODES)}", ephemeral=True)
+            return
+        
+        # Validate items
+        if items not in ["shrooms", "no_items"]:
+            await interaction.response.send_message("❌ Invalid items setting. Choose `shrooms` or `no_items`.", ephemeral=True)
+            return
+        
+        await interaction.response.defer()
+        runs, pb_steps = await asyncio.to_thread(load_progress_series, interaction.user.id, track, mode, items)
+        if not runs:
+            await interaction.followup.send(f"❌ No times recorded for {track} in {mode} ({items}) yet.", ephemeral=True)
+            return
+        
+        first_day = datetime.datetime.fromtimestamp(runs[0][0])
+        active_days = len({datetime.datetime.fromtimestamp(timestamp).date() for timestamp, _ in runs})
+        improvement_seconds = (pb_steps[0][1] - pb_steps[-1][1]) / 1000
+        
+        embed = discord.Embed(title=f"📈 Progress: {track} ({mode}, {items})", color=0x7289da)
+        embed.add_field(name="Runs", value=str(len(runs)), inline=True)
+        embed.add_field(name="Active Days", value=f"{active_days} since {first_day.strftime('%Y-%m-%d')}", inline=True)
+        embed.add_field(name="PBs Set", value=str(len(pb_steps)), inline=True)
+        embed.add_field(name="First Time", value=format_time(*total_ms_to_time(pb_steps[0][1])), inline=True)
+        embed.add_field(name="Current PB", value=format_time(*total_ms_to_time(pb_steps[-1][1])), inline=True)
+        embed.add_field(name="Improvement", value=f"-{improvement_seconds:.3f}s", inline=True)
+        
+        rendering = load_rendering()
+        if rendering is None:
+            embed.set_footer(text="Charts aren't available on this bot (Pillow is not installed).")
+            await interaction.followup.send(embed=embed)
+            return
+        
+        title = f"{interaction.user.display_name} - {track} ({mode}, {items})"
+        png = await asyncio.to_thread(rendering.render_progress_chart, title, runs, pb_steps)
+        embed.set_image(url="attachment://progress.png")
+        if len(runs) > rendering.PROGRESS_MAX_POINTS:
+            embed.set_footer(text=f"Chart shows {rendering.PROGRESS_MAX_POINTS} of {len(runs)} runs, picked to keep the shape of your history.")
+        await interaction.followup.send(embed=embed, file=discord.File(io.BytesIO(png), filename="progress.png"))
+    
+    @discord.app_commands.command(name="search_runs", description="Search run notes and vehicle setups (e.g. \"ultra shortcut\")")
+    @discord.app_commands.autocomplete(scope=search_scope_autocomplete)
+    async def search_runs(self, interaction: discord.Interaction, query: str, scope: str = "mine"):
+        # Validate scope
+        if scope not in SEARCH_SCOPES:
+            await interaction.response.send_message(f"❌ Invalid scope. Choose from: {', '.join(SEARCH_SCOPES)}", ephemeral=True)
+            return
+        if scope == "server" and interaction.guild_id is None:
+            await interaction.response.send_message("❌ Server-wide search only works inside a server.", ephemeral=True)
+            return
+        
+        fts_query = build_search_query(query)
+        if not fts_query:
+            await interaction.response.send_message("❌ Enter at least one word to search for.", ephemeral=True)
+            return
+        
+        if scope == "server":
+            view = SearchRunsPaginator(interaction.user.id, query, fts_query, "guild_id", interaction.guild_id, "this server")
+        else:
+            view = SearchRunsPaginator(interaction.user.id, query, fts_query, "user_id", interaction.user.id, "your runs")
+        try:
+            await view.send(interaction, ephemeral=scope == "mine")
+        except sqlite3.OperationalError:
+            await interaction.response.send_message("❌ Run search isn't available on this bot.", ephemeral=True)
+
+async def setup(bot):
+    await bot.add_cog(Analytics(bot))
@@ -0,0 +1,213 @@
+import discord
+import datetime
+import sqlite3
+from discord.ext import commands
+from bot import truncate_text
+from froog_core import format_time
+
+class HallOfFame(commands.Cog):
+    """Server record holders and personal achievements"""
+    
+    def __init__(self, bot):
+        self.bot = bot
+    
+    @discord.app_commands.command(name="hall_of_fame", description="View the server's Hall of Fame and record holders")
+    async def hall_of_fame(self, interaction: discord.Interaction):
+        await interaction.response.defer()
+        
+        try:
+            conn = sqlite3.connect('mario_kart_times.db')
+            cursor = conn.cursor()
+            
+            embed = discord.Embed(
+                title="🏛️ Hall of Fame",
+                description=f"**{interaction.guild.name}** - Legends and Champions",
+                color=0xffd700
+            )
+            
+            # Current record holders (top 5 by days held)
+            cursor.execute('''
+                SELECT user_id, track_name, time_minutes, time_seconds, time_milliseconds, 
+                       CAST((julianday('now') - julianday(date_achieved)) AS INTEGER) as days_held,
+                       date_achieved
+                FROM record_holders 
+                WHERE guild_id = ? AND is_current = 1
+                ORDER BY days_held DESC
+                LIMIT 5
+            ''', (interaction.guild.id,))
+            
+            current_records = cursor.fetchall()
+            
+            if current_records:
+                record_lines = []
+                for user_id, track, mins, secs, ms, days_held, date_achieved in current_records:
+                    try:
+                        user = await self.bot.fetch_user(user_id)
+                        formatted_time = format_time(mins, secs, ms)
+                        track_display = truncate_text(track, 20)
+                        record_lines.append(f"**{user.display_name}** - {track_display}\n{formatted_time} • {days_held} days")
+                    except:
+                        record_lines.append(f"User {user_id} - {truncate_text(track, 20)}\n{format_time(mins, secs, ms)} • {days_held} days")
+                
+                embed.add_field(
+                    name="👑 Current Record Holders",
+                    value="\n\n".join(record_lines[:3]),  # Limit to prevent overflow
+                    inline=False
+                )
+            
+            # Longest-held records (all time)
+            cursor.execute('''
+                SELECT user_id, track_name, time_minutes, time_seconds, time_milliseconds, days_held
+                FROM record_holders 
+                WHERE guild_id = ? AND days_held IS NOT NULL
+                ORDER BY days_held DESC
+                LIMIT 3
+            ''', (interaction.guild.id,))
+            
+            longest_records = cursor.fetchall()
+            
+            if longest_records:
+                legend_lines = []
+                for user_id, track, mins, secs, ms, days_held in longest_records:
+                    try:
+                        user = await self.bot.fetch_user(user_id)
+                        formatted_time = format_time(mins, secs, ms)
+                        track_display = truncate_text(track, 20)
+                        legend_lines.append(f"**{user.display_name}** - {track_display}\n{formatted_time} • {days_held} days")
+                    except:
+                        legend_lines.append(f"User {user_id} - {truncate_text(track, 20)}\n{format_time(mins, secs, ms)} • {days_held} days")
+                
+                embed.add_field(
+                    name="📜 Legendary Records",
+                    value="\n\n".join(legend_lines),
+                    inline=False
+                )
+            
+            embed.set_footer(text="Use /my_achievements to see your personal milestones!")
+            conn.close()
+            
+            await interaction.followup.send(embed=embed)
+            
+        except Exception as e:
+            print(f"❌ Hall of Fame error: {e}")
+            await interaction.followup.send(f"❌ Error loading Hall of Fame: {str(e)[:200]}")
+    
+    @discord.app_commands.command(name="my_achievements", description="View your personal achievements and milestones")
+    async def my_achievements(self, interaction: discord.Interaction):
+        await interaction.response.defer()
+        
+        try:
+            conn = sqlite3.connect('mario_kart_times.db')
+            cursor = conn.cursor()
+            
+            embed = discord.Embed(
+                title="🏆 Your Achievements",
+                description=f"**{interaction.user.display_name}**'s Mario Kart Legacy",
+                color=0x9b59b6
+            )
+            
+            # Current records held
+            cursor.execute('''
+                SELECT track_name, time_minutes, time_seconds, time_milliseconds, 
+                       CAST((julianday('now') - julianday(date_achieved)) AS INTEGER) as days_held,
+                       date_achieved
+                FROM record_holders 
+                WHERE user_id = ? AND guild_id = ? AND is_current = 1
+                ORDER BY days_held DESC
+            ''', (interaction.user.id, interaction.guild.id))
+            
+            current_records = cursor.fetchall()
+            
+            if current_records:
+                record_lines = []
+                for track, mins, secs, ms, days_held, date_achieved in current_records[:5]:
+                    formatted_time = format_time(mins, secs, ms)
+                    track_display = truncate_text(track, 25)
+                    record_lines.append(f"**{track_display}** - {formatted_time} ({days_held} days)")
+                
+                embed.add_field(
+                    name="👑 Current Records",
+                    value="\n".join(record_lines),
+                    inline=False
+                )
+            
+            # Total records ever held
+            cursor.execute('''
+                SELECT COUNT(*), SUM(COALESCE(days_held, CAST((julianday('now') - julianday(date_achieved)) AS INTEGER)))
+                FROM record_holders 
+                WHERE user_id = ? AND guild_id = ?
+            ''', (interaction.user.id, interaction.guild.id))
+            
+            total_records, total_days = cursor.fetchone()
+            
+            # Personal milestones
+            cursor.execute('''
+                SELECT milestone_name, date_achieved
+                FROM user_milestones 
+                WHERE user_id = ? AND guild_id = ?
+                ORDER BY date_achieved DESC
+            ''', (interaction.user.id, interaction.guild.id))
+            
+            milestones = cursor.fetchall()
+            
+            if milestones:
+                milestone_lines = []
+                for milestone_name, date_achieved in milestones[:8]:
+                    date_str = date_achieved.split()[0] if date_achieved else "Unknown"
+                    milestone_lines.append(f"🎖️ {milestone_name} ({date_str})")
+                
+                embed.add_field(
+                    name="🏅 Milestones Achieved",
+                    value="\n".join(milestone_lines),
+                    inline=False
+                )
+            
+            # Stats summary
+            stats_text = f"**Records Held:** {total_records or 0} (Total: {total_days or 0} days)\n"
+            stats_text += f"**Current Records:** {len(current_records)}\n"
+            stats_text += f"**Milestones:** {len(milestones)}"
+            
+            embed.add_field(
+                name="📊 Legacy Summary",
+                value=stats_text,
+                inline=True
+            )
+            
+            # Calculate anniversary (days since first submission)
+            cursor.execute('''
+                SELECT MIN(date_recorded) 
+                FROM time_trials 
+                WHERE user_id = ?
+            ''', (interaction.user.id,))
+            
+            first_submission = cursor.fetchone()[0]
+            if first_submission:
+                first_date = datetime.datetime.fromisoformat(first_submission)
+                days_active = (datetime.datetime.now() - first_date).days
+                
+                if days_active >= 365:
+                    years = days_active // 365
+                    embed.add_field(
+                        name="🎂 Anniversary",
+                        value=f"**{years} year{'s' if years > 1 else ''}** of racing!\n({days_active} days total)",
+                        inline=True
+                    )
+                elif days_active >= 30:
+                    months = days_active // 30
+                    embed.add_field(
+                        name="📅 Active For",
+                        value=f"**{months} month{'s' if months > 1 else ''}**\n({days_active} days)",
+                        inline=True
+                    )
+            
+            embed.set_thumbnail(url=interaction.user.display_avatar.url)
+            conn.close()
+            
+            await interaction.followup.send(embed=embed)
+            
+        except Exception as e:
+            print(f"❌ Achievements error: {e}")
+            await interaction.followup.send(f"❌ Error loading achievements: {str(e)[:200]}")
+
+async def setup(bot):
+    await bot.add_cog(HallOfFame(bot))
@@ -0,0 +1,1146 @@
+import discord
+import sqlite3
+from discord.ext import commands
+from tracks_config import GAME_MODES, MK8_CUPS, MK8_TRACKS
+from world_records_itemless import WORLD_RECORDS_ITEMLESS
+from world_records_shrooms import WORLD_RECORDS_SHROOMS
+from bot import (
+    award_streak_progress, build_batch_summary_embed, cc_autocomplete, cup_autocomplete,
+    export_format_autocomplete, EXPORT_FORMATS, format_standing, format_tier, get_user_name,
+    IMPORT_MAX_BYTES, IMPORT_MAX_ROWS, items_autocomplete, join_field_lines,
+    LeaderboardPaginator, mode_autocomplete, output_autocomplete, OUTPUT_FORMATS,
+    parse_import_csv, ranking_autocomplete, RANKING_TYPES, RatingPaginator, RivalsPaginator,
+    send_record_pings, send_table_image, send_time_export, SessionModal, STANDARD_TIER_EMOJIS,
+    test_autocomplete, TotalTimePaginator, track_autocomplete, TrackLeaderboardPaginator,
+    truncate_text, ViewTimesPaginator, wr_comparison_table_rows, write_submission
+)
+from db_writer import WriterError
+from froog_core import (
+    compute_stats, format_lap, format_time, get_best_laps, get_leaderboard, get_run_laps,
+    get_time_distribution, get_world_record, overall_tier_points, parse_splits, parse_time,
+    RATING_PROVISIONAL_MATCHUPS, STANDARD_THRESHOLDS, standard_tier_points, STANDARD_TIERS,
+    STANDARD_TRACK_COUNTS, theoretical_best, time_to_total_ms, total_ms_to_time, TRACK_CUPS
+)
+
+class Records(commands.Cog):
+    """Recording, viewing and comparing time trial runs"""
+    
+    def __init__(self, bot):
+        self.bot = bot
+    
+    @discord.app_commands.command(name="add_time", description="Add a new time trial record")
+    @discord.app_commands.autocomplete(
+        track=track_autocomplete,
+        mode=mode_autocomplete,
+        items=items_autocomplete,
+        vehicle=test_autocomplete
+    )
+    async def add_time(
+        self,
+        interaction: discord.Interaction,
+        track: str,
+        time: str,
+        mode: str,
+        items: str,
+        vehicle: str | None = None,
+        notes: str | None = None,
+        splits: str | None = None
+    ):
+        # Validate track
+        if track not in MK8_TRACKS:
+            await interaction.response.send_message(f"❌ Invalid track name. Use `/list_tracks` to see all available tracks.", ephemeral=True)
+            return
+        
+        # Validate mode
+        if mode not in GAME_MODES:
+            await interaction.response.send_message(f"❌ Invalid game mode. Choose from: {', '.join(GAME_MODES)}", ephemeral=True)
+            return
+        
+        # Validate items setting
+        if items not in ["shrooms", "no_items"]:
+            await interaction.response.send_message("❌ Invalid items setting. Choose `shrooms` or `no_items`.", ephemeral=True)
+            return
+        
+        # Parse time
+        parsed_time = parse_time(time)
+        if not parsed_time:
+            await interaction.response.send_message("❌ Invalid time format. Use MM:SS.mmm (e.g., 1:23.456)", ephemeral=True)
+            return
+        
+        minutes, seconds, milliseconds = parsed_time
+        
+        # Parse lap splits
+        laps = None
+        if splits:
+            laps, error = parse_splits(splits, time_to_total_ms(minutes, seconds, milliseconds))
+            if error:
+                await interaction.response.send_message(f"❌ Invalid splits: {error}.", ephemeral=True)
+                return
+        
+        await interaction.response.defer()
+    
+        try:
+            result = await write_submission(
+                "submit_run", interaction.user.id, interaction.guild_id, track, mode, items,
+                minutes, seconds, milliseconds, vehicle, notes, laps
+            )
+        except ValueError as e:
+            await interaction.followup.send(f"❌ {e}")
+            return
+        except WriterError as e:
+            print(f"❌ Add time error for {interaction.user}: {e}")
+            await interaction.followup.send(f"⚠️ Couldn't confirm your time was saved. Check `/view_times` for {track} before adding it again.")
+            return
+        
+        formatted_time = format_time(minutes, seconds, milliseconds)
+        embed = discord.Embed(title="🏁 Time Trial Added!", color=0x00ff00)
+        embed.add_field(name="Track", value=track, inline=False)
+        embed.add_field(name="Time", value=formatted_time, inline=True)
+        embed.add_field(name="Mode", value=mode, inline=True)
+        embed.add_field(name="Items", value=items, inline=True)
+        if vehicle:
+            embed.add_field(name="Vehicle Setup", value=truncate_text(vehicle, 1000), inline=True)
+        if notes:
+            embed.add_field(name="Notes", value=truncate_text(notes, 1000), inline=False)
+        if laps:
+            lap_text = " · ".join(
+                f"L{lap_number} {format_lap(lap_ms)}{' ⭐' if lap_number in result['new_best_lap_numbers'] else ''}"
+                for lap_number, lap_ms in enumerate(laps, 1)
+            )
+            lap_text += f"\nSum of best laps: {format_time(*total_ms_to_time(sum(result['best_laps'])))}"
+            embed.add_field(name="⏱️ Splits", value=lap_text, inline=False)
+        
+        # Personal best check
+        new_total_ms = time_to_total_ms(minutes, seconds, milliseconds)
+        previous_best_ms = result["old_best_ms"]
+        if previous_best_ms is not None:
+            if new_total_ms < previous_best_ms:
+                improvement_seconds = (previous_best_ms - new_total_ms) / 1000
+                embed.add_field(name="🎉 New Personal Best!", value=f"Improved by {improvement_seconds:.3f} seconds!", inline=False)
+                embed.color = 0xffd700
+            else:
+                difference_seconds = (new_total_ms - previous_best_ms) / 1000
+                embed.add_field(name="Current PB", value=f"{format_time(*total_ms_to_time(previous_best_ms))} (+{difference_seconds:.3f}s)", inline=False)
+        else:
+            embed.add_field(name="🎉 First Time on This Track!", value=f"This is your first recorded time for this track/mode/items setting.", inline=False)
+            embed.color = 0xffd700
+        
+        # Standard tier check
+        old_tier_points, new_tier_points = result["tier_points"]
+        if new_tier_points > old_tier_points:
+            tier_text = f"{format_tier(new_tier_points)} standard on this track!"
+            old_overall, new_overall = result["overall_tier_points"]
+            if new_overall > old_overall:
+                tier_text += f"\nOverall tier is now **{format_tier(new_overall)}**!"
+            embed.add_field(name="⭐ New Tier Reached!", value=tier_text, inline=False)
+            embed.color = 0xffd700
+
+        # Add weekly trials information if applicable
+        if result["week_number"]:
+            previous_weekly_ms = result["previous_weekly_best_ms"]
+            if previous_weekly_ms is None:
+                weekly_best_info = "🎉 First Weekly Submission for this track!"
+            elif new_total_ms < previous_weekly_ms:
+                improvement_seconds = (previous_weekly_ms - new_total_ms) / 1000
+                weekly_best_info = f"🎉 New Weekly Best! Improved by {improvement_seconds:.3f}s"
+            else:
+                difference_seconds = (new_total_ms - previous_weekly_ms) / 1000
+                weekly_best_info = f"Weekly Best: {format_time(*total_ms_to_time(previous_weekly_ms))} (+{difference_seconds:.3f}s)"
+            
+            # Streak role rewards
+            if result["streak"]:
+                try:
+                    streak_info = await award_streak_progress(interaction, result["streak"])
+                    if streak_info:
+                        weekly_best_info += f"\n{streak_info}"
+                except Exception as e:
+                    print(f"❌ Error awarding streak role to {interaction.user}: {e}")
+            
+            embed.add_field(name="📅 Weekly Trials", value=weekly_best_info, inline=False)
+            if weekly_best_info.startswith("🎉 New Weekly Best!"):
+                embed.color = 0xffd700
+        
+        # Check for milestones
+        if result["milestones"]:
+            milestone_text = "\n".join([f"🎖️ {milestone}" for milestone in result["milestones"]])
+            embed.add_field(name="🏆 New Achievements Unlocked!", value=milestone_text, inline=False)
+            embed.color = 0xffd700
+        
+        await interaction.followup.send(embed=embed)
+        if result["beaten_user_id"]:
+            ping_message = f"🏁 <@{result['beaten_user_id']}> Your top time for {track} ({mode}, {items}) was just beaten!"
+            try:
+                await interaction.channel.send(ping_message)
+            except Exception:
+                await interaction.followup.send(ping_message, ephemeral=False)
+    
+    @discord.app_commands.command(name="view_times", description="View your times for a specific track and mode/items")
+    @discord.app_commands.autocomplete(
+        track=track_autocomplete,
+        mode=mode_autocomplete,
+        items=items_autocomplete
+    )
+    async def view_times(self, interaction: discord.Interaction, track: str, mode: str = None, items: str = None):
+        # Validate track
+        if track not in MK8_TRACKS:
+            await interaction.response.send_message(f"❌ Invalid track name. Use `/list_tracks` to see all available tracks.")
+            return
+        view = ViewTimesPaginator(interaction.user.id, track, mode, items)
+        view.load_page()
+        if not view.rows:
+            await interaction.response.send_message(f"❌ No times found for {track}" + (f" in {mode} mode ({items})" if mode and items else "."), ephemeral=True)
+            return
+        
+        await interaction.response.send_message(embed=await view.build_embed(), view=view)
+        view.message = await interaction.original_response()
+    
+    @discord.app_commands.command(name="personal_best", description="View your personal best for a specific track and mode/items")
+    @discord.app_commands.autocomplete(
+        track=track_autocomplete,
+        mode=mode_autocomplete,
+        items=items_autocomplete
+    )
+    async def personal_best(self, interaction: discord.Interaction, track: str, mode: str = "150cc", items: str = "shrooms"):
+        # Validate track
+        if track not in MK8_TRACKS:
+            await interaction.response.send_message(f"❌ Invalid track name. Use `/list_tracks` to see all available tracks.")
+            return
+        
+        # Validate mode
+        if mode not in GAME_MODES:
+            await interaction.response.send_message(f"❌ Invalid game mode. Choose from: {', '.join(GAME_MODES)}")
+            return
+        
+        # Validate items
+        if items not in ["shrooms", "no_items"]:
+            await interaction.response.send_message("❌ Invalid items setting. Choose `shrooms` or `no_items`.")
+            return
+        
+        conn = sqlite3.connect('mario_kart_times.db')
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            SELECT time_minutes, time_seconds, time_milliseconds, vehicle_setup, date_recorded, notes
+            FROM time_trials 
+            WHERE user_id = ? AND track_name = ? AND game_mode = ? AND items_setting = ?
+            ORDER BY (time_minutes * 60000 + time_seconds * 1000 + time_milliseconds) ASC
+            LIMIT 1
+        ''', (interaction.user.id, track, mode, items))
+        
+        result = cursor.fetchone()
+        
+        if not result:
+            conn.close()
+            await interaction.response.send_message(f"❌ No records found for {track} in {mode} mode ({items}).", ephemeral=True)
+            return
+        
+        mins, secs, ms, vehicle, date_recorded, notes = result
+        formatted_time = format_time(mins, secs, ms)
+        standing = format_standing(get_time_distribution(cursor, track, mode, items), time_to_total_ms(mins, secs, ms))
+        conn.close()
+        
+        embed = discord.Embed(title="🏆 Personal Best", color=0xffd700)
+        embed.add_field(name="Track", value=track, inline=False)
+        embed.add_field(name="Mode", value=mode, inline=True)
+        embed.add_field(name="Items", value=items, inline=True)  # NEW FIELD
+        embed.add_field(name="Time", value=formatted_time, inline=True)
+        
+        if vehicle:
+            embed.add_field(name="Vehicle Setup", value=truncate_text(vehicle, 1000), inline=True)
+        
+        embed.add_field(name="Date Recorded", value=date_recorded.split()[0], inline=True)
+        embed.add_field(name="Standing", value=standing, inline=False)
+        
+        if notes:
+            embed.add_field(name="Notes", value=truncate_text(notes, 1000), inline=False)
+        
+        await interaction.response.send_message(embed=embed)
+    
+    @discord.app_commands.command(name="delete_time", description="Delete one of your recorded times for a track/mode/items")
+    @discord.app_commands.autocomplete(
+        track=track_autocomplete,
+        mode=mode_autocomplete,
+        items=items_autocomplete
+    )
+    async def delete_time(
+        self,
+        interaction: discord.Interaction,
+        track: str,
+        mode: str = "150cc",
+        items: str = "shrooms"
+    ):
+        # Validate track
+        if track not in MK8_TRACKS:
+            await interaction.response.send_message(
+                f"❌ Invalid track name. Use `/list_tracks` to see all available tracks.",
+                ephemeral=True
+            )
+            return
+
+        # Validate mode
+        if mode not in GAME_MODES:
+            await interaction.response.send_message(
+                f"❌ Invalid game mode. Choose from: {', '.join(GAME_MODES)}",
+                ephemeral=True
+            )
+            return
+
+        # Validate items
+        if items not in ["shrooms", "no_items"]:
+            await interaction.response.send_message(
+                "❌ Invalid items setting. Choose `shrooms` or `no_items`.",
+                ephemeral=True
+            )
+            return
+
+        await interaction.response.defer()
+
+        # Delete the most recent record for this user/track/mode/items
+        try:
+            deleted = await write_submission("delete_latest_run", interaction.user.id, track, mode, items)
+        except WriterError as e:
+            print(f"❌ Delete time error for {interaction.user}: {e}")
+            await interaction.followup.send(
+                f"⚠️ Couldn't confirm your latest {track} time was deleted. Check `/view_times` before deleting again, or you may remove an older time."
+            )
+            return
+
+        if not deleted:
+            await interaction.followup.send(f"❌ No records found for {track} in {mode} mode ({items}).")
+            return
+
+        formatted_time = format_time(deleted["minutes"], deleted["seconds"], deleted["milliseconds"])
+
+        embed = discord.Embed(title="🗑️ Time Deleted", color=0xe74c3c)
+        embed.add_field(name="Track", value=track, inline=False)
+        embed.add_field(name="Mode", value=mode, inline=True)
+        embed.add_field(name="Items", value=items, inline=True)
+        embed.add_field(name="Time", value=formatted_time, inline=True)
+        embed.add_field(name="Date Recorded", value=deleted["date_recorded"].split()[0], inline=True)
+    
+        await interaction.followup.send(embed=embed)
+    
+    @discord.app_commands.command(name="clear_track", description="Clear all your times for a specific track")
+    @discord.app_commands.autocomplete(track=track_autocomplete)
+    async def clear_track(self, interaction: discord.Interaction, track: str):
+        if track not in MK8_TRACKS:
+            await interaction.response.send_message(f"❌ Invalid track name. Use `/list_tracks` to see all available tracks.", ephemeral=True)
+            return
+        
+        await interaction.response.defer()
+    
+        # Delete all records for this track
+        try:
+            count = await write_submission("clear_track_runs", interaction.user.id, track)
+        except WriterError as e:
+            print(f"❌ Clear track error for {interaction.user}: {e}")
+            await interaction.followup.send(f"⚠️ Couldn't confirm your {track} times were cleared. Check `/view_times` before trying again.")
+            return
+    
+        if count == 0:
+            await interaction.followup.send(f"❌ No records found for {track}.")
+            return
+        
+        embed = discord.Embed(title="🗑️ Track Records Cleared", color=0xff0000)
+        embed.add_field(name="Track", value=track, inline=False)
+        embed.add_field(name="Records Deleted", value=str(count), inline=True)
+        embed.add_field(name="⚠️ Warning", value="This action cannot be undone!", inline=False)
+    
+        await interaction.followup.send(embed=embed)
+    
+    @discord.app_commands.command(name="list_tracks", description="List all 96 Mario Kart 8 Deluxe tracks")
+    async def list_tracks(self, interaction: discord.Interaction):
+        # Create embed with all 24 cups (within Discord's 25 field limit)
+        embed = discord.Embed(title="🏁 All 96 Mario Kart 8 Deluxe Tracks", color=0x0099ff)
+        embed.description = "**Base Game (48) + Booster Course Pass DLC (48)**"
+        
+        for cup_name, tracks in MK8_CUPS:
+            track_list = "\n".join([f"• {track}" for track in tracks])
+            embed.add_field(name=cup_name, value=track_list, inline=True)
+        
+        embed.set_footer(text="Total: 96 tracks across 24 cups (12 Base Game + 12 DLC)")
+        
+        await interaction.response.send_message(embed=embed)
+    
+    @discord.app_commands.command(name="stats", description="View your time trial stats and comparisons.")
+    @discord.app_commands.autocomplete(
+        mode=mode_autocomplete,
+        items=items_autocomplete
+    )
+    async def stats(
+        self,
+        interaction: discord.Interaction,
+        mode: str = "150cc",
+        items: str = "shrooms",
+        compare_user: str = None
+    ):
+        # Validate mode
+        if mode not in GAME_MODES:
+            await interaction.response.send_message(f"❌ Invalid game mode. Choose from: {', '.join(GAME_MODES)}", ephemeral=True)
+            return
+        # Validate items
+        if items not in ["shrooms", "no_items"]:
+            await interaction.response.send_message("❌ Invalid items setting. Choose `shrooms` or `no_items`.", ephemeral=True)
+            return
+        # Head-to-head comparison
+        compare_id = None
+        if compare_user:
+            try:
+                compare_id = int(compare_user)
+            except ValueError:
+                pass
+        conn = sqlite3.connect('mario_kart_times.db')
+        cursor = conn.cursor()
+        stats = compute_stats(cursor, interaction.user.id, mode, items, compare_id)
+        conn.close()
+        total_submissions = stats["total_submissions"]
+        most_played = stats["most_played"]
+        recent_runs = stats["recent_runs"]
+        tracks_recorded = stats["tracks_recorded"]
+        completion_rate = f"{tracks_recorded}/{len(MK8_TRACKS)} ({(tracks_recorded/len(MK8_TRACKS))*100:.1f}%)"
+        avg_rank = stats["average_rank"]
+        avg_gap = stats["average_wr_gap_ms"] / 1000 if stats["average_wr_gap_ms"] is not None else None
+        head_to_head = None
+        if stats["head_to_head"]:
+            head_to_head = f"Wins: {stats['head_to_head'][0]}, Losses: {stats['head_to_head'][1]}"
+        elif compare_user:
+            head_to_head = "Invalid user ID for comparison."
+        embed = discord.Embed(title=f"📊 Time Trial Stats ({mode}, {items})", color=0x9b59b6)
+        embed.add_field(name="Total Run Submissions", value=str(total_submissions), inline=True)
+        if avg_rank:
+            embed.add_field(name="Average Rank (per map)", value=f"{avg_rank:.2f}", inline=True)
+        else:
+            embed.add_field(name="Average Rank (per map)", value="No times recorded", inline=True)
+        if avg_gap is not None:
+            embed.add_field(name="Average Distance from WR", value=f"{avg_gap:.3f} seconds", inline=True)
+        else:
+            embed.add_field(name="Average Distance from WR", value="N/A", inline=True)
+        embed.add_field(name="Track Completion Rate", value=completion_rate, inline=True)
+        if most_played:
+            embed.add_field(name="Most Played Track", value=f"{most_played[0]} ({most_played[1]} runs)", inline=True)
+        else:
+            embed.add_field(name="Most Played Track", value="N/A", inline=True)
+        if recent_runs:
+            # Ensure recent runs field doesn't exceed limit
+            recent_lines = []
+            for r in recent_runs:
+                line = f"{r[0]}: {format_time(r[1], r[2], r[3])} ({r[4].split()[0]})"
+                # Truncate track name if too long
+                if len(line) > 100:
+                    track_name = truncate_text(r[0], 30)
+                    line = f"{track_name}: {format_time(r[1], r[2], r[3])} ({r[4].split()[0]})"
+                recent_lines.append(line)
+            
+            recent_str = "\n".join(recent_lines)
+            # Ensure total field value is under 1024 characters
+            if len(recent_str) > 1000:
+                recent_str = recent_str[:997] + "..."
+            
+            embed.add_field(name="Recent Runs", value=recent_str, inline=False)
+        else:
+            embed.add_field(name="Recent Runs", value="N/A", inline=False)
+        if head_to_head:
+            embed.add_field(name="Head-to-Head vs User", value=head_to_head, inline=False)
+        await interaction.response.send_message(embed=embed)
+    
+    @discord.app_commands.command(name="compare_wr_itemless", description="Compare your shroomless times to world records and group by proximity")
+    @discord.app_commands.autocomplete(output=output_autocomplete)
+    async def compare_wr_itemless(self, interaction: discord.Interaction, output: str = "embed"):
+        items = "no_items"  # Shroomless/Itemless only
+        mode = "150cc"      # Default mode for WRs (adjust if needed)
+        
+        # Validate output
+        if output not in OUTPUT_FORMATS:
+            await interaction.response.send_message(f"❌ Invalid output. Choose from: {', '.join(OUTPUT_FORMATS)}", ephemeral=True)
+            return
+
+        conn = sqlite3.connect('mario_kart_times.db')
+        cursor = conn.cursor()
+
+        # Get user's personal best times for shroomless 150cc (only best time per track)
+        cursor.execute('''
+            SELECT track_name, time_minutes, time_seconds, time_milliseconds
+            FROM time_trials
+            WHERE user_id = ? AND game_mode = ? AND items_setting = ?
+            AND (time_minutes * 60000 + time_seconds * 1000 + time_milliseconds) IN (
+                SELECT MIN(time_minutes * 60000 + time_seconds * 1000 + time_milliseconds)
+                FROM time_trials t2
+                WHERE t2.user_id = time_trials.user_id 
+                AND t2.track_name = time_trials.track_name 
+                AND t2.game_mode = time_trials.game_mode 
+                AND t2.items_setting = time_trials.items_setting
+            )
+        ''', (interaction.user.id, mode, items))
+        user_times = cursor.fetchall()
+        conn.close()
+        
+        if output == "image":
+            await interaction.response.defer()
+            await send_table_image(
+                interaction,
+                f"{interaction.user.display_name}: Shroomless Times vs World Records",
+                ["Track", "Your PB", "WR", "Gap"],
+                wr_comparison_table_rows(user_times, WORLD_RECORDS_ITEMLESS),
+                "World records: Shroomless/Itemless only. Times shown are your PBs for each track."
+            )
+            return
+        
+        # Prepare grouping buckets
+        buckets = {
+            "Within 1s": [],
+            "Within 2s": [],
+            "Within 3s": [],
+            "Within 5s": [],
+            "Within 7s": [],
+            "7s+": []
+        }
+
+        for track_name, mins, secs, ms in user_times:
+            wr_time_str = WORLD_RECORDS_ITEMLESS.get(track_name)
+            if not wr_time_str:
+                continue
+            wr_parsed = parse_time(wr_time_str)
+            if not wr_parsed:
+                continue
+            user_ms = time_to_total_ms(mins, secs, ms)
+            wr_ms = time_to_total_ms(*wr_parsed)
+            diff = user_ms - wr_ms
+            diff_s = diff / 1000.0
+            formatted_user = format_time(mins, secs, ms)
+            formatted_wr = format_time(*wr_parsed)
+            entry = f"{track_name}: {formatted_user} (WR: {formatted_wr}, +{diff_s:.3f}s)"
+            if diff_s <= 1:
+                buckets["Within 1s"].append(entry)
+            elif diff_s <= 2:
+                buckets["Within 2s"].append(entry)
+            elif diff_s <= 3:
+                buckets["Within 3s"].append(entry)
+            elif diff_s <= 5:
+                buckets["Within 5s"].append(entry)
+            elif diff_s <= 7:
+                buckets["Within 7s"].append(entry)
+            else:
+                buckets["7s+"].append(entry)
+
+        embed = discord.Embed(title="⏱️ Your Shroomless Times vs World Records", color=0x1abc9c)
+        for group, entries in buckets.items():
+            if entries:
+                # Limit entries and ensure field value doesn't exceed 1024 characters
+                field_value = ""
+                shown_entries = 0
+                max_entries_per_field = 15  # Reasonable limit to prevent overflow
+                
+                for entry in entries[:max_entries_per_field]:
+                    new_line = entry + "\n"
+                    if len(field_value + new_line) > 1000:  # Leave buffer for potential "..." 
+                        break
+                    field_value += new_line
+                    shown_entries += 1
+                
+                # Remove trailing newline
+                field_value = field_value.rstrip("\n")
+                
+                # Add truncation indicator if needed
+                if shown_entries < len(entries):
+                    remaining = len(entries) - shown_entries
+                    field_value += f"\n... and {remaining} more"
+                
+                embed.add_field(name=f"{group} ({len(entries)})", value=field_value or "None", inline=False)
+            else:
+                embed.add_field(name=f"{group} (0)", value="None", inline=False)
+
+        embed.set_footer(text="World records: Shroomless/Itemless only. Times shown are your PBs for each track.")
+        await interaction.response.send_message(embed=embed)
+    
+    @discord.app_commands.command(name="compare_wr_shrooms", description="Compare your shrooms times to world records and group by proximity (150cc/200cc)")
+    @discord.app_commands.autocomplete(cc=cc_autocomplete, output=output_autocomplete)
+    async def compare_wr_shrooms(self, interaction: discord.Interaction, cc: str = "150cc", output: str = "embed"):
+        if cc not in WORLD_RECORDS_SHROOMS:
+            await interaction.response.send_message(f"❌ Invalid CC. Choose '150cc' or '200cc'", ephemeral=True)
+            return
+        if output not in OUTPUT_FORMATS:
+            await interaction.response.send_message(f"❌ Invalid output. Choose from: {', '.join(OUTPUT_FORMATS)}", ephemeral=True)
+            return
+        items = "shrooms"
+        mode = cc
+
+        conn = sqlite3.connect('mario_kart_times.db')
+        cursor = conn.cursor()
+
+        # Get user's personal best times for shrooms and selected cc (only best time per track)
+        cursor.execute('''
+            SELECT track_name, time_minutes, time_seconds, time_milliseconds
+            FROM time_trials
+            WHERE user_id = ? AND game_mode = ? AND items_setting = ?
+            AND (time_minutes * 60000 + time_seconds * 1000 + time_milliseconds) IN (
+                SELECT MIN(time_minutes * 60000 + time_seconds * 1000 + time_milliseconds)
+                FROM time_trials t2
+                WHERE t2.user_id = time_trials.user_id 
+                AND t2.track_name = time_trials.track_name 
+                AND t2.game_mode = time_trials.game_mode 
+                AND t2.items_setting = time_trials.items_setting
+            )
+        ''', (interaction.user.id, mode, items))
+        user_times = cursor.fetchall()
+        conn.close()
+        
+        if output == "image":
+            await interaction.response.defer()
+            await send_table_image(
+                interaction,
+                f"{interaction.user.display_name}: Shrooms Times vs World Records ({cc})",
+                ["Track", "Your PB", "WR", "Gap"],
+                wr_comparison_table_rows(user_times, WORLD_RECORDS_SHROOMS[cc]),
+                "World records: Shrooms only. Times shown are your PBs for each track."
+            )
+            return
+        
+        buckets = {
+            "Within 1s": [],
+            "Within 2s": [],
+            "Within 3s": [],
+            "Within 5s": [],
+            "Within 7s": [],
+            "7s+": []
+        }
+
+        wr_dict = WORLD_RECORDS_SHROOMS[cc]
+        for track_name, mins, secs, ms in user_times:
+            wr_time_str = wr_dict.get(track_name)
+            if not wr_time_str:
+                continue
+            wr_parsed = parse_time(wr_time_str)
+            if not wr_parsed:
+                continue
+            user_ms = time_to_total_ms(mins, secs, ms)
+            wr_ms = time_to_total_ms(*wr_parsed)
+            diff = user_ms - wr_ms
+            diff_s = diff / 1000.0
+            formatted_user = format_time(mins, secs, ms)
+            formatted_wr = format_time(*wr_parsed)
+            entry = f"{track_name}: {formatted_user} (WR: {formatted_wr}, +{diff_s:.3f}s)"
+            if diff_s <= 1:
+                buckets["Within 1s"].append(entry)
+            elif diff_s <= 2:
+                buckets["Within 2s"].append(entry)
+            elif diff_s <= 3:
+                buckets["Within 3s"].append(entry)
+            elif diff_s <= 5:
+                buckets["Within 5s"].append(entry)
+            elif diff_s <= 7:
+                buckets["Within 7s"].append(entry)
+            else:
+                buckets["7s+"].append(entry)
+
+        embed = discord.Embed(title=f"⏱️ Your Shrooms Times vs World Records ({cc})", color=0x3498db)
+        for group, entries in buckets.items():
+            if entries:
+                # Limit entries and ensure field value doesn't exceed 1024 characters
+                field_value = ""
+                shown_entries = 0
+                max_entries_per_field = 15  # Reasonable limit to prevent overflow
+                
+                for entry in entries[:max_entries_per_field]:
+                    new_line = entry + "\n"
+                    if len(field_value + new_line) > 1000:  # Leave buffer for potential "..." 
+                        break
+                    field_value += new_line
+                    shown_entries += 1
+                
+                # Remove trailing newline
+                field_value = field_value.rstrip("\n")
+                
+                # Add truncation indicator if needed
+                if shown_entries < len(entries):
+                    remaining = len(entries) - shown_entries
+                    field_value += f"\n... and {remaining} more"
+                
+                embed.add_field(name=f"{group} ({len(entries)})", value=field_value or "None", inline=False)
+            else:
+                embed.add_field(name=f"{group} (0)", value="None", inline=False)
+
+        embed.set_footer(text="World records: Shrooms only. Times shown are your PBs for each track.")
+        await interaction.response.send_message(embed=embed)
+    
+    @discord.app_commands.command(name="leaderboard", description="Show the top time for every track, mode, and items setting.")
+    @discord.app_commands.autocomplete(
+        mode=mode_autocomplete,
+        items=items_autocomplete,
+        output=output_autocomplete
+    )
+    async def leaderboard(self, interaction: discord.Interaction, mode: str, items: str, output: str = "embed"):
+        # Validate mode
+        if mode not in GAME_MODES:
+            await interaction.response.send_message(f"❌ Invalid game mode. Choose from: {', '.join(GAME_MODES)}", ephemeral=True)
+            return
+        
+        # Validate items
+        if items not in ["shrooms", "no_items"]:
+            await interaction.response.send_message("❌ Invalid items setting. Choose `shrooms` or `no_items`.", ephemeral=True)
+            return
+        
+        # Validate output
+        if output not in OUTPUT_FORMATS:
+            await interaction.response.send_message(f"❌ Invalid output. Choose from: {', '.join(OUTPUT_FORMATS)}", ephemeral=True)
+            return
+        
+        # Defer response since resolving user names might take a while
+        await interaction.response.defer()
+        
+        if output == "image":
+            conn = sqlite3.connect('mario_kart_times.db')
+            cursor = conn.cursor()
+            records = get_leaderboard(cursor, mode, items)
+            conn.close()
+        
+            rows = []
+            for cup_name, tracks in MK8_CUPS:
+                rows.append(cup_name)
+                for track in tracks:
+                    if records[track]:
+                        user_id, best_ms, vehicle = records[track]
+                        rows.append([track, await get_user_name(user_id, 40), format_time(*total_ms_to_time(best_ms)), vehicle or ""])
+                    else:
+                        rows.append([track, "No record", "", ""])
+            await send_table_image(interaction, f"Leaderboard ({mode}, {items})", ["Track", "Player", "Time", "Vehicle"], rows)
+            return
+        
+        try:
+            view = LeaderboardPaginator(interaction.user.id, mode, items)
+            await view.send(interaction)
+        
+        except Exception as e:
+            print(f"❌ Error in leaderboard command: {e}")
+            await interaction.followup.send(
+                f"❌ An error occurred while generating the leaderboard: {str(e)[:100]}", 
+                ephemeral=True
+            )
+    
+    @discord.app_commands.command(name="track_leaderboard", description="Show every player's best time on a track, page by page.")
+    @discord.app_commands.autocomplete(
+        track=track_autocomplete,
+        mode=mode_autocomplete,
+        items=items_autocomplete
+    )
+    async def track_leaderboard(self, interaction: discord.Interaction, track: str, mode: str = "150cc", items: str = "shrooms"):
+        # Validate track
+        if track not in MK8_TRACKS:
+            await interaction.response.send_message(f"❌ Invalid track name. Use `/list_tracks` to see all available tracks.", ephemeral=True)
+            return
+        
+        # Validate mode
+        if mode not in GAME_MODES:
+            await interaction.response.send_message(f"❌ Invalid game mode. Choose from: {', '.join(GAME_MODES)}", ephemeral=True)
+            return
+        
+        # Validate items
+        if items not in ["shrooms", "no_items"]:
+            await interaction.response.send_message("❌ Invalid items setting. Choose `shrooms` or `no_items`.", ephemeral=True)
+            return
+        
+        await interaction.response.defer()
+        view = TrackLeaderboardPaginator(interaction.user.id, track, mode, items)
+        await view.send(interaction)
+    
+    @discord.app_commands.command(name="import_times", description="Import many times at once from a CSV file")
+    @discord.app_commands.autocomplete(
+        mode=mode_autocomplete,
+        items=items_autocomplete
+    )
+    @discord.app_commands.describe(
+        file="CSV with a header row: track, time and optionally mode, items, vehicle, notes, date",
+        mode="Mode for rows that don't have a mode column",
+        items="Items setting for rows that don't have an items column"
+    )
+    async def import_times(self, interaction: discord.Interaction, file: discord.Attachment, mode: str = "150cc", items: str = "shrooms"):
+        # Validate defaults
+        if mode not in GAME_MODES:
+            await interaction.response.send_message(f"❌ Invalid game mode. Choose from: {', '.join(GAME_MODES)}", ephemeral=True)
+            return
+        if items not in ["shrooms", "no_items"]:
+            await interaction.response.send_message("❌ Invalid items setting. Choose `shrooms` or `no_items`.", ephemeral=True)
+            return
+        
+        if file.size > IMPORT_MAX_BYTES:
+            await interaction.response.send_message(f"❌ File is too large. Imports are limited to {IMPORT_MAX_BYTES // 1024} KB.", ephemeral=True)
+            return
+        
+        try:
+            text = (await file.read()).decode("utf-8-sig")
+        except UnicodeDecodeError:
+            await interaction.response.send_message("❌ Couldn't read the file. Please upload a UTF-8 encoded CSV.", ephemeral=True)
+            return
+        
+        # Validate every row before touching the database - the import is all or nothing
+        runs, errors = parse_import_csv(text, mode, items)
+        if errors:
+            await interaction.response.send_message(
+                f"❌ Found {len(errors)} invalid row{'s' if len(errors) != 1 else ''}. Nothing was imported.\n" + join_field_lines(errors, 1800),
+                ephemeral=True
+            )
+            return
+        if not runs:
+            await interaction.response.send_message("❌ The CSV has no rows to import.", ephemeral=True)
+            return
+        if len(runs) > IMPORT_MAX_ROWS:
+            await interaction.response.send_message(f"❌ Too many rows ({len(runs)}). Imports are limited to {IMPORT_MAX_ROWS} rows at a time.", ephemeral=True)
+            return
+        
+        await interaction.response.defer()
+        
+        try:
+            # Milestones are checked once for the whole batch; imported runs skip weekly trials
+            submission = await write_submission("submit_runs", interaction.user.id, interaction.guild_id, runs, False)
+        except WriterError as e:
+            print(f"❌ Import error for {interaction.user}: {e}")
+            await interaction.followup.send("⚠️ Couldn't confirm the import was saved. Check `/view_times` before importing again.")
+            return
+        except Exception as e:
+            print(f"❌ Import error for {interaction.user}: {e}")
+            await interaction.followup.send(f"❌ Import failed, nothing was saved: {str(e)[:200]}")
+            return
+        
+        embed = build_batch_summary_embed("📥 Times Imported!", len(runs), submission["results"], submission["milestones"])
+        embed.set_footer(text="Imported runs don't count toward weekly trials.")
+        await interaction.followup.send(embed=embed)
+        await send_record_pings(interaction, submission["results"])
+    
+    @discord.app_commands.command(name="add_session", description="Add times for several tracks from one practice session at once")
+    @discord.app_commands.autocomplete(
+        mode=mode_autocomplete,
+        items=items_autocomplete
+    )
+    async def add_session(self, interaction: discord.Interaction, mode: str = "150cc", items: str = "shrooms"):
+        # Validate mode
+        if mode not in GAME_MODES:
+            await interaction.response.send_message(f"❌ Invalid game mode. Choose from: {', '.join(GAME_MODES)}", ephemeral=True)
+            return
+        
+        # Validate items setting
+        if items not in ["shrooms", "no_items"]:
+            await interaction.response.send_message("❌ Invalid items setting. Choose `shrooms` or `no_items`.", ephemeral=True)
+            return
+        
+        await interaction.response.send_modal(SessionModal(mode, items))
+    
+    @discord.app_commands.command(name="total_time_leaderboard", description="Rank players by the sum of their PBs (or average rank) across all tracks or a cup")
+    @discord.app_commands.autocomplete(
+        mode=mode_autocomplete,
+        items=items_autocomplete,
+        ranking=ranking_autocomplete,
+        cup=cup_autocomplete
+    )
+    @discord.app_commands.describe(
+        ranking="total_time (sum of PBs) or average_rank (mean per-track rank)",
+        cup="Only rank this cup's 4 tracks (total_time only)"
+    )
+    async def total_time_leaderboard(
+        self,
+        interaction: discord.Interaction,
+        mode: str = "150cc",
+        items: str = "shrooms",
+        ranking: str = "total_time",
+        cup: str = None
+    ):
+        # Validate mode
+        if mode not in GAME_MODES:
+            await interaction.response.send_message(f"❌ Invalid game mode. Choose from: {', '.join(GAME_MODES)}", ephemeral=True)
+            return
+        
+        # Validate items
+        if items not in ["shrooms", "no_items"]:
+            await interaction.response.send_message("❌ Invalid items setting. Choose `shrooms` or `no_items`.", ephemeral=True)
+            return
+        
+        if ranking not in RANKING_TYPES:
+            await interaction.response.send_message(f"❌ Invalid ranking. Choose from: {', '.join(RANKING_TYPES)}", ephemeral=True)
+            return
+        
+        if cup and cup not in TRACK_CUPS.values():
+            await interaction.response.send_message("❌ Invalid cup name. Use `/list_tracks` to see all cups.", ephemeral=True)
+            return
+        if cup and ranking == "average_rank":
+            await interaction.response.send_message("❌ Average rank ladders are only available across all tracks.", ephemeral=True)
+            return
+        
+        await interaction.response.defer()
+        view = TotalTimePaginator(interaction.user.id, mode, items, ranking, cup)
+        await view.send(interaction)
+    
+    @discord.app_commands.command(name="rating", description="View your skill rating, computed from your PBs against everyone else's")
+    @discord.app_commands.autocomplete(
+        mode=mode_autocomplete,
+        items=items_autocomplete
+    )
+    async def rating(self, interaction: discord.Interaction, mode: str = "150cc", items: str = "shrooms"):
+        # Validate mode
+        if mode not in GAME_MODES:
+            await interaction.response.send_message(f"❌ Invalid game mode. Choose from: {', '.join(GAME_MODES)}", ephemeral=True)
+            return
+        
+        # Validate items
+        if items not in ["shrooms", "no_items"]:
+            await interaction.response.send_message("❌ Invalid items setting. Choose `shrooms` or `no_items`.", ephemeral=True)
+            return
+        
+        conn = sqlite3.connect('mario_kart_times.db')
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT rating, matchups FROM player_ratings WHERE user_id = ? AND game_mode = ? AND items_setting = ?
+        ''', (interaction.user.id, mode, items))
+        rating_row = cursor.fetchone()
+        
+        if not rating_row:
+            conn.close()
+            await interaction.response.send_message(f"❌ You don't have a rating in {mode} ({items}) yet. Add some times with `/add_time`!", ephemeral=True)
+            return
+        
+        player_rating, matchups = rating_row
+        # Rank is the number of players above you on the rating index
+        cursor.execute('''
+            SELECT COUNT(*), (SELECT COUNT(*) FROM player_ratings WHERE game_mode = ? AND items_setting = ?)
+            FROM player_ratings WHERE game_mode = ? AND items_setting = ? AND rating > ?
+        ''', (mode, items, mode, items, player_rating))
+        players_above, total_players = cursor.fetchone()
+        conn.close()
+        
+        embed = discord.Embed(title=f"📈 Skill Rating ({mode}, {items})", color=0x9b59b6)
+        embed.add_field(name="Rating", value=f"**{player_rating:.0f}**", inline=True)
+        embed.add_field(name="Rank", value=f"#{players_above + 1} of {total_players}", inline=True)
+        embed.add_field(name="Head-to-Heads", value=str(matchups), inline=True)
+        if matchups < RATING_PROVISIONAL_MATCHUPS:
+            embed.add_field(name="⚠️ Provisional", value=f"Ratings settle after {RATING_PROVISIONAL_MATCHUPS} head-to-heads against other players' PBs.", inline=False)
+        embed.set_footer(text="Each track counts your PB against every other player's PB; closer gaps count for less.")
+        await interaction.response.send_message(embed=embed)
+    
+    @discord.app_commands.command(name="rating_leaderboard", description="View the skill rating leaderboard")
+    @discord.app_commands.autocomplete(
+        mode=mode_autocomplete,
+        items=items_autocomplete
+    )
+    async def rating_leaderboard(self, interaction: discord.Interaction, mode: str = "150cc", items: str = "shrooms"):
+        # Validate mode
+        if mode not in GAME_MODES:
+            await interaction.response.send_message(f"❌ Invalid game mode. Choose from: {', '.join(GAME_MODES)}", ephemeral=True)
+            return
+        
+        # Validate items
+        if items not in ["shrooms", "no_items"]:
+            await interaction.response.send_message("❌ Invalid items setting. Choose `shrooms` or `no_items`.", ephemeral=True)
+            return
+        
+        await interaction.response.defer()
+        view = RatingPaginator(interaction.user.id, mode, items)
+        await view.send(interaction)
+    
+    @discord.app_commands.command(name="standards", description="View time standard tiers for a track, or your tier counts overall")
+    @discord.app_commands.autocomplete(
+        track=track_autocomplete,
+        mode=mode_autocomplete,
+        items=items_autocomplete
+    )
+    async def standards(self, interaction: discord.Interaction, track: str = None, mode: str = "150cc", items: str = "shrooms"):
+        # Validate track
+        if track and track not in MK8_TRACKS:
+            await interaction.response.send_message(f"❌ Invalid track name. Use `/list_tracks` to see all available tracks.", ephemeral=True)
+            return
+        
+        # Validate mode
+        if mode not in GAME_MODES:
+            await interaction.response.send_message(f"❌ Invalid game mode. Choose from: {', '.join(GAME_MODES)}", ephemeral=True)
+            return
+        
+        # Validate items
+        if items not in ["shrooms", "no_items"]:
+            await interaction.response.send_message("❌ Invalid items setting. Choose `shrooms` or `no_items`.", ephemeral=True)
+            return
+        
+        track_count = STANDARD_TRACK_COUNTS.get((mode, items))
+        if not track_count or (track and (track, mode, items) not in STANDARD_THRESHOLDS):
+            await interaction.response.send_message(f"❌ There are no world records on file for {track or 'any track'} in {mode} ({items}), so there are no standards.", ephemeral=True)
+            return
+        
+        conn = sqlite3.connect('mario_kart_times.db')
+        cursor = conn.cursor()
+        
+        if track:
+            cursor.execute('''
+                SELECT best_ms FROM personal_bests
+                WHERE user_id = ? AND track_name = ? AND game_mode = ? AND items_setting = ?
+            ''', (interaction.user.id, track, mode, items))
+            own_row = cursor.fetchone()
+            cursor.execute('''
+                SELECT tier_points, COUNT(*) FROM user_track_tiers
+                WHERE track_name = ? AND game_mode = ? AND items_setting = ?
+                GROUP BY tier_points
+            ''', (track, mode, items))
+            player_counts = dict(cursor.fetchall())
+            conn.close()
+        
+            tier_lines = []
+            for index, threshold in enumerate(STANDARD_THRESHOLDS[(track, mode, items)]):
+                name, ratio = STANDARD_TIERS[index]
+                tier_points = len(STANDARD_TIERS) - index
+                tier_lines.append(
+                    f"{STANDARD_TIER_EMOJIS[name]} **{name}**: {format_time(*total_ms_to_time(threshold))} "
+                    f"(WR +{(ratio - 1) * 100:.0f}%) — {player_counts.get(tier_points, 0)} player(s)"
+                )
+        
+            embed = discord.Embed(title=f"⭐ Standards: {track} ({mode}, {items})", color=0xf1c40f)
+            embed.add_field(name="World Record", value=format_time(*get_world_record(track, mode, items)), inline=False)
+            embed.add_field(name="Tiers", value="\n".join(tier_lines), inline=False)
+            if own_row:
+                own_points = standard_tier_points(track, mode, items, own_row[0])
+                embed.add_field(name="Your PB", value=f"{format_time(*total_ms_to_time(own_row[0]))} — {format_tier(own_points)}", inline=False)
+            await interaction.response.send_message(embed=embed)
+            return
+        
+        cursor.execute('''
+            SELECT tier_points, COUNT(*) FROM user_track_tiers
+            WHERE user_id = ? AND game_mode = ? AND items_setting = ?
+            GROUP BY tier_points
+        ''', (interaction.user.id, mode, items))
+        own_counts = dict(cursor.fetchall())
+        cursor.execute('''
+            SELECT tier_points FROM user_standards WHERE user_id = ? AND game_mode = ? AND items_setting = ?
+        ''', (interaction.user.id, mode, items))
+        standards_row = cursor.fetchone()
+        # Players per overall tier across everyone with tier points
+        cursor.execute('''
+            SELECT tier_points / ?, COUNT(*) FROM user_standards
+            WHERE game_mode = ? AND items_setting = ? AND tier_points > 0
+            GROUP BY tier_points / ?
+        ''', (track_count, mode, items, track_count))
+        community_counts = dict(cursor.fetchall())
+        conn.close()
+        
+        total_tier_points = standards_row[0] if standards_row else 0
+        overall = overall_tier_points(mode, items, total_tier_points)
+        
+        embed = discord.Embed(title=f"⭐ Your Standards ({mode}, {items})", color=0xf1c40f)
+        embed.add_field(name="Overall Tier", value=format_tier(overall), inline=True)
+        embed.add_field(name="Tier Points", value=f"{total_tier_points} / {track_count * len(STANDARD_TIERS)}", inline=True)
+        if overall < len(STANDARD_TIERS):
+            points_needed = (overall + 1) * track_count - total_tier_points
+            embed.add_field(name="Next Overall Tier", value=f"{format_tier(overall + 1)} in {points_needed} more point(s)", inline=True)
+        
+        own_lines = []
+        community_lines = []
+        for index, (name, _) in enumerate(STANDARD_TIERS):
+            tier_points = len(STANDARD_TIERS) - index
+            own_lines.append(f"{STANDARD_TIER_EMOJIS[name]} {name}: {own_counts.get(tier_points, 0)} track(s)")
+            community_lines.append(f"{STANDARD_TIER_EMOJIS[name]} {name}: {community_counts.get(tier_points, 0)} player(s)")
+        embed.add_field(name="Your Tracks", value="\n".join(own_lines), inline=True)
+        embed.add_field(name="Overall Tiers on the Bot", value="\n".join(community_lines), inline=True)
+        embed.set_footer(text=f"Tiers are set relative to the world record. Elite is worth 4 points down to 1 for Bronze; your overall tier is your average over all {track_count} tracks.")
+        await interaction.response.send_message(embed=embed)
+    
+    @discord.app_commands.command(name="splits", description="View your lap splits, best laps and theoretical best on a track")
+    @discord.app_commands.autocomplete(
+        track=track_autocomplete,
+        mode=mode_autocomplete,
+        items=items_autocomplete
+    )
+    async def splits(self, interaction: discord.Interaction, track: str, mode: str = "150cc", items: str = "shrooms"):
+        # Validate track
+        if track not in MK8_TRACKS:
+            await interaction.response.send_message(f"❌ Invalid track name. Use `/list_tracks` to see all available tracks.", ephemeral=True)
+            return
+        
+        # Validate mode
+        if mode not in GAME_MODES:
+            await interaction.response.send_message(f"❌ Invalid game mode. Choose from: {', '.join(GAME_MODES)}", ephemeral=True)
+            return
+        
+        # Validate items
+        if items not in ["shrooms", "no_items"]:
+            await interaction.response.send_message("❌ Invalid items setting. Choose `shrooms` or `no_items`.", ephemeral=True)
+            return
+        
+        conn = sqlite3.connect('mario_kart_times.db')
+        cursor = conn.cursor()
+        best_laps = get_best_laps(cursor, interaction.user.id, track, mode, items)
+        cursor.execute('''
+            SELECT best_ms, run_id FROM personal_bests
+            WHERE user_id = ? AND track_name = ? AND game_mode = ? AND items_setting = ?
+        ''', (interaction.user.id, track, mode, items))
+        own_pb = cursor.fetchone()
+        own_pb_laps = get_run_laps(cursor, own_pb[1]) if own_pb else []
+        cursor.execute('''
+            SELECT user_id, best_ms, run_id FROM personal_bests
+            WHERE game_mode = ? AND items_setting = ? AND track_name = ?
+            ORDER BY best_ms ASC, user_id ASC
+            LIMIT 1
+        ''', (mode, items, track))
+        leader = cursor.fetchone()
+        leader_laps = get_run_laps(cursor, leader[2]) if leader else []
+        conn.close()
+        
+        if not best_laps:
+            await interaction.response.send_message(
+                f"❌ You haven't recorded splits for {track} in {mode} ({items}) yet. Add them with the `splits` option of `/add_time`.",
+                ephemeral=True
+            )
+            return
+        
+        embed = discord.Embed(title=f"⏱️ Splits: {track} ({mode}, {items})", color=0x1abc9c)
+        embed.add_field(name="Best Laps", value=" · ".join(f"L{lap_number} {format_lap(lap_ms)}" for lap_number, lap_ms in enumerate(best_laps, 1)), inline=False)
+        embed.add_field(name="Sum of Best", value=format_time(*total_ms_to_time(sum(best_laps))), inline=True)
+        embed.add_field(name="Theoretical Best", value=format_time(*total_ms_to_time(theoretical_best(best_laps))), inline=True)
+        if own_pb:
+            embed.add_field(name="PB", value=format_time(*total_ms_to_time(own_pb[0])), inline=True)
+            possible_save = own_pb[0] - sum(best_laps)
+            if possible_save > 0:
+                embed.add_field(name="Possible Time Save", value=f"{possible_save / 1000:.3f}s from your best laps", inline=True)
+        
+        if own_pb_laps:
+            embed.add_field(name="PB Splits", value=" · ".join(f"L{lap_number} {format_lap(lap_ms)}" for lap_number, lap_ms in enumerate(own_pb_laps, 1)), inline=False)
+        
+        # Lap-by-lap against the track leader's PB run
+        if leader and leader[0] != interaction.user.id:
+            leader_name = await get_user_name(leader[0])
+            if leader_laps and own_pb_laps and len(leader_laps) == len(own_pb_laps):
+                comparison_lines = [
+                    f"L{lap_number}: {format_lap(own_lap)} vs {format_lap(leader_lap)} ({(own_lap - leader_lap) / 1000:+.3f}s)"
+                    for lap_number, (own_lap, leader_lap) in enumerate(zip(own_pb_laps, leader_laps), 1)
+                ]
+                embed.add_field(name=f"vs {leader_name}'s PB", value="\n".join(comparison_lines), inline=False)
+            else:
+                embed.add_field(name=f"vs {leader_name}'s PB", value="No lap-by-lap comparison (one of the PB runs has no splits).", inline=False)
+        elif leader:
+            embed.add_field(name="👑 Top Time", value="You hold the top time on this track.", inline=False)
+        
+        embed.set_footer(text="Theoretical best = best first lap + best later lap for each remaining lap.")
+        await interaction.response.send_message(embed=embed)
+    
+    @discord.app_commands.command(name="rivals", description="See who is just ahead of and behind you on each track and overall")
+    @discord.app_commands.autocomplete(
+        mode=mode_autocomplete,
+        items=items_autocomplete
+    )
+    async def rivals(self, interaction: discord.Interaction, mode: str = "150cc", items: str = "shrooms"):
+        # Validate mode
+        if mode not in GAME_MODES:
+            await interaction.response.send_message(f"❌ Invalid game mode. Choose from: {', '.join(GAME_MODES)}", ephemeral=True)
+            return
+        
+        # Validate items
+        if items not in ["shrooms", "no_items"]:
+            await interaction.response.send_message("❌ Invalid items setting. Choose `shrooms` or `no_items`.", ephemeral=True)
+            return
+        
+        view = RivalsPaginator(interaction.user.id, mode, items)
+        await view.send(interaction)
+    
+    @discord.app_commands.command(name="export_times", description="Download all your time trial data as a compressed CSV or NDJSON file")
+    @discord.app_commands.autocomplete(format=export_format_autocomplete)
+    @discord.app_commands.describe(format="csv (zip with one file per table) or ndjson (gzipped JSON lines)")
+    async def export_times(self, interaction: discord.Interaction, format: str = "csv"):
+        if format not in EXPORT_FORMATS:
+            await interaction.response.send_message(f"❌ Invalid format. Choose from: {', '.join(EXPORT_FORMATS)}", ephemeral=True)
+            return
+        
+        await send_time_export(interaction, "user_id", interaction.user.id, format, f"froog_export_{interaction.user.id}")
+
+async def setup(bot):
+    await bot.add_cog(Records(bot))
@@ -0,0 +1,184 @@
+import discord
+import sqlite3
+from discord.ext import commands
+from froog_core import check_weekly_completion, get_active_weekly_trial, STREAK_ROLES
+
+class Streaks(commands.Cog):
+    """Weekly trials participation streaks and streak roles"""
+    
+    def __init__(self, bot):
+        self.bot = bot
+    
+    @discord.app_commands.command(name="my_streak", description="View your weekly trials streak information")
+    async def my_streak(self, interaction: discord.Interaction):
+        conn = sqlite3.connect('mario_kart_times.db')
+        cursor = conn.cursor()
+        
+        # Get user's streak data
+        cursor.execute('''
+            SELECT current_streak, best_streak, total_weeks_participated, last_participation_week
+            FROM weekly_streaks 
+            WHERE user_id = ? AND guild_id = ?
+        ''', (interaction.user.id, interaction.guild.id))
+        
+        streak_data = cursor.fetchone()
+        
+        # Get this server's current week for context
+        current_trial = get_active_weekly_trial(cursor, interaction.guild.id)
+        
+        if not streak_data:
+            embed = discord.Embed(
+                title="🔥 Your Trial Streak",
+                description="You haven't participated in weekly trials yet!",
+                color=0x95a5a6
+            )
+            embed.add_field(name="Get Started", value="Complete every track in a weekly trial to start your streak!", inline=False)
+        else:
+            current_streak, best_streak, total_weeks, last_week = streak_data
+            
+            # Check if they've participated this week
+            completed_this_week, submitted_tracks = (
+                check_weekly_completion(cursor, interaction.user.id, current_trial) if current_trial else (False, [])
+            )
+            track_count = len(current_trial["tracks"]) if current_trial else 0
+            
+            embed = discord.Embed(
+                title="🔥 Your Trial Streak",
+                color=0xe74c3c if current_streak >= 8 else 0xf39c12 if current_streak >= 4 else 0x2ecc71
+            )
+            
+            embed.add_field(name="Current Streak", value=f"🔥 **{current_streak}** weeks", inline=True)
+            embed.add_field(name="Best Streak", value=f"🏆 **{best_streak}** weeks", inline=True)
+            embed.add_field(name="Total Participation", value=f"📊 **{total_weeks}** weeks", inline=True)
+            
+            # Current week status
+            if completed_this_week:
+                embed.add_field(name="This Week", value=f"✅ **Completed all {track_count} tracks!**", inline=False)
+            else:
+                if submitted_tracks:
+                    embed.add_field(name="This Week", value=f"🔄 **In Progress** ({len(submitted_tracks)}/{track_count} tracks)", inline=False)
+                else:
+                    embed.add_field(name="This Week", value="❌ **Not started**", inline=False)
+            
+            # Show next role milestone
+            next_milestone = None
+            for min_streak, role_name in STREAK_ROLES.items():
+                if current_streak < min_streak:
+                    next_milestone = (min_streak, role_name)
+                    break
+            
+            if next_milestone:
+                weeks_needed = next_milestone[0] - current_streak
+                embed.add_field(
+                    name="Next Milestone", 
+                    value=f"🎯 **{next_milestone[1]}** role\n({weeks_needed} more weeks needed)",
+                    inline=False
+                )
+            else:
+                embed.add_field(name="Achievement", value="🏆 **Trial Champion** - Maximum rank achieved!", inline=False)
+        
+        conn.close()
+        await interaction.response.send_message(embed=embed)
+    
+    @discord.app_commands.command(name="streak_leaderboard", description="View the top trial streaks in this server")
+    async def streak_leaderboard(self, interaction: discord.Interaction):
+        conn = sqlite3.connect('mario_kart_times.db')
+        cursor = conn.cursor()
+        
+        # Get top current streaks
+        cursor.execute('''
+            SELECT user_id, current_streak, best_streak, total_weeks_participated
+            FROM weekly_streaks 
+            WHERE guild_id = ? 
+            ORDER BY current_streak DESC, best_streak DESC
+            LIMIT 10
+        ''', (interaction.guild.id,))
+        
+        streak_data = cursor.fetchall()
+        conn.close()
+        
+        if not streak_data:
+            embed = discord.Embed(
+                title="🏆 Trial Streak Leaderboard",
+                description="No one has participated in weekly trials yet!",
+                color=0x95a5a6
+            )
+        else:
+            embed = discord.Embed(
+                title="🏆 Trial Streak Leaderboard",
+                description="Top current streaks in this server",
+                color=0xffd700
+            )
+            
+            leaderboard_text = ""
+            for i, (user_id, current_streak, best_streak, total_weeks) in enumerate(streak_data, 1):
+                try:
+                    user = await self.bot.fetch_user(user_id)
+                    username = user.display_name
+                except:
+                    username = f"User {user_id}"
+                
+                medal = ["🥇", "🥈", "🥉"][i-1] if i <= 3 else f"{i}."
+                
+                # Add streak role emoji if they have one
+                role_emoji = ""
+                for min_streak, role_name in reversed(STREAK_ROLES.items()):
+                    if current_streak >= min_streak:
+                        role_emoji = {
+                            "Trial Cadet": "🟢",
+                            "Trial Veteran": "🔵", 
+                            "Trial Master": "🟣",
+                            "Trial Legend": "🔴",
+                            "Trial Champion": "🏆",
+                            "Trial Grandmaster": "💎"
+                        }.get(role_name, "")
+                        break
+                
+                leaderboard_text += f"{medal} {role_emoji} **{username}**: {current_streak} weeks (Best: {best_streak})\n"
+            
+            embed.add_field(name="Current Streaks", value=leaderboard_text or "None", inline=False)
+            embed.set_footer(text="Complete every weekly track to build your streak!")
+        
+        await interaction.response.send_message(embed=embed)
+    
+    @discord.app_commands.command(name="streak_roles", description="View information about trial streak roles")
+    async def streak_roles(self, interaction: discord.Interaction):
+        embed = discord.Embed(
+            title="🏆 Trial Streak Roles",
+            description="Earn special roles by maintaining weekly trial streaks!",
+            color=0x9b59b6
+        )
+        
+        embed.add_field(
+            name="How It Works",
+            value="Complete **every track** of your server's week to maintain your streak.\n"
+                  "Missing a week resets your streak to 0.",
+            inline=False
+        )
+        
+        roles_text = ""
+        for min_streak, role_name in STREAK_ROLES.items():
+            emoji = {
+                "Trial Cadet": "🟢",
+                "Trial Veteran": "🔵", 
+                "Trial Master": "🟣",
+                "Trial Legend": "🔴",
+                "Trial Champion": "🏆",
+                "Trial Grandmaster": "💎"
+            }.get(role_name, "⭐")
+            
+            roles_text += f"{emoji} **{role_name}**: {min_streak}+ weeks\n"
+        
+        embed.add_field(name="Available Roles", value=roles_text, inline=False)
+        embed.add_field(
+            name="Tips", 
+            value="• Use `/my_streak` to check your progress\n"
+                  "• Submit times for every weekly track\n"
+                  "• Roles are automatically awarded when earned",
+            inline=False
+        )
+        
+        await interaction.response.send_message(embed=embed)
+
+async def setup(bot):
+    await bot.add_cog(Streaks(bot))
@@ -0,0 +1,184 @@
+import datetime
+import discord
+import sqlite3
+from discord.ext import commands
+from bot import (
+    format_trial_schedule, generate_weekly_leaderboard, get_user_name, output_autocomplete,
+    OUTPUT_FORMATS, send_table_image, truncate_text, WeeklyHistoryPaginator,
+    WeeklyPlacementsPaginator
+)
+from froog_core import (
+    fetch_weekly_standings, format_time, format_trial_categories, get_active_weekly_trial,
+    get_trial_config, get_trial_week, total_ms_to_time
+)
+
+class WeeklyTrials(commands.Cog):
+    """Current and past weekly time trials"""
+    
+    def __init__(self, bot):
+        self.bot = bot
+    
+    @discord.app_commands.command(name="current_trials", description="View current weekly time trials")
+    async def current_trials(self, interaction: discord.Interaction):
+        # Check if command is used in the correct channel
+        if interaction.channel.name != 'time-trials-of-the-week':
+            await interaction.response.send_message(
+                "❌ This command can only be used in the #time-trials-of-the-week channel.",
+                ephemeral=True
+            )
+            return
+        
+        conn = sqlite3.connect('mario_kart_times.db')
+        cursor = conn.cursor()
+    
+        # Check if trials have started yet, by this server's own schedule
+        config = get_trial_config(cursor, interaction.guild_id)
+        conn.commit()
+        if get_trial_week(config, datetime.datetime.now(datetime.timezone.utc)) == 0:
+            conn.close()
+            await interaction.response.send_message(
+                "🏁 **Weekly Time Trials**\n\n"
+                "Trials haven't started yet!\n"
+                "**Week 1 begins:** the week of November 4, 2025\n\n"
+                "Get ready to race! 🏎️",
+                ephemeral=False
+            )
+            return
+    
+        trial = get_active_weekly_trial(cursor, interaction.guild_id)
+    
+        if not trial:
+            await interaction.response.send_message("❌ No active weekly trials at the moment.", ephemeral=True)
+            conn.close()
+            return
+    
+        week_number = trial["week_number"]
+    
+        embed = discord.Embed(
+            title=f"🏁 Weekly Time Trials - Week {week_number}",
+            description="Current active weekly trials",
+            color=0x3498db
+        )
+    
+        embed.add_field(name="Featured Tracks", value="\n".join(f"{i}. {track}" for i, track in enumerate(trial["tracks"], 1)), inline=False)
+        embed.add_field(name="Duration", value=f"{trial['start_date']} to {trial['end_date']}", inline=False)
+        embed.add_field(
+            name="How to Participate",
+            value=f"Use `/add_time` with {format_trial_categories(trial['categories'], ' or ')} for these tracks!",
+            inline=False
+        )
+    
+        # Show current participant count
+        cursor.execute('''
+            SELECT COUNT(DISTINCT user_id) FROM weekly_submissions WHERE week_guild_id = ? AND week_number = ?
+        ''', (trial["guild_id"], week_number))
+        participant_count = cursor.fetchone()[0]
+        embed.add_field(name="Participants", value=str(participant_count), inline=True)
+        
+        conn.close()
+        await interaction.response.send_message(embed=embed)
+    
+    @discord.app_commands.command(name="weekly_leaderboard", description="View current weekly trials leaderboard")
+    @discord.app_commands.autocomplete(output=output_autocomplete)
+    async def weekly_leaderboard(self, interaction: discord.Interaction, output: str = "embed"):
+        # Check if command is used in the correct channel
+        if interaction.channel.name != 'time-trials-of-the-week':
+            await interaction.response.send_message(
+                "❌ This command can only be used in the #time-trials-of-the-week channel.",
+                ephemeral=True
+            )
+            return
+        
+        # Validate output
+        if output not in OUTPUT_FORMATS:
+            await interaction.response.send_message(f"❌ Invalid output. Choose from: {', '.join(OUTPUT_FORMATS)}", ephemeral=True)
+            return
+        
+        conn = sqlite3.connect('mario_kart_times.db')
+        cursor = conn.cursor()
+        
+        trial = get_active_weekly_trial(cursor, interaction.guild_id)
+    
+        if not trial:
+            await interaction.response.send_message("❌ No active weekly trials at the moment.", ephemeral=True)
+            conn.close()
+            return
+    
+        week_number = trial["week_number"]
+    
+        if output == "image":
+            sections = [(track, mode, items) for track in trial["tracks"] for mode, items in trial["categories"]]
+            standings = {
+                section: fetch_weekly_standings(cursor, trial["guild_id"], week_number, *section) for section in sections
+            }
+            conn.close()
+            await interaction.response.defer()
+            rows = []
+            for track, mode, items in sections:
+                heading = f"{trial['tracks'].index(track) + 1}. {track}"
+                rows.append(f"{heading} ({mode}, {items})" if len(trial["categories"]) > 1 else heading)
+                if not standings[track, mode, items]:
+                    rows.append(["", "No submissions", "", ""])
+                for place, (user_id, best_ms, vehicle) in enumerate(standings[track, mode, items], 1):
+                    rows.append([str(place), await get_user_name(user_id, 40), format_time(*total_ms_to_time(best_ms)), vehicle or ""])
+            await send_table_image(interaction, f"Weekly Trials Leaderboard - Week {week_number}", ["#", "Player", "Time", "Vehicle"], rows)
+            return
+    
+        embed = await generate_weekly_leaderboard(trial)
+        embed.title = f"🏆 Weekly Trials Leaderboard - Week {week_number}"
+        embed.description = "Current standings (live leaderboard)"
+        embed.color = 0x3498db
+        
+        conn.close()
+        await interaction.response.send_message(embed=embed)
+    
+    @discord.app_commands.command(name="schedule", description="View the current weekly trials schedule")
+    async def schedule(self, interaction: discord.Interaction):
+        embed = discord.Embed(
+            title="📅 Weekly Trials Schedule",
+            description="Current automated schedule for weekly trials",
+            color=0x3498db
+        )
+        
+        # Get this server's schedule
+        conn = sqlite3.connect('mario_kart_times.db')
+        cursor = conn.cursor()
+        config = get_trial_config(cursor, interaction.guild_id or 0)
+        
+        embed.add_field(name="⏰ This Server", value=format_trial_schedule(config), inline=False)
+        
+        embed.add_field(
+            name="ℹ️ Info",
+            value=f"Times are in {config['timezone']}. Admins can change them with `/weekly_config`.\n"
+                  "Each server runs its own weeks; track count and category changes apply from the next week.",
+            inline=False
+        )
+    
+        # Check if there are current active trials
+        current_trial = get_active_weekly_trial(cursor, interaction.guild_id or 0)
+        if interaction.guild_id:
+            conn.commit()
+        conn.close()
+    
+        if current_trial:
+            embed.add_field(
+                name="📊 Current Trials",
+                value=f"Week {current_trial['week_number']}: {current_trial['start_date']} to {current_trial['end_date']}",
+                inline=False
+            )
+        
+        await interaction.response.send_message(embed=embed)
+    
+    @discord.app_commands.command(name="weekly_history", description="Browse the final results of past weekly trials")
+    async def weekly_history(self, interaction: discord.Interaction, week: int | None = None):
+        view = WeeklyHistoryPaginator(interaction.user.id, interaction.guild_id or 0, week)
+        await view.send(interaction)
+    
+    @discord.app_commands.command(name="weekly_placements", description="View a player's placements in past weekly trials")
+    async def weekly_placements(self, interaction: discord.Interaction, user: discord.User | None = None):
+        target = user or interaction.user
+        view = WeeklyPlacementsPaginator(interaction.user.id, interaction.guild_id or 0, target.id, truncate_text(target.display_name, 40))
+        await view.send(interaction)
+
+async def setup(bot):
+    await bot.add_cog(WeeklyTrials(bot))
@@ -0,0 +1,221 @@
+"""Writer service: the one process that writes time trial submissions to mario_kart_times.db.
+
+Usage: python db_writer.py --socket froog-writer.sock
+
+Bot processes started with DB_WRITER_SOCKET set send submissions here over a Unix socket
+(see WriterClient) instead of writing the database themselves, so they never wait on each
+other for SQLite's write lock. Requests that arrive while a commit is in progress are applied
+together in the next transaction, each in its own savepoint so one failing request doesn't
+undo the others, and share a single commit. Readers keep their own connections; the database
+is in WAL mode, so reads aren't blocked while the writer commits.
+
+Messages are one JSON object per line. Requests are {"id", "op", "args"}, where op is a name
+from froog_core.WRITE_OPERATIONS and args follow its cursor parameter. Responses are
+{"id", "result"} or {"id", "error", "message"}.
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import os
+import signal
+import sqlite3
+
+from froog_core import init_database, WRITE_OPERATIONS
+
+GROUP_MAX_REQUESTS = 256
+MAX_MESSAGE_BYTES = 16 * 1024 * 1024  # An /import_times batch is well under this
+
+class WriterError(Exception):
+    """A write failed in the writer service, or the service couldn't be reached"""
+
+class WriterService:
+    def __init__(self, socket_path):
+        self.socket_path = socket_path
+        self.requests = asyncio.Queue()
+        # One thread owns the connection; the event loop keeps reading requests while it commits
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self.conn = None
+        self.clients = {}
+    
+    async def serve(self):
+        init_database()
+        self.conn = sqlite3.connect('mario_kart_times.db', isolation_level=None, check_same_thread=False)
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        server = await asyncio.start_unix_server(self.handle_connection, self.socket_path, limit=MAX_MESSAGE_BYTES)
+        os.chmod(self.socket_path, 0o600)
+        stopping = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stopping.set)
+        committer = asyncio.create_task(self.commit_groups())
+        print(f"✅ Writer service listening on {self.socket_path}")
+        await stopping.wait()
+        
+        server.close()
+        # End every client's read loop so its handler finishes before the loop shuts down
+        handlers = list(self.clients.values())
+        for reader in list(self.clients):
+            reader.feed_eof()
+        await asyncio.gather(*handlers)
+        committer.cancel()
+        self.executor.shutdown(wait=True)
+        self.conn.close()
+        os.unlink(self.socket_path)
+    
+    async def handle_connection(self, reader, writer):
+        self.clients[reader] = asyncio.current_task()
+        try:
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                except ValueError as e:
+                    self.respond(writer, {"id": None, "error": "ValueError", "message": f"Bad request: {e}"})
+                    continue
+                self.requests.put_nowait((request, writer))
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError) as e:
+            print(f"⚠️ Dropped a writer client: {e}")
+        finally:
+            self.clients.pop(reader, None)
+            writer.close()
+    
+    def respond(self, writer, response):
+        if not writer.is_closing():
+            writer.write(json.dumps(response).encode('utf-8') + b"\n")
+    
+    async def commit_groups(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            group = [await self.requests.get()]
+            while len(group) < GROUP_MAX_REQUESTS and not self.requests.empty():
+                group.append(self.requests.get_nowait())
+            responses = await loop.run_in_executor(self.executor, self.apply_group, [request for request, _ in group])
+            for (_, writer), response in zip(group, responses):
+                self.respond(writer, response)
+    
+    def apply_group(self, requests):
+        """Apply requests in one transaction and return their responses, in order"""
+        cursor = self.conn.cursor()
+        responses = []
+        try:
+            cursor.execute('BEGIN IMMEDIATE')
+            for request in requests:
+                responses.append(self.apply_request(cursor, request))
+            cursor.execute('COMMIT')
+        except sqlite3.Error as e:
+            if self.conn.in_transaction:
+                self.conn.rollback()
+            print(f"❌ Writer transaction failed, {len(requests)} request(s) not saved: {e}")
+            return [{"id": request.get("id"), "error": type(e).__name__, "message": str(e)} for request in requests]
+        return responses
+    
+    def apply_request(self, cursor, request):
+        operation = WRITE_OPERATIONS.get(request.get("op"))
+        if operation is None:
+            return {"id": request.get("id"), "error": "ValueError", "message": f"Unknown operation {request.get('op')!r}"}
+        cursor.execute('SAVEPOINT request')
+        try:
+            result = operation(cursor, *request.get("args", []))
+        except Exception as e:
+            cursor.execute('ROLLBACK TO request')
+            cursor.execute('RELEASE request')
+            return {"id": request.get("id"), "error": type(e).__name__, "message": str(e)}
+        cursor.execute('RELEASE request')
+        return {"id": request.get("id"), "result": result}
+
+class WriterClient:
+    """Connection from a bot process to the writer service, shared by all its commands.
+    
+    Calls are pipelined over one socket and matched to responses by ID. If the connection
+    drops, calls waiting on it fail with WriterError (their writes may or may not have been
+    committed) and the next call reconnects.
+    """
+    
+    def __init__(self, socket_path):
+        self.socket_path = socket_path
+        self.writer = None
+        self.pending = {}
+        self.next_id = 0
+        self.connect_lock = asyncio.Lock()
+    
+    async def connect(self):
+        async with self.connect_lock:
+            if self.writer is None or self.writer.is_closing():
+                reader, self.writer = await asyncio.open_unix_connection(self.socket_path, limit=MAX_MESSAGE_BYTES)
+                asyncio.create_task(self.read_responses(reader, self.writer))
+    
+    async def read_responses(self, reader, writer):
+        try:
+            while line := await reader.readline():
+                response = json.loads(line)
+                future = self.pending.pop(response["id"], None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError) as e:
+            print(f"⚠️ Lost connection to the writer service: {e}")
+        finally:
+            writer.close()
+            if self.writer is writer:
+                self.writer = None
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(WriterError("Lost connection to the writer service"))
+            self.pending.clear()
+    
+    async def send(self, op, args):
+        """Send one request and return the future its response will be set on"""
+        try:
+            await self.connect()
+        except OSError as e:
+            raise WriterError(f"Couldn't reach the writer service at {self.socket_path}: {e}") from e
+        writer = self.writer
+        if writer is None or writer.is_closing():
+            raise ConnectionResetError("connection closed")
+        self.next_id += 1
+        request_id = self.next_id
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        try:
+            writer.write(json.dumps({"id": request_id, "op": op, "args": args}).encode('utf-8') + b"\n")
+            await writer.drain()
+        except ConnectionError:
+            self.pending.pop(request_id, None)
+            if not future.cancel():
+                future.exception()  # Already failed by read_responses; nobody else will look
+            writer.close()
+            if self.writer is writer:
+                self.writer = None
+            raise
+        return future
+    
+    async def call(self, op, *args):
+        """Run a froog_core.WRITE_OPERATIONS entry in the writer service and return its result.
+        
+        A ValueError from the operation (e.g. mismatched lap splits) is raised again here as
+        ValueError; anything else that fails raises WriterError.
+        """
+        try:
+            future = await self.send(op, args)
+        except ConnectionError:
+            # The request never reached the service (e.g. it restarted since the last call), so
+            # it's safe to send again on a new connection
+            try:
+                future = await self.send(op, args)
+            except ConnectionError as e:
+                raise WriterError(f"Lost connection to the writer service: {e}") from e
+        response = await future
+        if "error" in response:
+            if response["error"] == "ValueError":
+                raise ValueError(response["message"])
+            raise WriterError(f"{response['error']}: {response['message']}")
+        return response["result"]
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve time trial writes to mario_kart_times.db for every bot process")
+    parser.add_argument("--socket", default=os.getenv('DB_WRITER_SOCKET', 'froog-writer.sock'), help="Unix socket path to listen on")
+    args = parser.parse_args()
+    asyncio.run(WriterService(args.socket).serve())
+
+if __name__ == "__main__":
+    main()
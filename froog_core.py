@@ -0,0 +1,2266 @@
+"""Time trial rules and storage, independent of Discord.
+
+Everything here works on plain values and a sqlite3 cursor: schema setup, personal bests
+and everything derived from them, server records, weekly trials entries, streaks and
+milestones. bot.py and the cogs turn Discord interactions into calls to these functions
+and their results into messages, and benchmark_core.py drives them directly.
+"""
+import datetime
+import functools
+import json
+import random
+import re
+import sqlite3
+import time
+import zoneinfo
+from array import array
+from tracks_config import MK8_TRACKS, MK8_CUPS, GAME_MODES
+from karts_config import MK8_VEHICLES, MK8_TIRES, MK8_GLIDERS
+from kart_stats_config import STAT_NAMES, MK8_DRIVER_CLASSES, MK8_BODY_CLASSES, MK8_TIRE_CLASSES, MK8_GLIDER_CLASSES
+from world_records_itemless import WORLD_RECORDS_ITEMLESS
+from world_records_shrooms import WORLD_RECORDS_SHROOMS
+
+# Helper functions
+def get_tour_tracks():
+    """Get list of all Tour tracks from MK8_TRACKS"""
+    return [track for track in MK8_TRACKS if track.startswith("Tour ")]
+
+def get_non_tour_tracks():
+    """Get list of all non-Tour tracks from MK8_TRACKS"""
+    return [track for track in MK8_TRACKS if not track.startswith("Tour ")]
+
+def select_weekly_tracks(week_number, track_count=3, previous_tracks=()):
+    """Select track_count tracks for the week. Every other week includes 1 tour track.
+    
+    previous_tracks (the server's tracks last week) are avoided where possible.
+    """
+    # Handle week 0 (before trials start)
+    if week_number <= 0:
+        return []
+    
+    # Use week number as seed so servers with the same track count get the same tracks
+    random.seed(week_number)
+    
+    tour_tracks = get_tour_tracks()
+    non_tour_tracks = get_non_tour_tracks()
+    previous_tracks = [track for track in previous_tracks if track]
+    
+    max_attempts = 50  # Prevent infinite loops
+    attempts = 0
+    
+    while attempts < max_attempts:
+        selected_tracks = []
+        
+        # Every other week (odd week numbers) should include a tour track
+        if week_number % 2 == 1:
+            # Include 1 tour track and the rest regular tracks
+            available_tour = [t for t in tour_tracks if t not in previous_tracks]
+            available_non_tour = [t for t in non_tour_tracks if t not in previous_tracks]
+            
+            # If we filtered out too many tracks, fall back to full lists
+            if len(available_tour) == 0:
+                available_tour = tour_tracks
+            if len(available_non_tour) < track_count - 1:
+                available_non_tour = non_tour_tracks
+            
+            selected_tracks.append(random.choice(available_tour))
+            selected_tracks.extend(random.sample(available_non_tour, min(track_count - 1, len(available_non_tour))))
+        else:
+            # All regular tracks
+            available_non_tour = [t for t in non_tour_tracks if t not in previous_tracks]
+            
+            # If we filtered out too many tracks, fall back to full list
+            if len(available_non_tour) < track_count:
+                available_non_tour = non_tour_tracks
+            
+            selected_tracks = random.sample(available_non_tour, min(track_count, len(available_non_tour)))
+        
+        # Check if we have any duplicates with previous week
+        if not any(track in previous_tracks for track in selected_tracks):
+            break
+        
+        attempts += 1
+        # Re-seed with a slight variation to get different random results
+        random.seed(week_number + attempts)
+    
+    # Reset random seed to avoid affecting other random operations
+    random.seed()
+    
+    return selected_tracks
+
+def parse_time(time_str):
+    # Accepts MM:SS.mmm or M:SS.mmm
+    try:
+        mins_secs, ms = time_str.split('.')
+        mins, secs = mins_secs.split(':')
+        return int(mins), int(secs), int(ms)
+    except Exception:
+        return None
+
+# Case-insensitive track lookup for bulk submissions typed or pasted by hand
+TRACK_LOOKUP = {track.lower(): track for track in MK8_TRACKS}
+
+# Cup each track belongs to, for per-cup subtotals
+TRACK_CUPS = {track: cup_name for cup_name, tracks in MK8_CUPS for track in tracks}
+
+def validate_run(track, time_str, mode, items):
+    """Validate one submitted run.
+
+    Returns ((track, mode, items, mins, secs, ms), None) with the canonical track name,
+    or (None, error_message).
+    """
+    canonical_track = TRACK_LOOKUP.get((track or "").strip().lower())
+    if not canonical_track:
+        return None, f"unknown track `{track}`"
+    mode = (mode or "").strip()
+    if mode not in GAME_MODES:
+        return None, f"invalid mode `{mode}` (choose from {', '.join(GAME_MODES)})"
+    items = (items or "").strip()
+    if items not in ["shrooms", "no_items"]:
+        return None, f"invalid items setting `{items}` (choose `shrooms` or `no_items`)"
+    parsed_time = parse_time((time_str or "").strip())
+    if not parsed_time or not (0 <= parsed_time[1] < 60 and 0 <= parsed_time[2] < 1000):
+        return None, f"invalid time `{time_str}` (use MM:SS.mmm, e.g. 1:23.456)"
+    return (canonical_track, mode, items, *parsed_time), None
+
+def format_time(mins, secs, ms):
+    return f"{mins}:{secs:02d}.{ms:03d}"
+
+def time_to_total_ms(mins, secs, ms):
+    return mins * 60000 + secs * 1000 + ms
+
+def total_ms_to_time(total_ms):
+    """Split a total millisecond time back into (minutes, seconds, milliseconds)"""
+    mins, rest = divmod(total_ms, 60000)
+    secs, ms = divmod(rest, 1000)
+    return mins, secs, ms
+
+def format_total_time(total_ms):
+    """Format a long total (like a sum of PBs) as H:MM:SS.mmm"""
+    mins, secs, ms = total_ms_to_time(total_ms)
+    hours, mins = divmod(mins, 60)
+    if not hours:
+        return format_time(mins, secs, ms)
+    return f"{hours}:{mins:02d}:{secs:02d}.{ms:03d}"
+
+def get_world_record(track, mode, items):
+    """Get the world record (mins, secs, ms) for a track/mode/items, or None if unknown"""
+    if items == "shrooms":
+        wr_time_str = WORLD_RECORDS_SHROOMS.get(mode, {}).get(track)
+    elif mode == "150cc":
+        wr_time_str = WORLD_RECORDS_ITEMLESS.get(track)
+    else:
+        wr_time_str = None
+    return parse_time(wr_time_str) if wr_time_str else None
+
+# Time standards: tiers a PB reaches by being within a percentage of the world record
+STANDARD_TIERS = [("Elite", 1.02), ("Gold", 1.04), ("Silver", 1.07), ("Bronze", 1.10)]
+
+def build_standard_thresholds():
+    """Precompute the cutoff (ms) of every tier, fastest first, for each track/mode/items with a world record"""
+    thresholds = {}
+    for mode in GAME_MODES:
+        for items in ["shrooms", "no_items"]:
+            for track in MK8_TRACKS:
+                wr = get_world_record(track, mode, items)
+                if wr:
+                    wr_ms = time_to_total_ms(*wr)
+                    thresholds[(track, mode, items)] = [int(wr_ms * ratio) for _, ratio in STANDARD_TIERS]
+    return thresholds
+
+STANDARD_THRESHOLDS = build_standard_thresholds()
+
+# Number of tracks with standards in each mode/items, used to average tier points into an overall tier
+STANDARD_TRACK_COUNTS = {}
+for _track, _mode, _items in STANDARD_THRESHOLDS:
+    STANDARD_TRACK_COUNTS[(_mode, _items)] = STANDARD_TRACK_COUNTS.get((_mode, _items), 0) + 1
+
+def standard_tier_points(track, mode, items, best_ms):
+    """Tier points a time earns on a track: 4 for Elite down to 1 for Bronze, 0 for none"""
+    if best_ms is None or (track, mode, items) not in STANDARD_THRESHOLDS:
+        return 0
+    return sum(1 for threshold in STANDARD_THRESHOLDS[(track, mode, items)] if best_ms <= threshold)
+
+def standard_tier_name(tier_points):
+    """Name of the tier worth tier_points, or None below Bronze"""
+    if tier_points <= 0:
+        return None
+    return STANDARD_TIERS[len(STANDARD_TIERS) - tier_points][0]
+
+def overall_tier_points(mode, items, total_tier_points):
+    """Overall tier: the average of a player's tier points over every track with standards (unplayed tracks count 0)"""
+    track_count = STANDARD_TRACK_COUNTS.get((mode, items))
+    return total_tier_points // track_count if track_count else 0
+
+# Combo optimizer: the Pareto frontier over every driver/body/tire/glider stat class combination
+COMBO_PART_TYPES = [
+    ("Driver", MK8_DRIVER_CLASSES),
+    ("Body", MK8_BODY_CLASSES),
+    ("Tires", MK8_TIRE_CLASSES),
+    ("Glider", MK8_GLIDER_CLASSES)
+]
+
+COMBO_MAX_WEIGHT = 10
+
+def pareto_frontier(candidates):
+    """Keep the (stats, parts) candidates that no other candidate matches or beats in every stat.
+    
+    Among candidates with identical stats only one is kept.
+    """
+    frontier = []
+    # Visiting in order of descending stat total means nothing visited later can dominate a kept candidate
+    for stats, parts in sorted(candidates, key=lambda candidate: -sum(candidate[0])):
+        if not any(all(kept >= new for kept, new in zip(kept_stats, stats)) for kept_stats, _ in frontier):
+            frontier.append((stats, parts))
+    return frontier
+
+@functools.cache
+def get_combo_frontier():
+    """The Pareto-optimal combos as flat arrays of stats and class indexes, plus their count.
+    
+    Built on the first /combo_search and kept for the life of the process.
+    Part types are added one at a time with the frontier pruned after each step; a partial
+    combo that is dominated stays dominated whatever is added to it, so this finds the
+    same frontier as comparing every full combination.
+    """
+    frontier = [((0,) * len(STAT_NAMES), ())]
+    for _, part_classes in COMBO_PART_TYPES:
+        frontier = pareto_frontier([
+            (tuple(total + added for total, added in zip(stats, class_stats)), parts + (class_index,))
+            for stats, parts in frontier
+            for class_index, (_, class_stats) in enumerate(part_classes)
+        ])
+    stats_array = array('h', [value for stats, _ in frontier for value in stats])
+    parts_array = array('B', [class_index for _, parts in frontier for class_index in parts])
+    return stats_array, parts_array, len(frontier)
+
+def search_combos(weights, limit=5):
+    """Best frontier combos for a weighted sum of stats, as (score, stats, class_indexes) tuples.
+    
+    The best combo for any non-negative weighting is always on the frontier, so only the
+    precomputed frontier needs scoring.
+    """
+    frontier_stats, frontier_parts, frontier_size = get_combo_frontier()
+    stat_count = len(STAT_NAMES)
+    part_count = len(COMBO_PART_TYPES)
+    scored = []
+    for index in range(frontier_size):
+        stats = frontier_stats[index * stat_count:(index + 1) * stat_count]
+        scored.append((sum(weight * value for weight, value in zip(weights, stats)), index))
+    scored.sort(key=lambda entry: -entry[0])
+    return [
+        (
+            score,
+            tuple(frontier_stats[index * stat_count:(index + 1) * stat_count]),
+            tuple(frontier_parts[index * part_count:(index + 1) * part_count])
+        )
+        for score, index in scored[:limit]
+    ]
+
+# Streak management functions
+def update_user_streak(cursor, user_id, guild_id, week_number):
+    """Update user's weekly trial streak based on participation, in the caller's transaction"""
+    # Get current streak data
+    cursor.execute('''
+        SELECT current_streak, best_streak, last_participation_week, total_weeks_participated
+        FROM weekly_streaks 
+        WHERE user_id = ? AND guild_id = ?
+    ''', (user_id, guild_id))
+    
+    streak_data = cursor.fetchone()
+    
+    if streak_data:
+        current_streak, best_streak, last_week, total_weeks = streak_data
+        
+        # Check if they participated last week (streak continues) or this is a new streak
+        if last_week == week_number - 1:
+            # Streak continues
+            current_streak += 1
+        elif last_week < week_number - 1:
+            # Streak broken, reset to 1
+            current_streak = 1
+        else:
+            # last_week == week_number: they already completed this week, nothing to update
+            return current_streak, best_streak
+        
+        # Update best streak if needed
+        if current_streak > best_streak:
+            best_streak = current_streak
+        
+        total_weeks += 1
+        
+        # Update record
+        cursor.execute('''
+            UPDATE weekly_streaks 
+            SET current_streak = ?, best_streak = ?, last_participation_week = ?, 
+                total_weeks_participated = ?, date_updated = CURRENT_TIMESTAMP
+            WHERE user_id = ? AND guild_id = ?
+        ''', (current_streak, best_streak, week_number, total_weeks, user_id, guild_id))
+    else:
+        # First time participating, create new record
+        current_streak = 1
+        best_streak = 1
+        total_weeks = 1
+        
+        cursor.execute('''
+            INSERT INTO weekly_streaks 
+            (user_id, guild_id, current_streak, best_streak, last_participation_week, total_weeks_participated)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (user_id, guild_id, current_streak, best_streak, week_number, total_weeks))
+    
+    return current_streak, best_streak
+
+def check_weekly_completion(cursor, user_id, trial):
+    """Check if user entered every track of a weekly trial (a get_weekly_trial dict), in any of its categories"""
+    cursor.execute('''
+        SELECT DISTINCT track_name 
+        FROM weekly_submissions 
+        WHERE user_id = ? AND week_guild_id = ? AND week_number = ?
+    ''', (user_id, trial["guild_id"], trial["week_number"]))
+    
+    submitted_tracks = [row[0] for row in cursor.fetchall()]
+    
+    completed_all = all(track in submitted_tracks for track in trial["tracks"])
+    return completed_all, submitted_tracks
+
+def advance_weekly_streak(cursor, user_id, guild_id, trial):
+    """Advance the user's streak in a server once they've entered every track of its week.
+    
+    Returns the current streak, or None if some of the week's tracks are still missing.
+    """
+    completed_all, _ = check_weekly_completion(cursor, user_id, trial)
+    if not completed_all:
+        return None
+    current_streak, _ = update_user_streak(cursor, user_id, guild_id, trial["week_number"])
+    return current_streak
+
+# Streak roles: the role awarded at each streak length
+STREAK_ROLES = {
+    2: "Trial Cadet",
+    4: "Trial Veteran", 
+    8: "Trial Master",
+    16: "Trial Legend",
+    32: "Trial Champion",
+    52: "Trial Grandmaster"
+}
+
+def update_record_holder(cursor, user_id, guild_id, track, mode, items, mins, secs, ms, vehicle=None, notes=None):
+    """Record that user_id now holds the server record, using the caller's transaction"""
+    # Check current record holder
+    cursor.execute('''
+        SELECT user_id FROM record_holders 
+        WHERE track_name = ? AND game_mode = ? AND items_setting = ? AND guild_id = ? AND is_current = 1
+    ''', (track, mode, items, guild_id))
+    
+    current_holder = cursor.fetchone()
+    current_time = datetime.datetime.now().isoformat()
+    
+    if current_holder and current_holder[0] == user_id:
+        # Holder improved their own record - keep the reign going, just update the time
+        cursor.execute('''
+            UPDATE record_holders 
+            SET time_minutes = ?, time_seconds = ?, time_milliseconds = ?, vehicle_setup = ?, notes = ?
+            WHERE track_name = ? AND game_mode = ? AND items_setting = ? AND guild_id = ? AND is_current = 1
+        ''', (mins, secs, ms, vehicle or "", notes or "", track, mode, items, guild_id))
+        return
+    
+    if current_holder:
+        # Someone else held the record, mark it as lost
+        cursor.execute('''
+            UPDATE record_holders 
+            SET is_current = 0, date_lost = ?, days_held = CAST((julianday(?) - julianday(date_achieved)) AS INTEGER)
+            WHERE track_name = ? AND game_mode = ? AND items_setting = ? AND guild_id = ? AND is_current = 1
+        ''', (current_time, current_time, track, mode, items, guild_id))
+    
+    # Add new record
+    cursor.execute('''
+        INSERT INTO record_holders 
+        (user_id, guild_id, track_name, game_mode, items_setting, time_minutes, time_seconds, time_milliseconds, 
+         date_achieved, vehicle_setup, notes, is_current)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
+    ''', (user_id, guild_id, track, mode, items, mins, secs, ms, current_time, vehicle or "", notes or ""))
+
+def refresh_personal_best(cursor, user_id, track, mode, items):
+    """Recompute the personal_bests row for one user/track/mode/items from time_trials.
+
+    Returns (old_best_ms, new_best_ms); either may be None when there was/is no time.
+    """
+    cursor.execute('''
+        SELECT best_ms, body_id, tire_id, glider_id FROM personal_bests
+        WHERE user_id = ? AND track_name = ? AND game_mode = ? AND items_setting = ?
+    ''', (user_id, track, mode, items))
+    old_row = cursor.fetchone()
+    old_best_ms = old_row[0] if old_row else None
+    old_parts = tuple(old_row[1:]) if old_row else (None, None, None)
+    
+    cursor.execute('''
+        SELECT id, (time_minutes * 60000 + time_seconds * 1000 + time_milliseconds) as total_ms, vehicle_setup
+        FROM time_trials
+        WHERE user_id = ? AND track_name = ? AND game_mode = ? AND items_setting = ?
+        ORDER BY total_ms ASC, id ASC
+        LIMIT 1
+    ''', (user_id, track, mode, items))
+    best_run = cursor.fetchone()
+    
+    if best_run:
+        run_id, new_best_ms, vehicle_setup = best_run
+        new_parts = parse_vehicle_setup(cursor, vehicle_setup)
+        cursor.execute('''
+            INSERT OR REPLACE INTO personal_bests
+            (user_id, track_name, game_mode, items_setting, best_ms, run_id, body_id, tire_id, glider_id, date_updated)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ''', (user_id, track, mode, items, new_best_ms, run_id, *new_parts))
+    else:
+        new_best_ms = None
+        new_parts = (None, None, None)
+        cursor.execute('''
+            DELETE FROM personal_bests
+            WHERE user_id = ? AND track_name = ? AND game_mode = ? AND items_setting = ?
+        ''', (user_id, track, mode, items))
+    
+    if old_best_ms != new_best_ms:
+        apply_pb_change(cursor, user_id, track, mode, items, old_best_ms, new_best_ms)
+    # The setup can change without the time changing (e.g. a tied run becomes the PB)
+    if (old_best_ms, old_parts) != (new_best_ms, new_parts):
+        update_setup_meta(cursor, track, mode, items, old_parts, old_best_ms, new_parts, new_best_ms)
+    
+    return old_best_ms, new_best_ms
+
+def apply_pb_change(cursor, user_id, track, mode, items, old_best_ms, new_best_ms):
+    """Incrementally update everything derived from personal bests after one PB changes.
+
+    old_best_ms/new_best_ms are None when the user had/has no time on the track.
+    """
+    update_category_totals(cursor, user_id, track, mode, items, old_best_ms, new_best_ms)
+    update_player_ratings(cursor, user_id, track, mode, items, old_best_ms, new_best_ms)
+    update_time_distribution(cursor, track, mode, items, old_best_ms, new_best_ms)
+    update_standard_tiers(cursor, user_id, track, mode, items, old_best_ms, new_best_ms)
+
+def get_track_rank(cursor, user_id, track, mode, items, best_ms):
+    """Rank of a time among other players' PBs on a track (ties share a rank)"""
+    cursor.execute('''
+        SELECT COUNT(*) FROM personal_bests
+        WHERE game_mode = ? AND items_setting = ? AND track_name = ? AND best_ms < ? AND user_id != ?
+    ''', (mode, items, track, best_ms, user_id))
+    return cursor.fetchone()[0] + 1
+
+def update_category_totals(cursor, user_id, track, mode, items, old_best_ms, new_best_ms):
+    """Apply one PB change to category_totals and cup_totals.
+
+    Sum of PBs and completion counts move by the difference between the old and new PB.
+    rank_sum (for average rank) changes for this user by their old/new rank on the track,
+    and by +/-1 for every player whose time lies between the old and new PB, since this
+    user just passed them (or dropped behind them).
+    """
+    delta_ms = (new_best_ms or 0) - (old_best_ms or 0)
+    delta_tracks = (new_best_ms is not None) - (old_best_ms is not None)
+    delta_rank = 0
+    if old_best_ms is not None:
+        delta_rank -= get_track_rank(cursor, user_id, track, mode, items, old_best_ms)
+    if new_best_ms is not None:
+        delta_rank += get_track_rank(cursor, user_id, track, mode, items, new_best_ms)
+    
+    cup_name = TRACK_CUPS[track]
+    cursor.execute('''
+        INSERT OR IGNORE INTO category_totals (user_id, game_mode, items_setting) VALUES (?, ?, ?)
+    ''', (user_id, mode, items))
+    cursor.execute('''
+        UPDATE category_totals 
+        SET total_ms = total_ms + ?, tracks_completed = tracks_completed + ?, rank_sum = rank_sum + ?,
+            date_updated = CURRENT_TIMESTAMP
+        WHERE user_id = ? AND game_mode = ? AND items_setting = ?
+    ''', (delta_ms, delta_tracks, delta_rank, user_id, mode, items))
+    cursor.execute('''
+        INSERT OR IGNORE INTO cup_totals (user_id, game_mode, items_setting, cup_name) VALUES (?, ?, ?, ?)
+    ''', (user_id, mode, items, cup_name))
+    cursor.execute('''
+        UPDATE cup_totals SET total_ms = total_ms + ?, tracks_completed = tracks_completed + ?
+        WHERE user_id = ? AND game_mode = ? AND items_setting = ? AND cup_name = ?
+    ''', (delta_ms, delta_tracks, user_id, mode, items, cup_name))
+    
+    # Drop rows for players with no times left in the category/cup
+    cursor.execute('''
+        DELETE FROM category_totals WHERE user_id = ? AND game_mode = ? AND items_setting = ? AND tracks_completed <= 0
+    ''', (user_id, mode, items))
+    cursor.execute('''
+        DELETE FROM cup_totals WHERE user_id = ? AND game_mode = ? AND items_setting = ? AND cup_name = ? AND tracks_completed <= 0
+    ''', (user_id, mode, items, cup_name))
+    
+    # Everyone this user passed (or fell behind) moves one place on this track
+    if old_best_ms is None:
+        shift, low_ms, high_ms = 1, new_best_ms, None
+    elif new_best_ms is None:
+        shift, low_ms, high_ms = -1, old_best_ms, None
+    else:
+        low_ms, high_ms = min(old_best_ms, new_best_ms), max(old_best_ms, new_best_ms)
+        shift = 1 if new_best_ms < old_best_ms else -1
+    cursor.execute(f'''
+        UPDATE category_totals SET rank_sum = rank_sum + ?
+        WHERE game_mode = ? AND items_setting = ? AND user_id IN (
+            SELECT user_id FROM personal_bests
+            WHERE game_mode = ? AND items_setting = ? AND track_name = ? AND user_id != ?
+            AND best_ms > ?{" AND best_ms <= ?" if high_ms is not None else ""}
+        )
+    ''', (shift, mode, items, mode, items, track, user_id, low_ms) + ((high_ms,) if high_ms is not None else ()))
+
+# Skill ratings: each track's PB ordering is scored as a set of head-to-head matchups
+RATING_START = 1500.0
+
+RATING_K_PER_TRACK = 48.0  # Rating swing available per track, split across all opponents on it
+
+RATING_MARGIN_FULL = 0.02  # Relative gap at which a head-to-head counts as a full win
+
+RATING_PROVISIONAL_MATCHUPS = 10
+
+def matchup_score(time_ms, opponent_ms):
+    """Score (0-1) of one PB against another: 0.5 for a tie, scaling to 1 (or 0) at RATING_MARGIN_FULL"""
+    gap = (opponent_ms - time_ms) / max(time_ms, opponent_ms)
+    return 0.5 + 0.5 * max(-1.0, min(1.0, gap / RATING_MARGIN_FULL))
+
+def rating_expectation(rating, opponent_rating):
+    """Expected matchup score from the Elo formula"""
+    return 1 / (1 + 10 ** ((opponent_rating - rating) / 400))
+
+def update_player_ratings(cursor, user_id, track, mode, items, old_best_ms, new_best_ms):
+    """Update ratings for one PB change against every other player on the track.
+
+    A first time on a track is played as a fresh game against each opponent (standard
+    Elo: K * (score - expected)). An improved or slower PB revises the result of those
+    games by K * (new_score - old_score), and a removed PB revises them back to the
+    expected score. K is RATING_K_PER_TRACK split evenly across the opponents, so busy
+    tracks don't count for more than quiet ones. Updates are zero-sum between each pair.
+    """
+    cursor.execute('''
+        INSERT OR IGNORE INTO player_ratings (user_id, game_mode, items_setting, rating) VALUES (?, ?, ?, ?)
+    ''', (user_id, mode, items, RATING_START))
+    cursor.execute('''
+        SELECT rating FROM player_ratings WHERE user_id = ? AND game_mode = ? AND items_setting = ?
+    ''', (user_id, mode, items))
+    rating = cursor.fetchone()[0]
+    
+    cursor.execute('''
+        SELECT pb.user_id, pb.best_ms, COALESCE(r.rating, ?)
+        FROM personal_bests pb
+        LEFT JOIN player_ratings r 
+            ON r.user_id = pb.user_id AND r.game_mode = pb.game_mode AND r.items_setting = pb.items_setting
+        WHERE pb.game_mode = ? AND pb.items_setting = ? AND pb.track_name = ? AND pb.user_id != ?
+    ''', (RATING_START, mode, items, track, user_id))
+    opponents = cursor.fetchall()
+    if not opponents:
+        return
+    
+    k = RATING_K_PER_TRACK / len(opponents)
+    matchup_change = (new_best_ms is not None) - (old_best_ms is not None)
+    user_delta = 0.0
+    opponent_updates = []
+    for opponent_id, opponent_ms, opponent_rating in opponents:
+        expected = rating_expectation(rating, opponent_rating)
+        old_score = matchup_score(old_best_ms, opponent_ms) if old_best_ms is not None else expected
+        new_score = matchup_score(new_best_ms, opponent_ms) if new_best_ms is not None else expected
+        delta = k * (new_score - old_score)
+        user_delta += delta
+        opponent_updates.append((-delta, matchup_change, opponent_id, mode, items))
+    
+    cursor.executemany('''
+        INSERT OR IGNORE INTO player_ratings (user_id, game_mode, items_setting, rating) VALUES (?, ?, ?, ?)
+    ''', [(opponent_id, mode, items, RATING_START) for opponent_id, _, _ in opponents])
+    cursor.executemany('''
+        UPDATE player_ratings SET rating = rating + ?, matchups = matchups + ?, date_updated = CURRENT_TIMESTAMP
+        WHERE user_id = ? AND game_mode = ? AND items_setting = ?
+    ''', opponent_updates + [(user_delta, matchup_change * len(opponents), user_id, mode, items)])
+
+def rebuild_player_ratings(cursor):
+    """Rebuild player_ratings by playing every current PB in the order it was set"""
+    cursor.execute('DELETE FROM player_ratings')
+    cursor.execute('''
+        SELECT user_id, track_name, game_mode, items_setting, best_ms FROM personal_bests ORDER BY run_id
+    ''')
+    ratings = {}
+    matchups = {}
+    track_entries = {}
+    for user_id, track, mode, items, best_ms in cursor.fetchall():
+        key = (user_id, mode, items)
+        ratings.setdefault(key, RATING_START)
+        matchups.setdefault(key, 0)
+        opponents = track_entries.setdefault((track, mode, items), [])
+        if opponents:
+            rating = ratings[key]
+            k = RATING_K_PER_TRACK / len(opponents)
+            for opponent_id, opponent_ms in opponents:
+                opponent_key = (opponent_id, mode, items)
+                delta = k * (matchup_score(best_ms, opponent_ms) - rating_expectation(rating, ratings[opponent_key]))
+                ratings[key] += delta
+                ratings[opponent_key] -= delta
+                matchups[opponent_key] += 1
+            matchups[key] += len(opponents)
+        opponents.append((user_id, best_ms))
+    
+    cursor.executemany('''
+        INSERT INTO player_ratings (user_id, game_mode, items_setting, rating, matchups) VALUES (?, ?, ?, ?, ?)
+    ''', [key + (ratings[key], matchups[key]) for key in ratings])
+
+# Time distributions: PBs per track/mode/items counted in fixed-width buckets
+DISTRIBUTION_BUCKET_MS = 100
+
+DISTRIBUTION_BUCKETS = 1200  # Two minutes of buckets; slower PBs land in the last one
+
+DISTRIBUTION_ORIGIN_MARGIN_MS = 5000  # Bucket 0 starts this far under the world record
+
+DISTRIBUTION_DEFAULT_ORIGIN_MS = 60000  # Used when a track has no world record on file
+
+DISTRIBUTION_CACHE_SECONDS = 60  # Other bot processes change time_distributions too
+
+# (track, mode, items) -> (loaded_at, TimeDistribution), rebuilt from time_distributions after
+# each change here and at least every DISTRIBUTION_CACHE_SECONDS
+distribution_cache = {}
+
+def distribution_origin_ms(track, mode, items):
+    """Start time of bucket 0 for a track/mode/items"""
+    wr = get_world_record(track, mode, items) or get_world_record(track, mode, "shrooms")
+    if not wr:
+        return DISTRIBUTION_DEFAULT_ORIGIN_MS
+    return max(0, time_to_total_ms(*wr) - DISTRIBUTION_ORIGIN_MARGIN_MS)
+
+def distribution_bucket(origin_ms, best_ms):
+    return min(max((best_ms - origin_ms) // DISTRIBUTION_BUCKET_MS, 0), DISTRIBUTION_BUCKETS - 1)
+
+class TimeDistribution:
+    """Bucket counts of one track's PBs with a Fenwick tree over them.
+
+    Rank, percentile and quantile lookups cost O(log DISTRIBUTION_BUCKETS) - a fixed
+    handful of steps no matter how many players or runs there are.
+    """
+    
+    def __init__(self, origin_ms, bucket_counts):
+        self.origin_ms = origin_ms
+        self.counts = array('i', [0]) * DISTRIBUTION_BUCKETS
+        self.tree = array('i', [0]) * (DISTRIBUTION_BUCKETS + 1)
+        self.total = 0
+        for bucket, count in bucket_counts:
+            self.add(bucket, count)
+    
+    def add(self, bucket, count):
+        self.counts[bucket] += count
+        self.total += count
+        index = bucket + 1
+        while index <= DISTRIBUTION_BUCKETS:
+            self.tree[index] += count
+            index += index & -index
+    
+    def count_below(self, bucket):
+        """Number of PBs in buckets before `bucket`"""
+        total = 0
+        index = bucket
+        while index > 0:
+            total += self.tree[index]
+            index -= index & -index
+        return total
+    
+    def standing(self, best_ms):
+        """Estimate (players_faster, players_slower) for a PB that is part of this distribution.
+
+        Other PBs sharing its bucket are split evenly between faster and slower.
+        """
+        bucket = distribution_bucket(self.origin_ms, best_ms)
+        same_bucket = max(self.counts[bucket] - 1, 0)
+        faster = self.count_below(bucket) + same_bucket / 2
+        return faster, max(self.total - 1 - faster, 0)
+    
+    def quantile(self, fraction):
+        """Approximate PB time (ms) at the given fraction (0-1) of the field, fastest first"""
+        if not self.total:
+            return None
+        target = max(1, round(fraction * self.total))
+        # Binary lifting down the Fenwick tree to the first bucket whose prefix count reaches target
+        position = 0
+        step = 1 << DISTRIBUTION_BUCKETS.bit_length()
+        remaining = target
+        while step:
+            next_position = position + step
+            if next_position <= DISTRIBUTION_BUCKETS and self.tree[next_position] < remaining:
+                position = next_position
+                remaining -= self.tree[next_position]
+            step >>= 1
+        return self.origin_ms + position * DISTRIBUTION_BUCKET_MS + DISTRIBUTION_BUCKET_MS // 2
+
+def update_time_distribution(cursor, track, mode, items, old_best_ms, new_best_ms):
+    """Move one PB between buckets of its track's distribution"""
+    origin_ms = distribution_origin_ms(track, mode, items)
+    for best_ms, change in [(old_best_ms, -1), (new_best_ms, 1)]:
+        if best_ms is None:
+            continue
+        bucket = distribution_bucket(origin_ms, best_ms)
+        cursor.execute('''
+            INSERT OR IGNORE INTO time_distributions (track_name, game_mode, items_setting, bucket) VALUES (?, ?, ?, ?)
+        ''', (track, mode, items, bucket))
+        cursor.execute('''
+            UPDATE time_distributions SET player_count = player_count + ?
+            WHERE track_name = ? AND game_mode = ? AND items_setting = ? AND bucket = ?
+        ''', (change, track, mode, items, bucket))
+    # The cached tree is rebuilt from the table on next use (which also covers rolled-back batches)
+    distribution_cache.pop((track, mode, items), None)
+
+def get_time_distribution(cursor, track, mode, items):
+    """Get the (cached) TimeDistribution for a track/mode/items"""
+    key = (track, mode, items)
+    now = time.monotonic()
+    if key not in distribution_cache or now - distribution_cache[key][0] > DISTRIBUTION_CACHE_SECONDS:
+        cursor.execute('''
+            SELECT bucket, player_count FROM time_distributions
+            WHERE track_name = ? AND game_mode = ? AND items_setting = ? AND player_count > 0
+        ''', key)
+        distribution_cache[key] = (now, TimeDistribution(distribution_origin_ms(*key), cursor.fetchall()))
+    return distribution_cache[key][1]
+
+def rebuild_time_distributions(cursor):
+    """Recompute time_distributions from scratch out of personal_bests"""
+    cursor.execute('DELETE FROM time_distributions')
+    cursor.execute('SELECT track_name, game_mode, items_setting, best_ms FROM personal_bests')
+    bucket_counts = {}
+    origins = {}
+    for track, mode, items, best_ms in cursor.fetchall():
+        if (track, mode, items) not in origins:
+            origins[(track, mode, items)] = distribution_origin_ms(track, mode, items)
+        key = (track, mode, items, distribution_bucket(origins[(track, mode, items)], best_ms))
+        bucket_counts[key] = bucket_counts.get(key, 0) + 1
+    cursor.executemany('''
+        INSERT INTO time_distributions (track_name, game_mode, items_setting, bucket, player_count) VALUES (?, ?, ?, ?, ?)
+    ''', [key + (count,) for key, count in bucket_counts.items()])
+    distribution_cache.clear()
+
+def update_standard_tiers(cursor, user_id, track, mode, items, old_best_ms, new_best_ms):
+    """Apply one PB change to user_track_tiers and the user's tier point total in user_standards"""
+    old_points = standard_tier_points(track, mode, items, old_best_ms)
+    new_points = standard_tier_points(track, mode, items, new_best_ms)
+    if old_points == new_points:
+        return
+    
+    if new_points:
+        cursor.execute('''
+            INSERT OR REPLACE INTO user_track_tiers (user_id, track_name, game_mode, items_setting, tier_points)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (user_id, track, mode, items, new_points))
+    else:
+        cursor.execute('''
+            DELETE FROM user_track_tiers WHERE user_id = ? AND track_name = ? AND game_mode = ? AND items_setting = ?
+        ''', (user_id, track, mode, items))
+    
+    cursor.execute('''
+        INSERT OR IGNORE INTO user_standards (user_id, game_mode, items_setting) VALUES (?, ?, ?)
+    ''', (user_id, mode, items))
+    cursor.execute('''
+        UPDATE user_standards SET tier_points = tier_points + ?, date_updated = CURRENT_TIMESTAMP
+        WHERE user_id = ? AND game_mode = ? AND items_setting = ?
+    ''', (new_points - old_points, user_id, mode, items))
+
+def rebuild_standard_tiers(cursor):
+    """Recompute user_track_tiers and user_standards from scratch out of personal_bests"""
+    cursor.execute('DELETE FROM user_track_tiers')
+    cursor.execute('DELETE FROM user_standards')
+    cursor.execute('SELECT user_id, track_name, game_mode, items_setting, best_ms FROM personal_bests')
+    track_tiers = []
+    totals = {}
+    for user_id, track, mode, items, best_ms in cursor.fetchall():
+        tier_points = standard_tier_points(track, mode, items, best_ms)
+        if tier_points:
+            track_tiers.append((user_id, track, mode, items, tier_points))
+            totals[(user_id, mode, items)] = totals.get((user_id, mode, items), 0) + tier_points
+    cursor.executemany('''
+        INSERT INTO user_track_tiers (user_id, track_name, game_mode, items_setting, tier_points) VALUES (?, ?, ?, ?, ?)
+    ''', track_tiers)
+    cursor.executemany('''
+        INSERT INTO user_standards (user_id, game_mode, items_setting, tier_points) VALUES (?, ?, ?, ?)
+    ''', [key + (tier_points,) for key, tier_points in totals.items()])
+
+# Vehicle setups: free-text setups are matched against known parts for the meta rollups
+VEHICLE_PART_TYPES = [("body", MK8_VEHICLES), ("tire", MK8_TIRES), ("glider", MK8_GLIDERS)]
+
+META_GAP_BUCKETS_PER_PCT = 10  # setup_meta groups WR gaps into 0.1% buckets
+
+# Lowercase part name -> (part_id, part_type) and part_id -> (part_type, part_name), from vehicle_parts
+vehicle_part_ids = {}
+
+vehicle_part_names = {}
+
+# Longest names first so e.g. "Gold Standard" is matched as a body before "Standard" as a tire
+SETUP_PART_PATTERNS = sorted(
+    [
+        (name.lower(), re.compile(r"(?<![\w-])" + re.escape(name.lower()) + r"(?![\w-])"))
+        for _, names in VEHICLE_PART_TYPES for name in names
+    ],
+    key=lambda entry: len(entry[0]),
+    reverse=True
+)
+
+def load_vehicle_parts(cursor):
+    cursor.execute('SELECT part_id, part_type, part_name FROM vehicle_parts')
+    for part_id, part_type, part_name in cursor.fetchall():
+        vehicle_part_ids[part_name.lower()] = (part_id, part_type)
+        vehicle_part_names[part_id] = (part_type, part_name)
+
+def parse_vehicle_setup(cursor, setup_text):
+    """Match a free-text vehicle setup like "Teddy Buggy / Roller / Cloud Glider" to part IDs.
+    
+    Returns (body_id, tire_id, glider_id), with None for any part that wasn't recognized.
+    """
+    if not vehicle_part_ids:
+        load_vehicle_parts(cursor)
+    remaining = (setup_text or "").lower()
+    found = {}
+    for name, pattern in SETUP_PART_PATTERNS:
+        part_id, part_type = vehicle_part_ids[name]
+        if part_type in found:
+            continue
+        match = pattern.search(remaining)
+        if match:
+            found[part_type] = part_id
+            # Blank out the match so shorter names can't match inside it
+            remaining = remaining[:match.start()] + "/" * len(name) + remaining[match.end():]
+    return tuple(found.get(part_type) for part_type, _ in VEHICLE_PART_TYPES)
+
+def meta_gap_bucket(wr_ms, best_ms):
+    """WR gap bucket of a PB (0.1% steps), or -1 when the track has no world record on file"""
+    if not wr_ms:
+        return -1
+    return max(0, (best_ms - wr_ms) * 100 * META_GAP_BUCKETS_PER_PCT // wr_ms)
+
+def update_setup_meta(cursor, track, mode, items, old_parts, old_best_ms, new_parts, new_best_ms):
+    """Move one PB's parts between setup_meta buckets (old setup/time out, new setup/time in)"""
+    wr = get_world_record(track, mode, items)
+    wr_ms = time_to_total_ms(*wr) if wr else None
+    for parts, best_ms, change in [(old_parts, old_best_ms, -1), (new_parts, new_best_ms, 1)]:
+        if best_ms is None:
+            continue
+        gap_bucket = meta_gap_bucket(wr_ms, best_ms)
+        for part_id in parts:
+            if part_id is None:
+                continue
+            cursor.execute('''
+                INSERT OR IGNORE INTO setup_meta (track_name, game_mode, items_setting, part_id, gap_bucket) VALUES (?, ?, ?, ?, ?)
+            ''', (track, mode, items, part_id, gap_bucket))
+            cursor.execute('''
+                UPDATE setup_meta SET player_count = player_count + ?
+                WHERE track_name = ? AND game_mode = ? AND items_setting = ? AND part_id = ? AND gap_bucket = ?
+            ''', (change, track, mode, items, part_id, gap_bucket))
+
+def rebuild_setup_meta(cursor):
+    """Re-parse the setup of every PB run and recompute setup_meta from scratch"""
+    cursor.execute('DELETE FROM setup_meta')
+    cursor.execute('''
+        SELECT pb.user_id, pb.track_name, pb.game_mode, pb.items_setting, pb.best_ms, t.vehicle_setup
+        FROM personal_bests pb
+        LEFT JOIN time_trials t ON t.id = pb.run_id
+    ''')
+    part_updates = []
+    bucket_counts = {}
+    wr_cache = {}
+    for user_id, track, mode, items, best_ms, vehicle_setup in cursor.fetchall():
+        parts = parse_vehicle_setup(cursor, vehicle_setup)
+        part_updates.append(parts + (user_id, track, mode, items))
+        if (track, mode, items) not in wr_cache:
+            wr = get_world_record(track, mode, items)
+            wr_cache[(track, mode, items)] = time_to_total_ms(*wr) if wr else None
+        gap_bucket = meta_gap_bucket(wr_cache[(track, mode, items)], best_ms)
+        for part_id in parts:
+            if part_id is not None:
+                key = (track, mode, items, part_id, gap_bucket)
+                bucket_counts[key] = bucket_counts.get(key, 0) + 1
+    cursor.executemany('''
+        UPDATE personal_bests SET body_id = ?, tire_id = ?, glider_id = ?
+        WHERE user_id = ? AND track_name = ? AND game_mode = ? AND items_setting = ?
+    ''', part_updates)
+    cursor.executemany('''
+        INSERT INTO setup_meta (track_name, game_mode, items_setting, part_id, gap_bucket, player_count) VALUES (?, ?, ?, ?, ?, ?)
+    ''', [key + (count,) for key, count in bucket_counts.items()])
+
+def rebuild_category_totals(cursor):
+    """Recompute category_totals and cup_totals from scratch out of personal_bests"""
+    cursor.execute('DELETE FROM category_totals')
+    cursor.execute('DELETE FROM cup_totals')
+    cursor.execute('''
+        INSERT INTO category_totals (user_id, game_mode, items_setting, total_ms, tracks_completed, rank_sum)
+        SELECT user_id, game_mode, items_setting, SUM(best_ms), COUNT(*), SUM(track_rank)
+        FROM (
+            SELECT user_id, game_mode, items_setting, best_ms,
+                   RANK() OVER (PARTITION BY game_mode, items_setting, track_name ORDER BY best_ms ASC) as track_rank
+            FROM personal_bests
+        )
+        GROUP BY user_id, game_mode, items_setting
+    ''')
+    cursor.execute('SELECT user_id, game_mode, items_setting, track_name, best_ms FROM personal_bests')
+    cup_rows = {}
+    for user_id, mode, items, track, best_ms in cursor.fetchall():
+        key = (user_id, mode, items, TRACK_CUPS.get(track))
+        total_ms, tracks_completed = cup_rows.get(key, (0, 0))
+        cup_rows[key] = (total_ms + best_ms, tracks_completed + 1)
+    cursor.executemany('''
+        INSERT INTO cup_totals (user_id, game_mode, items_setting, cup_name, total_ms, tracks_completed)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', [key + value for key, value in cup_rows.items() if key[3]])
+
+def get_track_leader(cursor, track, mode, items):
+    """Get (user_id, best_ms) of the fastest personal best on a track/mode/items, or None"""
+    cursor.execute('''
+        SELECT user_id, best_ms FROM personal_bests
+        WHERE game_mode = ? AND items_setting = ? AND track_name = ?
+        ORDER BY best_ms ASC, user_id ASC
+        LIMIT 1
+    ''', (mode, items, track))
+    return cursor.fetchone()
+
+def get_track_record(cursor, track, mode, items):
+    """Get (user_id, best_ms, vehicle_setup) of the top time on a track/mode/items, or None"""
+    # Single index seek per track on idx_personal_bests_ranking
+    cursor.execute('''
+        SELECT pb.user_id, pb.best_ms, t.vehicle_setup
+        FROM personal_bests pb
+        LEFT JOIN time_trials t ON t.id = pb.run_id
+        WHERE pb.game_mode = ? AND pb.items_setting = ? AND pb.track_name = ?
+        ORDER BY pb.best_ms ASC, pb.user_id ASC
+        LIMIT 1
+    ''', (mode, items, track))
+    return cursor.fetchone()
+
+def get_track_neighbors(cursor, user_id, best_ms, track, mode, items):
+    """Find the PBs just ahead of and just behind (best_ms, user_id) on a track.
+    
+    Returns (position, ahead, behind) where ahead/behind are (user_id, best_ms) or None.
+    Each lookup is a seek on idx_personal_bests_ranking rather than a sort of the track.
+    """
+    cursor.execute('''
+        SELECT user_id, best_ms FROM personal_bests
+        WHERE game_mode = ? AND items_setting = ? AND track_name = ? AND (best_ms, user_id) < (?, ?)
+        ORDER BY best_ms DESC, user_id DESC
+        LIMIT 1
+    ''', (mode, items, track, best_ms, user_id))
+    ahead = cursor.fetchone()
+    cursor.execute('''
+        SELECT user_id, best_ms FROM personal_bests
+        WHERE game_mode = ? AND items_setting = ? AND track_name = ? AND (best_ms, user_id) > (?, ?)
+        ORDER BY best_ms ASC, user_id ASC
+        LIMIT 1
+    ''', (mode, items, track, best_ms, user_id))
+    behind = cursor.fetchone()
+    cursor.execute('''
+        SELECT COUNT(*) FROM personal_bests
+        WHERE game_mode = ? AND items_setting = ? AND track_name = ? AND (best_ms, user_id) < (?, ?)
+    ''', (mode, items, track, best_ms, user_id))
+    position = cursor.fetchone()[0] + 1
+    return position, ahead, behind
+
+def get_category_neighbors(cursor, user_id, mode, items):
+    """Like get_track_neighbors, on the sum-of-PBs ladder in category_totals.
+    
+    Returns (position, own, ahead, behind) with rows as (user_id, total_ms, tracks_completed),
+    or None if the user has no PBs in the category.
+    """
+    cursor.execute('''
+        SELECT user_id, total_ms, tracks_completed FROM category_totals
+        WHERE user_id = ? AND game_mode = ? AND items_setting = ?
+    ''', (user_id, mode, items))
+    own = cursor.fetchone()
+    if not own:
+        return None
+    _, total_ms, tracks_completed = own
+    # More tracks completed ranks first, then lower total time (see idx_category_totals_ranking)
+    ahead_sql = '(tracks_completed > ? OR (tracks_completed = ? AND (total_ms, user_id) < (?, ?)))'
+    key = (tracks_completed, tracks_completed, total_ms, user_id)
+    cursor.execute(f'''
+        SELECT user_id, total_ms, tracks_completed FROM category_totals
+        WHERE game_mode = ? AND items_setting = ? AND {ahead_sql}
+        ORDER BY tracks_completed ASC, total_ms DESC, user_id DESC
+        LIMIT 1
+    ''', (mode, items) + key)
+    ahead = cursor.fetchone()
+    cursor.execute('''
+        SELECT user_id, total_ms, tracks_completed FROM category_totals
+        WHERE game_mode = ? AND items_setting = ?
+        AND (tracks_completed < ? OR (tracks_completed = ? AND (total_ms, user_id) > (?, ?)))
+        ORDER BY tracks_completed DESC, total_ms ASC, user_id ASC
+        LIMIT 1
+    ''', (mode, items) + key)
+    behind = cursor.fetchone()
+    cursor.execute(f'''
+        SELECT COUNT(*) FROM category_totals
+        WHERE game_mode = ? AND items_setting = ? AND {ahead_sql}
+    ''', (mode, items) + key)
+    position = cursor.fetchone()[0] + 1
+    return position, own, ahead, behind
+
+# Lap splits
+SPLITS_MAX_LAPS = 7
+
+SPLITS_TOLERANCE_MS = 3  # Lap times shown in game are rounded, so they may not add up exactly
+
+SPLIT_PATTERN = re.compile(r"^(?:(\d+):)?(\d{1,2})\.(\d{3})$")
+
+def parse_splits(splits_text, total_ms):
+    """Parse lap splits like "36.512, 35.101, 35.007" (M:SS.mmm also works) for a run of total_ms.
+    
+    Returns (lap_ms_list, None) or (None, error_message).
+    """
+    parts = [part for part in re.split(r"[\s,;/|]+", splits_text.strip()) if part]
+    if not 1 <= len(parts) <= SPLITS_MAX_LAPS:
+        return None, f"enter between 1 and {SPLITS_MAX_LAPS} lap times"
+    laps = []
+    for part in parts:
+        match = SPLIT_PATTERN.match(part)
+        if not match:
+            return None, f"couldn't read lap time `{part}` (use SS.mmm or M:SS.mmm)"
+        laps.append(time_to_total_ms(int(match.group(1) or 0), int(match.group(2)), int(match.group(3))))
+    if abs(sum(laps) - total_ms) > SPLITS_TOLERANCE_MS:
+        return None, f"the laps add up to {format_time(*total_ms_to_time(sum(laps)))}, not {format_time(*total_ms_to_time(total_ms))}"
+    return laps, None
+
+def format_lap(lap_ms):
+    mins, secs, ms = total_ms_to_time(lap_ms)
+    return format_time(mins, secs, ms) if mins else f"{secs}.{ms:03d}"
+
+def get_best_laps(cursor, user_id, track, mode, items):
+    """Best time for each lap number across a user's runs with splits, as a list ordered by lap"""
+    cursor.execute('''
+        SELECT lap_ms FROM best_laps
+        WHERE user_id = ? AND track_name = ? AND game_mode = ? AND items_setting = ?
+        ORDER BY lap_number
+    ''', (user_id, track, mode, items))
+    return [row[0] for row in cursor.fetchall()]
+
+def get_run_laps(cursor, run_id):
+    cursor.execute('SELECT lap_ms FROM run_laps WHERE run_id = ? ORDER BY lap_number', (run_id,))
+    return [row[0] for row in cursor.fetchall()]
+
+def theoretical_best(best_laps):
+    """Best opening lap plus the best flying lap (any lap after the first) for every other lap.
+    
+    Unlike the sum of best laps, this treats all laps after the standing start as the same
+    lap, so one great lap 3 counts for laps 2 and 3 alike.
+    """
+    if len(best_laps) < 2:
+        return sum(best_laps)
+    return best_laps[0] + min(best_laps[1:]) * (len(best_laps) - 1)
+
+def record_run_laps(cursor, run_id, user_id, track, mode, items, laps):
+    """Store a run's lap splits and fold them into best_laps.
+    
+    Returns the lap numbers (1-based) that are new best laps.
+    """
+    previous_best = get_best_laps(cursor, user_id, track, mode, items)
+    cursor.executemany('''
+        INSERT INTO run_laps (run_id, lap_number, lap_ms) VALUES (?, ?, ?)
+    ''', [(run_id, lap_number, lap_ms) for lap_number, lap_ms in enumerate(laps, 1)])
+    cursor.executemany('''
+        INSERT INTO best_laps (user_id, track_name, game_mode, items_setting, lap_number, lap_ms, run_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (user_id, track_name, game_mode, items_setting, lap_number)
+        DO UPDATE SET lap_ms = excluded.lap_ms, run_id = excluded.run_id
+        WHERE excluded.lap_ms < best_laps.lap_ms
+    ''', [(user_id, track, mode, items, lap_number, lap_ms, run_id) for lap_number, lap_ms in enumerate(laps, 1)])
+    return [
+        lap_number for lap_number, lap_ms in enumerate(laps, 1)
+        if lap_number > len(previous_best) or lap_ms < previous_best[lap_number - 1]
+    ]
+
+def refresh_best_laps(cursor, user_id, track, mode, items):
+    """Recompute best_laps for one user/track/mode/items after runs were deleted"""
+    cursor.execute('''
+        DELETE FROM best_laps
+        WHERE user_id = ? AND track_name = ? AND game_mode = ? AND items_setting = ?
+    ''', (user_id, track, mode, items))
+    # With MIN(), SQLite takes run_id from the row holding the minimum
+    cursor.execute('''
+        INSERT INTO best_laps (user_id, track_name, game_mode, items_setting, lap_number, lap_ms, run_id)
+        SELECT t.user_id, t.track_name, t.game_mode, t.items_setting, rl.lap_number, MIN(rl.lap_ms), rl.run_id
+        FROM time_trials t
+        JOIN run_laps rl ON rl.run_id = t.id
+        WHERE t.user_id = ? AND t.track_name = ? AND t.game_mode = ? AND t.items_setting = ?
+        GROUP BY rl.lap_number
+    ''', (user_id, track, mode, items))
+
+def insert_run_batch(cursor, user_id, guild_id, runs):
+    """Insert many runs for one user and update derived state once per track/mode/items.
+
+    runs is a list of (track, mode, items, mins, secs, ms, vehicle, notes, date_recorded)
+    tuples, where date_recorded may be None for "now". Rows are inserted one by one so
+    each run's id can be read back; personal bests and server records are then recomputed
+    once for each affected track/mode/items rather than once per run. Nothing is
+    committed here.
+
+    Returns (run_ids, results): the new runs' ids in the order given, and one dict per
+    affected key with the old/new PB, whether the user took (or improved) the server
+    record, and the user whose record was beaten, if any.
+    """
+    keys = sorted({(track, mode, items) for track, mode, items, *_ in runs})
+    leaders_before = {key: get_track_leader(cursor, *key) for key in keys}
+    
+    run_ids = []
+    for track, mode, items, mins, secs, ms, vehicle, notes, date_recorded in runs:
+        cursor.execute('''
+            INSERT INTO time_trials 
+            (user_id, guild_id, track_name, game_mode, items_setting, time_minutes, time_seconds, time_milliseconds, 
+             vehicle_setup, notes, date_recorded)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+        ''', (user_id, guild_id, track, mode, items, mins, secs, ms, vehicle or "", notes or "", date_recorded))
+        run_ids.append(cursor.lastrowid)
+    
+    results = []
+    for track, mode, items in keys:
+        old_best_ms, new_best_ms = refresh_personal_best(cursor, user_id, track, mode, items)
+        leader_before = leaders_before[(track, mode, items)]
+        leader_after = get_track_leader(cursor, track, mode, items)
+        
+        improved = old_best_ms is None or new_best_ms < old_best_ms
+        took_record = improved and leader_after is not None and leader_after[0] == user_id
+        beaten_user_id = None
+        if took_record and leader_before and leader_before[0] != user_id:
+            beaten_user_id = leader_before[0]
+        
+        if took_record and guild_id is not None:
+            cursor.execute('''
+                SELECT vehicle_setup, notes FROM time_trials 
+                WHERE id = (SELECT run_id FROM personal_bests 
+                            WHERE user_id = ? AND track_name = ? AND game_mode = ? AND items_setting = ?)
+            ''', (user_id, track, mode, items))
+            vehicle, notes = cursor.fetchone()
+            update_record_holder(cursor, user_id, guild_id, track, mode, items, 
+                                 *total_ms_to_time(new_best_ms), vehicle, notes)
+        
+        results.append({
+            "track": track,
+            "mode": mode,
+            "items": items,
+            "old_best_ms": old_best_ms,
+            "new_best_ms": new_best_ms,
+            "took_record": took_record,
+            "beaten_user_id": beaten_user_id
+        })
+    
+    return run_ids, results
+
+def check_milestones(cursor, user_id, guild_id):
+    """Check and award milestones for user achievements, in the caller's transaction"""
+    # Count total submissions
+    cursor.execute('SELECT COUNT(*) FROM time_trials WHERE user_id = ?', (user_id,))
+    total_submissions = cursor.fetchone()[0]
+    
+    # Count unique tracks
+    cursor.execute('SELECT COUNT(DISTINCT track_name) FROM time_trials WHERE user_id = ?', (user_id,))
+    unique_tracks = cursor.fetchone()[0]
+    
+    # Check for milestones
+    milestones_to_check = [
+        (10, "10_submissions", f"First 10 Time Trials"),
+        (50, "50_submissions", f"50 Time Trials Milestone"),
+        (100, "100_submissions", f"Century Club - 100 Submissions"),
+        (500, "500_submissions", f"Speed Demon - 500 Submissions"),
+        (10, "10_tracks", f"Track Explorer - 10 Different Tracks"),
+        (25, "25_tracks", f"Track Veteran - 25 Different Tracks"),
+        (50, "50_tracks", f"Track Master - 50 Different Tracks"),
+        (96, "all_tracks", f"Track Completionist - All 96 Tracks!")
+    ]
+    
+    new_milestones = []
+    for threshold, milestone_type, milestone_name in milestones_to_check:
+        # Check if milestone already achieved
+        cursor.execute('''
+            SELECT id FROM user_milestones 
+            WHERE user_id = ? AND guild_id = ? AND milestone_type = ?
+        ''', (user_id, guild_id, milestone_type))
+        
+        if not cursor.fetchone():
+            # Check if threshold is met
+            if ("submissions" in milestone_type and total_submissions >= threshold) or \
+               ("tracks" in milestone_type and unique_tracks >= threshold):
+                
+                # Award milestone
+                cursor.execute('''
+                    INSERT INTO user_milestones (user_id, guild_id, milestone_type, milestone_name, milestone_data)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (user_id, guild_id, milestone_type, milestone_name, f"Achieved with {total_submissions} submissions on {unique_tracks} tracks"))
+                
+                new_milestones.append(milestone_name)
+    
+    return new_milestones
+
+def add_column_if_missing(cursor, table, column, definition):
+    """Add a column to an existing table (SQLite has no ADD COLUMN IF NOT EXISTS)"""
+    cursor.execute(f'PRAGMA table_info({table})')
+    if column not in [row[1] for row in cursor.fetchall()]:
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
+WEEKLY_SUBMISSION_COLUMNS = (
+    "id, week_number, user_id, track_name, time_minutes, time_seconds, time_milliseconds, "
+    "game_mode, items_setting, vehicle_setup, notes, date_recorded, guild_id"
+)
+
+def migrate_weekly_submissions(cursor):
+    """Replace the old weekly_submissions table with a view over weekly_entries and time_trials.
+    
+    Each old submission is linked to the time_trials run it duplicated. Submissions whose
+    run has since been deleted stay in weekly_submissions_legacy so closed weeks keep their
+    results, and the view includes them. week_guild_id is the server whose week an entry
+    counts for (SHARED_WEEK_GUILD_ID for weeks from before each server had its own).
+    """
+    cursor.execute("SELECT type FROM sqlite_master WHERE name = 'weekly_submissions'")
+    existing = cursor.fetchone()
+    if existing and existing[0] == 'view':
+        cursor.execute('PRAGMA table_info(weekly_submissions)')
+        if 'week_guild_id' in [row[1] for row in cursor.fetchall()]:
+            return
+        # Views from before per-server weeks lack week_guild_id; recreate it below
+        cursor.execute('DROP VIEW weekly_submissions')
+        existing = None
+    
+    # The view reads guild_id from time_trials, so the column has to exist first
+    add_column_if_missing(cursor, 'time_trials', 'guild_id', 'INTEGER')
+    if existing:
+        add_column_if_missing(cursor, 'weekly_submissions', 'guild_id', 'INTEGER')
+        cursor.execute('ALTER TABLE weekly_submissions RENAME TO weekly_submissions_legacy')
+        cursor.execute('''
+            SELECT id, week_number, user_id, track_name, time_minutes, time_seconds, time_milliseconds,
+                   game_mode, items_setting, date_recorded
+            FROM weekly_submissions_legacy
+            ORDER BY id
+        ''')
+        for legacy_id, week_number, user_id, track, mins, secs, ms, mode, items, date_recorded in cursor.fetchall():
+            # The matching run recorded closest to the submission that isn't linked yet
+            cursor.execute('''
+                SELECT id FROM time_trials
+                WHERE user_id = ? AND track_name = ? AND game_mode = ? AND items_setting = ?
+                AND time_minutes = ? AND time_seconds = ? AND time_milliseconds = ?
+                AND id NOT IN (SELECT run_id FROM weekly_entries)
+                ORDER BY ABS(julianday(date_recorded) - julianday(?)), id
+                LIMIT 1
+            ''', (user_id, track, mode, items, mins, secs, ms, date_recorded))
+            run = cursor.fetchone()
+            if run:
+                cursor.execute(
+                    'INSERT INTO weekly_entries (run_id, guild_id, week_number) VALUES (?, ?, ?)',
+                    (run[0], SHARED_WEEK_GUILD_ID, week_number)
+                )
+                cursor.execute('DELETE FROM weekly_submissions_legacy WHERE id = ?', (legacy_id,))
+        cursor.execute('SELECT COUNT(*) FROM weekly_submissions_legacy')
+        if cursor.fetchone()[0] == 0:
+            cursor.execute('DROP TABLE weekly_submissions_legacy')
+    
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'weekly_submissions_legacy'")
+    legacy_union = (
+        f"UNION ALL SELECT {WEEKLY_SUBMISSION_COLUMNS}, {SHARED_WEEK_GUILD_ID} FROM weekly_submissions_legacy"
+        if cursor.fetchone() else ""
+    )
+    cursor.execute(f'''
+        CREATE VIEW weekly_submissions AS
+        SELECT t.id, e.week_number, t.user_id, t.track_name, t.time_minutes, t.time_seconds, t.time_milliseconds,
+               t.game_mode, t.items_setting, t.vehicle_setup, t.notes, t.date_recorded, t.guild_id,
+               e.guild_id AS week_guild_id
+        FROM weekly_entries e
+        JOIN time_trials t ON t.id = e.run_id
+        {legacy_union}
+    ''')
+
+SHARED_WEEK_TABLES = ['weekly_trials', 'weekly_entries', 'weekly_result_weeks', 'weekly_results']
+
+def move_shared_weeks_aside(cursor):
+    """Rename the weekly trials tables from before per-server weeks to *_shared.
+    
+    Weeks used to be shared by every server, so week_number alone was their key.
+    init_database then creates the tables keyed by (guild_id, week_number) and
+    copy_shared_weeks moves the old weeks into them. Triggers and indexes move with the
+    renamed tables and are dropped with them.
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'weekly_trials'")
+    if not cursor.fetchone():
+        return
+    cursor.execute('PRAGMA table_info(weekly_trials)')
+    if 'guild_id' in [row[1] for row in cursor.fetchall()]:
+        return
+    
+    # Legacy renaming leaves other tables' references alone, so they point at the new tables
+    cursor.execute('PRAGMA legacy_alter_table = ON')
+    for table in SHARED_WEEK_TABLES:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+        if cursor.fetchone():
+            cursor.execute(f'ALTER TABLE {table} RENAME TO {table}_shared')
+    cursor.execute('PRAGMA legacy_alter_table = OFF')
+    # Index names are global; these are recreated on the new tables
+    cursor.execute('DROP INDEX IF EXISTS idx_weekly_entries_week')
+    cursor.execute('DROP INDEX IF EXISTS idx_weekly_results_user')
+
+def copy_shared_weeks(cursor):
+    """Copy weeks set aside by move_shared_weeks_aside in under SHARED_WEEK_GUILD_ID and drop the old tables.
+    
+    Their entries move with them. A shared week that was still running stays active until
+    its end date has passed (see open_weekly_trial), so servers keep it until they start
+    their own.
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'weekly_trials_shared'")
+    if not cursor.fetchone():
+        return
+    
+    default_categories = format_trial_categories(TRIAL_DEFAULT_CATEGORIES)
+    cursor.execute('SELECT week_number, track1, track2, track3, start_date, end_date, is_active FROM weekly_trials_shared')
+    cursor.executemany('''
+        INSERT INTO weekly_trials (guild_id, week_number, tracks, categories, start_date, end_date, is_active)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', [
+        (SHARED_WEEK_GUILD_ID, row[0], json.dumps([track for track in row[1:4] if track]), default_categories) + row[4:]
+        for row in cursor.fetchall()
+    ])
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'weekly_entries_shared'")
+    if cursor.fetchone():
+        cursor.execute('''
+            INSERT INTO weekly_entries (run_id, guild_id, week_number)
+            SELECT run_id, ?, week_number FROM weekly_entries_shared
+        ''', (SHARED_WEEK_GUILD_ID,))
+    
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'weekly_result_weeks_shared'")
+    if cursor.fetchone():
+        mode, items = TRIAL_DEFAULT_CATEGORIES[0]
+        cursor.execute('''
+            SELECT week_number, track1, track2, track3, start_date, end_date, participant_count, date_archived
+            FROM weekly_result_weeks_shared
+        ''')
+        cursor.executemany('''
+            INSERT INTO weekly_result_weeks
+            (guild_id, week_number, tracks, categories, start_date, end_date, participant_count, date_archived)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [
+            (SHARED_WEEK_GUILD_ID, row[0], json.dumps([track for track in row[1:4] if track]), default_categories) + row[4:]
+            for row in cursor.fetchall()
+        ])
+        cursor.execute('''
+            INSERT INTO weekly_results
+            (guild_id, week_number, track_name, game_mode, items_setting, placement, user_id, best_ms, vehicle_setup, track_participants)
+            SELECT ?, week_number, track_name, ?, ?, placement, user_id, best_ms, vehicle_setup, track_participants
+            FROM weekly_results_shared
+        ''', (SHARED_WEEK_GUILD_ID, mode, items))
+    
+    for table in SHARED_WEEK_TABLES:
+        cursor.execute(f'DROP TABLE IF EXISTS {table}_shared')
+
+def init_database():
+    conn = sqlite3.connect('mario_kart_times.db')
+    cursor = conn.cursor()
+    # WAL lets readers in every bot process keep reading while the writer commits (stored in the file)
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS time_trials (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            track_name TEXT,
+            time_minutes INTEGER,
+            time_seconds INTEGER,
+            time_milliseconds INTEGER,
+            game_mode TEXT,
+            items_setting TEXT,
+            vehicle_setup TEXT,
+            notes TEXT,
+            date_recorded TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Weekly trials table: each server runs its own weeks; tracks is a JSON list and
+    # categories the text format_trial_categories writes
+    move_shared_weeks_aside(cursor)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS weekly_trials (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guild_id INTEGER,
+            week_number INTEGER,
+            tracks TEXT,
+            categories TEXT,
+            start_date TEXT,
+            end_date TEXT,
+            is_active BOOLEAN DEFAULT 1,
+            UNIQUE(guild_id, week_number)
+        )
+    ''')
+    
+    # Weekly submissions are references to time_trials runs rather than copies of them
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS weekly_entries (
+            run_id INTEGER PRIMARY KEY,
+            guild_id INTEGER,
+            week_number INTEGER,
+            FOREIGN KEY (guild_id, week_number) REFERENCES weekly_trials(guild_id, week_number)
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_weekly_entries_guild_week
+        ON weekly_entries (guild_id, week_number, run_id)
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS weekly_entries_delete AFTER DELETE ON time_trials BEGIN
+            DELETE FROM weekly_entries WHERE run_id = old.id;
+        END
+    ''')
+    migrate_weekly_submissions(cursor)
+    
+    # Weekly trial streaks table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS weekly_streaks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            guild_id INTEGER,
+            current_streak INTEGER DEFAULT 0,
+            best_streak INTEGER DEFAULT 0,
+            last_participation_week INTEGER DEFAULT 0,
+            total_weeks_participated INTEGER DEFAULT 0,
+            date_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(user_id, guild_id)
+        )
+    ''')
+    
+    # Per-server weekly trials schedule; last_*_at record the last event fired so missed ones can be caught up
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS guild_trial_config (
+            guild_id INTEGER PRIMARY KEY,
+            timezone TEXT DEFAULT 'UTC',
+            start_day INTEGER DEFAULT 6,
+            start_time TEXT DEFAULT '12:00',
+            end_day INTEGER DEFAULT 5,
+            end_time TEXT DEFAULT '12:00',
+            last_start_at TEXT,
+            last_end_at TEXT,
+            track_count INTEGER DEFAULT 3,
+            categories TEXT DEFAULT '150cc shrooms'
+        )
+    ''')
+    add_column_if_missing(cursor, 'guild_trial_config', 'track_count', 'INTEGER DEFAULT 3')
+    add_column_if_missing(cursor, 'guild_trial_config', 'categories', "TEXT DEFAULT '150cc shrooms'")
+    
+    # Hash of the command tree last synced to Discord, per scope ('global' or a guild ID)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS command_sync_state (
+            scope TEXT PRIMARY KEY,
+            tree_hash TEXT,
+            date_synced TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Jobs that only one bot process may run at a time (e.g. the weekly trials scheduler).
+    # revision is bumped when the job's inputs change so the holder knows to reload them.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS cluster_leases (
+            name TEXT PRIMARY KEY,
+            owner TEXT,
+            expires_at REAL,
+            revision INTEGER DEFAULT 0
+        )
+    ''')
+    
+    # Every server the bot is in, across all bot processes; the scheduler reads it
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS bot_guilds (
+            guild_id INTEGER PRIMARY KEY,
+            cluster_name TEXT,
+            date_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Announcements waiting to be posted; one row per (server, kind, week) so each is posted once
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS announcement_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guild_id INTEGER,
+            kind TEXT,
+            week_number INTEGER,
+            payload TEXT,
+            status TEXT DEFAULT 'pending',
+            attempts INTEGER DEFAULT 0,
+            next_attempt_at REAL DEFAULT 0,
+            claimed_at REAL,
+            last_error TEXT,
+            message_id INTEGER,
+            date_created TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            date_sent TIMESTAMP,
+            UNIQUE (guild_id, kind, week_number)
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_announcement_outbox_due
+        ON announcement_outbox (status, next_attempt_at)
+    ''')
+    
+    # Final weekly standings, written once when a week closes and never changed afterwards
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS weekly_result_weeks (
+            guild_id INTEGER,
+            week_number INTEGER,
+            tracks TEXT,
+            categories TEXT,
+            start_date TEXT,
+            end_date TEXT,
+            participant_count INTEGER,
+            date_archived TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (guild_id, week_number)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS weekly_results (
+            guild_id INTEGER,
+            week_number INTEGER,
+            track_name TEXT,
+            game_mode TEXT,
+            items_setting TEXT,
+            placement INTEGER,
+            user_id INTEGER,
+            best_ms INTEGER,
+            vehicle_setup TEXT,
+            track_participants INTEGER,
+            PRIMARY KEY (guild_id, week_number, track_name, game_mode, items_setting, placement)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_weekly_results_user
+        ON weekly_results (user_id, guild_id, week_number, track_name)
+    ''')
+    copy_shared_weeks(cursor)
+    for table in ['weekly_result_weeks', 'weekly_results']:
+        for operation in ['UPDATE', 'DELETE']:
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {table}_no_{operation.lower()} BEFORE {operation} ON {table} BEGIN
+                    SELECT RAISE(ABORT, 'weekly results are read-only once archived');
+                END
+            ''')
+    
+    # Hall of Fame tables for legacy records and achievements
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS record_holders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            guild_id INTEGER,
+            track_name TEXT,
+            game_mode TEXT,
+            items_setting TEXT,
+            time_minutes INTEGER,
+            time_seconds INTEGER,
+            time_milliseconds INTEGER,
+            date_achieved TIMESTAMP,
+            date_lost TIMESTAMP,
+            days_held INTEGER,
+            is_current BOOLEAN DEFAULT 1,
+            vehicle_setup TEXT,
+            notes TEXT
+        )
+    ''')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_milestones (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            guild_id INTEGER,
+            milestone_type TEXT,
+            milestone_name TEXT,
+            date_achieved TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            milestone_data TEXT
+        )
+    ''')
+    
+    # Guild the run was submitted from (NULL for runs recorded before this column existed)
+    add_column_if_missing(cursor, 'time_trials', 'guild_id', 'INTEGER')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_time_trials_guild ON time_trials (guild_id)')
+    
+    # Best time per user/track/mode/items, kept in sync by add_time/delete_time/clear_track.
+    # Leaderboards page through this table with keyset cursors instead of scanning time_trials.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS personal_bests (
+            user_id INTEGER,
+            track_name TEXT,
+            game_mode TEXT,
+            items_setting TEXT,
+            best_ms INTEGER,
+            run_id INTEGER,
+            body_id INTEGER,
+            tire_id INTEGER,
+            glider_id INTEGER,
+            date_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, track_name, game_mode, items_setting)
+        )
+    ''')
+    for column in ['body_id', 'tire_id', 'glider_id']:
+        add_column_if_missing(cursor, 'personal_bests', column, 'INTEGER')
+    
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_personal_bests_ranking
+        ON personal_bests (game_mode, items_setting, track_name, best_ms, user_id)
+    ''')
+    
+    # Sum-of-PBs ladders per category and per cup, updated incrementally as PBs change
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS category_totals (
+            user_id INTEGER,
+            game_mode TEXT,
+            items_setting TEXT,
+            total_ms INTEGER DEFAULT 0,
+            tracks_completed INTEGER DEFAULT 0,
+            rank_sum INTEGER DEFAULT 0,
+            date_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, game_mode, items_setting)
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_category_totals_ranking
+        ON category_totals (game_mode, items_setting, tracks_completed DESC, total_ms, user_id)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_category_totals_avg_rank
+        ON category_totals (game_mode, items_setting, (CAST(rank_sum AS REAL) / tracks_completed), user_id)
+    ''')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS cup_totals (
+            user_id INTEGER,
+            game_mode TEXT,
+            items_setting TEXT,
+            cup_name TEXT,
+            total_ms INTEGER DEFAULT 0,
+            tracks_completed INTEGER DEFAULT 0,
+            PRIMARY KEY (user_id, game_mode, items_setting, cup_name)
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_cup_totals_ranking
+        ON cup_totals (game_mode, items_setting, cup_name, tracks_completed DESC, total_ms, user_id)
+    ''')
+    
+    # Skill ratings per category, updated incrementally as PBs change
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS player_ratings (
+            user_id INTEGER,
+            game_mode TEXT,
+            items_setting TEXT,
+            rating REAL DEFAULT 1500,
+            matchups INTEGER DEFAULT 0,
+            date_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, game_mode, items_setting)
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_player_ratings_ranking
+        ON player_ratings (game_mode, items_setting, rating DESC, user_id)
+    ''')
+    
+    # PB counts per fixed-width time bucket, for percentile lookups
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS time_distributions (
+            track_name TEXT,
+            game_mode TEXT,
+            items_setting TEXT,
+            bucket INTEGER,
+            player_count INTEGER DEFAULT 0,
+            PRIMARY KEY (track_name, game_mode, items_setting, bucket)
+        )
+    ''')
+    
+    # Standard tier reached on each track (rows only exist for Bronze or better)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_track_tiers (
+            user_id INTEGER,
+            track_name TEXT,
+            game_mode TEXT,
+            items_setting TEXT,
+            tier_points INTEGER,
+            PRIMARY KEY (user_id, track_name, game_mode, items_setting)
+        )
+    ''')
+    
+    # Sum of tier points per player and mode/items, for the overall tier
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_standards (
+            user_id INTEGER,
+            game_mode TEXT,
+            items_setting TEXT,
+            tier_points INTEGER DEFAULT 0,
+            date_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, game_mode, items_setting)
+        )
+    ''')
+    
+    # Known vehicle parts with stable integer IDs (new parts get new IDs, existing ones never change)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS vehicle_parts (
+            part_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            part_type TEXT,
+            part_name TEXT UNIQUE
+        )
+    ''')
+    cursor.executemany('''
+        INSERT OR IGNORE INTO vehicle_parts (part_type, part_name) VALUES (?, ?)
+    ''', [(part_type, name) for part_type, names in VEHICLE_PART_TYPES for name in names])
+    load_vehicle_parts(cursor)
+    
+    # PB counts per part and WR-gap bucket on each track, for /meta
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS setup_meta (
+            track_name TEXT,
+            game_mode TEXT,
+            items_setting TEXT,
+            part_id INTEGER,
+            gap_bucket INTEGER,
+            player_count INTEGER DEFAULT 0,
+            PRIMARY KEY (game_mode, items_setting, track_name, part_id, gap_bucket)
+        )
+    ''')
+    
+    # A user's runs on a track in date order, for /progress
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_time_trials_user_track_date
+        ON time_trials (user_id, track_name, game_mode, items_setting, date_recorded, id)
+    ''')
+    
+    # Full-text index over run notes and vehicle setups for /search_runs. It stores no text of
+    # its own (content='time_trials'); the triggers below keep it in step with the table.
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'time_trials_fts'")
+    fts_existed = cursor.fetchone() is not None
+    try:
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS time_trials_fts USING fts5(
+                notes, vehicle_setup,
+                content='time_trials', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+            )
+        ''')
+    except sqlite3.OperationalError as e:
+        print(f"⚠️ Run search disabled, SQLite was built without FTS5: {e}")
+    else:
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS time_trials_fts_insert AFTER INSERT ON time_trials BEGIN
+                INSERT INTO time_trials_fts (rowid, notes, vehicle_setup) VALUES (new.id, new.notes, new.vehicle_setup);
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS time_trials_fts_delete AFTER DELETE ON time_trials BEGIN
+                INSERT INTO time_trials_fts (time_trials_fts, rowid, notes, vehicle_setup) VALUES ('delete', old.id, old.notes, old.vehicle_setup);
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS time_trials_fts_update AFTER UPDATE OF notes, vehicle_setup ON time_trials BEGIN
+                INSERT INTO time_trials_fts (time_trials_fts, rowid, notes, vehicle_setup) VALUES ('delete', old.id, old.notes, old.vehicle_setup);
+                INSERT INTO time_trials_fts (rowid, notes, vehicle_setup) VALUES (new.id, new.notes, new.vehicle_setup);
+            END
+        ''')
+        if not fts_existed:
+            # Index every run recorded before the search index existed
+            cursor.execute("INSERT INTO time_trials_fts (time_trials_fts) VALUES ('rebuild')")
+    
+    # Lap splits per run, and each user's best time for every lap number on a track
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS run_laps (
+            run_id INTEGER,
+            lap_number INTEGER,
+            lap_ms INTEGER,
+            PRIMARY KEY (run_id, lap_number)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS run_laps_delete AFTER DELETE ON time_trials BEGIN
+            DELETE FROM run_laps WHERE run_id = old.id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS best_laps (
+            user_id INTEGER,
+            track_name TEXT,
+            game_mode TEXT,
+            items_setting TEXT,
+            lap_number INTEGER,
+            lap_ms INTEGER,
+            run_id INTEGER,
+            PRIMARY KEY (user_id, track_name, game_mode, items_setting, lap_number)
+        )
+    ''')
+    
+    # Ordered index over a user's runs on a track so /view_times can seek page by page
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_time_trials_user_track_time
+        ON time_trials (user_id, track_name, (time_minutes * 60000 + time_seconds * 1000 + time_milliseconds), id)
+    ''')
+    
+    # Backfill personal bests for databases created before the table existed
+    cursor.execute('SELECT COUNT(*) FROM personal_bests')
+    if cursor.fetchone()[0] == 0:
+        cursor.execute('''
+            INSERT OR IGNORE INTO personal_bests (user_id, track_name, game_mode, items_setting, best_ms, run_id)
+            SELECT user_id, track_name, game_mode, items_setting, total_ms, id
+            FROM (
+                SELECT id, user_id, track_name, game_mode, items_setting,
+                       (time_minutes * 60000 + time_seconds * 1000 + time_milliseconds) as total_ms,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY user_id, track_name, game_mode, items_setting
+                           ORDER BY (time_minutes * 60000 + time_seconds * 1000 + time_milliseconds) ASC, id ASC
+                       ) as rank
+                FROM time_trials
+            )
+            WHERE rank = 1
+        ''')
+    
+    # Build the ranking tables the first time they exist
+    cursor.execute('SELECT (SELECT COUNT(*) FROM category_totals), (SELECT COUNT(*) FROM personal_bests)')
+    totals_count, personal_bests_count = cursor.fetchone()
+    if totals_count == 0 and personal_bests_count > 0:
+        rebuild_category_totals(cursor)
+    cursor.execute('SELECT COUNT(*) FROM player_ratings')
+    if cursor.fetchone()[0] == 0 and personal_bests_count > 0:
+        rebuild_player_ratings(cursor)
+    cursor.execute('SELECT COUNT(*) FROM time_distributions')
+    if cursor.fetchone()[0] == 0 and personal_bests_count > 0:
+        rebuild_time_distributions(cursor)
+    cursor.execute('SELECT COUNT(*) FROM user_standards')
+    if cursor.fetchone()[0] == 0 and personal_bests_count > 0:
+        rebuild_standard_tiers(cursor)
+    cursor.execute('SELECT COUNT(*) FROM setup_meta')
+    if cursor.fetchone()[0] == 0 and personal_bests_count > 0:
+        rebuild_setup_meta(cursor)
+    
+    # Archive weeks that closed before the results archive existed
+    cursor.execute('''
+        SELECT guild_id, week_number FROM weekly_trials
+        WHERE is_active = 0 AND (guild_id, week_number) NOT IN (SELECT guild_id, week_number FROM weekly_result_weeks)
+    ''')
+    for guild_id, week_number in cursor.fetchall():
+        archive_weekly_results(cursor, guild_id, week_number)
+    
+    conn.commit()
+    conn.close()
+
+def insert_weekly_batch(cursor, user_id, guild_id, run_ids, runs):
+    """Enter a batch's qualifying runs (this server's weekly tracks, in one of its categories) into its week.
+    
+    run_ids and runs are what insert_run_batch returned and was given, in the same
+    transaction. The server's active week is looked up once for the whole batch. Returns
+    (trial, bests) with one (track, mode, items, batch_best_ms, previous_weekly_best_ms) per
+    track and category, where the previous best is None for a first entry, or (None, []) if
+    no run qualified.
+    """
+    if guild_id is None:
+        return None, []
+    trial = get_active_weekly_trial(cursor, guild_id)
+    if not trial:
+        return None, []
+    
+    qualifying = [
+        (run_id, run) for run_id, run in zip(run_ids, runs)
+        if run[0] in trial["tracks"] and (run[1], run[2]) in trial["categories"]
+    ]
+    if not qualifying:
+        return None, []
+    
+    groups = sorted(
+        {tuple(run[:3]) for _, run in qualifying},
+        key=lambda group: (trial["tracks"].index(group[0]), trial["categories"].index(group[1:]))
+    )
+    previous_bests = {}
+    for track, mode, items in groups:
+        cursor.execute('''
+            SELECT MIN(time_minutes * 60000 + time_seconds * 1000 + time_milliseconds)
+            FROM weekly_submissions 
+            WHERE week_guild_id = ? AND week_number = ? AND user_id = ? AND track_name = ? AND game_mode = ? AND items_setting = ?
+        ''', (trial["guild_id"], trial["week_number"], user_id, track, mode, items))
+        previous_bests[track, mode, items] = cursor.fetchone()[0]
+    
+    cursor.executemany(
+        'INSERT INTO weekly_entries (run_id, guild_id, week_number) VALUES (?, ?, ?)',
+        [(run_id, trial["guild_id"], trial["week_number"]) for run_id, _ in qualifying]
+    )
+    
+    bests = [
+        group + (min(time_to_total_ms(*run[3:6]) for _, run in qualifying if tuple(run[:3]) == group), previous_bests[group])
+        for group in groups
+    ]
+    return trial, bests
+
+def warm_caches():
+    """Load in-memory caches up front so the first commands after startup don't pay for it"""
+    conn = sqlite3.connect('mario_kart_times.db')
+    cursor = conn.cursor()
+    cursor.execute('SELECT DISTINCT track_name, game_mode, items_setting FROM time_distributions')
+    for track, mode, items in cursor.fetchall():
+        get_time_distribution(cursor, track, mode, items)
+    conn.close()
+
+def fetch_weekly_standings(cursor, guild_id, week_number, track, mode, items):
+    """Every user's best time in a server's week on a track and category as (user_id, best_ms, vehicle_setup), fastest first"""
+    cursor.execute('''
+        SELECT user_id, total_ms, vehicle_setup FROM (
+            SELECT user_id, vehicle_setup,
+                   (time_minutes * 60000 + time_seconds * 1000 + time_milliseconds) as total_ms,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY user_id
+                       ORDER BY (time_minutes * 60000 + time_seconds * 1000 + time_milliseconds) ASC
+                   ) as rank
+            FROM weekly_submissions
+            WHERE week_guild_id = ? AND week_number = ? AND track_name = ? AND game_mode = ? AND items_setting = ?
+        )
+        WHERE rank = 1
+        ORDER BY total_ms ASC, user_id ASC
+    ''', (guild_id, week_number, track, mode, items))
+    return cursor.fetchall()
+
+def archive_weekly_results(cursor, guild_id, week_number):
+    """Snapshot a server's week's final standings into weekly_results, once the week has closed.
+    
+    A week closes when the next one replaces it, not at its results announcement, since
+    runs still count until then. Does nothing if the week is already archived, so closing
+    a week twice can't change its results. Returns True if a snapshot was written.
+    """
+    cursor.execute('SELECT 1 FROM weekly_result_weeks WHERE guild_id = ? AND week_number = ?', (guild_id, week_number))
+    if cursor.fetchone():
+        return False
+    trial = get_weekly_trial(cursor, guild_id, week_number)
+    if not trial:
+        return False
+    
+    for track in trial["tracks"]:
+        for mode, items in trial["categories"]:
+            standings = fetch_weekly_standings(cursor, guild_id, week_number, track, mode, items)
+            cursor.executemany('''
+                INSERT INTO weekly_results
+                (guild_id, week_number, track_name, game_mode, items_setting, placement, user_id, best_ms, vehicle_setup, track_participants)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [
+                (guild_id, week_number, track, mode, items, placement, user_id, best_ms, vehicle or "", len(standings))
+                for placement, (user_id, best_ms, vehicle) in enumerate(standings, 1)
+            ])
+    cursor.execute('''
+        INSERT INTO weekly_result_weeks (guild_id, week_number, tracks, categories, start_date, end_date, participant_count)
+        SELECT ?, ?, ?, ?, ?, ?, COUNT(DISTINCT user_id) FROM weekly_results WHERE guild_id = ? AND week_number = ?
+    ''', (
+        guild_id, week_number, json.dumps(trial["tracks"]), format_trial_categories(trial["categories"]),
+        trial["start_date"], trial["end_date"], guild_id, week_number
+    ))
+    return True
+
+# Weekly trials schedule
+WEEKDAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+TRIAL_EVENTS = ["start", "end"]
+
+WEEK_ONE_START = datetime.date(2025, 11, 4)  # Weeks are numbered from the week of the first trials
+
+SHARED_WEEK_GUILD_ID = 0  # Weeks from before each server had its own are stored under this guild ID
+
+TRIAL_MAX_TRACKS = 6
+
+TRIAL_ITEMS = ["shrooms", "no_items"]
+
+TRIAL_DEFAULT_CATEGORIES = [("150cc", "shrooms")]
+
+def parse_trial_categories(text):
+    """Parse categories like "150cc shrooms, 200cc no_items" into [(mode, items)], or None if invalid"""
+    categories = []
+    for part in (text or "").split(","):
+        words = part.split()
+        if len(words) != 2 or words[0] not in GAME_MODES or words[1] not in TRIAL_ITEMS:
+            return None
+        if tuple(words) not in categories:
+            categories.append(tuple(words))
+    return categories
+
+def format_trial_categories(categories, separator=", "):
+    return separator.join(f"{mode} {items}" for mode, items in categories)
+
+def get_trial_config(cursor, guild_id):
+    """Get a server's schedule and weekly format as a dict, creating the default one if it has none yet"""
+    cursor.execute('INSERT OR IGNORE INTO guild_trial_config (guild_id) VALUES (?)', (guild_id,))
+    cursor.execute('''
+        SELECT timezone, start_day, start_time, end_day, end_time, last_start_at, last_end_at, track_count, categories
+        FROM guild_trial_config WHERE guild_id = ?
+    ''', (guild_id,))
+    timezone, start_day, start_time, end_day, end_time, last_start_at, last_end_at, track_count, categories = cursor.fetchone()
+    return {
+        "timezone": timezone,
+        "start": (start_day, start_time),
+        "end": (end_day, end_time),
+        "last_start_at": last_start_at,
+        "last_end_at": last_end_at,
+        "track_count": track_count,
+        "categories": parse_trial_categories(categories) or TRIAL_DEFAULT_CATEGORIES
+    }
+
+def parse_clock_time(text):
+    """Parse "HH:MM" (24-hour) into (hour, minute), or None if invalid"""
+    match = re.fullmatch(r"(\d{1,2}):(\d{2})", text.strip())
+    if not match or int(match.group(1)) > 23 or int(match.group(2)) > 59:
+        return None
+    return int(match.group(1)), int(match.group(2))
+
+def next_trial_event(after, timezone, weekday, clock_time):
+    """First time strictly after `after` (aware UTC) that is `weekday` at `clock_time` in `timezone`"""
+    zone = zoneinfo.ZoneInfo(timezone)
+    hour, minute = parse_clock_time(clock_time)
+    local = after.astimezone(zone)
+    day = local.date() + datetime.timedelta(days=(weekday - local.weekday()) % 7)
+    while True:
+        candidate = datetime.datetime.combine(day, datetime.time(hour, minute), tzinfo=zone).astimezone(datetime.timezone.utc)
+        if candidate > after:
+            return candidate
+        day += datetime.timedelta(days=7)
+
+def previous_trial_event(now, timezone, weekday, clock_time):
+    """Most recent time at or before `now` that is `weekday` at `clock_time` in `timezone`"""
+    return next_trial_event(now - datetime.timedelta(days=7), timezone, weekday, clock_time)
+
+def get_trial_week(config, at):
+    """Number of the server's week running at `at` (aware UTC) by its own schedule, or 0 before week 1.
+    
+    A week is numbered by the local date of the start that opened it.
+    """
+    started_at = previous_trial_event(at, config["timezone"], *config["start"])
+    start_date = started_at.astimezone(zoneinfo.ZoneInfo(config["timezone"])).date()
+    return max(0, (start_date - WEEK_ONE_START).days // 7 + 1)
+
+def weekly_trial_from_row(row):
+    guild_id, week_number, tracks, categories, start_date, end_date = row
+    return {
+        "guild_id": guild_id,
+        "week_number": week_number,
+        "tracks": json.loads(tracks),
+        "categories": parse_trial_categories(categories) or TRIAL_DEFAULT_CATEGORIES,
+        "start_date": start_date,
+        "end_date": end_date
+    }
+
+WEEKLY_TRIAL_COLUMNS = "guild_id, week_number, tracks, categories, start_date, end_date"
+
+def get_weekly_trial(cursor, guild_id, week_number):
+    """Get a server's week as a dict (see weekly_trial_from_row), or None"""
+    cursor.execute(f'''
+        SELECT {WEEKLY_TRIAL_COLUMNS} FROM weekly_trials WHERE guild_id = ? AND week_number = ?
+    ''', (guild_id, week_number))
+    row = cursor.fetchone()
+    return weekly_trial_from_row(row) if row else None
+
+def get_active_weekly_trial(cursor, guild_id):
+    """Get the week running in a server, or None.
+    
+    Falls back to a shared week still running from before the server had its own weeks.
+    """
+    cursor.execute(f'''
+        SELECT {WEEKLY_TRIAL_COLUMNS} FROM weekly_trials
+        WHERE guild_id IN (?, ?) AND is_active = 1
+        ORDER BY guild_id = ? DESC, week_number DESC
+        LIMIT 1
+    ''', (guild_id, SHARED_WEEK_GUILD_ID, guild_id))
+    row = cursor.fetchone()
+    return weekly_trial_from_row(row) if row else None
+
+def close_weekly_trial(cursor, guild_id, week_number):
+    """Archive a week's final standings and mark it finished"""
+    archive_weekly_results(cursor, guild_id, week_number)
+    cursor.execute('''
+        UPDATE weekly_trials SET is_active = 0 WHERE guild_id = ? AND week_number = ?
+    ''', (guild_id, week_number))
+
+def open_weekly_trial(cursor, guild_id, at):
+    """Start the server's week for a start event due at `at` (aware UTC), in the caller's transaction.
+    
+    The week number comes from the server's own schedule, and its tracks and categories from
+    its config at this moment. The server's previous week is closed (archived) here, since
+    runs count toward it until it is replaced. Returns (trial, opened): the week now running
+    and whether this call started it, or (None, False) before week 1.
+    """
+    config = get_trial_config(cursor, guild_id)
+    week_number = get_trial_week(config, at)
+    if week_number <= 0:
+        return None, False
+    
+    active = get_active_weekly_trial(cursor, guild_id)
+    if active and active["guild_id"] == guild_id and active["week_number"] >= week_number:
+        return active, False
+    
+    started_at = previous_trial_event(at, config["timezone"], *config["start"])
+    ends_at = next_trial_event(started_at, config["timezone"], *config["end"])
+    zone = zoneinfo.ZoneInfo(config["timezone"])
+    start_date = started_at.astimezone(zone).date().isoformat()
+    end_date = ends_at.astimezone(zone).date().isoformat()
+    
+    previous_tracks = active["tracks"] if active else []
+    if active and active["guild_id"] == guild_id:
+        close_weekly_trial(cursor, guild_id, active["week_number"])
+    # A shared week closes at the first server start after its end date
+    cursor.execute('''
+        SELECT week_number FROM weekly_trials WHERE guild_id = ? AND is_active = 1 AND end_date < ?
+    ''', (SHARED_WEEK_GUILD_ID, start_date))
+    for (shared_week,) in cursor.fetchall():
+        close_weekly_trial(cursor, SHARED_WEEK_GUILD_ID, shared_week)
+    
+    tracks = select_weekly_tracks(week_number, config["track_count"], previous_tracks)
+    cursor.execute('''
+        INSERT INTO weekly_trials (guild_id, week_number, tracks, categories, start_date, end_date, is_active)
+        VALUES (?, ?, ?, ?, ?, ?, 1)
+    ''', (guild_id, week_number, json.dumps(tracks), format_trial_categories(config["categories"]), start_date, end_date))
+    return get_weekly_trial(cursor, guild_id, week_number), True
+
+# Service entry points: one call per user action, each in the caller's transaction
+def submit_runs(cursor, user_id, guild_id, runs, weekly=True):
+    """Record a batch of runs and apply everything that follows from them.
+    
+    runs are tuples as for insert_run_batch. They only count toward weekly trials when
+    weekly is True. Returns a dict with the new run ids and insert_run_batch's per-track
+    results, the server's weekly trials week and insert_weekly_batch's per-track bests, the user's streak if the batch
+    completed the week (else None) and any milestones newly reached.
+    """
+    run_ids, results = insert_run_batch(cursor, user_id, guild_id, runs)
+    trial, weekly_bests = insert_weekly_batch(cursor, user_id, guild_id, run_ids, runs) if weekly else (None, [])
+    streak = advance_weekly_streak(cursor, user_id, guild_id, trial) if trial else None
+    return {
+        "run_ids": run_ids,
+        "results": results,
+        "week_number": trial["week_number"] if trial else None,
+        "weekly_bests": weekly_bests,
+        "streak": streak,
+        "milestones": check_milestones(cursor, user_id, guild_id)
+    }
+
+def submit_run(cursor, user_id, guild_id, track, mode, items, mins, secs, ms, vehicle=None, notes=None, laps=None):
+    """Record one run and apply everything that follows from it.
+    
+    laps are lap times in ms already checked by parse_splits, or None. Raises ValueError if
+    they don't match the lap count of the user's earlier splits on the track. Returns
+    submit_runs' result for the run's track, plus the run id, lap bests, standard tier
+    points before and after (per track and overall) and the weekly best before this run.
+    """
+    if laps:
+        previous_best_laps = get_best_laps(cursor, user_id, track, mode, items)
+        if previous_best_laps and len(previous_best_laps) != len(laps):
+            raise ValueError(f"Your earlier splits on {track} ({mode}, {items}) have {len(previous_best_laps)} laps, but you entered {len(laps)}.")
+    
+    submission = submit_runs(cursor, user_id, guild_id, [(track, mode, items, mins, secs, ms, vehicle, notes, None)])
+    result = submission.pop("results")[0]
+    result["run_id"] = submission.pop("run_ids")[0]
+    result.update(submission)
+    
+    result["new_best_lap_numbers"] = []
+    result["best_laps"] = []
+    if laps:
+        result["new_best_lap_numbers"] = record_run_laps(cursor, result["run_id"], user_id, track, mode, items, laps)
+        result["best_laps"] = get_best_laps(cursor, user_id, track, mode, items)
+    
+    old_tier_points = standard_tier_points(track, mode, items, result["old_best_ms"])
+    new_tier_points = standard_tier_points(track, mode, items, result["new_best_ms"])
+    cursor.execute('''
+        SELECT tier_points FROM user_standards WHERE user_id = ? AND game_mode = ? AND items_setting = ?
+    ''', (user_id, mode, items))
+    standards_row = cursor.fetchone()
+    total_tier_points = standards_row[0] if standards_row else 0
+    result["tier_points"] = (old_tier_points, new_tier_points)
+    result["overall_tier_points"] = (
+        overall_tier_points(mode, items, total_tier_points - (new_tier_points - old_tier_points)),
+        overall_tier_points(mode, items, total_tier_points)
+    )
+    
+    result["previous_weekly_best_ms"] = result["weekly_bests"][0][4] if result["weekly_bests"] else None
+    return result
+
+def delete_latest_run(cursor, user_id, track, mode, items):
+    """Delete the user's most recent run on a track/mode/items and refresh what derives from it.
+    
+    Returns the deleted run as a dict with its time and date_recorded, or None if the user
+    has no runs there.
+    """
+    cursor.execute('''
+        SELECT id, time_minutes, time_seconds, time_milliseconds, date_recorded
+        FROM time_trials
+        WHERE user_id = ? AND track_name = ? AND game_mode = ? AND items_setting = ?
+        ORDER BY date_recorded DESC
+        LIMIT 1
+    ''', (user_id, track, mode, items))
+    row = cursor.fetchone()
+    if not row:
+        return None
+    
+    run_id, mins, secs, ms, date_recorded = row
+    cursor.execute('DELETE FROM time_trials WHERE id = ?', (run_id,))
+    refresh_personal_best(cursor, user_id, track, mode, items)
+    refresh_best_laps(cursor, user_id, track, mode, items)
+    return {"minutes": mins, "seconds": secs, "milliseconds": ms, "date_recorded": date_recorded}
+
+def clear_track_runs(cursor, user_id, track):
+    """Delete all of the user's runs on a track, in every mode, and return how many there were"""
+    cursor.execute('DELETE FROM time_trials WHERE user_id = ? AND track_name = ?', (user_id, track))
+    count = cursor.rowcount
+    if count:
+        cursor.execute('SELECT game_mode, items_setting FROM personal_bests WHERE user_id = ? AND track_name = ?', (user_id, track))
+        for mode, items in cursor.fetchall():
+            refresh_personal_best(cursor, user_id, track, mode, items)
+        cursor.execute('DELETE FROM best_laps WHERE user_id = ? AND track_name = ?', (user_id, track))
+    return count
+
+# The entry points that write; the writer service (db_writer.py) runs only these
+WRITE_OPERATIONS = {
+    "submit_run": submit_run,
+    "submit_runs": submit_runs,
+    "delete_latest_run": delete_latest_run,
+    "clear_track_runs": clear_track_runs
+}
+
+def get_leaderboard(cursor, mode, items, tracks=None):
+    """Top time on each track (every track by default) as {track: (user_id, best_ms, vehicle_setup) or None}"""
+    return {track: get_track_record(cursor, track, mode, items) for track in (tracks or MK8_TRACKS)}
+
+def compute_stats(cursor, user_id, mode, items, compare_id=None):
+    """Summarise a user's runs and PBs in one mode/items.
+    
+    Returns a dict with run and track counts, the most played track as (track, runs), the 5
+    latest runs, the average rank and WR gap (ms) over the user's PBs, and, with compare_id,
+    head-to-head (wins, losses): tracks where one of the two holds the top PB and the other
+    the second.
+    """
+    cursor.execute('''
+        SELECT COUNT(*), COUNT(DISTINCT track_name) FROM time_trials WHERE user_id = ? AND game_mode = ? AND items_setting = ?
+    ''', (user_id, mode, items))
+    total_submissions, tracks_recorded = cursor.fetchone()
+    # Most played track
+    cursor.execute('''
+        SELECT track_name, COUNT(*) as cnt FROM time_trials
+        WHERE user_id = ? AND game_mode = ? AND items_setting = ?
+        GROUP BY track_name ORDER BY cnt DESC LIMIT 1
+    ''', (user_id, mode, items))
+    most_played = cursor.fetchone()
+    # Recent activity (last 5 runs)
+    cursor.execute('''
+        SELECT track_name, time_minutes, time_seconds, time_milliseconds, date_recorded FROM time_trials
+        WHERE user_id = ? AND game_mode = ? AND items_setting = ?
+        ORDER BY date_recorded DESC LIMIT 5
+    ''', (user_id, mode, items))
+    recent_runs = cursor.fetchall()
+    
+    # Rank and WR gap per track, from the user's PBs
+    cursor.execute('''
+        SELECT track_name, best_ms FROM personal_bests WHERE user_id = ? AND game_mode = ? AND items_setting = ?
+    ''', (user_id, mode, items))
+    ranks = []
+    wr_gaps = []
+    for track, best_ms in cursor.fetchall():
+        ranks.append(get_track_rank(cursor, user_id, track, mode, items, best_ms))
+        wr_parsed = get_world_record(track, mode, items)
+        if wr_parsed:
+            wr_gaps.append(best_ms - time_to_total_ms(*wr_parsed))
+    
+    head_to_head = None
+    if compare_id is not None:
+        wins = 0
+        losses = 0
+        for track in MK8_TRACKS:
+            cursor.execute('''
+                SELECT user_id FROM personal_bests
+                WHERE game_mode = ? AND items_setting = ? AND track_name = ?
+                ORDER BY best_ms ASC, user_id ASC
+                LIMIT 2
+            ''', (mode, items, track))
+            top_two = [row[0] for row in cursor.fetchall()]
+            if top_two == [user_id, compare_id]:
+                wins += 1
+            elif top_two == [compare_id, user_id]:
+                losses += 1
+        head_to_head = (wins, losses)
+    
+    return {
+        "total_submissions": total_submissions,
+        "tracks_recorded": tracks_recorded,
+        "most_played": most_played,
+        "recent_runs": recent_runs,
+        "average_rank": sum(ranks) / len(ranks) if ranks else None,
+        "average_wr_gap_ms": sum(wr_gaps) / len(wr_gaps) if wr_gaps else None,
+        "head_to_head": head_to_head
+    }
@@ -0,0 +1,61 @@
+# Stat points of every driver, body, tire and glider, grouped into stat classes (parts in
+# a class share the same stats). Each class is (names, (speed, acceleration, weight,
+# handling, mini_turbo)); a combo's stats are the sum of its four parts.
+# Body, tire and glider names match karts_config.
+
+STAT_NAMES = ["speed", "acceleration", "weight", "handling", "mini_turbo"]
+
+MK8_DRIVER_CLASSES = [
+    (["Baby Rosalina", "Lemmy"], (2, 5, 0, 10, 6)),
+    (["Baby Peach", "Baby Daisy"], (2, 5, 1, 9, 6)),
+    (["Baby Mario", "Baby Luigi", "Dry Bones"], (3, 5, 1, 9, 5)),
+    (["Koopa Troopa", "Lakitu", "Bowser Jr."], (3, 5, 2, 8, 5)),
+    (["Toad", "Shy Guy", "Larry"], (3, 5, 2, 7, 5)),
+    (["Toadette", "Wendy", "Isabelle"], (3, 5, 1, 8, 6)),
+    (["Cat Peach", "Inkling Girl", "Villager (female)"], (5, 4, 3, 7, 4)),
+    (["Peach", "Daisy", "Yoshi", "Birdo", "Diddy Kong", "Peachette"], (6, 4, 4, 7, 4)),
+    (["Tanooki Mario", "Inkling Boy", "Villager (male)"], (6, 4, 4, 6, 4)),
+    (["Mario", "Ludwig", "Mii"], (7, 4, 6, 5, 3)),
+    (["Luigi", "Iggy"], (7, 4, 5, 6, 3)),
+    (["Rosalina", "King Boo", "Link", "Kamek", "Pauline"], (8, 3, 7, 5, 2)),
+    (["Donkey Kong", "Waluigi", "Roy"], (8, 2, 8, 3, 2)),
+    (["Metal Mario", "Pink Gold Peach", "Gold Mario"], (8, 1, 10, 3, 1)),
+    (["Wario", "Dry Bowser", "Funky Kong"], (10, 1, 10, 1, 1)),
+    (["Bowser", "Morton", "Petey Piranha", "Wiggler"], (10, 0, 10, 0, 0))
+]
+
+MK8_BODY_CLASSES = [
+    (["Standard Kart", "Standard Bike", "The Duke", "Flame Rider", "W 25 Silver Arrow", "300 SL Roadster"], (2, 4, 2, 3, 3)),
+    (["Pipe Frame", "Varmint", "City Tripper"], (1, 6, 1, 5, 5)),
+    (["Mach 8", "Sports Coupe", "Inkstriker"], (3, 3, 3, 2, 3)),
+    (["Steel Driver", "Tri-Speeder", "Bone Rattler", "Standard ATV", "Standard Quad"], (4, 1, 4, 0, 1)),
+    (["Cat Cruiser", "Comet", "Yoshi Bike", "Teddy Buggy"], (2, 5, 2, 5, 4)),
+    (["Circuit Special", "B Dasher", "P-Wing"], (5, 1, 3, 1, 1)),
+    (["Badwagon", "GLA"], (5, 0, 5, 0, 0)),
+    (["Prancer", "Sport Bike", "Jet Bike"], (4, 2, 1, 2, 1)),
+    (["Biddybuggy", "Buggybud", "Mr. Scooty"], (0, 7, 0, 5, 6)),
+    (["Landship", "Streetle"], (1, 6, 1, 4, 4)),
+    (["Sneeker", "Gold Standard", "Gold Kart", "Master Cycle"], (3, 2, 2, 3, 2)),
+    (["Bounder"], (3, 1, 3, 2, 3)),
+    (["Blue Falcon", "Tanooki Kart", "Splat Buggy"], (3, 3, 1, 4, 3)),
+    (["Koopa Clown", "Master Cycle Zero", "Wild Wiggler"], (2, 4, 3, 3, 4))
+]
+
+MK8_TIRE_CLASSES = [
+    (["Standard", "Blue Standard", "GLA Tires"], (2, 4, 2, 3, 3)),
+    (["Monster", "Hot Monster"], (2, 2, 4, 1, 1)),
+    (["Roller", "Azure Roller"], (0, 6, 0, 4, 6)),
+    (["Slim", "Crimson Slim"], (2, 2, 2, 5, 2)),
+    (["Slick", "Cyber Slick"], (4, 1, 3, 0, 0)),
+    (["Metal", "Gold Tires"], (4, 1, 4, 2, 1)),
+    (["Button", "Leaf Tires"], (0, 5, 0, 4, 5)),
+    (["Off-Road", "Retro Off-Road", "Triforce Tires", "Ancient Tires"], (3, 2, 3, 1, 2)),
+    (["Sponge", "Cushion", "Wood"], (1, 4, 1, 3, 4))
+]
+
+MK8_GLIDER_CLASSES = [
+    (["Super Glider", "Waddle Wing", "Hylian Kite"], (1, 1, 1, 1, 1)),
+    (["Cloud Glider", "Parachute", "Flower Glider", "Paper Glider"], (0, 2, 0, 1, 2)),
+    (["Wario Wing", "Plane Glider", "Gold Glider", "Bowser Kite"], (1, 1, 2, 0, 1)),
+    (["Peach Parasol", "Parafoil", "MKTV Parafoil", "Paraglider"], (0, 2, 1, 1, 1))
+]
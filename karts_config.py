@@ -45,3 +45,46 @@ MK8_VEHICLES = [
     "Splat Buggy",
     "Inkstriker"
 ]
+
+MK8_TIRES = [
+    "Standard",
+    "Monster",
+    "Roller",
+    "Slim",
+    "Slick",
+    "Metal",
+    "Button",
+    "Off-Road",
+    "Sponge",
+    "Wood",
+    "Cushion",
+    "Blue Standard",
+    "Hot Monster",
+    "Azure Roller",
+    "Crimson Slim",
+    "Cyber Slick",
+    "Retro Off-Road",
+    "Gold Tires",
+    "GLA Tires",
+    "Triforce Tires",
+    "Ancient Tires",
+    "Leaf Tires"
+]
+
+MK8_GLIDERS = [
+    "Super Glider",
+    "Cloud Glider",
+    "Wario Wing",
+    "Waddle Wing",
+    "Peach Parasol",
+    "Parachute",
+    "Parafoil",
+    "Flower Glider",
+    "Bowser Kite",
+    "Plane Glider",
+    "MKTV Parafoil",
+    "Gold Glider",
+    "Hylian Kite",
+    "Paraglider",
+    "Paper Glider"
+]
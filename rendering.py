@@ -0,0 +1,175 @@
+"""Pillow renderers for chart and table images.
+
+Imported on first use through bot.load_rendering(), so Pillow is only loaded once someone
+asks for an image. Nothing here touches the database or Discord; table images are drawn in
+worker processes, which only need this module.
+"""
+import datetime
+import io
+
+from PIL import Image, ImageDraw, ImageFont
+
+from froog_core import format_time, total_ms_to_time
+
+# Progress charts
+PROGRESS_MAX_POINTS = 300  # Runs plotted per chart; longer histories are downsampled
+PROGRESS_CADENCE_BARS = 40
+PROGRESS_CHART_SIZE = (900, 500)
+
+def downsample_lttb(points, threshold):
+    """Reduce (x, y) points to `threshold` points with Largest-Triangle-Three-Buckets.
+    
+    The first and last points are kept; from each bucket in between, the point forming the
+    largest triangle with the previously kept point and the next bucket's average is kept,
+    which preserves the peaks and dips a plain every-Nth sample would miss.
+    """
+    if threshold >= len(points) or threshold < 3:
+        return list(points)
+    sampled = [points[0]]
+    bucket_size = (len(points) - 2) / (threshold - 2)
+    previous = points[0]
+    for bucket in range(threshold - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+        next_start = end
+        next_end = min(max(int((bucket + 2) * bucket_size) + 1, next_start + 1), len(points))
+        next_points = points[next_start:next_end]
+        average_x = sum(x for x, _ in next_points) / len(next_points)
+        average_y = sum(y for _, y in next_points) / len(next_points)
+        chosen = max(
+            points[start:end],
+            key=lambda point: abs(
+                (previous[0] - average_x) * (point[1] - previous[1])
+                - (previous[0] - point[0]) * (average_y - previous[1])
+            )
+        )
+        sampled.append(chosen)
+        previous = chosen
+    sampled.append(points[-1])
+    return sampled
+
+def render_progress_chart(title, runs, pb_steps):
+    """Draw runs, the PB curve and run cadence as a PNG and return its bytes"""
+    width, height = PROGRESS_CHART_SIZE
+    left, right, top = 80, width - 20, 40
+    plot_bottom = height - 150
+    cadence_top, cadence_bottom = height - 110, height - 40
+    image = Image.new("RGB", (width, height), (32, 34, 37))
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default()
+    
+    start_x = runs[0][0]
+    end_x = max(runs[-1][0], start_x + 1)
+    plotted = downsample_lttb(runs, PROGRESS_MAX_POINTS)
+    fastest = min(total_ms for _, total_ms in plotted + pb_steps)
+    slowest = max(total_ms for _, total_ms in plotted)
+    padding = max((slowest - fastest) * 0.05, 100)
+    low, high = fastest - padding, slowest + padding
+    
+    def x_position(timestamp):
+        return left + (timestamp - start_x) / (end_x - start_x) * (right - left)
+    
+    def y_position(total_ms):
+        return plot_bottom - (total_ms - low) / (high - low) * (plot_bottom - top)
+    
+    draw.text((left, 12), title, fill=(255, 255, 255), font=font)
+    
+    # Time axis labels and grid
+    for step in range(5):
+        total_ms = low + (high - low) * step / 4
+        y = y_position(total_ms)
+        draw.line([(left, y), (right, y)], fill=(60, 63, 68))
+        draw.text((8, y - 6), format_time(*total_ms_to_time(int(total_ms))), fill=(185, 187, 190), font=font)
+    
+    # Every (downsampled) run as a dot
+    for timestamp, total_ms in plotted:
+        x, y = x_position(timestamp), y_position(total_ms)
+        draw.ellipse([(x - 2, y - 2), (x + 2, y + 2)], fill=(114, 137, 218))
+    
+    # PB curve as a step line carried through to the last run
+    pb_line = []
+    for timestamp, total_ms in pb_steps:
+        if pb_line:
+            pb_line.append((x_position(timestamp), pb_line[-1][1]))
+        pb_line.append((x_position(timestamp), y_position(total_ms)))
+    pb_line.append((right, pb_line[-1][1]))
+    draw.line(pb_line, fill=(255, 215, 0), width=2)
+    
+    # Run cadence: runs per equal slice of the date range
+    cadence = [0] * PROGRESS_CADENCE_BARS
+    for timestamp, _ in runs:
+        cadence[min(int((timestamp - start_x) / (end_x - start_x) * PROGRESS_CADENCE_BARS), PROGRESS_CADENCE_BARS - 1)] += 1
+    busiest = max(cadence)
+    bar_width = (right - left) / PROGRESS_CADENCE_BARS
+    for index, count in enumerate(cadence):
+        if count:
+            bar_top = cadence_bottom - count / busiest * (cadence_bottom - cadence_top)
+            draw.rectangle([(left + index * bar_width + 1, bar_top), (left + (index + 1) * bar_width - 1, cadence_bottom)], fill=(67, 181, 129))
+    draw.text((8, cadence_top), f"Runs\n(max {busiest})", fill=(185, 187, 190), font=font)
+    
+    # Date labels
+    for step in range(3):
+        timestamp = start_x + (end_x - start_x) * step / 2
+        label = datetime.datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d")
+        # Left, centre and right aligned under the start, middle and end of the range
+        label_x = x_position(timestamp) - draw.textlength(label, font=font) * step / 2
+        draw.text((label_x, cadence_bottom + 10), label, fill=(185, 187, 190), font=font)
+    
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+# Table images
+def render_table_image(title, headers, rows, footer=None):
+    """Draw a table as a PNG and return its bytes.
+    
+    rows are lists of cell strings; a plain string row is drawn as a section heading across
+    the table. Runs in a worker process, so it only takes and returns plain data.
+    """
+    try:
+        font = ImageFont.load_default(size=15)
+        title_font = ImageFont.load_default(size=20)
+    except TypeError:  # Pillow < 10.1 has a single fixed-size default font
+        font = title_font = ImageFont.load_default()
+    measure = ImageDraw.Draw(Image.new("RGB", (1, 1)))
+    padding, row_height = 12, 24
+    
+    column_widths = [measure.textlength(header, font=font) for header in headers]
+    for row in rows:
+        if not isinstance(row, str):
+            column_widths = [max(width, measure.textlength(cell, font=font)) for width, cell in zip(column_widths, row)]
+    column_widths = [int(width) + 2 * padding for width in column_widths]
+    width = max(sum(column_widths), int(measure.textlength(title, font=title_font)) + 2 * padding)
+    height = 50 + row_height * (len(rows) + 1) + (30 if footer else 10)
+    
+    image = Image.new("RGB", (width, height), (32, 34, 37))
+    draw = ImageDraw.Draw(image)
+    draw.text((padding, 14), title, fill=(255, 255, 255), font=title_font)
+    
+    y = 50
+    x = 0
+    draw.rectangle([(0, y), (width, y + row_height)], fill=(47, 49, 54))
+    for header, column_width in zip(headers, column_widths):
+        draw.text((x + padding, y + 4), header, fill=(255, 215, 0), font=font)
+        x += column_width
+    y += row_height
+    
+    for index, row in enumerate(rows):
+        if isinstance(row, str):
+            draw.rectangle([(0, y), (width, y + row_height)], fill=(64, 68, 75))
+            draw.text((padding, y + 4), row, fill=(255, 255, 255), font=font)
+        else:
+            if index % 2:
+                draw.rectangle([(0, y), (width, y + row_height)], fill=(41, 43, 47))
+            x = 0
+            for cell, column_width in zip(row, column_widths):
+                draw.text((x + padding, y + 4), cell, fill=(220, 221, 222), font=font)
+                x += column_width
+        y += row_height
+    
+    if footer:
+        draw.text((padding, y + 8), footer, fill=(150, 152, 157), font=font)
+    
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
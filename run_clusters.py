@@ -0,0 +1,97 @@
+"""Run the bot as several processes, each with its own share of the shards.
+
+Usage: python run_clusters.py --shards 16 --processes 4
+
+Each process runs bot.py with SHARD_COUNT, SHARD_IDS and CLUSTER_NAME set, so the shards are
+spread over several CPU cores. The processes coordinate through mario_kart_times.db: one of
+them holds the weekly trials scheduler lease and each posts announcements for its own
+servers. Submissions from every process go through one db_writer.py subprocess, which
+group-commits them. A process that exits unexpectedly is restarted; Ctrl+C stops them all.
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+
+RESTART_DELAY_SECONDS = 10
+WRITER_START_TIMEOUT_SECONDS = 30
+
+def shard_slices(shard_count, process_count):
+    """Split shard IDs 0..shard_count-1 round-robin into process_count near-equal slices"""
+    return [list(range(shard_count))[index::process_count] for index in range(process_count)]
+
+def script_path(name):
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), name)
+
+def start_writer(socket_path):
+    """Start the writer service and wait until it is accepting connections"""
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    print(f"Starting writer service on {socket_path}")
+    # Its own session, so Ctrl+C reaches it only through us, after the bots have stopped
+    process = subprocess.Popen([sys.executable, script_path("db_writer.py"), "--socket", socket_path], start_new_session=True)
+    deadline = time.monotonic() + WRITER_START_TIMEOUT_SECONDS
+    while not os.path.exists(socket_path):
+        if process.poll() is not None or time.monotonic() > deadline:
+            process.kill()
+            sys.exit(f"❌ Writer service didn't start (exit code {process.returncode})")
+        time.sleep(0.1)
+    return process
+
+def start_cluster(index, shard_count, shard_ids, socket_path):
+    env = dict(
+        os.environ, SHARD_COUNT=str(shard_count), SHARD_IDS=",".join(map(str, shard_ids)),
+        CLUSTER_NAME=f"cluster-{index}", DB_WRITER_SOCKET=socket_path
+    )
+    print(f"Starting cluster-{index} with shards {shard_ids}")
+    return subprocess.Popen([sys.executable, script_path("bot.py")], env=env)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run Froog as several sharded processes")
+    parser.add_argument("--shards", type=int, required=True, help="total number of shards")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="bot processes to split them over")
+    parser.add_argument("--writer-socket", default=os.path.abspath("froog-writer.sock"), help="Unix socket for the writer service")
+    args = parser.parse_args()
+    if not 1 <= args.processes <= args.shards:
+        parser.error("--processes must be between 1 and --shards")
+    
+    writer = start_writer(args.writer_socket)
+    slices = shard_slices(args.shards, args.processes)
+    clusters = {index: start_cluster(index, args.shards, shard_ids, args.writer_socket) for index, shard_ids in enumerate(slices)}
+    stopping = False
+    
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for process in clusters.values():
+            process.terminate()
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    
+    while not stopping:
+        time.sleep(1)
+        if writer.poll() is not None and not stopping:
+            # Bot processes reconnect on their next submission
+            print(f"⚠️ Writer service exited with code {writer.returncode}, restarting")
+            writer = start_writer(args.writer_socket)
+        for index, process in clusters.items():
+            if process.poll() is not None and not stopping:
+                print(f"⚠️ cluster-{index} exited with code {process.returncode}, restarting in {RESTART_DELAY_SECONDS}s")
+                time.sleep(RESTART_DELAY_SECONDS)
+                if stopping:
+                    break
+                clusters[index] = start_cluster(index, args.shards, slices[index], args.writer_socket)
+    
+    # A signal can land while a cluster is being restarted, after stop() has terminated the rest
+    for process in clusters.values():
+        if process.poll() is None:
+            process.terminate()
+        process.wait()
+    # Stop the writer last so the bots' final submissions are saved
+    writer.terminate()
+    writer.wait()
+
+if __name__ == "__main__":
+    main()
@@ -61,3 +61,34 @@ MK8_TRACKS = [
 ]
 
 GAME_MODES = ["150cc", "200cc"]
+
+# Cups in display order, each with its 4 tracks (24 cups x 4 = 96 tracks)
+MK8_CUPS = [
+    # Base Game Nitro Cups
+    ("Mushroom Cup", MK8_TRACKS[0:4]),
+    ("Flower Cup", MK8_TRACKS[4:8]),
+    ("Star Cup", MK8_TRACKS[8:12]),
+    ("Special Cup", MK8_TRACKS[12:16]),
+    # Base Game Retro Cups
+    ("Shell Cup", MK8_TRACKS[16:20]),
+    ("Banana Cup", MK8_TRACKS[20:24]),
+    ("Leaf Cup", MK8_TRACKS[24:28]),
+    ("Lightning Cup", MK8_TRACKS[28:32]),
+    ("Bell Cup", MK8_TRACKS[32:36]),
+    ("Egg Cup", MK8_TRACKS[36:40]),
+    ("Triforce Cup", MK8_TRACKS[40:44]),
+    ("Crossing Cup", MK8_TRACKS[44:48]),
+    # DLC Booster Course Pass
+    ("Golden Dash Cup", MK8_TRACKS[48:52]),
+    ("Lucky Cat Cup", MK8_TRACKS[52:56]),
+    ("Turnip Cup", MK8_TRACKS[56:60]),
+    ("Propeller Cup", MK8_TRACKS[60:64]),
+    ("Rock Cup", MK8_TRACKS[64:68]),
+    ("Moon Cup", MK8_TRACKS[68:72]),
+    ("Fruit Cup", MK8_TRACKS[72:76]),
+    ("Boomerang Cup", MK8_TRACKS[76:80]),
+    ("Feather Cup", MK8_TRACKS[80:84]),
+    ("Cherry Cup", MK8_TRACKS[84:88]),
+    ("Acorn Cup", MK8_TRACKS[88:92]),
+    ("Spiny Cup", MK8_TRACKS[92:96])
+]